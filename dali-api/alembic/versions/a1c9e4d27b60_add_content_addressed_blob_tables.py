@@ -0,0 +1,52 @@
+"""Add content-addressed blob tables for image deduplication
+
+Revision ID: a1c9e4d27b60
+Revises: f8a2c1b3d4e5
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1c9e4d27b60'
+down_revision: Union[str, Sequence[str], None] = 'f8a2c1b3d4e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create stored_blobs and blob_references tables."""
+    op.create_table('stored_blobs',
+    sa.Column('digest', sa.String(length=64), nullable=False),
+    sa.Column('object_key', sa.String(length=200), nullable=False),
+    sa.Column('content_type', sa.String(length=50), nullable=False),
+    sa.Column('size_bytes', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('digest'),
+    sa.UniqueConstraint('object_key')
+    )
+    op.create_table('blob_references',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('digest', sa.String(length=64), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['digest'], ['stored_blobs.digest'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'digest', 'kind', name='uq_blob_references_user_digest_kind')
+    )
+    op.create_index(op.f('ix_blob_references_user_id'), 'blob_references', ['user_id'], unique=False)
+    op.create_index(op.f('ix_blob_references_digest'), 'blob_references', ['digest'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop blob tables."""
+    op.drop_index(op.f('ix_blob_references_digest'), table_name='blob_references')
+    op.drop_index(op.f('ix_blob_references_user_id'), table_name='blob_references')
+    op.drop_table('blob_references')
+    op.drop_table('stored_blobs')
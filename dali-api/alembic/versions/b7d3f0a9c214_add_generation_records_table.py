@@ -0,0 +1,53 @@
+"""Add generation_records table for usage and cost accounting
+
+Revision ID: b7d3f0a9c214
+Revises: a1c9e4d27b60
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d3f0a9c214'
+down_revision: Union[str, Sequence[str], None] = 'a1c9e4d27b60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create generation_records table."""
+    op.create_table('generation_records',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('outfit_id', sa.UUID(), nullable=False),
+    sa.Column('occasion', sa.String(length=100), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('model', sa.String(length=50), nullable=False),
+    sa.Column('prompt_tokens', sa.Integer(), nullable=False),
+    sa.Column('completion_tokens', sa.Integer(), nullable=False),
+    sa.Column('time_to_first_token_ms', sa.Integer(), nullable=True),
+    sa.Column('chunk_gap_p50_ms', sa.Integer(), nullable=True),
+    sa.Column('chunk_gap_p95_ms', sa.Integer(), nullable=True),
+    sa.Column('chunk_gap_max_ms', sa.Integer(), nullable=True),
+    sa.Column('stream_time_ms', sa.Integer(), nullable=True),
+    sa.Column('image_provider', sa.String(length=20), nullable=True),
+    sa.Column('image_time_ms', sa.Integer(), nullable=True),
+    sa.Column('generation_time_ms', sa.Integer(), nullable=False),
+    sa.Column('estimated_cost', sa.Numeric(precision=12, scale=6), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_generation_records_user_id'), 'generation_records', ['user_id'], unique=False)
+    op.create_index(op.f('ix_generation_records_created_at'), 'generation_records', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop generation_records table."""
+    op.drop_index(op.f('ix_generation_records_created_at'), table_name='generation_records')
+    op.drop_index(op.f('ix_generation_records_user_id'), table_name='generation_records')
+    op.drop_table('generation_records')
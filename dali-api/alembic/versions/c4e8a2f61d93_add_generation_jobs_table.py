@@ -0,0 +1,56 @@
+"""Add generation_jobs table for background outfit generation
+
+Revision ID: c4e8a2f61d93
+Revises: b7d3f0a9c214
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a2f61d93'
+down_revision: Union[str, Sequence[str], None] = 'b7d3f0a9c214'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create generation_jobs table."""
+    op.create_table('generation_jobs',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('selected_item_url', sa.Text(), nullable=False),
+    sa.Column('selected_item_description', sa.String(length=200), nullable=False),
+    sa.Column('selected_item_category', sa.String(length=50), nullable=False),
+    sa.Column('occasion', sa.String(length=100), nullable=False),
+    sa.Column('original_image_url', sa.Text(), nullable=True),
+    sa.Column('callback_url', sa.Text(), nullable=True),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.Column('image_url', sa.Text(), nullable=True),
+    sa.Column('image_error', sa.String(length=200), nullable=True),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('outfit_id', sa.UUID(), nullable=True),
+    sa.Column('fallback', sa.String(length=20), nullable=True),
+    sa.Column('error_code', sa.String(length=50), nullable=True),
+    sa.Column('error_message', sa.String(length=200), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_generation_jobs_user_id'), 'generation_jobs', ['user_id'], unique=False)
+    op.create_index('ix_generation_jobs_status_created_at', 'generation_jobs', ['status', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop generation_jobs table."""
+    op.drop_index('ix_generation_jobs_status_created_at', table_name='generation_jobs')
+    op.drop_index(op.f('ix_generation_jobs_user_id'), table_name='generation_jobs')
+    op.drop_table('generation_jobs')
@@ -0,0 +1,50 @@
+"""Add wardrobe_items table for saved garments
+
+Revision ID: e1f7b3c58a20
+Revises: c4e8a2f61d93
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f7b3c58a20'
+down_revision: Union[str, Sequence[str], None] = 'c4e8a2f61d93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create wardrobe_items table."""
+    op.create_table('wardrobe_items',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('digest', sa.String(length=64), nullable=False),
+    sa.Column('object_key', sa.String(length=200), nullable=False),
+    sa.Column('garment_type', sa.String(length=20), nullable=False),
+    sa.Column('category', sa.String(length=50), nullable=True),
+    sa.Column('color', sa.String(length=50), nullable=True),
+    sa.Column('style', sa.String(length=100), nullable=True),
+    sa.Column('pattern', sa.String(length=50), nullable=True),
+    sa.Column('description', sa.String(length=200), nullable=True),
+    sa.Column('colors', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('embedding', sa.LargeBinary(), nullable=False),
+    sa.Column('embedding_version', sa.SmallInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['digest'], ['stored_blobs.digest'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'digest', name='uq_wardrobe_items_user_digest')
+    )
+    op.create_index(op.f('ix_wardrobe_items_user_id'), 'wardrobe_items', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop wardrobe_items table."""
+    op.drop_index(op.f('ix_wardrobe_items_user_id'), table_name='wardrobe_items')
+    op.drop_table('wardrobe_items')
@@ -1,14 +1,17 @@
 """Dependency injection for API routes."""
 
+import hmac
 import uuid
 from collections.abc import AsyncGenerator
 from typing import Annotated
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
+from app.core.deadline import set_deadline
 from app.core.security import verify_token
 from app.db.session import async_session_maker
 from app.models.user import User
@@ -87,6 +90,51 @@ async def get_current_user(
     return user
 
 
+async def get_current_user_short_session(
+    credentials: Annotated[HTTPAuthorizationCredentials, Depends(bearer_scheme)],
+) -> User:
+    """Authenticate like get_current_user, with a session closed before the route runs.
+
+    For routes that wait (long-polls): the request's get_db session is only
+    closed after the response is sent, so it would hold a pooled connection
+    for the whole wait.
+
+    Raises:
+        HTTPException: If token is invalid or user not found
+    """
+    async with async_session_maker() as db:
+        return await get_current_user(credentials, db)
+
+
+async def require_admin(x_admin_token: Annotated[str | None, Header()] = None) -> None:
+    """Allow only requests carrying the configured X-Admin-Token.
+
+    Raises:
+        HTTPException: 404 if admin endpoints are disabled, 403 on a wrong token
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail={"code": "ADMIN_FORBIDDEN", "message": "Admin token required"},
+        )
+
+
+async def request_deadline() -> None:
+    """Give the request REQUEST_DEADLINE_SECONDS to finish (see app.core.deadline).
+
+    Async on purpose: a sync dependency runs in a worker thread, and the
+    deadline would not reach the route.
+    """
+    set_deadline(settings.REQUEST_DEADLINE_SECONDS)
+
+
+async def stream_deadline() -> None:
+    """Give a streaming response STREAM_DEADLINE_SECONDS to finish."""
+    set_deadline(settings.STREAM_DEADLINE_SECONDS)
+
+
 # Type aliases for dependency injection
 DBSession = Annotated[AsyncSession, Depends(get_db)]
 CurrentUser = Annotated[User, Depends(get_current_user)]
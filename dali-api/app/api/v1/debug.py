@@ -0,0 +1,55 @@
+"""Admin-only diagnostics for live workers.
+
+Requests need the X-Admin-Token header (see require_admin); with ADMIN_TOKEN
+unset the routes answer 404. Each request is served by one uvicorn worker,
+whose pid is returned in X-Worker-Pid; repeat the call to reach others.
+"""
+
+import asyncio
+import os
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+
+from app.api.deps import require_admin
+from app.config import settings
+from app.core.exceptions import APIException
+from app.core.profiling import sample_stacks
+
+router = APIRouter(prefix="/debug", tags=["debug"], dependencies=[Depends(require_admin)])
+
+# One profile per worker at a time; sampling costs CPU of its own
+_profile_lock = asyncio.Lock()
+
+
+@router.get("/profile", response_class=PlainTextResponse, include_in_schema=False)
+async def profile(
+    seconds: float = Query(10.0, gt=0),
+    interval_ms: int = Query(10, ge=1, le=1000),
+) -> PlainTextResponse:
+    """Sample this worker's stacks and return them as collapsed stacks.
+
+    Feed the file to flamegraph.pl or speedscope:
+
+        curl -H "X-Admin-Token: ..." ".../api/v1/debug/profile?seconds=30" > out.collapsed
+        flamegraph.pl out.collapsed > out.svg
+    """
+    if _profile_lock.locked():
+        raise APIException(
+            code="PROFILE_IN_PROGRESS",
+            message="A profile is already running on this worker",
+            status_code=409,
+        )
+    async with _profile_lock:
+        # Sample from a thread so the event loop keeps serving (and being profiled)
+        collapsed = await asyncio.to_thread(
+            sample_stacks, min(seconds, settings.PROFILE_MAX_SECONDS), interval_ms / 1000
+        )
+    pid = os.getpid()
+    return PlainTextResponse(
+        collapsed,
+        headers={
+            "X-Worker-Pid": str(pid),
+            "Content-Disposition": f'attachment; filename="profile-{pid}.collapsed"',
+        },
+    )
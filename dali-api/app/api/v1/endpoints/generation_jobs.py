@@ -0,0 +1,96 @@
+"""Background outfit generation jobs.
+
+The job-based variant of /outfits/generate-stream for clients that cannot
+hold a stream open: submit, then poll (or long-poll) the job's status, or
+receive a callback when it has finished. See app.services.generation_jobs.
+"""
+
+import logging
+import uuid
+
+from fastapi import APIRouter, Depends, Query, status
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_current_user, get_current_user_short_session, get_db
+from app.api.v1.endpoints.sse import GenerateStreamRequest
+from app.models.user import User
+from app.services.generation_jobs import generation_job_service, job_payload
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/outfits/jobs", tags=["outfits-jobs"])
+
+
+class GenerationJobRequest(GenerateStreamRequest):
+    """Request schema for a background outfit generation."""
+
+    callback_url: str | None = Field(
+        None, description="HTTPS URL (allowlisted host) to POST the finished job to"
+    )
+
+
+class GenerationJobError(BaseModel):
+    """Why a job failed."""
+
+    code: str
+    message: str
+
+
+class GenerationJobResponse(BaseModel):
+    """Status, progress and result of a generation job."""
+
+    job_id: str
+    status: str = Field(..., description="queued, running, complete or error")
+    version: int = Field(..., description="Changes whenever the job does; pass it back to long-poll")
+    occasion: str
+    text: str = Field(..., description="Outfit text generated so far")
+    image_url: str | None = None
+    image_error: str | None = None
+    outfit_id: str | None = None
+    fallback: str | None = None
+    error: GenerationJobError | None = None
+    created_at: str
+    finished_at: str | None = None
+
+
+@router.post("", response_model=GenerationJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_generation_job(
+    request: GenerationJobRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> GenerationJobResponse:
+    """Queue an outfit generation and return its job at once.
+
+    Poll GET /outfits/jobs/{job_id} for progress. A job runs with the same
+    pipeline and deadline as /outfits/generate-stream.
+    """
+    job = await generation_job_service.submit(
+        db,
+        user_id=current_user.id,
+        selected_item_url=request.selected_item_url,
+        selected_item_description=request.selected_item_description,
+        selected_item_category=request.selected_item_category,
+        occasion=request.occasion,
+        original_image_url=request.original_image_url,
+        callback_url=request.callback_url,
+    )
+    return GenerationJobResponse(**job_payload(job))
+
+
+@router.get("/{job_id}", response_model=GenerationJobResponse)
+async def get_generation_job(
+    job_id: uuid.UUID,
+    version: int | None = Query(None, description="Long-poll: wait until the job's version is past this one"),
+    wait: float = Query(0.0, ge=0, description="Longest wait in seconds (capped server-side)"),
+    # Its session is closed before the wait (see get_current_user_short_session)
+    current_user: User = Depends(get_current_user_short_session),
+) -> GenerationJobResponse:
+    """Get a generation job's status, text so far and image.
+
+    With `version` and `wait`, the response is held until the job changes,
+    finishes or `wait` runs out; the client then polls again with the
+    version it received.
+    """
+    job = await generation_job_service.get(job_id, current_user.id, after_version=version, wait=wait)
+    return GenerationJobResponse(**job_payload(job))
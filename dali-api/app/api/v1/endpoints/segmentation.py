@@ -4,8 +4,11 @@ import logging
 import uuid
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, get_db, request_deadline
+from app.core.exceptions import CircuitOpenError, DeadlineExceededError
+from app.core.retry import RetryPolicy, get_with_retry
 from app.integrations.alibaba_vision import vision_client, VisionAPIError
 from app.integrations.qwen_vision import qwen_vision_client, QwenVisionError
 from app.models.user import User
@@ -16,16 +19,23 @@ from app.schemas.segmentation import (
     SegmentClothingResponse,
     SegmentedClothingItemSchema,
 )
+from app.services.content_store import content_store
+from app.services.image_variants import image_variant_service
+from app.services.storage import storage_service
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/segmentation", tags=["Segmentation"])
+router = APIRouter(prefix="/segmentation", tags=["Segmentation"], dependencies=[Depends(request_deadline)])
+
+# Signed OSS and Vision API result URLs: plain GETs, safe to retry
+DOWNLOAD_RETRY = RetryPolicy.from_settings("signed_url_download")
 
 
 @router.post("/segment-clothing", response_model=SegmentClothingResponse)
 async def segment_clothing(
     request: SegmentClothingRequest,
     current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ) -> SegmentClothingResponse:
     """Segment clothing items from an uploaded photo.
     
@@ -62,7 +72,7 @@ async def segment_clothing(
                 try:
                     # Download the image content
                     # request.image_url is the Presigned URL from frontend (valid for download)
-                    resp = await client.get(request.image_url, timeout=30.0)
+                    resp = await get_with_retry(client, request.image_url, DOWNLOAD_RETRY, timeout=30.0)
                     if resp.status_code == 200:
                         image_content = resp.content
                         # Alibaba Cloud Vision API expects raw image URL or Base64 (depending on SDK)
@@ -85,6 +95,11 @@ async def segment_clothing(
                         # Format: "data:image/jpeg;base64,...."? Or just raw?
                         # Usually Ali APIs accept: "http://..." or "base64code..."
                         
+                        # Derive thumbnails of the user's photo while we hold its bytes
+                        photo_key = storage_service.object_key_from_url(request.image_url)
+                        if photo_key and photo_key.startswith(f"users/{current_user.id}/photos/"):
+                            image_variant_service.schedule(photo_key, image_content)
+
                         base64_str = base64.b64encode(image_content).decode('utf-8')
                         # Some Ali SDKs require protocol prefix
                         vision_image_url = f"data:image/jpeg;base64,{base64_str}"
@@ -102,20 +117,19 @@ async def segment_clothing(
         if result.individual_items:
             # Initialize HTTP client for downloading images
             import httpx
-            from app.services.storage import storage_service
-            
+
             async with httpx.AsyncClient() as client:
                 for item in result.individual_items:
-                    # Generic filename for the segmented item
                     item_id = str(uuid.uuid4())
-                    object_key = f"users/{current_user.id}/segmented/{item_id}.png"
-                    
+                    digest = None
+
                     try:
                         # Download image from Vision API (temporary URL)
                         # Use verify=False if necessary, but Alibaba SSL should be trusted
-                        img_resp = await client.get(item.image_url, timeout=10.0)
+                        img_resp = await get_with_retry(client, item.image_url, DOWNLOAD_RETRY, timeout=10.0)
                         
                         final_url = item.image_url # Fallback
+                        thumbnail_url = None
                         
                         if img_resp.status_code == 200:
                             content_length = len(img_resp.content)
@@ -124,17 +138,27 @@ async def segment_clothing(
                             if content_length == 0:
                                 logger.warning(f"[Segmentation] ⚠️ Warning: {item.category} image content is empty!")
 
-                            # Upload to our OSS
-                            success = storage_service.upload_file(
-                                object_key=object_key,
-                                data=img_resp.content,
-                                content_type="image/png"
+                            # Store in our OSS, keyed by content digest (identical cutouts are stored once)
+                            stored = await content_store.put(
+                                db,
+                                current_user.id,
+                                img_resp.content,
+                                content_type="image/png",
+                                kind="segmented",
                             )
-                            
-                            if success:
+
+                            if stored:
                                 # Get signed HTTPS URL from our OSS
-                                final_url = storage_service.get_file_url(object_key)
-                                logger.info(f"[Segmentation] Re-uploaded item {item.category} to {object_key}")
+                                digest = stored.digest
+                                final_url = storage_service.get_file_url(stored.object_key)
+                                if stored.deduplicated:
+                                    # Reported only if stored; a missing one is regenerated
+                                    thumbnail_url = await image_variant_service.variant_url(
+                                        stored.object_key, "thumb", img_resp.content
+                                    )
+                                else:
+                                    image_variant_service.schedule(stored.object_key, img_resp.content)
+                                logger.info(f"[Segmentation] Stored item {item.category} at {stored.object_key}")
                             else:
                                 logger.error(f"[Segmentation] Failed to upload {item.category} to OSS")
                         else:
@@ -143,12 +167,15 @@ async def segment_clothing(
                     except Exception as e:
                         logger.error(f"[Segmentation] Error processing item {item.category}: {e}")
                         final_url = item.image_url # Fallback to original if anything fails
+                        thumbnail_url = None
 
                     items.append(SegmentedClothingItemSchema(
                         id=item_id,
                         category=item.category,
                         garment_type=item.garment_type.value,  # Convert enum to string
-                        image_url=final_url
+                        image_url=final_url,
+                        thumbnail_url=thumbnail_url,
+                        digest=digest,
                     ))
         
         logger.info(f"[Segmentation] Successfully segmented {len(items)} items from {len(result.detected_categories)} categories")
@@ -165,6 +192,9 @@ async def segment_clothing(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"分割失败: {str(e)}"
         )
+    except (CircuitOpenError, DeadlineExceededError):
+        # Provider circuit open (503, Retry-After) or request deadline passed (504)
+        raise
     except Exception as e:
         logger.error(f"[Segmentation] Unexpected error: {e}", exc_info=True)
         raise HTTPException(
@@ -217,6 +247,9 @@ async def describe_clothing(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"识别失败: {str(e)}"
         )
+    except (CircuitOpenError, DeadlineExceededError):
+        # Provider circuit open (503, Retry-After) or request deadline passed (504)
+        raise
     except Exception as e:
         logger.error(f"[Segmentation] Unexpected error: {e}", exc_info=True)
         raise HTTPException(
@@ -5,25 +5,48 @@ Provides Server-Sent Events (SSE) streaming for real-time outfit generation:
 - Thinking state notifications
 - Image generation progress
 - Error handling with graceful fallback
+- Several occasions for one item in a single multiplexed stream
+
+The generation runs in a task owned by the stream. When the client goes
+away (detected by polling the request, or by the server closing the
+response) that task is cancelled, which stops the LLM stream and the image
+generation instead of letting them run to completion for nobody.
 """
 
 import asyncio
 import json
 import logging
-from collections.abc import AsyncGenerator
+import time
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from contextlib import aclosing
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, stream_deadline
+from app.config import settings
+from app.core.metrics import (
+    SSE_ACTIVE_STREAMS,
+    SSE_TIME_TO_FIRST_BYTE,
+    SSE_TIME_TO_FIRST_TEXT,
+    SSE_TIME_TO_IMAGE,
+)
 from app.models.user import User
-from app.services.streaming_generator import streaming_generator
+from app.services.streaming_generator import SSEEvent, streaming_generator
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/outfits", tags=["outfits-sse"])
 
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # Disable nginx buffering
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Content-Type, Authorization",
+}
+
 
 class GenerateStreamRequest(BaseModel):
     """Request schema for streaming outfit generation."""
@@ -35,53 +58,148 @@ class GenerateStreamRequest(BaseModel):
     original_image_url: str | None = Field(None, description="Optional original uploaded image URL for context")
 
 
-async def event_generator(
+class GenerateBatchStreamRequest(BaseModel):
+    """Request schema for generating one item's outfits for several occasions."""
+
+    selected_item_url: str = Field(..., description="URL of the selected segmented clothing item")
+    selected_item_description: str = Field(..., description="Description of the selected item (e.g., '蓝色圆领短袖T恤')")
+    selected_item_category: str = Field(..., description="Category of the selected item (e.g., '上衣', '裤子')")
+    occasions: list[str] = Field(
+        ...,
+        min_length=2,
+        max_length=settings.BATCH_MAX_OCCASIONS,
+        description="Occasions to compare (职场通勤, 约会, 日常出行, ...)",
+    )
+    original_image_url: str | None = Field(None, description="Optional original uploaded image URL for context")
+
+    @field_validator("occasions")
+    @classmethod
+    def unique_occasions(cls, occasions: list[str]) -> list[str]:
+        """Drop repeated occasions (results are keyed by occasion)."""
+        unique = list(dict.fromkeys(occasions))
+        if len(unique) < 2:
+            raise ValueError("at least two different occasions are required")
+        return unique
+
+
+async def _produce(events: AsyncGenerator[SSEEvent, None], queue: asyncio.Queue[SSEEvent | None]) -> None:
+    """Run the generation, handing its events to the response (None ends them)."""
+    try:
+        async with aclosing(events):
+            async for event in events:
+                queue.put_nowait(event)
+    finally:
+        queue.put_nowait(None)
+
+
+async def _watch_disconnect(
+    is_disconnected: Callable[[], Awaitable[bool]], producer: asyncio.Task
+) -> None:
+    """Cancel the generation once the client has gone."""
+    while not producer.done():
+        await asyncio.sleep(settings.SSE_DISCONNECT_POLL_SECONDS)
+        if await is_disconnected():
+            producer.cancel()
+            return
+
+
+def event_generator(
     selected_item_url: str,
     selected_item_description: str,
     selected_item_category: str,
     occasion: str,
     original_image_url: str | None,
     user_id: str,
+    started_at: float | None = None,
+    is_disconnected: Callable[[], Awaitable[bool]] | None = None,
+) -> AsyncGenerator[str, None]:
+    """Generate SSE events from streaming generator (see serve_events)."""
+    logger.info(f"[SSE] Starting stream for user={user_id}, occasion={occasion}")
+    events = streaming_generator.generate_stream(
+        selected_item_url=selected_item_url,
+        selected_item_description=selected_item_description,
+        selected_item_category=selected_item_category,
+        occasion=occasion,
+        original_image_url=original_image_url,
+        user_id=user_id,
+    )
+    return serve_events(events, user_id, started_at, is_disconnected)
+
+
+async def serve_events(
+    events: AsyncGenerator[SSEEvent, None],
+    user_id: str,
+    started_at: float | None = None,
+    is_disconnected: Callable[[], Awaitable[bool]] | None = None,
 ) -> AsyncGenerator[str, None]:
-    """Generate SSE events from streaming generator.
+    """Serve a generation's events as an SSE response body.
 
     Formats events in SSE wire protocol:
     event: <event_type>
     data: <json_data>
 
+    started_at (time.perf_counter() at request start) is the reference for
+    the time-to-first-byte/text/image metrics. is_disconnected (the
+    request's) is polled so a gone client cancels the generation even
+    while no event is being sent; closing or cancelling this generator
+    cancels it too.
     """
-    logger.info(f"[SSE] Starting stream for user={user_id}, occasion={occasion}")
+    if started_at is None:
+        started_at = time.perf_counter()
+    first_event = first_text = True
+    SSE_ACTIVE_STREAMS.inc()
+
+    queue: asyncio.Queue[SSEEvent | None] = asyncio.Queue()
+    producer = asyncio.create_task(_produce(events, queue))
+    watcher = asyncio.create_task(_watch_disconnect(is_disconnected, producer)) if is_disconnected else None
 
     try:
-        async for event in streaming_generator.generate_stream(
-            selected_item_url=selected_item_url,
-            selected_item_description=selected_item_description,
-            selected_item_category=selected_item_category,
-            occasion=occasion,
-            original_image_url=original_image_url,
-        ):
+        while (event := await queue.get()) is not None:
             # Format as SSE
             event_str = f"event: {event.event}\ndata: {json.dumps(event.data, ensure_ascii=False)}\n\n"
+            elapsed = time.perf_counter() - started_at
+            if first_event:
+                SSE_TIME_TO_FIRST_BYTE.observe(elapsed)
+                first_event = False
+            if first_text and event.event == "text_chunk":
+                SSE_TIME_TO_FIRST_TEXT.observe(elapsed)
+                first_text = False
+            elif event.event == "image_ready":
+                SSE_TIME_TO_IMAGE.observe(elapsed)
             yield event_str
 
             # Small delay to prevent overwhelming the client
             await asyncio.sleep(0.01)
 
+        await asyncio.wait([producer])
+        if producer.cancelled():
+            logger.info(f"[SSE] Client disconnected, generation cancelled for user={user_id}")
+            return
+        producer.result()  # Re-raise a failure of the generation
+
     except asyncio.CancelledError:
+        # The server is tearing the response down; nothing more can be sent
         logger.info(f"[SSE] Stream cancelled for user={user_id}")
-        yield f"event: cancelled\ndata: {json.dumps({'message': '连接已断开'})}\n\n"
+        raise
     except Exception as e:
         logger.error(f"[SSE] Stream error for user={user_id}: {e}", exc_info=True)
         yield f"event: error\ndata: {json.dumps({'message': '生成失败', 'code': 'STREAM_ERROR'})}\n\n"
+    finally:
+        # Never awaits: this may run inside a cancelled scope
+        producer.cancel()
+        if watcher is not None:
+            watcher.cancel()
+        SSE_ACTIVE_STREAMS.dec()
 
     # Send done signal
     yield "event: done\ndata: {}\n\n"
     logger.info(f"[SSE] Stream completed for user={user_id}")
 
 
-@router.post("/generate-stream")
+@router.post("/generate-stream", dependencies=[Depends(stream_deadline)])
 async def generate_outfit_stream(
     request: GenerateStreamRequest,
+    http_request: Request,
     current_user: User = Depends(get_current_user),
 ) -> StreamingResponse:
     """Generate outfit recommendations with SSE streaming.
@@ -94,7 +212,8 @@ async def generate_outfit_stream(
     - **image_generating**: Image generation started (data: {prompt: string})
     - **image_ready**: Generated image ready (data: {url: string})
     - **image_failed**: Image generation failed (data: {message: string})
-    - **complete**: Generation complete (data: {outfit_id: string, generated_image_url: string|null})
+    - **complete**: Generation complete (data: {outfit_id: string, generated_image_url: string|null,
+      fallback: string|null, wardrobe_item_ids: array})
     - **error**: Error occurred (data: {message: string, code: string})
     - **done**: Stream ended (data: {})
 
@@ -112,9 +231,10 @@ async def generate_outfit_stream(
     });
     ```
     """
+    started_at = time.perf_counter()
     logger.info(
         f"[SSE] Generate stream request: user={current_user.id}, "
-        f"occasion={request.occasion}, image={request.image_url[:50]}..."
+        f"occasion={request.occasion}, item={request.selected_item_url[:50]}..."
     )
 
     return StreamingResponse(
@@ -125,15 +245,49 @@ async def generate_outfit_stream(
             occasion=request.occasion,
             original_image_url=request.original_image_url,
             user_id=str(current_user.id),
+            started_at=started_at,
+            is_disconnected=http_request.is_disconnected,
         ),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",  # Disable nginx buffering
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Content-Type, Authorization",
-        },
+        headers=SSE_HEADERS,
+    )
+
+
+@router.post("/generate-batch-stream", dependencies=[Depends(stream_deadline)])
+async def generate_outfit_batch_stream(
+    request: GenerateBatchStreamRequest,
+    http_request: Request,
+    current_user: User = Depends(get_current_user),
+) -> StreamingResponse:
+    """Generate outfits for the same item and several occasions in one SSE stream.
+
+    The occasions are generated concurrently. Every event of
+    /generate-stream is sent with an extra `occasion` field, interleaved;
+    the img2img base image is downloaded once for all of them. Extra event:
+
+    - **batch_complete**: All occasions finished (data: {results: {occasion: {outfit_id,
+      generated_image_url, fallback, wardrobe_item_ids} | {error: string}}})
+    - **done**: Stream ended (data: {})
+    """
+    started_at = time.perf_counter()
+    user_id = str(current_user.id)
+    logger.info(
+        f"[SSE] Generate batch stream request: user={user_id}, "
+        f"occasions={request.occasions}, item={request.selected_item_url[:50]}..."
+    )
+    events = streaming_generator.generate_batch_stream(
+        selected_item_url=request.selected_item_url,
+        selected_item_description=request.selected_item_description,
+        selected_item_category=request.selected_item_category,
+        occasions=request.occasions,
+        original_image_url=request.original_image_url,
+        user_id=user_id,
+    )
+
+    return StreamingResponse(
+        serve_events(events, user_id, started_at, is_disconnected=http_request.is_disconnected),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
     )
 
 
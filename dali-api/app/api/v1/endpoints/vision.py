@@ -2,14 +2,15 @@ import logging
 import traceback
 from typing import Any
 
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Depends, status
 from pydantic import BaseModel, HttpUrl
 
+from app.api.deps import request_deadline
 from app.integrations.alibaba_vision import vision_client
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/vision")
+router = APIRouter(prefix="/vision", dependencies=[Depends(request_deadline)])
 
 
 class SegmentClothRequest(BaseModel):
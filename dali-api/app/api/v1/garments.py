@@ -2,7 +2,8 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status
 
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, request_deadline
+from app.core.exceptions import CircuitOpenError, DeadlineExceededError
 from app.integrations.alibaba_vision import VisionAPIError, vision_client
 from app.integrations.qwen_vision import QwenVisionError, qwen_vision_client
 from app.models.user import User
@@ -15,7 +16,7 @@ from app.schemas.garment import (
     VisualAnalysisResponse,
 )
 
-router = APIRouter(prefix="/garments", tags=["Garments"])
+router = APIRouter(prefix="/garments", tags=["Garments"], dependencies=[Depends(request_deadline)])
 
 
 @router.post("/analyze", response_model=GarmentAnalysisResponse)
@@ -64,6 +65,9 @@ async def analyze_garment(
                 "code": e.code or "ANALYSIS_FAILED",
             },
         ) from None
+    except (CircuitOpenError, DeadlineExceededError):
+        # Provider circuit open (503, Retry-After) or request deadline passed (504)
+        raise
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -119,6 +123,9 @@ async def visual_analysis(
                 "code": e.code or "VISION_ANALYSIS_FAILED",
             },
         ) from None
+    except (CircuitOpenError, DeadlineExceededError):
+        # Provider circuit open (503, Retry-After) or request deadline passed (504)
+        raise
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
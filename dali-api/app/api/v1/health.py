@@ -1,18 +1,63 @@
-"""Health check endpoint."""
+"""Health and readiness endpoints."""
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Response, status
 
 from app.__version__ import __version__
-from app.schemas.common import HealthResponse
+from app.schemas.common import DependencyStatusResponse, HealthResponse, ReadinessResponse
+from app.services.health import DependencyStatus, health_service, overall_status
+from app.services.readiness import readiness_service
 
 router = APIRouter(tags=["health"])
 
 
+def _dependency_response(dep: DependencyStatus) -> DependencyStatusResponse:
+    return DependencyStatusResponse(
+        status=dep.status,
+        latencyMs=dep.latency_ms,
+        required=dep.required,
+        error=dep.error,
+        circuit=dep.circuit,
+    )
+
+
 @router.get("/health", response_model=HealthResponse)
-async def health_check() -> HealthResponse:
+async def health_check(response: Response) -> HealthResponse:
     """Health check endpoint.
 
+    Probes each dependency (results cached for HEALTH_CACHE_SECONDS).
+    Answers 503 when Postgres is down; upstream vendor failures only make
+    the status "degraded".
+
+    Returns:
+        HealthResponse: Application health and per-dependency status
+    """
+    dependencies = await health_service.check_all()
+    state = overall_status(dependencies)
+    if state == "error":
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return HealthResponse(
+        status=state,
+        version=__version__,
+        dependencies={name: _dependency_response(dep) for name, dep in dependencies.items()},
+    )
+
+
+@router.get("/ready", response_model=ReadinessResponse)
+async def readiness_check(response: Response) -> ReadinessResponse:
+    """Readiness endpoint for the load balancer.
+
+    Returns 503 until the startup warm-up has finished and the database is
+    reachable; per-dependency results come from the last warm-up.
+
     Returns:
-        HealthResponse: Application health status
+        ReadinessResponse: Readiness and per-dependency status and latency
     """
-    return HealthResponse(status="ok", version=__version__)
+    if readiness_service.ready:
+        state = "ready"
+    else:
+        state = "warming" if readiness_service.warming or not readiness_service.dependencies else "not_ready"
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return ReadinessResponse(
+        status=state,
+        dependencies={name: _dependency_response(dep) for name, dep in readiness_service.dependencies.items()},
+    )
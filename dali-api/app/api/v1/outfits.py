@@ -2,7 +2,7 @@
 
 from fastapi import APIRouter, Depends, HTTPException
 
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, request_deadline
 from app.models.user import User
 from app.schemas.outfit import (
     GenerateOutfitRequest,
@@ -16,7 +16,7 @@ from app.services.ai_orchestrator import ai_orchestrator
 router = APIRouter(prefix="/outfits", tags=["outfits"])
 
 
-@router.post("/generate", response_model=GenerateOutfitResponse)
+@router.post("/generate", response_model=GenerateOutfitResponse, dependencies=[Depends(request_deadline)])
 async def generate_outfit_recommendations(
     request: GenerateOutfitRequest,
     current_user: User = Depends(get_current_user),
@@ -2,8 +2,19 @@
 
 from fastapi import APIRouter
 
-from app.api.v1 import auth, context, garments, health, outfits, share, upload, users, wardrobe
-from app.api.v1.endpoints import segmentation, sse, vision
+from app.api.v1 import (
+    auth,
+    context,
+    debug,
+    garments,
+    health,
+    outfits,
+    share,
+    upload,
+    users,
+    wardrobe,
+)
+from app.api.v1.endpoints import generation_jobs, segmentation, sse, vision
 
 router = APIRouter(prefix="/api/v1")
 
@@ -17,7 +28,9 @@ router.include_router(outfits.router)
 router.include_router(wardrobe.router)
 router.include_router(share.router)
 router.include_router(context.router)
+router.include_router(debug.router)
 router.include_router(vision.router, tags=["Vision"])
 router.include_router(segmentation.router, tags=["Segmentation"])
 router.include_router(sse.router, tags=["SSE Streaming"])
+router.include_router(generation_jobs.router, tags=["Generation Jobs"])
 
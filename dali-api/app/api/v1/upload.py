@@ -1,15 +1,19 @@
 """Upload API routes for photo upload functionality."""
 
+import asyncio
 import logging
 from datetime import UTC, datetime
 from uuid import uuid4
 
 from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, get_db
 from app.models.user import User
 from app.schemas.upload import SignedUrlRequest, SignedUrlResponse
-from app.services.storage import storage_service
+from app.services.content_store import BLOB_PREFIX, content_store, user_photo_key
+from app.services.image_variants import image_variant_service
+from app.services.storage import IMAGE_VARIANTS, storage_service
 
 logger = logging.getLogger(__name__)
 
@@ -24,13 +28,21 @@ async def get_signed_upload_url(
     """
     Generate a presigned URL for uploading a photo to cloud storage.
 
-    The URL expires after 10 minutes.
+    The URL expires after 10 minutes. If the client sends content_sha256,
+    the key is derived from the digest so re-uploading the same photo reuses
+    one object, and alreadyUploaded tells the client it can skip the PUT.
     """
-    # Generate unique object key
-    timestamp = datetime.now(UTC).strftime("%Y%m%d_%H%M%S")
-    unique_id = uuid4().hex[:8]
-    extension = request.content_type.split("/")[-1] if "/" in request.content_type else "jpg"
-    object_key = f"users/{current_user.id}/photos/{timestamp}_{unique_id}.{extension}"
+    already_uploaded = False
+    if request.content_sha256:
+        # Digest is client-claimed, so dedup stays within the user's own prefix
+        object_key = user_photo_key(current_user.id, request.content_sha256, request.content_type)
+        already_uploaded = await asyncio.to_thread(storage_service.file_exists, object_key)
+    else:
+        # Generate unique object key
+        timestamp = datetime.now(UTC).strftime("%Y%m%d_%H%M%S")
+        unique_id = uuid4().hex[:8]
+        extension = request.content_type.split("/")[-1] if "/" in request.content_type else "jpg"
+        object_key = f"users/{current_user.id}/photos/{timestamp}_{unique_id}.{extension}"
 
     # Generate presigned URL
     signed_url, expires_at = storage_service.generate_upload_url(
@@ -51,32 +63,54 @@ async def get_signed_upload_url(
         objectKey=object_key,
         photoUrl=photo_url,
         expiresAt=expires_at,
+        alreadyUploaded=already_uploaded,
     )
 
 
 @router.get("/refresh-url")
 async def refresh_photo_url(
     object_key: str = Query(..., description="Object key of the photo"),
+    variant: str | None = Query(
+        None,
+        description=f"Optional derivative size: {', '.join(IMAGE_VARIANTS)}",
+        pattern=f"^({'|'.join(IMAGE_VARIANTS)})$",
+    ),
     current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ) -> dict:
     """
     Refresh the signed URL for an existing photo.
     
     Use this when the previous signed URL has expired.
     Returns a new signed URL with 1 hour expiry.
+    Pass variant=thumb for list views (WebP, ~20 KB). If that derivative is
+    not stored (yet), the original's URL is returned with "variant": null and
+    the derivative is generated in the background.
     """
     # Verify the object key belongs to this user
     expected_prefix = f"users/{current_user.id}/"
-    if not object_key.startswith(expected_prefix):
+    if object_key.startswith(BLOB_PREFIX):
+        # Shared content-addressed blobs are checked against the reference table
+        allowed = await content_store.user_can_access(db, current_user.id, object_key)
+    else:
+        allowed = object_key.startswith(expected_prefix)
+    if not allowed:
         logger.warning(f"User {current_user.id} attempted to access object: {object_key}")
         return {"error": "Access denied", "photoUrl": None}
     
     # Generate fresh signed URL
-    photo_url = storage_service.get_file_url(object_key)
-    
-    logger.info(f"Refreshed URL for object_key: {object_key}")
-    
+    photo_url = None
+    if variant:
+        photo_url = await image_variant_service.variant_url(object_key, variant)
+        if photo_url is None:
+            variant = None
+    if photo_url is None:
+        photo_url = storage_service.get_file_url(object_key)
+
+    logger.info(f"Refreshed URL for object_key: {object_key} (variant={variant})")
+
     return {
         "objectKey": object_key,
         "photoUrl": photo_url,
+        "variant": variant,
     }
@@ -1,11 +1,90 @@
-"""Wardrobe endpoints placeholder."""
+"""Wardrobe endpoints: saved garments and similarity search."""
 
-from fastapi import APIRouter
+import uuid
+
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_current_user, get_db
+from app.models.user import User
+from app.models.wardrobe_item import WardrobeItem
+from app.schemas.wardrobe import (
+    SimilarWardrobeItem,
+    SimilarWardrobeResponse,
+    WardrobeItemCreate,
+    WardrobeItemResponse,
+    WardrobeListResponse,
+)
+from app.services.storage import storage_service
+from app.services.wardrobe import WardrobeEntry, wardrobe_service
 
 router = APIRouter(prefix="/wardrobe", tags=["wardrobe"])
 
 
-# Placeholder for future implementation:
-# POST /items - Add clothing item
-# GET /items - List wardrobe items
-# DELETE /items/:id - Remove item
+def _to_response(item: WardrobeItem | WardrobeEntry) -> WardrobeItemResponse:
+    return WardrobeItemResponse(
+        id=str(item.id),
+        imageUrl=storage_service.get_file_url(item.object_key),
+        garmentType=item.garment_type,
+        category=item.category,
+        color=item.color,
+        style=item.style,
+        pattern=item.pattern,
+        description=item.description,
+        colors=item.colors,
+        createdAt=item.created_at.isoformat(),
+    )
+
+
+@router.post("/items", response_model=WardrobeItemResponse, status_code=status.HTTP_201_CREATED)
+async def add_wardrobe_item(
+    request: WardrobeItemCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> WardrobeItemResponse:
+    """Save a segmented item to the wardrobe (saving it again updates it)."""
+    item = await wardrobe_service.add_item(
+        db,
+        user_id=current_user.id,
+        digest=request.digest,
+        garment_type=request.garmentType,
+        category=request.category,
+        color=request.color,
+        style=request.style,
+        pattern=request.pattern,
+        description=request.description,
+    )
+    return _to_response(item)
+
+
+@router.get("/items", response_model=WardrobeListResponse)
+async def list_wardrobe_items(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> WardrobeListResponse:
+    """List the wardrobe, newest first."""
+    items = await wardrobe_service.list_items(db, current_user.id)
+    return WardrobeListResponse(items=[_to_response(item) for item in items], total=len(items))
+
+
+@router.delete("/items/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_wardrobe_item(
+    item_id: uuid.UUID,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> None:
+    """Remove an item from the wardrobe."""
+    await wardrobe_service.delete_item(db, current_user.id, item_id)
+
+
+@router.get("/items/{item_id}/similar", response_model=SimilarWardrobeResponse)
+async def similar_wardrobe_items(
+    item_id: uuid.UUID,
+    limit: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_user),
+) -> SimilarWardrobeResponse:
+    """Items most similar to one in the wardrobe (color, type and style)."""
+    matches = await wardrobe_service.similar(current_user.id, item_id, limit)
+    return SimilarWardrobeResponse(
+        items=[SimilarWardrobeItem(item=_to_response(entry), score=round(score, 4)) for entry, score in matches]
+    )
@@ -40,21 +40,71 @@ class Settings(BaseSettings):
     ALIBABA_OSS_BUCKET: str = ""
     ALIBABA_OSS_ENDPOINT: str = ""
     ALIBABA_VISION_ENDPOINT: str = ""
+    ALIBABA_IMAGESEG_ENDPOINT: str = "imageseg.cn-shanghai.aliyuncs.com"
+    ALIBABA_OBJECTDET_ENDPOINT: str = "objectdet.cn-shanghai.aliyuncs.com"
+    # Allow plain-http OSS/Vision endpoints (local fake upstreams only)
+    ALIBABA_ALLOW_HTTP: bool = False
 
     # AI Provider
     AI_PROVIDER: str = "tongyi"  # "tongyi" or "openai"
     TONGYI_API_KEY: str = ""
     OPENAI_API_KEY: str = ""
+    OPENAI_BASE_URL: str = "https://api.openai.com/v1"
 
     # Qwen-VL-Max (DashScope)
     DASHSCOPE_API_KEY: str = ""
+    DASHSCOPE_BASE_URL: str = "https://dashscope.aliyuncs.com/api/v1"
 
     # SiliconFlow (Img2Img)
     SILICONFLOW_API_KEY: str = ""
+    SILICONFLOW_BASE_URL: str = "https://api.siliconflow.cn/v1"
     SILICONFLOW_MODEL: str = "black-forest-labs/FLUX.1-schnell"
     IMG2IMG_STRENGTH: float = 0.4
     IMG2IMG_TIMEOUT: int = 60
 
+    # Outfit generation streams
+    LLM_MAX_CONCURRENT_STREAMS: int = 32  # Per process, shared by single and batch streams
+    BATCH_MAX_OCCASIONS: int = 4  # /outfits/generate-batch-stream
+
+    # Response cache: identical generation requests replay an earlier answer (see app.services.response_cache)
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTL_SECONDS: float = 3600.0  # Capped at STORAGE_GC_MIN_AGE_HOURS (cached images)
+    RESPONSE_CACHE_VARIANTS: int = 3  # Answers collected per request before they are replayed in turn
+    RESPONSE_CACHE_MAX_KEYS: int = 2000  # Per process (LRU)
+    RESPONSE_CACHE_SIMILARITY: float = 0.0  # Cosine at which similar descriptions share answers; 0 disables
+
+    # Generation cost accounting (CNY; keep in line with the vendors' price lists)
+    LLM_PRICE_INPUT_PER_1K_TOKENS: float = 0.0024
+    LLM_PRICE_OUTPUT_PER_1K_TOKENS: float = 0.0096
+    IMAGE_PRICE_SILICONFLOW: float = 0.0
+    IMAGE_PRICE_DALLE: float = 0.29
+
+    # Color extraction (process pool size for garment color analysis)
+    COLOR_EXTRACTION_WORKERS: int = 2
+
+    # Wardrobe (saved garments; see app.services.wardrobe)
+    WARDROBE_MAX_ITEMS_PER_USER: int = 500
+    WARDROBE_INDEX_MAX_USERS: int = 1000  # Similarity indexes kept in memory per process (LRU)
+    WARDROBE_INDEX_TTL_SECONDS: float = 300.0  # Reload so items saved via other processes show up
+    # Wardrobe-aware generation: stored items that best complete the selected garment's outfit
+    WARDROBE_PROMPT_ITEMS: int = 5  # Best matches listed in the LLM prompt
+    WARDROBE_MIN_MATCH_SCORE: float = 0.6  # Weaker matches are left out of the prompt
+    # Answer from the wardrobe alone (no LLM call) when every slot of the outfit is this good
+    WARDROBE_FAST_PATH_ENABLED: bool = True
+    WARDROBE_FAST_PATH_MIN_SCORE: float = 0.8
+    WARDROBE_FAST_PATH_MIN_ITEMS: int = 2
+
+    # Derivative images (max concurrent WebP renders per worker)
+    IMAGE_VARIANT_CONCURRENCY: int = 2
+
+    # Storage GC (orphaned generated/segmented objects)
+    STORAGE_GC_ENABLED: bool = False
+    STORAGE_GC_DRY_RUN: bool = True  # Only log what would be deleted
+    STORAGE_GC_MIN_AGE_HOURS: int = 24  # Younger objects may belong to in-flight requests
+    STORAGE_GC_INTERVAL_MINUTES: int = 360
+    STORAGE_GC_BATCH_SIZE: int = 500  # Keys per OSS batch delete (max 1000)
+    STORAGE_GC_BATCH_PAUSE_SECONDS: float = 1.0
+
     # WeChat
     WECHAT_APP_ID: str = ""
     WECHAT_APP_SECRET: str = ""
@@ -68,6 +118,89 @@ class Settings(BaseSettings):
     # CORS
     CORS_ORIGINS: str = "*"
 
+    # Observability
+    METRICS_ENABLED: bool = True  # Prometheus metrics at /metrics
+    TRACING_ENABLED: bool = True
+    TRACING_EXPORTER: str = "none"  # "none", "console" or "otlp"
+    TRACING_OTLP_ENDPOINT: str = ""  # e.g. http://localhost:4318/v1/traces
+    TRACING_SERVICE_NAME: str = "dali-api"
+    TRACING_SAMPLE_RATIO: float = 1.0
+
+    # Build integration clients (and import their SDKs) at startup instead of
+    # on first use; see app.core.lazy
+    INTEGRATION_WARM_UP: bool = False
+
+    # Startup warm-up; /api/v1/ready answers 503 until it has finished
+    # (see app.services.readiness)
+    WARM_UP_ENABLED: bool = True
+    WARM_UP_PROBE_TIMEOUT: float = 10.0  # Seconds per dependency
+    WARM_UP_RETRY_SECONDS: float = 5.0  # Retry while the database is down
+    # Idle time before shared HTTP clients drop a connection (httpx default: 5s)
+    HTTP_KEEPALIVE_EXPIRY: float = 60.0
+
+    # Dependency probes behind /api/v1/health (see app.services.health)
+    HEALTH_CACHE_SECONDS: float = 5.0  # Probe each dependency at most this often
+    HEALTH_PROBE_TIMEOUT: float = 2.0
+    HEALTH_OSS_SENTINEL_KEY: str = "health/sentinel"
+
+    # Circuit breakers per upstream endpoint (see app.core.circuit_breaker)
+    CIRCUIT_BREAKER_ENABLED: bool = True
+    CIRCUIT_WINDOW_SIZE: int = 20  # Recent calls the rates are computed over
+    CIRCUIT_MIN_CALLS: int = 10
+    CIRCUIT_FAILURE_RATE: float = 0.5
+    CIRCUIT_SLOW_CALL_RATE: float = 0.8
+    CIRCUIT_OPEN_SECONDS: float = 30.0
+    CIRCUIT_HALF_OPEN_CALLS: int = 1
+    CIRCUIT_SLOW_CALL_DEFAULT_SECONDS: float = 20.0
+    # Per endpoint; the LLM stream is judged by its time to first token
+    CIRCUIT_SLOW_CALL_SECONDS: dict[str, float] = {
+        "dashscope.text_generation_stream": 10.0,
+        "siliconflow.images_edits": 45.0,
+        "openai.images_generations": 60.0,
+    }
+
+    # Per-request deadlines shared by every upstream call of the request
+    # (see app.core.deadline); keep them below the mobile client's timeout
+    REQUEST_DEADLINE_SECONDS: float = 30.0
+    STREAM_DEADLINE_SECONDS: float = 90.0  # /outfits/generate-stream
+    # How often a stream checks whether its client is still connected; a
+    # gone client cancels the generation (LLM stream, image) it was waiting for
+    SSE_DISCONNECT_POLL_SECONDS: float = 1.0
+
+    # Background generation jobs (POST /outfits/jobs; see app.services.generation_jobs)
+    GENERATION_JOB_WORKERS: int = 2  # Jobs run concurrently per process; 0 only serves status
+    GENERATION_JOB_POLL_SECONDS: float = 1.0  # Queue/status polling when not woken locally
+    GENERATION_JOB_FLUSH_SECONDS: float = 1.0  # Write progress at most this often
+    GENERATION_JOB_MAX_WAIT_SECONDS: float = 25.0  # Longest long-poll (keep below proxy timeouts)
+    GENERATION_JOB_STALE_SECONDS: float = 300.0  # Running without progress this long: worker lost
+    GENERATION_JOB_RECLAIM_SECONDS: float = 60.0  # How often each process fails lost jobs
+    GENERATION_JOB_MAX_PENDING_PER_USER: int = 3  # Queued or running jobs per user
+    # Hosts completion callbacks may be sent to (empty: callbacks rejected)
+    GENERATION_JOB_CALLBACK_HOSTS: list[str] = []
+    GENERATION_JOB_CALLBACK_SECRET: str = ""  # Signs callbacks (X-Dali-Signature) if set
+
+    # Retries of idempotent upstream calls (see app.core.retry)
+    RETRY_MAX_ATTEMPTS: int = 3  # Including the first attempt
+    RETRY_BASE_DELAY: float = 0.2  # Seconds; doubled per retry, full jitter
+    RETRY_MAX_DELAY: float = 2.0
+    RETRY_BUDGET_RATIO: float = 0.1  # Retries allowed per call in the window
+    RETRY_BUDGET_MIN_PER_SECOND: float = 1.0  # Floor for low traffic
+    RETRY_BUDGET_WINDOW_SECONDS: float = 10.0
+    # Per-client overrides of RetryPolicy fields, e.g.
+    # {"qwen_vl": {"max_attempts": 2}, "signed_url_download": {"max_delay": 1.0}}
+    RETRY_POLICIES: dict[str, dict[str, float]] = {}
+
+    # Profiling (admin endpoints are disabled while ADMIN_TOKEN is empty)
+    ADMIN_TOKEN: str = ""
+    PROFILE_MAX_SECONDS: int = 60
+    LOOP_STALL_MONITOR_ENABLED: bool = False
+    LOOP_STALL_THRESHOLD_MS: int = 200  # Log the loop's stack when blocked this long
+
+    # Event-loop blocking detector (debug/staging; hooks every loop callback)
+    LOOP_WATCHDOG_ENABLED: bool = False
+    LOOP_WATCHDOG_THRESHOLD_MS: int = 100
+    LOOP_WATCHDOG_PROBE_INTERVAL: float = 0.5  # Seconds between loop-lag probes
+
     @property
     def cors_origins_list(self) -> list[str]:
         """Parse CORS_ORIGINS string into a list."""
@@ -0,0 +1,13 @@
+"""Helpers shared by the ASGI middleware (metrics, tracing)."""
+
+from starlette.types import Scope
+
+
+def route_template(scope: Scope) -> str:
+    """Full path template of the matched route, or "unmatched"."""
+    # Newer FastAPI keeps included routers nested: scope["route"].path is then
+    # relative to its router and the prefixed template lives in the route context
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    if context is not None and getattr(context, "path", None):
+        return context.path
+    return getattr(scope.get("route"), "path", None) or "unmatched"
@@ -0,0 +1,278 @@
+"""Circuit breakers for upstream AI providers.
+
+When DashScope or SiliconFlow degrades, every call used to wait for the
+full client timeout (up to 120s), holding a worker and often a database
+connection. Each upstream endpoint ("integration.method", the same names
+as upstream_request_duration_seconds) gets a breaker:
+
+- closed:    calls go through; the last CIRCUIT_WINDOW_SIZE outcomes are
+             kept. Once CIRCUIT_MIN_CALLS are recorded, the breaker opens
+             when the failure rate reaches CIRCUIT_FAILURE_RATE or the
+             share of calls slower than the endpoint's slow-call threshold
+             reaches CIRCUIT_SLOW_CALL_RATE.
+- open:      calls fail immediately with CircuitOpenError (503,
+             AI_SERVICE_UNAVAILABLE, or AI_SERVICE_TIMEOUT when latency
+             opened it) for CIRCUIT_OPEN_SECONDS.
+- half_open: up to CIRCUIT_HALF_OPEN_CALLS trial calls go through; a
+             healthy one closes the breaker, a failed or slow one reopens it.
+
+track_upstream() guards decorated integration methods. Callers with a
+fallback (StreamingOutfitGenerator) check allows_request() first and skip
+the provider instead of waiting for the rejection.
+
+State is per worker process.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from enum import Enum
+
+import httpx
+from prometheus_client import Counter, Gauge
+
+from app.config import settings
+from app.core.exceptions import APIException, CircuitOpenError, DeadlineExceededError
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_STATE = Gauge(
+    "circuit_breaker_state",
+    "Upstream circuit breaker state (0 closed, 1 half-open, 2 open)",
+    ["circuit"],
+    multiprocess_mode="max",
+)
+CIRCUIT_REJECTIONS = Counter(
+    "circuit_breaker_rejections_total",
+    "Upstream calls rejected by an open circuit",
+    ["circuit"],
+)
+CIRCUIT_TRANSITIONS = Counter(
+    "circuit_breaker_transitions_total",
+    "Circuit breaker state changes",
+    ["circuit", "state"],
+)
+
+
+class CircuitState(str, Enum):
+    """Circuit breaker states."""
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+
+_STATE_VALUES = {CircuitState.CLOSED: 0, CircuitState.HALF_OPEN: 1, CircuitState.OPEN: 2}
+
+# HTTP statuses that say "the upstream is unwell" rather than "bad request"
+_UPSTREAM_FAULT_STATUSES = frozenset({408, 429})
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """Whether an exception counts against the upstream.
+
+    Client errors (4xx other than 408/429, including wrapped ones) and our
+    own 4xx API exceptions mean the request was bad, not the provider; a
+    request deadline running out is ours too.
+    """
+    seen: BaseException | None = exc
+    while seen is not None:
+        if isinstance(seen, DeadlineExceededError):
+            return False
+        if isinstance(seen, httpx.HTTPStatusError):
+            status = seen.response.status_code
+            return status >= 500 or status in _UPSTREAM_FAULT_STATUSES
+        if isinstance(seen, APIException) and seen.status_code < 500:
+            return False
+        seen = seen.__cause__
+    return True
+
+
+class CircuitCall:
+    """One call admitted by a breaker (see CircuitBreaker.guard())."""
+
+    def __init__(self) -> None:
+        """Start timing the call."""
+        self.started_at = time.perf_counter()
+        # Latency judged against the slow-call threshold; streams set it to
+        # their time to first token instead of the total duration
+        self.duration: float | None = None
+
+
+class CircuitBreaker:
+    """Failure-rate and slow-call circuit breaker for one upstream endpoint."""
+
+    def __init__(
+        self,
+        name: str,
+        slow_call_seconds: float | None = None,
+        window_size: int | None = None,
+        min_calls: int | None = None,
+        failure_rate: float | None = None,
+        slow_call_rate: float | None = None,
+        open_seconds: float | None = None,
+        half_open_calls: int | None = None,
+    ) -> None:
+        """Initialize a closed breaker; defaults come from settings."""
+        self.name = name
+        self.slow_call_seconds = slow_call_seconds or settings.CIRCUIT_SLOW_CALL_SECONDS.get(
+            name, settings.CIRCUIT_SLOW_CALL_DEFAULT_SECONDS
+        )
+        self.min_calls = min_calls or settings.CIRCUIT_MIN_CALLS
+        self.failure_rate = failure_rate or settings.CIRCUIT_FAILURE_RATE
+        self.slow_call_rate = slow_call_rate or settings.CIRCUIT_SLOW_CALL_RATE
+        self.open_seconds = open_seconds or settings.CIRCUIT_OPEN_SECONDS
+        self.half_open_calls = half_open_calls or settings.CIRCUIT_HALF_OPEN_CALLS
+
+        self.state = CircuitState.CLOSED
+        self.opened_by_slow_calls = False
+        # (failed, slow) per recorded call, newest last
+        self._outcomes: deque[tuple[bool, bool]] = deque(maxlen=window_size or settings.CIRCUIT_WINDOW_SIZE)
+        self._opened_at = 0.0
+        self._trials = 0
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.labels(name).set(0)
+
+    def allows_request(self) -> bool:
+        """Whether a call would be admitted now (does not take a trial slot)."""
+        with self._lock:
+            if self.state == CircuitState.OPEN:
+                return self._open_expired()
+            if self.state == CircuitState.HALF_OPEN:
+                return self._trials < self.half_open_calls
+            return True
+
+    def retry_after(self) -> int:
+        """Seconds until the breaker lets a trial call through."""
+        remaining = self._opened_at + self.open_seconds - time.monotonic()
+        return max(1, round(remaining))
+
+    @contextmanager
+    def guard(self) -> Iterator[CircuitCall]:
+        """Admit a call and record its outcome.
+
+        Raises:
+            CircuitOpenError: If the breaker is open (the block does not run)
+        """
+        self._acquire()
+        call = CircuitCall()
+        try:
+            yield call
+        except Exception as e:
+            self._record(not is_upstream_failure(e), call)
+            raise
+        except BaseException:
+            # Cancelled or closed early: says nothing about the upstream
+            self._release()
+            raise
+        self._record(True, call)
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self.state == CircuitState.OPEN and self._open_expired():
+                self._transition(CircuitState.HALF_OPEN)
+            if self.state == CircuitState.CLOSED:
+                return
+            if self.state == CircuitState.HALF_OPEN and self._trials < self.half_open_calls:
+                self._trials += 1
+                return
+        CIRCUIT_REJECTIONS.labels(self.name).inc()
+        raise CircuitOpenError(self.name, self.retry_after(), slow=self.opened_by_slow_calls)
+
+    def _release(self) -> None:
+        with self._lock:
+            if self.state == CircuitState.HALF_OPEN and self._trials:
+                self._trials -= 1
+
+    def _record(self, succeeded: bool, call: CircuitCall) -> None:
+        duration = call.duration if call.duration is not None else time.perf_counter() - call.started_at
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            if self.state == CircuitState.HALF_OPEN:
+                self._trials = max(0, self._trials - 1)
+                if succeeded and not slow:
+                    self._transition(CircuitState.CLOSED)
+                else:
+                    self._open(slow=succeeded)
+                return
+            if self.state == CircuitState.OPEN:
+                return  # Admitted before another call opened the breaker
+            self._outcomes.append((not succeeded, slow))
+            if len(self._outcomes) < self.min_calls:
+                return
+            failures = sum(failed for failed, _ in self._outcomes) / len(self._outcomes)
+            slow_calls = sum(slow for _, slow in self._outcomes) / len(self._outcomes)
+            if failures >= self.failure_rate:
+                self._open(slow=False)
+            elif slow_calls >= self.slow_call_rate:
+                self._open(slow=True)
+
+    def _open_expired(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.open_seconds
+
+    def _open(self, slow: bool) -> None:
+        self.opened_by_slow_calls = slow
+        self._opened_at = time.monotonic()
+        self._transition(CircuitState.OPEN)
+        reason = "slow calls" if slow else "failures"
+        logger.warning(f"[Circuit] {self.name} opened by {reason} for {self.open_seconds:.0f}s")
+
+    def _transition(self, state: CircuitState) -> None:
+        if state == self.state:
+            return
+        self.state = state
+        self._trials = 0
+        if state == CircuitState.CLOSED:
+            self._outcomes.clear()
+            logger.info(f"[Circuit] {self.name} closed")
+        CIRCUIT_STATE.labels(self.name).set(_STATE_VALUES[state])
+        CIRCUIT_TRANSITIONS.labels(self.name, state.value).inc()
+
+
+class CircuitBreakerRegistry:
+    """Breakers by endpoint name, created on first use."""
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        """The breaker for an "integration.method" endpoint."""
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(name, CircuitBreaker(name))
+        return breaker
+
+    def state_of(self, *integrations: str) -> CircuitState:
+        """Worst state among the integrations' breakers (closed if none yet)."""
+        states = [b.state for name, b in list(self._breakers.items()) if name.split(".", 1)[0] in integrations]
+        return max(states, key=_STATE_VALUES.__getitem__, default=CircuitState.CLOSED)
+
+    def reset(self) -> None:
+        """Forget all breakers (tests)."""
+        with self._lock:
+            self._breakers.clear()
+
+
+@contextmanager
+def circuit_guard(name: str) -> Iterator[CircuitCall]:
+    """CircuitBreaker.guard() for a named endpoint, unless breakers are disabled."""
+    if not settings.CIRCUIT_BREAKER_ENABLED:
+        yield CircuitCall()
+        return
+    with circuit_breakers.get(name).guard() as call:
+        yield call
+
+
+def circuit_allows(name: str) -> bool:
+    """Whether an endpoint's breaker would admit a call now."""
+    return not settings.CIRCUIT_BREAKER_ENABLED or circuit_breakers.get(name).allows_request()
+
+
+# Singleton instance
+circuit_breakers = CircuitBreakerRegistry()
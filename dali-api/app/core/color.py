@@ -0,0 +1,188 @@
+"""Color science helpers shared by vision, recommendation and theory code.
+
+All conversions are vectorized with NumPy and assume sRGB input with a D65
+white point. Distances are CIE76 ΔE in CIELAB space, which is cheap and
+good enough for mapping garment colors onto a small named palette.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+# Named palette used for garment color reporting (hex, Chinese name)
+COLOR_PALETTE: list[tuple[str, str]] = [
+    ("#FFFFFF", "白色"),
+    ("#000000", "黑色"),
+    ("#F5F5DC", "米色"),
+    ("#808080", "灰色"),
+    ("#000080", "藏蓝色"),
+    ("#8B4513", "棕色"),
+    ("#FFC0CB", "粉色"),
+    ("#FF0000", "红色"),
+    ("#90EE90", "浅绿色"),
+    ("#ADD8E6", "浅蓝色"),
+    ("#FFD700", "金色"),
+    ("#800080", "紫色"),
+    ("#FFA500", "橙色"),
+    ("#008000", "绿色"),
+    ("#C0C0C0", "银色"),
+]
+
+# D65 reference white
+_WHITE_XYZ = np.array([0.95047, 1.0, 1.08883])
+
+_RGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+
+
+def hex_to_rgb(hex_color: str) -> tuple[int, int, int]:
+    """Convert '#RRGGBB' to an (r, g, b) tuple of 0-255 ints."""
+    value = hex_color.lstrip("#")
+    return int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16)
+
+
+def rgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """Convert sRGB values (0-255, shape (..., 3)) to CIELAB.
+
+    Args:
+        rgb: Array of sRGB colors, any leading shape
+
+    Returns:
+        Float array of the same shape holding L*, a*, b*
+    """
+    srgb = np.asarray(rgb, dtype=np.float64) / 255.0
+    linear = np.where(srgb > 0.04045, ((srgb + 0.055) / 1.055) ** 2.4, srgb / 12.92)
+    xyz = linear @ _RGB_TO_XYZ.T / _WHITE_XYZ
+
+    epsilon = 216 / 24389
+    kappa = 24389 / 27
+    f = np.where(xyz > epsilon, np.cbrt(xyz), (kappa * xyz + 16) / 116)
+
+    lab = np.empty_like(f)
+    lab[..., 0] = 116 * f[..., 1] - 16
+    lab[..., 1] = 500 * (f[..., 0] - f[..., 1])
+    lab[..., 2] = 200 * (f[..., 1] - f[..., 2])
+    return lab
+
+
+def hex_to_lab(hex_colors: list[str]) -> np.ndarray:
+    """Convert a list of hex strings to an (n, 3) Lab array."""
+    return rgb_to_lab(np.array([hex_to_rgb(h) for h in hex_colors], dtype=np.float64))
+
+
+def delta_e(lab_a: np.ndarray, lab_b: np.ndarray) -> np.ndarray:
+    """Pairwise CIE76 ΔE between two sets of Lab colors.
+
+    Args:
+        lab_a: Array of shape (n, 3)
+        lab_b: Array of shape (m, 3)
+
+    Returns:
+        Distance matrix of shape (n, m)
+    """
+    diff = lab_a[:, None, :] - lab_b[None, :, :]
+    return np.sqrt(np.einsum("nmk,nmk->nm", diff, diff))
+
+
+@lru_cache
+def palette_lab() -> np.ndarray:
+    """Lab coordinates of COLOR_PALETTE, computed once."""
+    lab = hex_to_lab([hex_color for hex_color, _ in COLOR_PALETTE])
+    lab.setflags(write=False)
+    return lab
+
+
+def nearest_palette_indices(lab: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Map Lab colors onto the nearest COLOR_PALETTE entries.
+
+    Args:
+        lab: Array of shape (n, 3)
+
+    Returns:
+        Tuple of (palette indices, ΔE to the chosen entry), both shape (n,)
+    """
+    distances = delta_e(lab, palette_lab())
+    indices = distances.argmin(axis=1)
+    return indices, distances[np.arange(len(indices)), indices]
+
+
+# Chroma below which a color reads as neutral (white, black, grey, beige...)
+NEUTRAL_CHROMA = 15.0
+
+# Pleasing hue separations (degree ranges) and their harmony score:
+# analogous/monochrome, triadic, complementary. Outside a range the score
+# falls off as a Gaussian of width HUE_TOLERANCE degrees.
+HUE_RANGES = np.array([[0.0, 40.0], [100.0, 140.0], [150.0, 180.0]])
+_HUE_PEAKS = np.array([0.9, 0.65, 0.75])
+HUE_TOLERANCE = 15.0
+CLASH_SCORE = 0.3  # Chromatic pairs far from every anchor
+NEUTRAL_SCORE = 0.8  # A neutral goes with anything
+
+
+def lab_to_lch(lab: np.ndarray) -> np.ndarray:
+    """Convert CIELAB (shape (..., 3)) to L*, chroma and hue angle in degrees."""
+    lab = np.asarray(lab, dtype=np.float64)
+    lch = np.empty_like(lab)
+    lch[..., 0] = lab[..., 0]
+    lch[..., 1] = np.hypot(lab[..., 1], lab[..., 2])
+    lch[..., 2] = np.degrees(np.arctan2(lab[..., 2], lab[..., 1])) % 360
+    return lch
+
+
+def contrast_ratios(lab_a: np.ndarray, lab_b: np.ndarray) -> np.ndarray:
+    """Pairwise WCAG contrast ratio (1 to 21) between two sets of Lab colors.
+
+    Args:
+        lab_a: Array of shape (n, 3)
+        lab_b: Array of shape (m, 3)
+
+    Returns:
+        Ratios of shape (n, m)
+    """
+
+    def luminance(lab: np.ndarray) -> np.ndarray:
+        lightness = np.asarray(lab, dtype=np.float64)[:, 0]
+        return np.where(lightness > 8, ((lightness + 16) / 116) ** 3, lightness * 27 / 24389)
+
+    y_a, y_b = luminance(lab_a)[:, None], luminance(lab_b)[None, :]
+    return (np.maximum(y_a, y_b) + 0.05) / (np.minimum(y_a, y_b) + 0.05)
+
+
+def harmony_scores(lab_a: np.ndarray, lab_b: np.ndarray) -> np.ndarray:
+    """Pairwise color harmony between two sets of Lab colors.
+
+    Neutrals pair well with everything; chromatic pairs score by how close
+    their hue separation is to an analogous, complementary or triadic
+    relation. Lightness contrast adds a small bonus.
+
+    Args:
+        lab_a: Array of shape (n, 3)
+        lab_b: Array of shape (m, 3)
+
+    Returns:
+        Scores in [0, 1] of shape (n, m)
+    """
+    lch_a, lch_b = lab_to_lch(lab_a), lab_to_lch(lab_b)
+    hue_gap = np.abs(lch_a[:, None, 2] - lch_b[None, :, 2])
+    hue_gap = np.minimum(hue_gap, 360 - hue_gap)
+
+    outside = np.maximum(HUE_RANGES[:, 0] - hue_gap[..., None], hue_gap[..., None] - HUE_RANGES[:, 1])
+    bumps = _HUE_PEAKS * np.exp(-((np.maximum(outside, 0) / HUE_TOLERANCE) ** 2))
+    chromatic = np.maximum(bumps.max(axis=-1), CLASH_SCORE)
+
+    neutral = (lch_a[:, None, 1] < NEUTRAL_CHROMA) | (lch_b[None, :, 1] < NEUTRAL_CHROMA)
+    scores = np.where(neutral, NEUTRAL_SCORE, chromatic)
+
+    contrast = np.abs(lch_a[:, None, 0] - lch_b[None, :, 0])
+    return np.clip(scores + 0.1 * np.minimum(contrast / 50, 1.0), 0.0, 1.0)
+
+
+@lru_cache
+def harmony_matrix() -> np.ndarray:
+    """Harmony scores between every pair of COLOR_PALETTE entries, computed once."""
+    matrix = harmony_scores(palette_lab(), palette_lab())
+    matrix.setflags(write=False)
+    return matrix
@@ -0,0 +1,129 @@
+"""Per-request deadlines.
+
+Upstream timeouts used to be fixed per call (30s for Qwen Vision, 10s/30s
+for segmentation downloads, 60s waiting for the image, 120s on the LLM
+stream), so one request could outlive the mobile client by minutes. Routes
+now set a deadline (the request_deadline() and stream_deadline()
+dependencies in app.api.deps) and it travels with the request in a context
+variable, including into tasks the request creates:
+
+- track_upstream() runs each integration call within_deadline(): it fails
+  fast once the deadline has passed and cancels the call when it expires
+- iter_within_deadline() bounds each read of a stream the caller iterates
+  (the LLM stream), so a stalled stream cannot outlive the request
+- timeout(default) caps a wait or client timeout at the remaining budget
+- retries never sleep past the deadline (app.core.retry)
+
+Without a deadline (scripts, background jobs) every helper falls back to
+the call's own default timeout.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterable, AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import TypeVar
+
+from prometheus_client import Counter
+
+from app.core.exceptions import DeadlineExceededError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEADLINE_EXCEEDED = Counter(
+    "request_deadline_exceeded_total",
+    "Operations cut short or skipped because the request deadline passed",
+    ["operation"],
+)
+
+# time.monotonic() by which the current request must be done
+_deadline: ContextVar[float | None] = ContextVar("request_deadline", default=None)
+
+
+def set_deadline(seconds: float) -> None:
+    """Give the current request `seconds` from now (replaces any deadline)."""
+    _deadline.set(time.monotonic() + seconds)
+
+
+@contextmanager
+def deadline_scope(seconds: float) -> Iterator[None]:
+    """Tighten the deadline for a block; an earlier deadline still wins."""
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> float | None:
+    """Seconds left before the deadline (negative once passed), or None."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def exceeded(operation: str) -> DeadlineExceededError:
+    """Count and build the error for an operation the deadline cut short."""
+    DEADLINE_EXCEEDED.labels(operation).inc()
+    logger.warning(f"[Deadline] {operation}: request deadline exceeded")
+    return DeadlineExceededError(operation)
+
+
+def check_deadline(operation: str) -> None:
+    """Raise DeadlineExceededError if the deadline has passed."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise exceeded(operation)
+
+
+def timeout(default: float, operation: str) -> float:
+    """Timeout for one call: its default, capped at the remaining budget.
+
+    Raises:
+        DeadlineExceededError: If no budget is left
+    """
+    check_deadline(operation)
+    left = remaining()
+    return default if left is None else min(default, left)
+
+
+@asynccontextmanager
+async def within_deadline(operation: str) -> AsyncIterator[None]:
+    """Cancel the block when the deadline passes.
+
+    Raises:
+        DeadlineExceededError: If the deadline passed before or during the block
+    """
+    check_deadline(operation)
+    left = remaining()
+    if left is None:
+        yield
+        return
+    scope = asyncio.timeout(left)
+    try:
+        async with scope:
+            yield
+    except TimeoutError as e:
+        if not scope.expired():
+            raise  # The operation's own timeout, not the deadline
+        raise exceeded(operation) from e
+
+
+async def iter_within_deadline(items: AsyncIterable[T], operation: str) -> AsyncIterator[T]:
+    """Iterate items, cancelling a read still waiting when the deadline passes.
+
+    Only the reads are bounded, not the consumer's work between them.
+    """
+    iterator = aiter(items)
+    while True:
+        async with within_deadline(operation):
+            try:
+                item = await anext(iterator)
+            except StopAsyncIteration:
+                return
+        yield item
@@ -95,6 +95,48 @@ class AIServiceTimeout(ExternalServiceError):
         super().__init__(code="AI_SERVICE_TIMEOUT", message=message, details=details)
 
 
+class CircuitOpenError(ExternalServiceError):
+    """Upstream circuit breaker is open; the call was not attempted."""
+
+    def __init__(
+        self,
+        circuit: str,
+        retry_after: int,
+        slow: bool = False,
+        details: dict[str, Any] | None = None,
+    ) -> None:
+        error_details = details or {}
+        error_details["circuit"] = circuit
+        error_details["retryAfter"] = retry_after
+        super().__init__(
+            # Opened by slow calls: report it as the timeout it stands in for
+            code="AI_SERVICE_TIMEOUT" if slow else "AI_SERVICE_UNAVAILABLE",
+            message="AI服务响应超时，请稍后重试" if slow else "AI服务暂时不可用，请稍后重试",
+            details=error_details,
+        )
+        self.circuit = circuit
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(APIException):
+    """The request's deadline passed before an operation could finish."""
+
+    def __init__(
+        self,
+        operation: str,
+        details: dict[str, Any] | None = None,
+    ) -> None:
+        error_details = details or {}
+        error_details["operation"] = operation
+        super().__init__(
+            code="REQUEST_DEADLINE_EXCEEDED",
+            message="请求处理超时，请稍后重试",
+            status_code=504,
+            details=error_details,
+        )
+        self.operation = operation
+
+
 class RateLimitedError(APIException):
     """Rate limit exceeded error."""
 
@@ -0,0 +1,111 @@
+"""Lazily constructed module-level singletons.
+
+Integration clients used to be built at import time, which imported every
+vendor SDK (Tea clients, dashscope, oss2) and read credentials as soon as
+app.main was imported, slowing worker boot and test collection, and
+crashing imports outright when e.g. ALIBABA_OSS_ENDPOINT was empty.
+
+lazy_singleton() returns a stand-in that builds the real object on first
+attribute access; callers keep using the module-level name unchanged:
+
+    vision_client = lazy_singleton("vision_client", VisionAPIClient)
+
+Modules defer their SDK imports to the constructor or call site, so the SDK
+is loaded together with the client. warm_up() builds every registered
+singleton ahead of traffic (app lifespan).
+"""
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import Any, Generic, TypeVar, cast
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_registry: dict[str, "LazySingleton[Any]"] = {}
+
+
+class LazySingleton(Generic[T]):
+    """Proxy that constructs its target on first use (thread-safe)."""
+
+    def __init__(self, name: str, factory: Callable[[], T]) -> None:
+        """Initialize proxy; nothing is built yet."""
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    @property
+    def built(self) -> bool:
+        """Whether the target has been constructed."""
+        return self._instance is not None
+
+    def get(self) -> T:
+        """The target, constructed on the first call."""
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                instance = self._instance
+                if instance is None:
+                    start = time.perf_counter()
+                    instance = self._factory()
+                    object.__setattr__(self, "_instance", instance)
+                    logger.info(
+                        f"[Lazy] Built {self._name} in {(time.perf_counter() - start) * 1000:.0f}ms"
+                    )
+        return instance
+
+    def __getattr__(self, name: str) -> Any:
+        """Forward attribute reads to the target."""
+        return getattr(self.get(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """Forward attribute writes (e.g. monkeypatching) to the target."""
+        setattr(self.get(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        """Forward attribute deletion to the target."""
+        delattr(self.get(), name)
+
+    def __repr__(self) -> str:
+        """Show the proxy without building the target."""
+        state = "built" if self.built else "not built"
+        return f"<LazySingleton {self._name} ({state})>"
+
+
+def lazy_singleton(name: str, factory: Callable[[], T]) -> T:
+    """Register a lazily built singleton.
+
+    Args:
+        name: Name used in logs and by warm_up()
+        factory: Builds the instance (usually the class)
+
+    Returns:
+        A proxy typed as the instance it stands for
+    """
+    proxy = LazySingleton(name, factory)
+    _registry[name] = proxy
+    return cast(T, proxy)
+
+
+def warm_up(names: list[str] | None = None) -> dict[str, str]:
+    """Build registered singletons now (blocking; run it in a thread).
+
+    Args:
+        names: Singletons to build (default: all registered)
+
+    Returns:
+        Mapping of name to "ok" or the construction error
+    """
+    results: dict[str, str] = {}
+    for name in names or list(_registry):
+        try:
+            _registry[name].get()
+            results[name] = "ok"
+        except Exception as e:
+            logger.warning(f"[Lazy] Warm-up of {name} failed: {e}")
+            results[name] = f"{type(e).__name__}: {e}"
+    return results
@@ -5,17 +5,20 @@ import sys
 from typing import Any
 
 from app.config import settings
+from app.core.tracing import TraceContextFilter
 
 
 def setup_logging() -> None:
     """Configure logging for the application."""
     log_level = logging.DEBUG if settings.DEBUG else logging.INFO
 
-    # Configure root logger
+    # Configure root logger; records carry the current trace/span ids
+    handler = logging.StreamHandler(sys.stdout)
+    handler.addFilter(TraceContextFilter())
     logging.basicConfig(
         level=log_level,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[logging.StreamHandler(sys.stdout)],
+        format="%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s %(span_id)s] - %(message)s",
+        handlers=[handler],
     )
 
     # Set uvicorn access log level
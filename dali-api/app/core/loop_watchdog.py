@@ -0,0 +1,170 @@
+"""Event-loop blocking detector for debug and staging.
+
+Synchronous I/O inside async handlers (oss2, the dashscope and Alibaba Tea
+SDKs, the SMS client, passlib/bcrypt) stalls every request on the worker.
+With LOOP_WATCHDOG_ENABLED the watchdog:
+
+- probes loop lag: a coroutine sleeps LOOP_WATCHDOG_PROBE_INTERVAL and
+  records how late it wakes up (event_loop_lag_seconds)
+- times every callback the loop runs (the same hook asyncio's debug-mode
+  slow-callback warning uses, without debug mode's overhead) and reports
+  each one over LOOP_WATCHDOG_THRESHOLD_MS as event_loop_blocking_seconds
+  and a structured warning, attributed to:
+    route:       template of the request being handled ("background" if none)
+    integration: upstream method entered during or around the callback
+                 (see observe_upstream / upstream_scope), "none" otherwise
+
+It wraps asyncio.Handle._run for the whole process, so leave it off in
+production.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from prometheus_client import Histogram
+from starlette.types import Scope
+
+from app.config import settings
+from app.core.asgi import route_template
+
+logger = logging.getLogger(__name__)
+
+# ASGI scope of the request being handled (set by MetricsMiddleware)
+request_scope: ContextVar[Scope | None] = ContextVar("request_scope", default=None)
+# "integration.method" of the upstream call in progress
+current_upstream: ContextVar[str | None] = ContextVar("current_upstream", default=None)
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "How late the loop-lag probe woke up",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EVENT_LOOP_BLOCKING = Histogram(
+    "event_loop_blocking_seconds",
+    "Callbacks that held the event loop longer than the watchdog threshold",
+    ["route", "integration"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+
+class LoopWatchdog:
+    """Detects and attributes callbacks that block the event loop."""
+
+    def __init__(self, threshold: float | None = None, probe_interval: float | None = None) -> None:
+        """Initialize watchdog; defaults come from settings."""
+        self.threshold = threshold or settings.LOOP_WATCHDOG_THRESHOLD_MS / 1000
+        self.probe_interval = probe_interval or settings.LOOP_WATCHDOG_PROBE_INTERVAL
+        self._original_run: Callable[[asyncio.Handle], None] | None = None
+        self._loop_thread_id: int | None = None
+        self._probe: asyncio.Task | None = None
+        # Upstream methods entered by the callback currently running
+        self._entered: list[str] = []
+
+    @property
+    def active(self) -> bool:
+        """Whether the watchdog is installed."""
+        return self._original_run is not None
+
+    def start(self) -> None:
+        """Hook the callback runner and start the lag probe (call from the loop)."""
+        if self.active:
+            return
+        self._loop_thread_id = threading.get_ident()
+        original = self._original_run = asyncio.Handle._run
+        watchdog = self
+
+        def _run(handle: asyncio.Handle) -> None:
+            if threading.get_ident() != watchdog._loop_thread_id:
+                original(handle)
+                return
+            watchdog._entered = []
+            start = time.perf_counter()
+            try:
+                original(handle)
+            finally:
+                elapsed = time.perf_counter() - start
+                if elapsed >= watchdog.threshold:
+                    watchdog.report(handle, elapsed)
+
+        asyncio.Handle._run = _run  # type: ignore[method-assign]
+        self._probe = asyncio.create_task(self._probe_lag())
+        logger.info(f"[LoopWatchdog] Reporting callbacks over {self.threshold * 1000:.0f}ms")
+
+    async def stop(self) -> None:
+        """Restore the callback runner and stop the probe."""
+        if self._original_run is not None:
+            asyncio.Handle._run = self._original_run  # type: ignore[method-assign]
+            self._original_run = None
+        if self._probe is not None:
+            self._probe.cancel()
+            try:
+                await self._probe
+            except asyncio.CancelledError:
+                pass
+            self._probe = None
+
+    def note_upstream(self, name: str) -> None:
+        """Remember that the running callback entered an upstream call."""
+        if self.active and threading.get_ident() == self._loop_thread_id:
+            self._entered.append(name)
+
+    def report(self, handle: asyncio.Handle, elapsed: float) -> None:
+        """Record one blocking callback."""
+        context = handle._context  # type: ignore[attr-defined]
+        scope = context.get(request_scope)
+        route = route_template(scope) if scope is not None else "background"
+        # Still inside an upstream call (blocked before its next await), or a
+        # call that started and finished within this callback
+        integration = context.get(current_upstream) or (self._entered[-1] if self._entered else "none")
+        callback = describe_callback(handle)
+
+        EVENT_LOOP_BLOCKING.labels(route, integration).observe(elapsed)
+        logger.warning(
+            f"[LoopWatchdog] Event loop blocked {elapsed * 1000:.0f}ms "
+            f"route={route} integration={integration} callback={callback}",
+            extra={
+                "blocked_ms": round(elapsed * 1000),
+                "route": route,
+                "integration": integration,
+                "callback": callback,
+            },
+        )
+
+    async def _probe_lag(self) -> None:
+        """Measure how late the loop wakes a sleeping coroutine."""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.probe_interval)
+            EVENT_LOOP_LAG.observe(max(0.0, loop.time() - start - self.probe_interval))
+
+
+def describe_callback(handle: asyncio.Handle) -> str:
+    """Readable name of a callback: the task's coroutine, or the function."""
+    callback: Any = handle._callback  # type: ignore[attr-defined]
+    task = getattr(callback, "__self__", None)
+    if isinstance(task, asyncio.Task):
+        coro = task.get_coro()
+        return getattr(coro, "__qualname__", repr(coro))
+    return getattr(callback, "__qualname__", repr(callback))
+
+
+@contextmanager
+def upstream_scope(name: str) -> Iterator[None]:
+    """Attribute loop blocking inside the block to an upstream method."""
+    token = current_upstream.set(name)
+    loop_watchdog.note_upstream(name)
+    try:
+        yield
+    finally:
+        current_upstream.reset(token)
+
+
+# Singleton instance
+loop_watchdog = LoopWatchdog()
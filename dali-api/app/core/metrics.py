@@ -0,0 +1,322 @@
+"""Prometheus metrics.
+
+Exposed at /metrics. With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR
+to a shared empty directory so every worker's samples are aggregated.
+
+Metric families:
+- http_request_duration_seconds: per route template, method and status
+- upstream_request_duration_seconds / upstream_errors_total: per integration
+  method (segment_cloth, analyze_image_one_shot, generate_img2img, ...)
+- sse_*: time to first byte / first text chunk / image ready, active streams,
+  work cancelled when a stream ends early
+- generation_job_*: background generation jobs by outcome, time queued;
+  generation_wardrobe_total: generations that used the user's wardrobe
+- response_cache_lookups_total: generation answers replayed from the cache
+  (hit, similar_hit) or not (miss); see app.services.response_cache
+- llm_*: time to first token, gaps between streamed chunks, tokens used;
+  generation_estimated_cost_cny_total: estimated vendor spend
+- db_pool_checked_out, executor_queue_depth: saturation gauges
+- event_loop_lag_seconds, event_loop_blocking_seconds: see app.core.loop_watchdog
+- circuit_breaker_*: see app.core.circuit_breaker
+- upstream_retries_total: see app.core.retry
+- request_deadline_exceeded_total: see app.core.deadline
+"""
+
+import functools
+import os
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from typing import Any, ParamSpec, TypeVar
+
+from opentelemetry import trace
+from opentelemetry.context import Context
+from opentelemetry.trace import Span, SpanKind
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.asgi import route_template
+from app.core.circuit_breaker import circuit_guard
+from app.core.deadline import within_deadline
+from app.core.loop_watchdog import request_scope, upstream_scope
+from app.core.tracing import detached_span, tracer
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+# Request latencies span fast JSON endpoints to 60s+ image generation
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_REQUEST_DURATION = Histogram(
+    "upstream_request_duration_seconds",
+    "Latency of calls to external AI/storage services",
+    ["integration", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_ERRORS = Counter(
+    "upstream_errors_total",
+    "Failed calls to external AI/storage services",
+    ["integration", "method", "error"],
+)
+SSE_TIME_TO_FIRST_BYTE = Histogram(
+    "sse_time_to_first_byte_seconds",
+    "Time from request to the first SSE event",
+    buckets=LATENCY_BUCKETS,
+)
+SSE_TIME_TO_FIRST_TEXT = Histogram(
+    "sse_time_to_first_text_seconds",
+    "Time from request to the first text_chunk event",
+    buckets=LATENCY_BUCKETS,
+)
+SSE_TIME_TO_IMAGE = Histogram(
+    "sse_time_to_image_seconds",
+    "Time from request to the image_ready event",
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    "llm_time_to_first_token_seconds",
+    "Time from sending an LLM request to the first streamed content",
+    ["model"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_INTER_CHUNK_GAP = Histogram(
+    "llm_inter_chunk_gap_seconds",
+    "Upstream wait between consecutive streamed LLM chunks",
+    ["model"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens reported by the LLM provider",
+    ["model", "type"],
+)
+GENERATION_COST = Counter(
+    "generation_estimated_cost_cny_total",
+    "Estimated vendor cost of outfit generations (CNY)",
+    ["model"],
+)
+SSE_CANCELLED_WORK = Counter(
+    "sse_cancelled_work_total",
+    "Upstream work stopped or undone because a stream ended early (client gone, error)",
+    ["work"],  # llm_stream, image_generation, orphaned_image
+)
+SSE_ACTIVE_STREAMS = Gauge(
+    "sse_active_streams",
+    "SSE generation streams currently open",
+    multiprocess_mode="livesum",
+)
+GENERATION_JOBS = Counter(
+    "generation_jobs_total",
+    "Background generation jobs by outcome",
+    ["outcome"],  # complete, error, requeued (worker shut down), lost (worker died)
+)
+GENERATION_JOB_QUEUE_TIME = Histogram(
+    "generation_job_queue_seconds",
+    "Time a background generation job waited for a worker",
+    buckets=LATENCY_BUCKETS,
+)
+GENERATION_WARDROBE = Counter(
+    "generation_wardrobe_total",
+    "Outfit generations that used items from the user's wardrobe",
+    ["path"],  # prompt (matches given to the LLM), fast_path (no LLM call)
+)
+RESPONSE_CACHE_LOOKUPS = Counter(
+    "response_cache_lookups_total",
+    "Generation requests looked up in the response cache by result",
+    ["result"],  # hit, similar_hit, miss
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Database connections currently checked out of the pool",
+    multiprocess_mode="livesum",
+)
+EXECUTOR_QUEUE_DEPTH = Gauge(
+    "executor_queue_depth",
+    "Jobs submitted to a background executor and not finished yet",
+    ["executor"],
+    multiprocess_mode="livesum",
+)
+
+
+@contextmanager
+def observe_upstream(integration: str, method: str) -> Iterator[None]:
+    """Time an upstream call, count failures and trace it as a client span.
+
+    The span is current inside the block, so do not yield from an async
+    generator here (use observe_upstream_stream()).
+
+    Usage:
+        with observe_upstream("qwen_vl", "analyze_image_one_shot"):
+            ...
+    """
+    start = time.perf_counter()
+    try:
+        with tracer.start_as_current_span(
+            f"{integration}.{method}",
+            kind=SpanKind.CLIENT,
+            attributes={"upstream.integration": integration, "upstream.method": method},
+        ), upstream_scope(f"{integration}.{method}"):
+            yield
+    except Exception as e:
+        UPSTREAM_ERRORS.labels(integration, method, type(e).__name__).inc()
+        raise
+    finally:
+        UPSTREAM_REQUEST_DURATION.labels(integration, method).observe(time.perf_counter() - start)
+
+
+class UpstreamStream:
+    """An upstream stream being observed (see observe_upstream_stream())."""
+
+    def __init__(self, span: Span) -> None:
+        """Wrap the stream's client span."""
+        self.span = span
+        # Parent for spans started while the stream is read
+        self.context = trace.set_span_in_context(span)
+        self.consumer_seconds = 0.0
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        """Exclude the block (handing an item to the consumer) from the latency."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.consumer_seconds += time.perf_counter() - start
+
+
+@contextmanager
+def observe_upstream_stream(
+    integration: str, method: str, parent: Context | None = None
+) -> Iterator[UpstreamStream]:
+    """observe_upstream() for async generators relaying an upstream stream.
+
+    The client span is not made current: a current span held across yields
+    leaks into the consumer and cannot be detached if the generator is closed
+    early. Start child spans with UpstreamStream.context as their parent.
+
+    Wrap each yield in UpstreamStream.paused() so the latency covers only
+    waiting on the upstream, not the consumer (SSE pacing, backpressure).
+    """
+    start = time.perf_counter()
+    stream: UpstreamStream | None = None
+    try:
+        with detached_span(
+            f"{integration}.{method}",
+            parent,
+            kind=SpanKind.CLIENT,
+            attributes={"upstream.integration": integration, "upstream.method": method},
+        ) as span:
+            stream = UpstreamStream(span)
+            yield stream
+    except Exception as e:
+        UPSTREAM_ERRORS.labels(integration, method, type(e).__name__).inc()
+        raise
+    finally:
+        consumer_seconds = stream.consumer_seconds if stream else 0.0
+        UPSTREAM_REQUEST_DURATION.labels(integration, method).observe(
+            time.perf_counter() - start - consumer_seconds
+        )
+
+
+def track_upstream(
+    integration: str, method: str | None = None, circuit: bool = True
+) -> Callable[[Callable[P, Awaitable[R]]], Callable[P, Awaitable[R]]]:
+    """Decorate an async integration method with observe_upstream().
+
+    Calls also go through the endpoint's circuit breaker, unless circuit is
+    False (methods that only orchestrate other tracked calls), and are
+    cancelled when the request deadline passes (see app.core.deadline).
+    """
+
+    def decorator(func: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+        name = method or func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            # Outermost: a call cut off by the deadline frees its breaker slot
+            # without counting as an upstream failure
+            async with within_deadline(f"{integration}.{name}"):
+                if not circuit:
+                    with observe_upstream(integration, name):
+                        return await func(*args, **kwargs)
+                # Rejected calls never reach the upstream, so they are not timed
+                with circuit_guard(f"{integration}.{name}"), observe_upstream(integration, name):
+                    return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def instrument_engine(engine: Any) -> None:
+    """Track pool checkouts of an (async) SQLAlchemy engine."""
+    from sqlalchemy import event
+
+    pool = getattr(engine, "sync_engine", engine).pool
+    event.listen(pool, "checkout", lambda *_: DB_POOL_CHECKED_OUT.inc())
+    event.listen(pool, "checkin", lambda *_: DB_POOL_CHECKED_OUT.dec())
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template.
+
+    Labels use the matched route's path template (/api/v1/outfits/{id}), never
+    the raw path, so cardinality stays bounded. Streaming responses are timed
+    until the last body chunk is sent.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Wrap an ASGI app."""
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle one ASGI request."""
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = "500"
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        # Lets the loop watchdog attribute blocking to this request's route
+        token = request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_scope.reset(token)
+            HTTP_REQUEST_DURATION.labels(scope["method"], route_template(scope), status).observe(
+                time.perf_counter() - start
+            )
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Render all metrics in the Prometheus text format.
+
+    Returns:
+        Tuple of (body, content_type)
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,158 @@
+"""On-demand profiling of a live worker.
+
+Two tools for "this worker is slow, where does the time go?":
+
+- sample_stacks(): a built-in sampling profiler. A background thread reads
+  every thread's stack (sys._current_frames()) at a fixed interval and
+  returns the samples in the collapsed-stack format used by py-spy
+  (--format raw), flamegraph.pl and speedscope:
+
+      MainThread;run (asyncio/runners.py:118);... 42
+
+  Served by GET /api/v1/debug/profile (admin token required).
+
+- LoopStallMonitor: a heartbeat coroutine plus a watchdog thread. When the
+  event loop has not run the heartbeat for LOOP_STALL_THRESHOLD_MS, the
+  watchdog logs the loop thread's stack while it is still blocked, so the
+  offending call (a synchronous SDK request, bcrypt, ...) is named directly.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Frames kept per stack (innermost ones win when a stack is deeper)
+MAX_STACK_DEPTH = 128
+
+
+def format_frame(frame: FrameType) -> str:
+    """Render one frame as "function (path:line)" with a shortened path."""
+    code = frame.f_code
+    filename = code.co_filename
+    for marker in ("/site-packages/", "/lib/python"):
+        if marker in filename:
+            filename = filename.split(marker, 1)[1]
+            break
+    else:
+        if "/app/" in filename:
+            filename = "app/" + filename.rsplit("/app/", 1)[1]
+    return f"{code.co_name} ({filename}:{frame.f_lineno})"
+
+
+def collapse_stack(frame: FrameType | None) -> list[str]:
+    """Frames of a stack, outermost first."""
+    frames: list[str] = []
+    while frame is not None and len(frames) < MAX_STACK_DEPTH:
+        frames.append(format_frame(frame))
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+def sample_stacks(seconds: float, interval: float = 0.01) -> str:
+    """Sample all threads' stacks (blocking; run it in a worker thread).
+
+    Args:
+        seconds: How long to sample
+        interval: Time between samples
+
+    Returns:
+        Collapsed stacks, one "thread;frame;...;frame count" line per stack
+    """
+    own_id = threading.get_ident()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    counts: Counter[str] = Counter()
+
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            thread_name = names.get(thread_id, f"thread-{thread_id}")
+            counts[";".join([thread_name, *collapse_stack(frame)])] += 1
+        time.sleep(interval)
+
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+class LoopStallMonitor:
+    """Logs the event loop's stack whenever it is blocked for too long."""
+
+    def __init__(self, threshold: float | None = None, interval: float = 0.05) -> None:
+        """Initialize monitor.
+
+        Args:
+            threshold: Seconds without a heartbeat before a stall is reported
+            interval: Heartbeat period
+        """
+        self.threshold = threshold or settings.LOOP_STALL_THRESHOLD_MS / 1000
+        self.interval = interval
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._heartbeat: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Start the heartbeat and the watchdog (call from the event loop)."""
+        if self._heartbeat is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._heartbeat = asyncio.create_task(self._beat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-stall-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop monitoring."""
+        self._stopped.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat = None
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join, 1.0)
+            self._watchdog = None
+
+    async def _beat(self) -> None:
+        """Record that the loop is running callbacks."""
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self) -> None:
+        """Report each stall once, with the stack captured while it lasts."""
+        reported_beat = None
+        while not self._stopped.wait(self.interval):
+            beat = self._last_beat
+            blocked = time.monotonic() - beat
+            if blocked < self.threshold + self.interval or beat == reported_beat:
+                continue
+            reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id or 0)
+            self.report(blocked, collapse_stack(frame))
+
+    def report(self, blocked: float, stack: list[str]) -> None:
+        """Log one stall (called from the watchdog thread)."""
+        app_frames = [entry for entry in stack if "(app/" in entry]
+        culprit = (app_frames or stack or ["unknown"])[-1]
+        logger.warning(
+            f"[Profiling] Event loop blocked for {blocked * 1000:.0f}ms in {culprit}\n  "
+            + "\n  ".join(stack[-20:])
+        )
+
+
+# Singleton instance
+loop_stall_monitor = LoopStallMonitor()
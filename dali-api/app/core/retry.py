@@ -0,0 +1,238 @@
+"""Retries for idempotent upstream calls.
+
+A single 429 or 502 from DashScope, or a dropped connection while fetching
+a signed OSS URL, used to fail the whole user flow. Idempotent calls (GETs
+and downloads, VL analysis, segmentation) now retry transient failures:
+
+- retried: transport errors (connect/read errors, timeouts) and HTTP 408,
+  429, 500, 502, 503, 504, including when wrapped by an integration error
+  (raise ... from e) or reported by an SDK (Alibaba Tea's statusCode, an
+  integration error's upstream_status)
+- backoff: exponential with full jitter, or the server's Retry-After when
+  it sends one (a Retry-After over max_retry_after ends the retries)
+- budget: retries across the process may not exceed RETRY_BUDGET_RATIO of
+  the calls in the last RETRY_BUDGET_WINDOW_SECONDS (plus a small floor),
+  so retries cannot multiply the load on a provider that is already down
+
+Each client owns a RetryPolicy (RetryPolicy.from_settings("qwen_vl")),
+tunable per client through RETRY_POLICIES. Decorate methods with
+@retryable above @track_upstream so every attempt is timed and counted
+by the circuit breaker; an open circuit is never retried, and no retry
+starts that would sleep past the request deadline (app.core.deadline).
+"""
+
+import asyncio
+import functools
+import logging
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field, replace
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from typing import Any, Concatenate, ParamSpec, TypeVar
+
+import httpx
+from prometheus_client import Counter
+
+from app.config import settings
+from app.core.deadline import remaining, within_deadline
+from app.core.exceptions import CircuitOpenError, DeadlineExceededError
+
+logger = logging.getLogger(__name__)
+
+P = ParamSpec("P")
+R = TypeVar("R")
+S = TypeVar("S")
+
+UPSTREAM_RETRIES = Counter(
+    "upstream_retries_total",
+    "Retries of idempotent upstream calls",
+    ["client", "outcome"],  # outcome: "retried" or "budget_exhausted"
+)
+
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How one client retries its idempotent calls."""
+
+    name: str
+    max_attempts: int = 3
+    base_delay: float = 0.2  # Seconds; doubles per attempt before jitter
+    max_delay: float = 2.0
+    max_retry_after: float = 10.0  # Give up rather than wait longer
+    retry_statuses: frozenset[int] = field(default=RETRYABLE_STATUSES)
+
+    @classmethod
+    def from_settings(cls, name: str) -> "RetryPolicy":
+        """Policy from the RETRY_* defaults and RETRY_POLICIES[name] overrides."""
+        policy = cls(
+            name=name,
+            max_attempts=settings.RETRY_MAX_ATTEMPTS,
+            base_delay=settings.RETRY_BASE_DELAY,
+            max_delay=settings.RETRY_MAX_DELAY,
+        )
+        return replace(policy, **settings.RETRY_POLICIES.get(name, {}))
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number `attempt` (1-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class RetryBudget:
+    """Caps retries at a share of recent calls, process-wide."""
+
+    def __init__(
+        self,
+        ratio: float | None = None,
+        min_per_second: float | None = None,
+        window: float | None = None,
+    ) -> None:
+        """Initialize budget; defaults come from settings."""
+        self.ratio = settings.RETRY_BUDGET_RATIO if ratio is None else ratio
+        self.min_per_second = settings.RETRY_BUDGET_MIN_PER_SECOND if min_per_second is None else min_per_second
+        self.window = window or settings.RETRY_BUDGET_WINDOW_SECONDS
+        self._calls: deque[float] = deque()
+        self._retries: deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def record_call(self) -> None:
+        """Count a first attempt."""
+        with self._lock:
+            self._calls.append(time.monotonic())
+
+    def try_spend(self) -> bool:
+        """Take one retry from the budget if any is left."""
+        with self._lock:
+            now = time.monotonic()
+            for timestamps in (self._calls, self._retries):
+                while timestamps and now - timestamps[0] > self.window:
+                    timestamps.popleft()
+            allowed = self.min_per_second * self.window + self.ratio * len(self._calls)
+            if len(self._retries) >= allowed:
+                return False
+            self._retries.append(now)
+            return True
+
+
+def _causes(exc: BaseException) -> list[BaseException]:
+    """The exception and what it wraps (__cause__, Tea's inner_exception)."""
+    chain: list[BaseException] = []
+    seen: BaseException | None = exc
+    while seen is not None and len(chain) < 10:
+        chain.append(seen)
+        seen = seen.__cause__ or getattr(seen, "inner_exception", None)
+    return chain
+
+
+def is_retryable(exc: BaseException, policy: RetryPolicy) -> bool:
+    """Whether a failure is transient."""
+    for seen in _causes(exc):
+        if isinstance(seen, CircuitOpenError | DeadlineExceededError):
+            return False
+        if isinstance(seen, httpx.HTTPStatusError):
+            return seen.response.status_code in policy.retry_statuses
+        # Connect/read errors and timeouts (requests' errors, under Tea, are OSErrors)
+        if isinstance(seen, httpx.TransportError | OSError):
+            return True
+        # Statuses reported by SDKs: Alibaba Tea errors, DashScope responses
+        status = getattr(seen, "statusCode", None) or getattr(seen, "upstream_status", None)
+        if isinstance(status, int):
+            return status in policy.retry_statuses
+    return False
+
+
+def retry_after(exc: BaseException) -> float | None:
+    """Seconds from a Retry-After header on the failed response, if any."""
+    for seen in _causes(exc):
+        if isinstance(seen, httpx.HTTPStatusError):
+            value = seen.response.headers.get("retry-after")
+            if not value:
+                return None
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                pass
+            try:
+                return max(0.0, (parsedate_to_datetime(value) - datetime.now(UTC)).total_seconds())
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+async def call_with_retry(
+    policy: RetryPolicy,
+    func: Callable[P, Awaitable[R]],
+    *args: P.args,
+    **kwargs: P.kwargs,
+) -> R:
+    """Await func(*args, **kwargs), retrying transient failures per policy."""
+    retry_budget.record_call()
+    attempt = 1
+    while True:
+        try:
+            return await func(*args, **kwargs)
+        except Exception as e:
+            if attempt >= policy.max_attempts or not is_retryable(e, policy):
+                raise
+            delay = retry_after(e)
+            if delay is not None and delay > policy.max_retry_after:
+                raise
+            if delay is None:
+                delay = policy.backoff(attempt)
+            left = remaining()
+            if left is not None and delay >= left:
+                raise  # The retry could not start before the request deadline
+            if not retry_budget.try_spend():
+                UPSTREAM_RETRIES.labels(policy.name, "budget_exhausted").inc()
+                logger.warning(f"[Retry] {policy.name}: retry budget exhausted, not retrying: {e}")
+                raise
+            UPSTREAM_RETRIES.labels(policy.name, "retried").inc()
+            logger.info(
+                f"[Retry] {policy.name}: attempt {attempt}/{policy.max_attempts} failed ({e}), "
+                f"retrying in {delay:.2f}s"
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+def retryable(
+    func: Callable[Concatenate[S, P], Awaitable[R]],
+) -> Callable[Concatenate[S, P], Awaitable[R]]:
+    """Retry a client method with the client's retry_policy attribute."""
+
+    @functools.wraps(func)
+    async def wrapper(self: S, *args: P.args, **kwargs: P.kwargs) -> R:
+        policy: RetryPolicy = self.retry_policy  # type: ignore[attr-defined]
+        return await call_with_retry(policy, func, self, *args, **kwargs)
+
+    return wrapper
+
+
+async def get_with_retry(
+    client: httpx.AsyncClient, url: str, policy: RetryPolicy, **kwargs: Any
+) -> httpx.Response:
+    """GET a URL (e.g. a signed OSS URL), retrying transient failures.
+
+    Returns the response for any status outside policy.retry_statuses
+    (callers still check it); raises httpx.HTTPStatusError if a retryable
+    status persists through every attempt, DeadlineExceededError if the
+    request deadline passes first.
+    """
+
+    async def fetch() -> httpx.Response:
+        response = await client.get(url, **kwargs)
+        if response.status_code in policy.retry_statuses:
+            response.raise_for_status()
+        return response
+
+    async with within_deadline(f"{policy.name}.download"):
+        return await call_with_retry(policy, fetch)
+
+
+# Singleton instance
+retry_budget = RetryBudget()
@@ -0,0 +1,276 @@
+"""OpenTelemetry tracing.
+
+One /outfits/generate-stream request fans out into a DashScope stream, a
+background img2img task, image downloads and OSS uploads. Every step opens a
+span under the request's server span so a slow request can be broken down:
+
+    POST /api/v1/outfits/generate-stream
+      streaming.generate_stream
+        dashscope.text_generation_stream
+          streaming.generate_image            (asyncio.Task)
+            siliconflow.generate_img2img
+              siliconflow.images_edits
+                siliconflow.download_base_image
+                siliconflow.upload_to_oss
+                  storage.upload_file ...
+
+asyncio.create_task() and asyncio.to_thread() copy the current context, so
+background work stays attached to the span that started it. Async generators
+must not keep a span current across yields; they open it with detached_span()
+and hand its context to children explicitly. Log records get trace_id/span_id
+attributes (see TraceContextFilter).
+
+Exporters (TRACING_EXPORTER): "none" (ids for log correlation only),
+"console", or "otlp" (needs opentelemetry-exporter-otlp-proto-http; endpoint
+from TRACING_OTLP_ENDPOINT or the standard OTEL_EXPORTER_OTLP_* variables).
+Tests attach an InMemorySpanExporter with add_span_exporter().
+"""
+
+import functools
+import inspect
+import logging
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any, TypeVar
+
+from opentelemetry import propagate, trace
+from opentelemetry.context import Context
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SimpleSpanProcessor,
+    SpanExporter,
+)
+from opentelemetry.sdk.trace.sampling import ParentBasedTraceIdRatio
+from opentelemetry.trace import Span, SpanKind, Status, StatusCode
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.__version__ import __version__
+from app.config import settings
+from app.core.asgi import route_template
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Statement text is recorded on DB spans up to this length
+MAX_STATEMENT_LENGTH = 500
+
+tracer = trace.get_tracer("dali-api", __version__)
+
+_provider: TracerProvider | None = None
+
+
+def setup_tracing() -> TracerProvider | None:
+    """Install the global tracer provider (idempotent).
+
+    Returns:
+        The provider, or None if tracing is disabled
+    """
+    global _provider
+    if _provider is not None or not settings.TRACING_ENABLED:
+        return _provider
+
+    _provider = TracerProvider(
+        resource=Resource.create({
+            "service.name": settings.TRACING_SERVICE_NAME,
+            "service.version": __version__,
+            "deployment.environment": settings.APP_ENV,
+        }),
+        sampler=ParentBasedTraceIdRatio(settings.TRACING_SAMPLE_RATIO),
+    )
+    trace.set_tracer_provider(_provider)
+
+    exporter = _build_exporter(settings.TRACING_EXPORTER)
+    if exporter is not None:
+        _provider.add_span_processor(BatchSpanProcessor(exporter))
+    return _provider
+
+
+def _build_exporter(name: str) -> SpanExporter | None:
+    """Create the configured span exporter."""
+    if name == "console":
+        return ConsoleSpanExporter()
+    if name == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning("[Tracing] opentelemetry-exporter-otlp-proto-http not installed, spans not exported")
+            return None
+        return OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT or None)
+    if name != "none":
+        logger.warning(f"[Tracing] Unknown TRACING_EXPORTER={name!r}, spans not exported")
+    return None
+
+
+def add_span_exporter(exporter: SpanExporter) -> None:
+    """Export finished spans synchronously to an extra exporter (tests, debugging)."""
+    provider = setup_tracing()
+    if provider is None:
+        raise RuntimeError("Tracing is disabled (TRACING_ENABLED=false)")
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+
+
+def shutdown_tracing() -> None:
+    """Flush pending spans."""
+    if _provider is not None:
+        _provider.force_flush()
+
+
+def traced(name: str | None = None, kind: SpanKind = SpanKind.INTERNAL) -> Callable[[F], F]:
+    """Run a sync or async function inside a span.
+
+    Exceptions are recorded on the span and re-raised.
+
+    Usage:
+        @traced("storage.upload_file")
+        def upload_file(...): ...
+    """
+
+    def decorator(func: F) -> F:
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with tracer.start_as_current_span(span_name, kind=kind):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with tracer.start_as_current_span(span_name, kind=kind):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+@contextmanager
+def detached_span(
+    name: str,
+    parent: Context | None = None,
+    kind: SpanKind = SpanKind.INTERNAL,
+    attributes: dict[str, Any] | None = None,
+) -> Iterator[Span]:
+    """Open a span without making it current.
+
+    Safe to hold across yields in async generators. Children are started with
+    trace.set_span_in_context(span) as their parent.
+
+    Args:
+        name: Span name
+        parent: Parent context (default: the current one)
+        kind: Span kind
+        attributes: Initial attributes
+    """
+    span = tracer.start_span(name, context=parent, kind=kind, attributes=attributes)
+    try:
+        yield span
+    except Exception as e:
+        span.record_exception(e)
+        span.set_status(Status(StatusCode.ERROR, str(e)))
+        raise
+    finally:
+        span.end()
+
+
+def current_trace_ids() -> tuple[str, str]:
+    """Hex trace and span id of the current span ("-" outside a span)."""
+    span_context = trace.get_current_span().get_span_context()
+    if not span_context.is_valid:
+        return "-", "-"
+    return format(span_context.trace_id, "032x"), format(span_context.span_id, "016x")
+
+
+class TraceContextFilter(logging.Filter):
+    """Adds trace_id and span_id to every log record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Attach the current span's ids; never drops records."""
+        record.trace_id, record.span_id = current_trace_ids()
+        return True
+
+
+def instrument_engine(engine: Any) -> None:
+    """Open a client span for every statement of an (async) SQLAlchemy engine."""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        operation = statement.lstrip().split(" ", 1)[0].upper() or "QUERY"
+        span = tracer.start_span(
+            f"db.{operation.lower()}",
+            kind=SpanKind.CLIENT,
+            attributes={
+                "db.system": sync_engine.dialect.name,
+                "db.operation": operation,
+                "db.statement": statement[:MAX_STATEMENT_LENGTH],
+            },
+        )
+        conn.info.setdefault("trace_spans", []).append(span)
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        spans = conn.info.get("trace_spans")
+        if spans:
+            spans.pop().end()
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context: Any) -> None:
+        conn = exception_context.connection
+        spans = conn.info.get("trace_spans") if conn is not None else None
+        if spans:
+            span = spans.pop()
+            span.record_exception(exception_context.original_exception)
+            span.set_status(Status(StatusCode.ERROR))
+            span.end()
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a server span per HTTP request.
+
+    Incoming W3C traceparent headers are honoured. The span is renamed to the
+    matched route template once routing has happened; streaming responses are
+    traced until the last body chunk is sent.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Wrap an ASGI app."""
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle one ASGI request."""
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        carrier = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        with tracer.start_as_current_span(
+            f"{scope['method']} {scope['path']}",
+            context=propagate.extract(carrier),
+            kind=SpanKind.SERVER,
+            attributes={"http.request.method": scope["method"], "url.path": scope["path"]},
+        ) as span:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_status(Status(StatusCode.ERROR))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                template = route_template(scope)
+                if template != "unmatched":
+                    span.set_attribute("http.route", template)
+                    span.update_name(f"{scope['method']} {template}")
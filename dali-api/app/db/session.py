@@ -4,6 +4,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.config import settings
+from app.core import metrics, tracing
 
 # Create async engine with connection pool
 engine = create_async_engine(
@@ -13,6 +14,8 @@ engine = create_async_engine(
     pool_size=5,
     max_overflow=10,
 )
+metrics.instrument_engine(engine)
+tracing.instrument_engine(engine)
 
 # Create async session maker
 async_session_maker = async_sessionmaker(
@@ -1,14 +1,15 @@
 """Alibaba Cloud OSS integration for image storage.
 
-Used for image storage with SSE encryption.
+Used for image storage with SSE encryption. oss2 is imported when the client
+is first built (see app.core.lazy), not when this module is imported.
 """
 
-from datetime import datetime, timedelta
+from collections.abc import Iterator
+from datetime import UTC, datetime, timedelta
 from urllib.parse import quote, unquote, urlsplit, urlunsplit
 
-import oss2
-
 from app.config import settings
+from app.core.lazy import lazy_singleton
 
 
 def encode_presigned_url(url: str) -> str:
@@ -47,27 +48,52 @@ def encode_presigned_url(url: str) -> str:
     ))
 
 
+def oss_endpoint() -> str:
+    """Get the OSS endpoint URL from settings.
+
+    HTTPS is enforced (required for bucket policy) unless ALIBABA_ALLOW_HTTP
+    is set, which is only meant for local fake upstreams.
+    """
+    endpoint = settings.ALIBABA_OSS_ENDPOINT
+    if endpoint.startswith("http://"):
+        if settings.ALIBABA_ALLOW_HTTP:
+            return endpoint
+        return endpoint.replace("http://", "https://", 1)
+    if not endpoint.startswith("https://"):
+        return f"https://{endpoint}"
+    return endpoint
+
+
+def oss_base_url() -> str:
+    """Get the base URL under which bucket objects are served.
+
+    Virtual-hosted style (https://bucket.endpoint) for real OSS; IP or
+    localhost endpoints use path style (http://host:port/bucket), like oss2.
+    """
+    import oss2
+
+    parts = urlsplit(oss_endpoint())
+    if oss2.utils.is_ip_or_localhost(parts.netloc):
+        return f"{parts.scheme}://{parts.netloc}/{settings.ALIBABA_OSS_BUCKET}"
+    return f"{parts.scheme}://{settings.ALIBABA_OSS_BUCKET}.{parts.netloc}"
+
+
 class OSSClient:
     """Client for Alibaba Cloud OSS operations."""
 
     def __init__(self) -> None:
         """Initialize OSS client with credentials from settings."""
+        import oss2
+
+        self._oss_error = oss2.exceptions.OssError
         self._auth = oss2.Auth(
             settings.ALIBABA_ACCESS_KEY_ID,
             settings.ALIBABA_ACCESS_KEY_SECRET,
         )
-        
-        # Ensure endpoint uses HTTPS (required for bucket policy)
-        endpoint = settings.ALIBABA_OSS_ENDPOINT
-        if not endpoint.startswith("http://") and not endpoint.startswith("https://"):
-            endpoint = f"https://{endpoint}"
-        elif endpoint.startswith("http://"):
-            # Force HTTPS
-            endpoint = endpoint.replace("http://", "https://", 1)
-        
+
         self._bucket = oss2.Bucket(
             self._auth,
-            endpoint,
+            oss_endpoint(),
             settings.ALIBABA_OSS_BUCKET,
         )
 
@@ -170,9 +196,23 @@ class OSSClient:
                 headers={"Content-Type": content_type}
             )
             return True
-        except oss2.exceptions.OssError:
+        except self._oss_error:
             return False
 
+    def get_object(self, object_key: str) -> bytes | None:
+        """Download an object from OSS.
+
+        Args:
+            object_key: The object key (path) to read
+
+        Returns:
+            Object content, or None if it cannot be read
+        """
+        try:
+            return self._bucket.get_object(object_key).read()
+        except self._oss_error:
+            return None
+
     def delete_object(self, object_key: str) -> bool:
         """Delete an object from OSS.
 
@@ -185,7 +225,7 @@ class OSSClient:
         try:
             self._bucket.delete_object(object_key)
             return True
-        except oss2.exceptions.OssError:
+        except self._oss_error:
             return False
 
     def list_objects(self, prefix: str = "", max_keys: int = 100) -> list[str]:
@@ -201,7 +241,43 @@ class OSSClient:
         try:
             result = self._bucket.list_objects(prefix=prefix, max_keys=max_keys)
             return [obj.key for obj in result.object_list]
-        except oss2.exceptions.OssError:
+        except self._oss_error:
+            return []
+
+    def iter_objects(self, prefix: str = "", page_size: int = 1000) -> Iterator[tuple[str, datetime, int]]:
+        """Iterate over all objects with a given prefix, following pagination.
+
+        Args:
+            prefix: The prefix to filter objects
+            page_size: Keys fetched per ListObjects call (OSS maximum is 1000)
+
+        Yields:
+            Tuples of (object_key, last_modified, size_bytes)
+        """
+        marker = ""
+        while True:
+            result = self._bucket.list_objects(prefix=prefix, marker=marker, max_keys=page_size)
+            for obj in result.object_list:
+                yield obj.key, datetime.fromtimestamp(obj.last_modified, UTC), obj.size
+            if not result.is_truncated:
+                return
+            marker = result.next_marker
+
+    def batch_delete(self, object_keys: list[str]) -> list[str]:
+        """Delete up to 1000 objects in a single request.
+
+        Args:
+            object_keys: The object keys to delete (at most 1000)
+
+        Returns:
+            Keys reported as deleted (empty on failure)
+        """
+        if not object_keys:
+            return []
+        try:
+            result = self._bucket.batch_delete_objects(object_keys)
+            return list(result.deleted_keys)
+        except self._oss_error:
             return []
 
     def object_exists(self, object_key: str) -> bool:
@@ -216,5 +292,5 @@ class OSSClient:
         return self._bucket.object_exists(object_key)
 
 
-# Singleton instance
-oss_client = OSSClient()
+# Singleton instance (built on first use)
+oss_client = lazy_singleton("oss_client", OSSClient)
@@ -1,23 +1,24 @@
 """Alibaba Cloud Vision API integration for garment recognition and segmentation.
 
 This module provides integration with Alibaba Cloud Vision API (Viapi)
-for garment attribute analysis and segmentation.
+for garment attribute analysis and segmentation. The Tea SDKs are imported
+when the client is first built (see app.core.lazy).
 """
 
 import random
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any
-
-from alibabacloud_imageseg20191230.client import Client as ImageSegClient
-from alibabacloud_imageseg20191230 import models as imageseg_models
-from alibabacloud_objectdet20191230.client import Client as ObjectDetClient
-from alibabacloud_objectdet20191230 import models as objectdet_models
-from alibabacloud_tea_openapi import models as open_api_models
-from alibabacloud_tea_util import models as util_models
+from typing import TYPE_CHECKING, Any
 
 from app.config import settings
-from app.core.exceptions import APIException
+from app.core.exceptions import APIException, DeadlineExceededError
+from app.core.lazy import lazy_singleton
+from app.core.metrics import track_upstream
+from app.core.retry import RetryPolicy, get_with_retry, retryable
+from app.services.color_extraction import ExtractedColor, color_extractor
+
+if TYPE_CHECKING:
+    from alibabacloud_tea_openapi import models as open_api_models
 
 
 class GarmentType(str, Enum):
@@ -92,24 +93,25 @@ class SegmentationResult:
     individual_items: list[SegmentedClothingItem] = field(default_factory=list)  # Individual segmented items
 
 
-# Predefined color palette for mock responses (Fallback)
-COLOR_PALETTE: list[tuple[str, str]] = [
-    ("#FFFFFF", "白色"),
-    ("#000000", "黑色"),
-    ("#F5F5DC", "米色"),
-    ("#808080", "灰色"),
-    ("#000080", "藏蓝色"),
-    ("#8B4513", "棕色"),
-    ("#FFC0CB", "粉色"),
-    ("#FF0000", "红色"),
-    ("#90EE90", "浅绿色"),
-    ("#ADD8E6", "浅蓝色"),
-    ("#FFD700", "金色"),
-    ("#800080", "紫色"),
-    ("#FFA500", "橙色"),
-    ("#008000", "绿色"),
-    ("#C0C0C0", "银色"),
-]
+# Style tags suggested by each named palette color, used to derive style
+# tags from the extracted garment colors (weighted by color share)
+COLOR_STYLE_TAGS: dict[str, list[StyleTag]] = {
+    "白色": [StyleTag.MINIMALIST, StyleTag.CASUAL],
+    "黑色": [StyleTag.FORMAL, StyleTag.MINIMALIST],
+    "米色": [StyleTag.INTELLECTUAL, StyleTag.MINIMALIST],
+    "灰色": [StyleTag.MINIMALIST, StyleTag.INTELLECTUAL],
+    "藏蓝色": [StyleTag.FORMAL, StyleTag.INTELLECTUAL],
+    "棕色": [StyleTag.VINTAGE, StyleTag.INTELLECTUAL],
+    "粉色": [StyleTag.SWEET],
+    "红色": [StyleTag.TRENDY],
+    "浅绿色": [StyleTag.CASUAL, StyleTag.SWEET],
+    "浅蓝色": [StyleTag.CASUAL, StyleTag.MINIMALIST],
+    "金色": [StyleTag.TRENDY, StyleTag.VINTAGE],
+    "紫色": [StyleTag.VINTAGE, StyleTag.TRENDY],
+    "橙色": [StyleTag.ATHLETIC, StyleTag.TRENDY],
+    "绿色": [StyleTag.ATHLETIC, StyleTag.CASUAL],
+    "银色": [StyleTag.TRENDY],
+}
 
 
 class VisionAPIClient:
@@ -117,27 +119,38 @@ class VisionAPIClient:
 
     def __init__(self) -> None:
         """Initialize Vision API client with credentials."""
+        self.retry_policy = RetryPolicy.from_settings("alibaba_vision")
         self._init_clients()
 
     def _init_clients(self) -> None:
         """Initialize Aliyun SDK clients."""
-        config = open_api_models.Config(
-            access_key_id=settings.ALIBABA_ACCESS_KEY_ID,
-            access_key_secret=settings.ALIBABA_ACCESS_KEY_SECRET,
-        )
+        from alibabacloud_imageseg20191230.client import Client as ImageSegClient
+        from alibabacloud_objectdet20191230.client import Client as ObjectDetClient
+
         # Endpoint for Image Segmentation
-        config.endpoint = "imageseg.cn-shanghai.aliyuncs.com"
-        self.imageseg_client = ImageSegClient(config)
+        self.imageseg_client = ImageSegClient(self._sdk_config(settings.ALIBABA_IMAGESEG_ENDPOINT))
 
         # Config for Object Detection (DetectMainBody)
-        # Note: Endpoint might be different or shared (usually objectdet.cn-shanghai.aliyuncs.com)
-        det_config = open_api_models.Config(
+        self.objectdet_client = ObjectDetClient(self._sdk_config(settings.ALIBABA_OBJECTDET_ENDPOINT))
+
+    def _sdk_config(self, endpoint: str) -> "open_api_models.Config":
+        """Build SDK config; "http://host:port" endpoints are honored for local fakes."""
+        from alibabacloud_tea_openapi import models as open_api_models
+
+        config = open_api_models.Config(
             access_key_id=settings.ALIBABA_ACCESS_KEY_ID,
             access_key_secret=settings.ALIBABA_ACCESS_KEY_SECRET,
         )
-        det_config.endpoint = "objectdet.cn-shanghai.aliyuncs.com"
-        self.objectdet_client = ObjectDetClient(det_config)
-
+        scheme, sep, host = endpoint.partition("://")
+        if not sep:
+            scheme, host = "https", endpoint
+        config.endpoint = host
+        if scheme == "http" and settings.ALIBABA_ALLOW_HTTP:
+            config.protocol = "http"
+        return config
+
+    @retryable
+    @track_upstream("alibaba_vision")
     async def segment_cloth(self, image_url: str) -> SegmentationResult:
         """Segment cloth from image using Alibaba Cloud SegmentCloth API.
 
@@ -159,14 +172,16 @@ class VisionAPIClient:
         # Build request with correct parameters
         # Reference: https://help.aliyun.com/zh/viapi/developer-reference/api-clothing-segmentation
         # IMPORTANT: Must specify cloth_class to get ClassUrl in response
+        from alibabacloud_imageseg20191230 import models as imageseg_models
+
         request = imageseg_models.SegmentClothRequest(
             image_url=image_url,
             cloth_class=['tops', 'coat', 'skirt', 'pants', 'bag', 'shoes', 'hat']  # Request all categories
         )
 
         try:
-            # Call the API (synchronous SDK method in async context)
-            response = self.imageseg_client.segment_cloth(request)
+            # Async SDK call: does not block the loop and can be cancelled at the deadline
+            response = await self.imageseg_client.segment_cloth_async(request)
 
 
 
@@ -265,6 +280,8 @@ class VisionAPIClient:
             logger.error(f"[Vision] SegmentCloth API error: {str(e)}", exc_info=True)
             raise VisionAPIError(f"Segmentation failed: {str(e)}") from e
 
+    @retryable
+    @track_upstream("alibaba_vision")
     async def detect_main_body(self, image_url: str) -> dict[str, Any]:
         """Detect main body (person) in the image using Alibaba Cloud DetectMainBody API.
 
@@ -283,13 +300,15 @@ class VisionAPIClient:
         
         logger.info(f"[Vision] DetectMainBody calling with image_url: {image_url[:200]}...")
 
+        from alibabacloud_objectdet20191230 import models as objectdet_models
+
         request = objectdet_models.DetectMainBodyRequest(
             image_url=image_url
         )
 
         try:
             # Assuming main region is what we want
-            response = self.objectdet_client.detect_main_body(request)
+            response = await self.objectdet_client.detect_main_body_async(request)
             
             if response.body and response.body.data and response.body.data.location:
                 # API returns Location: { Y, X, Height, Width }
@@ -309,13 +328,17 @@ class VisionAPIClient:
     async def analyze_garment(self, image_url: str) -> GarmentAnalysisResult:
         """Analyze a garment image and extract attributes.
 
-        Uses SegmentCloth API to detect garment type, with fallback to mock data for other attributes.
+        Uses SegmentCloth to detect the garment type and cut it out, then runs
+        color extraction on the transparent cutout so background pixels do not
+        leak into the palette. Style tags and confidence are derived from the
+        extracted colors.
         """
         import logging
         logger = logging.getLogger(__name__)
 
         # Detect garment type using SegmentCloth API
         detected_garment_type = GarmentType.TOP  # Default fallback
+        color_source_url = image_url  # Falls back to the original photo
         try:
             logger.info(f"[Vision] Calling SegmentCloth for garment analysis: {image_url[:100]}...")
             segmentation_result = await self.segment_cloth(image_url)
@@ -328,9 +351,24 @@ class VisionAPIClient:
                     logger.info(f"[Vision] Detected garment category: {first_category} -> {detected_garment_type.value}")
                 else:
                     logger.warning(f"[Vision] Unknown category: {first_category}, using default TOP")
+
+                # Prefer the cutout of the detected garment for color analysis
+                cutout = next(
+                    (
+                        item for item in segmentation_result.individual_items
+                        if item.category == first_category
+                    ),
+                    None,
+                )
+                if cutout:
+                    color_source_url = cutout.image_url
+                elif segmentation_result.mask_url:
+                    color_source_url = segmentation_result.mask_url
             else:
                 logger.warning("[Vision] No categories detected in segmentation result, using default TOP")
 
+        except DeadlineExceededError:
+            raise
         except Exception as e:
             logger.warning(f"[Vision] SegmentCloth API failed for garment analysis: {e}, using mock data")
             # Fallback to mock implementation if API fails
@@ -346,34 +384,74 @@ class VisionAPIClient:
                 weights=[g[1] for g in garment_weights],
             )[0]
 
-        # Generate colors (mock for now - can be enhanced with color analysis)
-        num_colors = random.randint(2, 4)
-        selected_colors = random.sample(COLOR_PALETTE, num_colors)
-        percentages = self._generate_percentages(num_colors)
+        # A cutout that cannot be downloaded or decoded falls back to the photo
+        colors = await self._extract_colors(color_source_url, image_url)
+
         primary_colors = [
-            ColorInfo(hex=color[0], name=color[1], percentage=pct)
-            for color, pct in zip(selected_colors, percentages, strict=True)
+            ColorInfo(hex=color.hex, name=color.name, percentage=color.percentage)
+            for color in colors
         ]
 
-        # Generate style tags (mock for now)
-        num_styles = random.randint(2, 3)
-        style_tags = random.sample(list(StyleTag), num_styles)
-
-        # Generate confidence score
-        confidence = round(random.uniform(0.85, 0.98), 2)
-
         return GarmentAnalysisResult(
             garment_type=detected_garment_type,
             primary_colors=primary_colors,
-            style_tags=style_tags,
-            confidence=confidence,
+            style_tags=self._infer_style_tags(colors),
+            confidence=self._color_confidence(colors),
+        )
+
+    async def _extract_colors(self, *image_urls: str) -> list[ExtractedColor]:
+        """Download an image and extract its dominant palette colors.
+
+        Sources are tried in order; VisionAPIError is raised only when none of
+        them can be downloaded and yields garment pixels.
+        """
+        import logging
+
+        import httpx
+        logger = logging.getLogger(__name__)
+
+        errors: list[str] = []
+        for image_url in dict.fromkeys(image_urls):
+            try:
+                async with httpx.AsyncClient(timeout=10.0) as client:
+                    response = await get_with_retry(client, image_url, self.retry_policy)
+                    response.raise_for_status()
+                colors = await color_extractor.extract(response.content)
+            except DeadlineExceededError:
+                raise
+            except Exception as e:
+                logger.warning(f"[Vision] Color extraction failed for {image_url[:100]}: {e}")
+                errors.append(str(e))
+                continue
+            if colors:
+                return colors
+            errors.append("no garment pixels found")
+
+        raise VisionAPIError(
+            f"Color extraction failed: {'; '.join(errors)}", code="COLOR_EXTRACTION_FAILED"
         )
 
-    def _generate_percentages(self, count: int) -> list[float]:
-        """Generate random percentages that sum to 1.0."""
-        values = [random.random() for _ in range(count)]
-        total = sum(values)
-        return [round(v / total, 2) for v in values]
+    def _infer_style_tags(self, colors: list[ExtractedColor], max_tags: int = 3) -> list[StyleTag]:
+        """Derive style tags from extracted colors, weighted by color share."""
+        scores: dict[StyleTag, float] = {}
+        for color in colors:
+            tags = COLOR_STYLE_TAGS.get(color.name, [])
+            for rank, tag in enumerate(tags):
+                # The first tag of each color is its strongest association
+                scores[tag] = scores.get(tag, 0.0) + color.percentage / (rank + 1)
+
+        ranked = sorted(scores, key=lambda tag: scores[tag], reverse=True)
+        return ranked[:max_tags] or [StyleTag.CASUAL]
+
+    def _color_confidence(self, colors: list[ExtractedColor]) -> float:
+        """Confidence that the palette names describe the garment well.
+
+        Based on the share-weighted ΔE between measured clusters and their
+        palette entries: 0 ΔE maps to 0.99, large distances bottom out at 0.5.
+        """
+        total = sum(color.percentage for color in colors) or 1.0
+        mean_delta_e = sum(color.delta_e * color.percentage for color in colors) / total
+        return round(min(0.99, max(0.5, 1.0 - mean_delta_e / 100)), 2)
 
 
 class VisionAPIError(APIException):
@@ -387,5 +465,5 @@ class VisionAPIError(APIException):
         )
 
 
-# Singleton instance
-vision_client = VisionAPIClient()
+# Singleton instance (built on first use)
+vision_client = lazy_singleton("vision_client", VisionAPIClient)
@@ -1,7 +1,8 @@
 """Qwen-VL-Max Vision API integration for clothing detection.
 
 Uses DashScope API to call Qwen-VL-Max for visual analysis of clothing items.
-Returns structured data with clothing categories and positions.
+Returns structured data with clothing categories and positions. The dashscope
+SDK is imported when the client is first built (see app.core.lazy).
 """
 
 import json
@@ -9,11 +10,11 @@ import logging
 from dataclasses import dataclass
 from typing import Any
 
-import dashscope
-from dashscope import MultiModalConversation
-
 from app.config import settings
 from app.core.exceptions import APIException
+from app.core.lazy import lazy_singleton
+from app.core.metrics import track_upstream
+from app.core.retry import RetryPolicy, retryable
 
 logger = logging.getLogger(__name__)
 
@@ -62,6 +63,13 @@ class QwenVisionClient:
 
     def __init__(self) -> None:
         """Initialize Qwen Vision client."""
+        import dashscope
+
+        # Async client: the call can be cancelled when the request deadline passes
+        self._conversation = dashscope.AioMultiModalConversation
+        self.retry_policy = RetryPolicy.from_settings("qwen_vision")
+        dashscope.base_http_api_url = settings.DASHSCOPE_BASE_URL
+
         # DashScope supports two authentication methods:
         # 1. Dedicated API Key (sk-xxxxx)
         # 2. AccessKeyID:AccessKeySecret format
@@ -75,6 +83,8 @@ class QwenVisionClient:
         else:
             logger.warning("[QwenVision] No API credentials configured, API calls will fail")
 
+    @retryable
+    @track_upstream("qwen_vision")
     async def analyze_clothing_items(self, image_url: str) -> VisualAnalysisResult:
         """Analyze clothing items in an image.
 
@@ -146,14 +156,16 @@ class QwenVisionClient:
 
             # Step 4: Call Qwen-VL-Max API
             logger.info("[QwenVision] Calling Qwen-VL-Max API...")
-            response = MultiModalConversation.call(
+            response = await self._conversation.call(
                 model="qwen-vl-max",
                 messages=messages,
             )
 
             if response.status_code != 200:
                 logger.error(f"[QwenVision] API error: {response.code} - {response.message}")
-                raise QwenVisionError(f"API call failed: {response.message}", code=response.code)
+                raise QwenVisionError(
+                    f"API call failed: {response.message}", code=response.code, upstream_status=response.status_code
+                )
 
             # Extract response content
             raw_content = response.output.choices[0].message.content[0].get("text", "")
@@ -232,6 +244,8 @@ class QwenVisionClient:
         logger.info(f"[QwenVision] Parsed {len(items)} clothing items")
         return items
 
+    @retryable
+    @track_upstream("qwen_vision")
     async def describe_single_clothing(
         self,
         image_url: str,
@@ -321,14 +335,16 @@ class QwenVisionClient:
             
             # Call Qwen-VL-Max
             logger.info("[QwenVision] Calling Qwen-VL-Max for description...")
-            response = MultiModalConversation.call(
+            response = await self._conversation.call(
                 model="qwen-vl-max",
                 messages=messages,
             )
             
             if response.status_code != 200:
                 logger.error(f"[QwenVision] API error: {response.code} - {response.message}")
-                raise QwenVisionError(f"API call failed: {response.message}", code=response.code)
+                raise QwenVisionError(
+                    f"API call failed: {response.message}", code=response.code, upstream_status=response.status_code
+                )
             
             # Extract response
             raw_content = response.output.choices[0].message.content[0].get("text", "")
@@ -397,13 +413,15 @@ class QwenVisionClient:
 class QwenVisionError(APIException):
     """Exception raised when Qwen Vision API call fails."""
 
-    def __init__(self, message: str, code: str = "QWEN_VISION_ERROR") -> None:
+    def __init__(self, message: str, code: str = "QWEN_VISION_ERROR", upstream_status: int | None = None) -> None:
         super().__init__(
             status_code=500,
             code=code,
             message=message,
         )
+        # DashScope's HTTP status (the SDK returns it instead of raising)
+        self.upstream_status = upstream_status
 
 
-# Singleton instance
-qwen_vision_client = QwenVisionClient()
+# Singleton instance (built on first use)
+qwen_vision_client = lazy_singleton("qwen_vision_client", QwenVisionClient)
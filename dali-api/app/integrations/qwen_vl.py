@@ -19,6 +19,9 @@ import httpx
 
 from app.config import settings
 from app.core.exceptions import APIException
+from app.core.lazy import lazy_singleton
+from app.core.metrics import track_upstream
+from app.core.retry import RetryPolicy, retryable
 
 logger = logging.getLogger(__name__)
 
@@ -80,19 +83,23 @@ ONE_SHOT_ANALYSIS_PROMPT = """分析这张服装照片，提供以下信息：
 class QwenVLClient:
     """Client for Qwen-VL-Max visual analysis via DashScope API."""
 
-    DASHSCOPE_API_URL = "https://dashscope.aliyuncs.com/api/v1/services/aigc/multimodal-generation/generation"
     MODEL_NAME = "qwen-vl-max"
 
     def __init__(self) -> None:
         """Initialize Qwen-VL client."""
+        self.api_url = f"{settings.DASHSCOPE_BASE_URL}/services/aigc/multimodal-generation/generation"
         self.api_key = settings.DASHSCOPE_API_KEY
+        self.retry_policy = RetryPolicy.from_settings("qwen_vl")
         self._client: httpx.AsyncClient | None = None
 
     @property
     def client(self) -> httpx.AsyncClient:
         """Get or create HTTP client."""
         if self._client is None:
-            self._client = httpx.AsyncClient(timeout=60.0)
+            self._client = httpx.AsyncClient(
+                timeout=60.0,
+                limits=httpx.Limits(keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY),
+            )
         return self._client
 
     async def close(self) -> None:
@@ -101,6 +108,8 @@ class QwenVLClient:
             await self._client.aclose()
             self._client = None
 
+    @retryable
+    @track_upstream("qwen_vl")
     async def analyze_image_one_shot(
         self,
         image_url: str,
@@ -153,7 +162,7 @@ class QwenVLClient:
 
         try:
             response = await self.client.post(
-                self.DASHSCOPE_API_URL,
+                self.api_url,
                 json=payload,
                 headers=headers,
             )
@@ -281,5 +290,5 @@ class QwenVLError(APIException):
         )
 
 
-# Singleton instance
-qwen_vl_client = QwenVLClient()
+# Singleton instance (built on first use)
+qwen_vl_client = lazy_singleton("qwen_vl_client", QwenVLClient)
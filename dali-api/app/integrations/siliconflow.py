@@ -12,13 +12,21 @@ import base64
 import logging
 import uuid
 from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
 import httpx
-import oss2
 
 from app.config import settings
+from app.core.circuit_breaker import circuit_allows
 from app.core.exceptions import APIException
-from app.integrations.alibaba_oss import encode_presigned_url
+from app.core.lazy import lazy_singleton
+from app.core.metrics import track_upstream
+from app.core.retry import RetryPolicy, get_with_retry
+from app.core.tracing import traced, tracer
+from app.integrations.alibaba_oss import encode_presigned_url, oss_endpoint
+
+if TYPE_CHECKING:
+    import oss2
 
 logger = logging.getLogger(__name__)
 
@@ -33,21 +41,31 @@ class ImageGenerationResult:
     generation_time_ms: int  # Time taken in milliseconds
 
 
-class SiliconFlowClient:
-    """Client for SiliconFlow Img2Img generation."""
+# Endpoints generate_img2img() tries, in order
+IMAGE_ENDPOINTS = ("siliconflow.images_edits", "openai.images_generations")
 
-    SILICONFLOW_API_URL = "https://api.siliconflow.cn/v1/images/generations"
-    SILICONFLOW_IMG2IMG_URL = "https://api.siliconflow.cn/v1/images/edits"
 
-    # DALL-E 3 fallback
-    OPENAI_API_URL = "https://api.openai.com/v1/images/generations"
+def image_generation_available() -> bool:
+    """Whether any image provider's circuit admits calls."""
+    return any(circuit_allows(name) for name in IMAGE_ENDPOINTS)
+
+
+class SiliconFlowClient:
+    """Client for SiliconFlow Img2Img generation."""
 
     def __init__(self) -> None:
         """Initialize SiliconFlow client."""
+        self.siliconflow_api_url = f"{settings.SILICONFLOW_BASE_URL}/images/generations"
+        self.siliconflow_img2img_url = f"{settings.SILICONFLOW_BASE_URL}/images/edits"
+        # DALL-E 3 fallback
+        self.openai_api_url = f"{settings.OPENAI_BASE_URL}/images/generations"
+
         self.api_key = settings.SILICONFLOW_API_KEY
         self.model = settings.SILICONFLOW_MODEL
         self.strength = settings.IMG2IMG_STRENGTH
         self.timeout = settings.IMG2IMG_TIMEOUT
+        # Downloads are retried; generation POSTs are not (each one is billed)
+        self.retry_policy = RetryPolicy.from_settings("siliconflow")
         self._client: httpx.AsyncClient | None = None
 
         # OSS for storing generated images
@@ -57,22 +75,24 @@ class SiliconFlowClient:
     def client(self) -> httpx.AsyncClient:
         """Get or create HTTP client."""
         if self._client is None:
-            self._client = httpx.AsyncClient(timeout=float(self.timeout))
+            self._client = httpx.AsyncClient(
+                timeout=float(self.timeout),
+                limits=httpx.Limits(keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY),
+            )
         return self._client
 
     @property
-    def oss_bucket(self) -> oss2.Bucket:
+    def oss_bucket(self) -> "oss2.Bucket":
         """Get or create OSS bucket."""
         if self._oss_bucket is None:
+            import oss2
+
             auth = oss2.Auth(
                 settings.ALIBABA_ACCESS_KEY_ID,
                 settings.ALIBABA_ACCESS_KEY_SECRET,
             )
-            endpoint = settings.ALIBABA_OSS_ENDPOINT
-            if not endpoint.startswith("https://"):
-                endpoint = f"https://{endpoint}"
             self._oss_bucket = oss2.Bucket(
-                auth, endpoint, settings.ALIBABA_OSS_BUCKET
+                auth, oss_endpoint(), settings.ALIBABA_OSS_BUCKET
             )
         return self._oss_bucket
 
@@ -82,11 +102,13 @@ class SiliconFlowClient:
             await self._client.aclose()
             self._client = None
 
+    @track_upstream("siliconflow", circuit=False)
     async def generate_img2img(
         self,
         base_image_url: str,
         prompt: str,
         strength: float | None = None,
+        base_image: bytes | None = None,
     ) -> ImageGenerationResult:
         """Generate an image based on a base image and prompt.
 
@@ -97,6 +119,7 @@ class SiliconFlowClient:
             base_image_url: URL of the base garment image
             prompt: English text prompt for generation
             strength: How much to deviate from base image (0-1), default from config
+            base_image: The base image, if the caller already downloaded it
 
         Returns:
             ImageGenerationResult with OSS URL
@@ -111,7 +134,7 @@ class SiliconFlowClient:
 
         # Try SiliconFlow first
         try:
-            result = await self._generate_siliconflow(base_image_url, prompt, strength)
+            result = await self._generate_siliconflow(base_image_url, prompt, strength, base_image)
             generation_time = int((time.time() - start_time) * 1000)
             return ImageGenerationResult(
                 image_url=result["url"],
@@ -139,6 +162,7 @@ class SiliconFlowClient:
                 code="IMG_GEN_FAILED",
             ) from e
 
+    @track_upstream("siliconflow")
     async def generate_text2img(
         self,
         prompt: str,
@@ -180,7 +204,7 @@ class SiliconFlowClient:
 
         try:
             response = await self.client.post(
-                self.SILICONFLOW_API_URL,
+                self.siliconflow_api_url,
                 json=payload,
                 headers=headers,
             )
@@ -195,7 +219,7 @@ class SiliconFlowClient:
                 oss_result = await self._upload_to_oss(image_bytes)
             elif "url" in image_data:
                 # Download and re-upload to OSS
-                img_response = await self.client.get(image_data["url"])
+                img_response = await get_with_retry(self.client, image_data["url"], self.retry_policy)
                 img_response.raise_for_status()
                 oss_result = await self._upload_to_oss(img_response.content)
             else:
@@ -216,11 +240,13 @@ class SiliconFlowClient:
             logger.error(f"[SiliconFlow] Generation error: {e}", exc_info=True)
             raise SiliconFlowError(f"Generation failed: {e}") from e
 
+    @track_upstream("siliconflow", "images_edits")
     async def _generate_siliconflow(
         self,
         base_image_url: str,
         prompt: str,
         strength: float,
+        base_image: bytes | None = None,
     ) -> dict[str, str]:
         """Generate using SiliconFlow Img2Img API."""
         if not self.api_key:
@@ -228,10 +254,9 @@ class SiliconFlowClient:
 
         logger.info(f"[SiliconFlow] Generating with strength={strength}")
 
-        # Download base image
-        img_response = await self.client.get(base_image_url)
-        img_response.raise_for_status()
-        base_image_b64 = base64.b64encode(img_response.content).decode()
+        if base_image is None:
+            base_image = await self.download_base_image(base_image_url)
+        base_image_b64 = base64.b64encode(base_image).decode()
 
         payload = {
             "model": self.model,
@@ -248,7 +273,7 @@ class SiliconFlowClient:
         }
 
         response = await self.client.post(
-            self.SILICONFLOW_IMG2IMG_URL,
+            self.siliconflow_img2img_url,
             json=payload,
             headers=headers,
         )
@@ -261,14 +286,27 @@ class SiliconFlowClient:
         if "b64_json" in image_data:
             image_bytes = base64.b64decode(image_data["b64_json"])
         elif "url" in image_data:
-            dl_response = await self.client.get(image_data["url"])
-            dl_response.raise_for_status()
+            with tracer.start_as_current_span("siliconflow.download_result"):
+                dl_response = await get_with_retry(self.client, image_data["url"], self.retry_policy)
+                dl_response.raise_for_status()
             image_bytes = dl_response.content
         else:
             raise SiliconFlowError("No image data in SiliconFlow response")
 
         return await self._upload_to_oss(image_bytes)
 
+    async def download_base_image(self, base_image_url: str) -> bytes:
+        """Download an Img2Img base image (retried; see get_with_retry).
+
+        Raises:
+            httpx.HTTPStatusError: If the download fails
+        """
+        with tracer.start_as_current_span("siliconflow.download_base_image"):
+            response = await get_with_retry(self.client, base_image_url, self.retry_policy)
+            response.raise_for_status()
+        return response.content
+
+    @track_upstream("openai", "images_generations")
     async def _generate_dalle(self, prompt: str) -> dict[str, str]:
         """Generate using OpenAI DALL-E 3 as fallback."""
         openai_key = settings.OPENAI_API_KEY
@@ -291,7 +329,7 @@ class SiliconFlowClient:
         }
 
         response = await self.client.post(
-            self.OPENAI_API_URL,
+            self.openai_api_url,
             json=payload,
             headers=headers,
         )
@@ -303,11 +341,13 @@ class SiliconFlowClient:
             raise SiliconFlowError("No image URL in DALL-E response")
 
         # Download and upload to OSS
-        img_response = await self.client.get(image_url)
-        img_response.raise_for_status()
+        with tracer.start_as_current_span("openai.download_result"):
+            img_response = await get_with_retry(self.client, image_url, self.retry_policy)
+            img_response.raise_for_status()
 
         return await self._upload_to_oss(img_response.content)
 
+    @traced("siliconflow.upload_to_oss")
     async def _upload_to_oss(self, image_bytes: bytes) -> dict[str, str]:
         """Upload generated image to OSS.
 
@@ -329,6 +369,11 @@ class SiliconFlowClient:
             url = encode_presigned_url(url)
 
             logger.info(f"[SiliconFlow] Uploaded to OSS: {object_key}")
+
+            # Thumbnails for history/list views are rendered in the background
+            from app.services.image_variants import image_variant_service
+            image_variant_service.schedule(object_key, image_bytes)
+
             return {"url": url, "object_key": object_key}
 
         except Exception as e:
@@ -356,5 +401,5 @@ class SiliconFlowError(APIException):
         )
 
 
-# Singleton instance
-siliconflow_client = SiliconFlowClient()
+# Singleton instance (built on first use)
+siliconflow_client = lazy_singleton("siliconflow_client", SiliconFlowClient)
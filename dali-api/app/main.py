@@ -10,13 +10,24 @@ from typing import Any
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 
 from app.__version__ import __version__
 from app.api.v1.router import router as api_v1_router
 from app.config import settings
 from app.core.exceptions import APIException
 from app.core.logging import setup_logging
+from app.core.loop_watchdog import loop_watchdog
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.core.profiling import loop_stall_monitor
+from app.core.tracing import TracingMiddleware, setup_tracing, shutdown_tracing
+from app.services.color_extraction import color_extractor
+from app.services.generation_jobs import generation_job_service
+from app.services.generation_usage import generation_usage_recorder
+from app.services.image_variants import image_variant_service
+from app.services.readiness import readiness_service
+from app.services.storage_gc import start_storage_gc_task
+from app.services.streaming_generator import streaming_generator
 from app.services.verification_store import start_cleanup_task
 
 # Use unpkg CDN which is more reliable in China
@@ -30,15 +41,38 @@ async def lifespan(app: FastAPI):
     """Application lifespan events."""
     # Startup
     setup_logging()
+    # Warm connections and clients in the background; /ready gates traffic
+    if settings.WARM_UP_ENABLED:
+        readiness_service.start()
+    else:
+        readiness_service.ready = True
     # Start background cleanup task for verification codes
     cleanup_task = asyncio.create_task(start_cleanup_task())
+    background_tasks = [cleanup_task]
+    if settings.STORAGE_GC_ENABLED:
+        background_tasks.append(asyncio.create_task(start_storage_gc_task()))
+    if settings.LOOP_STALL_MONITOR_ENABLED:
+        loop_stall_monitor.start()
+    if settings.LOOP_WATCHDOG_ENABLED:
+        loop_watchdog.start()
+    generation_job_service.start()
     yield
     # Shutdown
-    cleanup_task.cancel()
-    try:
-        await cleanup_task
-    except asyncio.CancelledError:
-        pass
+    await readiness_service.shutdown()
+    await loop_watchdog.stop()
+    await loop_stall_monitor.stop()
+    for task in background_tasks:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    await generation_job_service.shutdown()  # Requeues running jobs
+    await streaming_generator.shutdown()
+    await image_variant_service.shutdown()
+    await generation_usage_recorder.shutdown()
+    color_extractor.shutdown()
+    shutdown_tracing()
 
 
 app = FastAPI(
@@ -60,6 +94,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Server span per request; spans opened while handling it become children
+if setup_tracing() is not None:
+    app.add_middleware(TracingMiddleware)
+
+# Request latency per route (outermost, so it includes all other middleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 
 @app.exception_handler(APIException)
 async def api_exception_handler(request: Request, exc: APIException) -> JSONResponse:
@@ -106,6 +148,15 @@ async def custom_redoc_html():
     )
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Prometheus metrics."""
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/")
 async def root() -> dict[str, str]:
     """Root endpoint returning API info."""
@@ -1,8 +1,23 @@
 # SQLAlchemy models package
 from app.models.base import Base
+from app.models.generation_job import GenerationJob
+from app.models.generation_record import GenerationRecord
 from app.models.outfit import Outfit
 from app.models.share_record import ShareRecord
+from app.models.stored_blob import BlobReference, StoredBlob
 from app.models.user import User
 from app.models.user_preferences import UserPreferences
+from app.models.wardrobe_item import WardrobeItem
 
-__all__ = ["Base", "User", "UserPreferences", "Outfit", "ShareRecord"]
+__all__ = [
+    "Base",
+    "User",
+    "UserPreferences",
+    "Outfit",
+    "ShareRecord",
+    "StoredBlob",
+    "BlobReference",
+    "GenerationRecord",
+    "GenerationJob",
+    "WardrobeItem",
+]
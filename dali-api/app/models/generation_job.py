@@ -0,0 +1,133 @@
+"""Background outfit generation jobs.
+
+Table: generation_jobs
+One row per POST /outfits/jobs. The row is the queue entry (workers claim
+queued rows) and the job's state: any API process can serve status reads.
+"""
+
+import uuid
+from datetime import UTC, datetime
+
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, Text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class GenerationJob(Base):
+    """Inputs, progress and result of one background outfit generation."""
+
+    __tablename__ = "generation_jobs"
+    __table_args__ = (
+        # Claiming the oldest queued job, finding abandoned running ones
+        Index("ix_generation_jobs_status_created_at", "status", "created_at"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        index=True,
+        nullable=False,
+    )
+    # "queued", "running", "complete" or "error"
+    status: Mapped[str] = mapped_column(
+        String(20),
+        default="queued",
+        nullable=False,
+    )
+
+    # Inputs (same as /outfits/generate-stream)
+    selected_item_url: Mapped[str] = mapped_column(
+        Text,
+        nullable=False,
+    )
+    selected_item_description: Mapped[str] = mapped_column(
+        String(200),
+        nullable=False,
+    )
+    selected_item_category: Mapped[str] = mapped_column(
+        String(50),
+        nullable=False,
+    )
+    occasion: Mapped[str] = mapped_column(
+        String(100),
+        nullable=False,
+    )
+    original_image_url: Mapped[str | None] = mapped_column(
+        Text,
+        nullable=True,
+    )
+    # Notified once the job has finished (host must be allowlisted)
+    callback_url: Mapped[str | None] = mapped_column(
+        Text,
+        nullable=True,
+    )
+
+    # Progress, written by the worker while the job runs
+    text: Mapped[str] = mapped_column(
+        Text,
+        default="",
+        nullable=False,
+    )
+    image_url: Mapped[str | None] = mapped_column(
+        Text,
+        nullable=True,
+    )
+    image_error: Mapped[str | None] = mapped_column(
+        String(200),
+        nullable=True,
+    )
+    # Bumped on every write; long-polling clients pass the one they have seen
+    version: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        nullable=False,
+    )
+
+    # Result
+    outfit_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        nullable=True,
+    )
+    # "template" or "text_only" when a provider circuit was open
+    fallback: Mapped[str | None] = mapped_column(
+        String(20),
+        nullable=True,
+    )
+    error_code: Mapped[str | None] = mapped_column(
+        String(50),
+        nullable=True,
+    )
+    error_message: Mapped[str | None] = mapped_column(
+        String(200),
+        nullable=True,
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(UTC),
+        nullable=False,
+    )
+    started_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(UTC),
+        nullable=False,
+    )
+    finished_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
+
+    def __repr__(self) -> str:
+        """Return string representation of job."""
+        return f"<GenerationJob {self.id} user={self.user_id} status={self.status}>"
@@ -0,0 +1,110 @@
+"""Per-generation usage and cost records.
+
+Table: generation_records
+One row per /outfits/generate-stream run: LLM tokens and stream timings,
+image provider and time, and the estimated vendor cost.
+"""
+
+import uuid
+from datetime import UTC, datetime
+from decimal import Decimal
+
+from sqlalchemy import DateTime, ForeignKey, Integer, Numeric, String
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class GenerationRecord(Base):
+    """Usage, timing and estimated cost of one outfit generation."""
+
+    __tablename__ = "generation_records"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        index=True,
+        nullable=False,
+    )
+    outfit_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        nullable=False,
+    )
+    occasion: Mapped[str | None] = mapped_column(
+        String(100),
+        nullable=True,
+    )
+    # "complete", "error" or "cancelled" (client went away)
+    status: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False,
+    )
+    model: Mapped[str] = mapped_column(
+        String(50),
+        nullable=False,
+    )
+    prompt_tokens: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        nullable=False,
+    )
+    completion_tokens: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        nullable=False,
+    )
+    # LLM stream timings; consumer (SSE) time is excluded
+    time_to_first_token_ms: Mapped[int | None] = mapped_column(
+        Integer,
+        nullable=True,
+    )
+    chunk_gap_p50_ms: Mapped[int | None] = mapped_column(
+        Integer,
+        nullable=True,
+    )
+    chunk_gap_p95_ms: Mapped[int | None] = mapped_column(
+        Integer,
+        nullable=True,
+    )
+    chunk_gap_max_ms: Mapped[int | None] = mapped_column(
+        Integer,
+        nullable=True,
+    )
+    stream_time_ms: Mapped[int | None] = mapped_column(
+        Integer,
+        nullable=True,
+    )
+    # Image generation ("siliconflow" or "dalle"; None if no image was made)
+    image_provider: Mapped[str | None] = mapped_column(
+        String(20),
+        nullable=True,
+    )
+    image_time_ms: Mapped[int | None] = mapped_column(
+        Integer,
+        nullable=True,
+    )
+    # Whole generation, request to last event
+    generation_time_ms: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+    )
+    estimated_cost: Mapped[Decimal] = mapped_column(
+        Numeric(12, 6),
+        nullable=False,
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(UTC),
+        index=True,
+        nullable=False,
+    )
+
+    def __repr__(self) -> str:
+        """Return string representation of record."""
+        return f"<GenerationRecord outfit={self.outfit_id} user={self.user_id} status={self.status}>"
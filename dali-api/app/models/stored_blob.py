@@ -0,0 +1,89 @@
+"""Content-addressed blob models for deduplicated image storage.
+
+Tables: stored_blobs, blob_references
+Each distinct byte sequence is stored once under a key derived from its
+SHA-256 digest; blob_references links blobs to the users that produced them.
+"""
+
+import uuid
+from datetime import UTC, datetime
+
+from sqlalchemy import DateTime, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class StoredBlob(Base):
+    """A stored object identified by the SHA-256 digest of its content."""
+
+    __tablename__ = "stored_blobs"
+
+    digest: Mapped[str] = mapped_column(
+        String(64),
+        primary_key=True,
+    )
+    object_key: Mapped[str] = mapped_column(
+        String(200),
+        unique=True,
+        nullable=False,
+    )
+    content_type: Mapped[str] = mapped_column(
+        String(50),
+        nullable=False,
+    )
+    size_bytes: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(UTC),
+        nullable=False,
+    )
+
+    def __repr__(self) -> str:
+        """Return string representation of blob."""
+        return f"<StoredBlob {self.digest[:12]} key={self.object_key}>"
+
+
+class BlobReference(Base):
+    """Link between a user and a blob they uploaded or produced."""
+
+    __tablename__ = "blob_references"
+    __table_args__ = (
+        UniqueConstraint("user_id", "digest", "kind", name="uq_blob_references_user_digest_kind"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        index=True,
+        nullable=False,
+    )
+    digest: Mapped[str] = mapped_column(
+        String(64),
+        ForeignKey("stored_blobs.digest", ondelete="CASCADE"),
+        index=True,
+        nullable=False,
+    )
+    # What produced the blob: "segmented", "generated", ...
+    kind: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False,
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(UTC),
+        nullable=False,
+    )
+
+    def __repr__(self) -> str:
+        """Return string representation of reference."""
+        return f"<BlobReference user={self.user_id} digest={self.digest[:12]} kind={self.kind}>"
@@ -0,0 +1,102 @@
+"""Wardrobe items saved from segmented cutouts.
+
+Table: wardrobe_items
+One row per garment a user keeps: the cutout blob (stored_blobs), the
+attributes from /segmentation/describe-clothing, the colors extracted from
+the cutout and a compact embedding for similarity search (see
+app.services.wardrobe).
+"""
+
+import uuid
+from datetime import UTC, datetime
+
+from sqlalchemy import DateTime, ForeignKey, LargeBinary, SmallInteger, String, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class WardrobeItem(Base):
+    """A garment in a user's wardrobe."""
+
+    __tablename__ = "wardrobe_items"
+    __table_args__ = (
+        # Saving the same cutout again updates the existing item
+        UniqueConstraint("user_id", "digest", name="uq_wardrobe_items_user_digest"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        index=True,
+        nullable=False,
+    )
+    # Cutout with transparent background (kept alive by a "wardrobe" blob reference)
+    digest: Mapped[str] = mapped_column(
+        String(64),
+        ForeignKey("stored_blobs.digest", ondelete="CASCADE"),
+        nullable=False,
+    )
+    object_key: Mapped[str] = mapped_column(
+        String(200),
+        nullable=False,
+    )
+
+    # Mapped garment type (上衣, 外套, 裤子, 裙子, 配饰) and Alibaba category (tops, coat, ...)
+    garment_type: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False,
+    )
+    category: Mapped[str | None] = mapped_column(
+        String(50),
+        nullable=True,
+    )
+    # From describe-clothing
+    color: Mapped[str | None] = mapped_column(
+        String(50),
+        nullable=True,
+    )
+    style: Mapped[str | None] = mapped_column(
+        String(100),
+        nullable=True,
+    )
+    pattern: Mapped[str | None] = mapped_column(
+        String(50),
+        nullable=True,
+    )
+    description: Mapped[str | None] = mapped_column(
+        String(200),
+        nullable=True,
+    )
+    # Extracted from the cutout: [{"hex", "name", "percentage"}], largest share first
+    colors: Mapped[list[dict]] = mapped_column(
+        JSONB,
+        default=list,
+        nullable=False,
+    )
+
+    # float32 vector; recomputed from the columns above when the layout version changes
+    embedding: Mapped[bytes] = mapped_column(
+        LargeBinary,
+        nullable=False,
+    )
+    embedding_version: Mapped[int] = mapped_column(
+        SmallInteger,
+        nullable=False,
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(UTC),
+        nullable=False,
+    )
+
+    def __repr__(self) -> str:
+        """Return string representation of wardrobe item."""
+        return f"<WardrobeItem {self.id} user={self.user_id} type={self.garment_type}>"
@@ -28,8 +28,28 @@ class ErrorResponse(BaseModel):
     details: dict[str, Any] | None = None
 
 
+
+
+class DependencyStatusResponse(BaseModel):
+    """Status of one dependency checked by readiness or health."""
+
+    status: str
+    latencyMs: float | None = None
+    required: bool = False
+    error: str | None = None
+    circuit: str | None = None
+
+
+class ReadinessResponse(BaseModel):
+    """Readiness response schema."""
+
+    status: str  # "ready", "warming" or "not_ready"
+    dependencies: dict[str, DependencyStatusResponse]
+
+
 class HealthResponse(BaseModel):
     """Health check response schema."""
 
-    status: str
+    status: str  # "ok", "degraded" or "error"
     version: str
+    dependencies: dict[str, DependencyStatusResponse] = {}
@@ -10,6 +10,8 @@ class SegmentedClothingItemSchema(BaseModel):
     category: str  # Alibaba category (e.g., "tops", "coat", "pants")
     garment_type: str  # Our mapped type (e.g., "上衣", "外套", "裤子")
     image_url: str  # URL of segmented image with transparent background
+    thumbnail_url: str | None = None  # WebP thumbnail (generated async; fall back to image_url)
+    digest: str | None = None  # SHA-256 of the cutout; stable cache key across requests
 
 
 class SegmentClothingRequest(BaseModel):
@@ -13,6 +13,11 @@ class SignedUrlRequest(BaseModel):
         description="MIME type of the file to upload",
         pattern=r"^image/(jpeg|png|webp)$",
     )
+    content_sha256: str | None = Field(
+        default=None,
+        description="Optional SHA-256 of the file; re-uploads of the same photo reuse one object",
+        pattern=r"^[0-9a-f]{64}$",
+    )
 
 
 class SignedUrlResponse(BaseModel):
@@ -22,3 +27,7 @@ class SignedUrlResponse(BaseModel):
     objectKey: str = Field(..., description="Object key in cloud storage")
     photoUrl: str = Field(..., description="Final URL where the photo will be accessible")
     expiresAt: datetime = Field(..., description="URL expiration timestamp")
+    alreadyUploaded: bool = Field(
+        default=False,
+        description="True if identical content is already stored; the upload can be skipped",
+    )
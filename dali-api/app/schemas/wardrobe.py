@@ -1,13 +1,25 @@
-"""Wardrobe schemas placeholder."""
+"""Wardrobe schemas."""
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from app.schemas.garment import ColorInfoSchema
 
 
 class WardrobeItemCreate(BaseModel):
-    """Request schema for adding wardrobe item."""
+    """Request schema for saving a segmented item to the wardrobe.
 
-    imageUrl: str
-    garmentType: str | None = None
+    The attributes come from /segmentation/describe-clothing.
+    """
+
+    digest: str = Field(
+        ..., description="SHA-256 of the cutout (from /segmentation/segment-clothing)", pattern=r"^[0-9a-f]{64}$"
+    )
+    garmentType: str = Field(..., description="Mapped garment type (上衣, 外套, 裤子, 裙子, 配饰)", max_length=20)
+    category: str | None = Field(None, description="Alibaba category (tops, coat, ...)", max_length=50)
+    color: str | None = Field(None, max_length=50)
+    style: str | None = Field(None, max_length=100)
+    pattern: str | None = Field(None, max_length=50)
+    description: str | None = Field(None, max_length=200)
 
 
 class WardrobeItemResponse(BaseModel):
@@ -16,5 +28,30 @@ class WardrobeItemResponse(BaseModel):
     id: str
     imageUrl: str
     garmentType: str
+    category: str | None = None
     color: str | None = None
+    style: str | None = None
     pattern: str | None = None
+    description: str | None = None
+    colors: list[ColorInfoSchema] = Field(default_factory=list, description="Colors extracted from the cutout")
+    createdAt: str
+
+
+class WardrobeListResponse(BaseModel):
+    """A user's wardrobe, newest first."""
+
+    items: list[WardrobeItemResponse]
+    total: int
+
+
+class SimilarWardrobeItem(BaseModel):
+    """A wardrobe item and its similarity to the queried one."""
+
+    item: WardrobeItemResponse
+    score: float = Field(..., description="Similarity in [0, 1]")
+
+
+class SimilarWardrobeResponse(BaseModel):
+    """Wardrobe items most similar to the queried one, best first."""
+
+    items: list[SimilarWardrobeItem]
@@ -5,14 +5,19 @@ This service coordinates:
 2. Style analysis and recommendation generation
 3. Theory explanation generation (Tongyi Qianwen / GPT-4)
 
-Currently provides mock implementation for development.
+Recommendations are ranked from OUTFIT_TEMPLATES by the vectorized
+OutfitRanker (color harmony, style, occasion and body type). The color
+principle is looked up in the color theory tables; the rest of the
+theory text still comes from the templates.
 """
 
-import random
 import uuid
 from dataclasses import dataclass
 from enum import Enum
 
+from app.services.color_theory import color_principle
+from app.services.outfit_ranker import OutfitRanker
+
 
 class OccasionType(str, Enum):
     """Supported occasion types for outfit recommendations."""
@@ -60,7 +65,7 @@ class OutfitRecommendation:
     confidence: float
 
 
-# Mock outfit templates per occasion
+# Outfit templates per occasion, the candidate catalog for OutfitRanker
 OUTFIT_TEMPLATES: dict[str, list[dict]] = {
     OccasionType.ROMANTIC_DATE: [
         {
@@ -287,13 +292,13 @@ BODY_TYPE_ADVICE: dict[str, str] = {
 class AIOrchestrator:
     """AI orchestration service for outfit recommendations.
 
-    Currently provides mock implementation for development.
-    Production implementation would use Tongyi Qianwen or GPT-4.
+    Ranks the template catalog against the garment; production theory
+    text would come from Tongyi Qianwen or GPT-4.
     """
 
     def __init__(self) -> None:
-        """Initialize AI Orchestrator."""
-        pass
+        """Initialize AI Orchestrator and encode the template catalog."""
+        self.ranker = OutfitRanker(OUTFIT_TEMPLATES)
 
     async def generate_outfit_recommendations(
         self,
@@ -304,7 +309,11 @@ class AIOrchestrator:
         body_type: str | None = None,
         user_styles: list[str] | None = None,
     ) -> list[OutfitRecommendation]:
-        """Generate 3 outfit recommendations based on garment and preferences.
+        """Generate the 3 best-matching outfit recommendations.
+
+        Templates from every occasion are scored; ones for the requested
+        occasion rank first unless a related occasion's fits much better.
+        Confidence is the ranker's score.
 
         Args:
             garment_type: Type of garment (上衣, 裤子, etc.)
@@ -317,11 +326,21 @@ class AIOrchestrator:
         Returns:
             List of 3 OutfitRecommendation objects
         """
-        # Get templates for the occasion
-        templates = OUTFIT_TEMPLATES.get(occasion, OUTFIT_TEMPLATES[OccasionType.DAILY_CASUAL])
+        ranked = self.ranker.rank(
+            garment_type=garment_type,
+            colors=colors,
+            style_tags=style_tags,
+            occasion=occasion,
+            body_type=body_type,
+            user_styles=user_styles,
+        )
+
+        shades = [color for color in colors if color.get("hex")]
+        main_color = max(shades, key=lambda color: float(color.get("percentage") or 0))["hex"] if shades else None
 
         recommendations = []
-        for template in templates:
+        for outfit in ranked:
+            template = outfit.template
             # Create outfit items
             items = []
             for item_data in template["items"]:
@@ -337,23 +356,26 @@ class AIOrchestrator:
             # Generate theory explanation
             body_advice = BODY_TYPE_ADVICE.get(body_type or "沙漏形", "根据你的身材特点，这套搭配很适合你")
             theory = TheoryExplanation(
-                color_principle=template["color_principle"],
+                color_principle=(
+                    color_principle(main_color, [item["hex"] for item in template["items"]])
+                    if main_color
+                    else template["color_principle"]
+                ),
                 style_analysis=f"这套搭配属于{'/'.join(template['style_tags'])}风格",
                 body_type_advice=body_advice,
-                occasion_fit=f"非常适合{occasion}场合",
+                occasion_fit=(
+                    f"非常适合{occasion}场合" if outfit.occasion == occasion else f"适合{outfit.occasion}，也可用于{occasion}"
+                ),
                 full_explanation=template["theory"],
             )
 
-            # Generate confidence score
-            confidence = round(random.uniform(0.85, 0.95), 2)
-
             recommendation = OutfitRecommendation(
                 id=str(uuid.uuid4()),
                 name=template["name"],
                 items=items,
                 theory=theory,
                 style_tags=template["style_tags"],
-                confidence=confidence,
+                confidence=round(outfit.score, 2),
             )
             recommendations.append(recommendation)
 
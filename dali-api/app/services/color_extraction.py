@@ -0,0 +1,204 @@
+"""Dominant color extraction for segmented garment cutouts.
+
+Pipeline (all vectorized NumPy, no per-pixel Python loops):
+1. Decode the PNG and downsample to at most SAMPLE_SIZE px on the long edge
+2. Drop transparent pixels (background removed by SegmentCloth)
+3. Convert to CIELAB and cluster with k-means
+4. Map each cluster onto the named COLOR_PALETTE and merge duplicates
+
+Decoding and clustering are CPU bound, so the async entry point runs them in
+a process pool to keep the event loop free.
+"""
+
+import asyncio
+import hashlib
+import io
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+from PIL import Image
+
+from app.config import settings
+from app.core.color import COLOR_PALETTE, nearest_palette_indices, rgb_to_lab
+from app.core.metrics import EXECUTOR_QUEUE_DEPTH
+
+SAMPLE_SIZE = 64  # Long edge after downsampling (<= 4096 pixels to cluster)
+ALPHA_THRESHOLD = 128  # Pixels below this alpha are treated as background
+KMEANS_CLUSTERS = 6
+KMEANS_ITERATIONS = 12
+MIN_COLOR_SHARE = 0.05  # Colors covering less than 5% of the garment are dropped
+CACHE_SIZE = 512  # Results cached per content digest
+
+
+@dataclass(frozen=True)
+class ExtractedColor:
+    """A named palette color and its share of the garment pixels."""
+
+    hex: str
+    name: str
+    percentage: float
+    delta_e: float  # Distance between the measured cluster and the palette entry
+
+
+def _load_pixels(image_bytes: bytes) -> np.ndarray:
+    """Decode and downsample an image, returning opaque RGB pixels (n, 3)."""
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        # JPEG decoders can downscale during decode, which is much cheaper
+        img.draft("RGB", (SAMPLE_SIZE * 2, SAMPLE_SIZE * 2))
+        has_alpha = img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+        img = img.convert("RGBA")
+        img.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE), Image.Resampling.BOX)
+        pixels = np.asarray(img, dtype=np.uint8).reshape(-1, 4)
+
+    if has_alpha:
+        pixels = pixels[pixels[:, 3] >= ALPHA_THRESHOLD]
+    return pixels[:, :3]
+
+
+def _kmeans(points: np.ndarray, k: int, iterations: int) -> tuple[np.ndarray, np.ndarray]:
+    """Lloyd's k-means with deterministic k-means++ seeding.
+
+    Returns:
+        Tuple of (centroids (k, 3), labels (n,))
+    """
+    rng = np.random.default_rng(0)
+    centroids = np.empty((k, points.shape[1]))
+    centroids[0] = points[rng.integers(len(points))]
+    closest = ((points - centroids[0]) ** 2).sum(axis=1)
+    for i in range(1, k):
+        total = closest.sum()
+        if total == 0:
+            centroids = centroids[:i]
+            break
+        centroids[i] = points[rng.choice(len(points), p=closest / total)]
+        closest = np.minimum(closest, ((points - centroids[i]) ** 2).sum(axis=1))
+
+    labels = np.zeros(len(points), dtype=np.intp)
+    for iteration in range(iterations):
+        distances = ((points[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+        new_labels = distances.argmin(axis=1)
+        if iteration > 0 and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        counts = np.bincount(labels, minlength=len(centroids))
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, points)
+        occupied = counts > 0
+        centroids[occupied] = sums[occupied] / counts[occupied, None]
+
+    return centroids, labels
+
+
+def extract_dominant_colors(image_bytes: bytes, max_colors: int = 4) -> list[ExtractedColor]:
+    """Extract dominant named colors from a garment image.
+
+    Transparent pixels are ignored, so segmented cutouts only report the
+    garment itself. Synchronous and CPU bound; prefer ColorExtractor.extract
+    from async code.
+
+    Args:
+        image_bytes: Encoded image (PNG cutout or plain JPEG/PNG)
+        max_colors: Maximum number of colors to return
+
+    Returns:
+        Colors sorted by share, largest first. Empty if no opaque pixels.
+    """
+    pixels = _load_pixels(image_bytes)
+    if len(pixels) == 0:
+        return []
+
+    lab = rgb_to_lab(pixels)
+    k = min(KMEANS_CLUSTERS, len(np.unique(pixels, axis=0)))
+    centroids, labels = _kmeans(lab, k, KMEANS_ITERATIONS)
+    counts = np.bincount(labels, minlength=len(centroids))
+
+    palette_idx, distances = nearest_palette_indices(centroids)
+
+    # Merge clusters that land on the same palette entry
+    pixel_counts = np.bincount(palette_idx, weights=counts, minlength=len(COLOR_PALETTE))
+    weighted_de = np.bincount(palette_idx, weights=counts * distances, minlength=len(COLOR_PALETTE))
+    shares = pixel_counts / counts.sum()
+    order = np.argsort(shares)[::-1]
+
+    colors: list[ExtractedColor] = []
+    for idx in order[:max_colors]:
+        share = float(shares[idx])
+        if share < MIN_COLOR_SHARE and colors:
+            break
+        hex_color, name = COLOR_PALETTE[idx]
+        colors.append(ExtractedColor(
+            hex=hex_color,
+            name=name,
+            percentage=round(share, 2),
+            delta_e=round(float(weighted_de[idx] / pixel_counts[idx]), 1),
+        ))
+    return colors
+
+
+class ColorExtractor:
+    """Runs color extraction in a shared process pool.
+
+    Results are cached by the SHA-256 of the image bytes, the same digest the
+    content store keys objects by, so repeated analyses of identical cutouts
+    skip the pool entirely. Callers get their own list; the cache keeps a tuple.
+    """
+
+    def __init__(self, max_workers: int | None = None) -> None:
+        """Initialize extractor; the pool is created on first use."""
+        self.max_workers = max_workers or settings.COLOR_EXTRACTION_WORKERS
+        self._executor: ProcessPoolExecutor | None = None
+        self._cache: OrderedDict[tuple[str, int], tuple[ExtractedColor, ...]] = OrderedDict()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """Get or create the process pool."""
+        if self._executor is None:
+            # spawn avoids forking a process that already runs event loop threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def extract(self, image_bytes: bytes, max_colors: int = 4) -> list[ExtractedColor]:
+        """Extract dominant colors without blocking the event loop.
+
+        Args:
+            image_bytes: Encoded image bytes
+            max_colors: Maximum number of colors to return
+
+        Returns:
+            Colors sorted by share, largest first
+        """
+        cache_key = (hashlib.sha256(image_bytes).hexdigest(), max_colors)
+        if cache_key in self._cache:
+            self._cache.move_to_end(cache_key)
+            return list(self._cache[cache_key])
+
+        loop = asyncio.get_running_loop()
+        queue_depth = EXECUTOR_QUEUE_DEPTH.labels("color_extraction")
+        queue_depth.inc()
+        try:
+            colors = await loop.run_in_executor(
+                self.executor, extract_dominant_colors, image_bytes, max_colors
+            )
+        finally:
+            queue_depth.dec()
+
+        self._cache[cache_key] = tuple(colors)
+        if len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return colors
+
+    def shutdown(self) -> None:
+        """Shut down the process pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Singleton instance
+color_extractor = ColorExtractor()
@@ -0,0 +1,221 @@
+"""Color theory facts for outfit explanations.
+
+A lookup table over every pair of COLOR_PALETTE entries is built once:
+the harmony relation (同色系, 邻近色, 三角色, 互补色, 中性色, 撞色), the
+harmony score, the WCAG contrast ratio and ΔE. Any garment color is
+mapped to its nearest palette entry (cached per hex), so classifying a
+color combination is a table lookup rather than an LLM call.
+"""
+
+import re
+from dataclasses import dataclass
+from enum import Enum
+from functools import lru_cache
+
+import numpy as np
+
+from app.core.color import (
+    COLOR_PALETTE,
+    HUE_RANGES,
+    NEUTRAL_CHROMA,
+    contrast_ratios,
+    delta_e,
+    harmony_matrix,
+    hex_to_lab,
+    lab_to_lch,
+    nearest_palette_indices,
+    palette_lab,
+)
+
+MONOCHROME_HUE_GAP = 15.0  # Degrees; closer hues read as one color family
+HIGH_CONTRAST_RATIO = 7.0  # WCAG AAA; such pairs read as a deliberate contrast
+PROMPT_PARTNER_COUNT = 3  # Best and worst partner colors listed in the prompt
+
+
+class ColorRelation(str, Enum):
+    """Harmony relation between two colors."""
+
+    MONOCHROME = "同色系"
+    ANALOGOUS = "邻近色"
+    TRIADIC = "三角色"
+    COMPLEMENTARY = "互补色"
+    NEUTRAL = "中性色"
+    CLASH = "撞色"
+
+
+# Relation for each row of HUE_RANGES
+_HUE_RELATIONS = [ColorRelation.ANALOGOUS, ColorRelation.TRIADIC, ColorRelation.COMPLEMENTARY]
+_RELATIONS = list(ColorRelation)
+
+# Common color words in garment descriptions, beyond the palette names
+COLOR_NAMES: dict[str, str] = {
+    **{name: hex_color for hex_color, name in COLOR_PALETTE},
+    "蓝色": "#1E50A0",
+    "深蓝色": "#000080",
+    "藏青色": "#1C2A4A",
+    "天蓝色": "#87CEEB",
+    "牛仔蓝": "#4169E1",
+    "黄色": "#FFD400",
+    "卡其色": "#C3B091",
+    "驼色": "#C19A6B",
+    "杏色": "#F7E7CE",
+    "裸色": "#E3BC9A",
+    "咖啡色": "#6F4E37",
+    "酒红色": "#722F37",
+    "玫红色": "#E0218A",
+    "军绿色": "#4B5320",
+    "墨绿色": "#0B4F2E",
+    "薄荷绿": "#98FF98",
+    "象牙白": "#FFFFF0",
+    "奶白色": "#FFFDD0",
+    "深灰色": "#696969",
+    "浅灰色": "#D3D3D3",
+}
+# Longest names first, so 深蓝色 wins over 蓝色
+_COLOR_NAME_PATTERN = re.compile("|".join(sorted(map(re.escape, COLOR_NAMES), key=len, reverse=True)))
+
+
+@dataclass(frozen=True)
+class ColorPairing:
+    """Color theory facts about a pair of colors."""
+
+    relation: ColorRelation
+    harmony: float  # 0-1, see app.core.color.harmony_scores
+    contrast: float  # WCAG contrast ratio, 1-21
+    delta_e: float
+
+
+@dataclass(frozen=True)
+class HarmonyTable:
+    """Palette x palette color theory facts."""
+
+    relations: np.ndarray  # Index into ColorRelation
+    harmony: np.ndarray
+    contrast: np.ndarray
+    delta_e: np.ndarray
+    neutral: np.ndarray  # Per palette entry
+
+
+@lru_cache
+def harmony_table() -> HarmonyTable:
+    """Build the palette lookup table once."""
+    lab = palette_lab()
+    lch = lab_to_lch(lab)
+    neutral = lch[:, 1] < NEUTRAL_CHROMA
+    hue_gap = np.abs(lch[:, None, 2] - lch[None, :, 2])
+    hue_gap = np.minimum(hue_gap, 360 - hue_gap)
+
+    relations = np.full(hue_gap.shape, _RELATIONS.index(ColorRelation.CLASH), dtype=np.int8)
+    for (low, high), relation in zip(HUE_RANGES, _HUE_RELATIONS, strict=True):
+        relations[(hue_gap >= low) & (hue_gap <= high)] = _RELATIONS.index(relation)
+    relations[hue_gap < MONOCHROME_HUE_GAP] = _RELATIONS.index(ColorRelation.MONOCHROME)
+    relations[np.diag_indices_from(relations)] = _RELATIONS.index(ColorRelation.MONOCHROME)
+    relations[neutral[:, None] | neutral[None, :]] = _RELATIONS.index(ColorRelation.NEUTRAL)
+
+    table = HarmonyTable(
+        relations=relations,
+        harmony=harmony_matrix(),
+        contrast=contrast_ratios(lab, lab),
+        delta_e=delta_e(lab, lab),
+        neutral=neutral,
+    )
+    for array in (table.relations, table.contrast, table.delta_e, table.neutral):
+        array.setflags(write=False)
+    return table
+
+
+@lru_cache(maxsize=1024)
+def palette_index(hex_color: str) -> int:
+    """Nearest COLOR_PALETTE entry for a hex color."""
+    indices, _ = nearest_palette_indices(hex_to_lab([hex_color]))
+    return int(indices[0])
+
+
+def palette_name(hex_color: str) -> str:
+    """Palette name of a hex color."""
+    return COLOR_PALETTE[palette_index(hex_color)][1]
+
+
+def classify(hex_a: str, hex_b: str) -> ColorPairing:
+    """Look up the color theory facts for a pair of colors."""
+    a, b = palette_index(hex_a), palette_index(hex_b)
+    table = harmony_table()
+    return ColorPairing(
+        relation=_RELATIONS[table.relations[a, b]],
+        harmony=float(table.harmony[a, b]),
+        contrast=float(table.contrast[a, b]),
+        delta_e=float(table.delta_e[a, b]),
+    )
+
+
+def color_principle(base_hex: str, other_hexes: list[str]) -> str:
+    """Name the color principle of an outfit built around one color.
+
+    The most frequent relation between the base color and the other items
+    wins; chromatic relations take precedence over neutral pairings, which
+    only name the outfit when every pair is neutral.
+
+    Args:
+        base_hex: The garment's main color
+        other_hexes: Colors of the other items in the outfit
+
+    Returns:
+        E.g. "互补色搭配（粉色×绿色）" or "中性色搭配·高对比"
+    """
+    pairings = [(hex_color, classify(base_hex, hex_color)) for hex_color in other_hexes]
+    chromatic = [(h, p) for h, p in pairings if p.relation != ColorRelation.NEUTRAL]
+    if not chromatic:
+        high_contrast = any(p.contrast >= HIGH_CONTRAST_RATIO for _, p in pairings)
+        return f"{ColorRelation.NEUTRAL.value}搭配" + ("·高对比" if high_contrast else "")
+
+    relations = [p.relation for _, p in chromatic]
+    relation = max(dict.fromkeys(relations), key=relations.count)
+    base_name = palette_name(base_hex)
+    partners = dict.fromkeys(palette_name(h) for h, p in chromatic if p.relation == relation)
+    partners.pop(base_name, None)
+    label = f"{base_name}×{'、'.join(partners)}" if partners else base_name
+    return f"{relation.value}搭配（{label}）"
+
+
+def find_colors(text: str) -> list[str]:
+    """Hex colors of the color words in a description, in order of appearance."""
+    return list(dict.fromkeys(COLOR_NAMES[name] for name in _COLOR_NAME_PATTERN.findall(text)))
+
+
+def prompt_facts(description: str) -> str | None:
+    """Color theory facts about a garment description, for the LLM prompt.
+
+    Returns:
+        A prompt section, or None if the description names no color
+    """
+    hexes = find_colors(description)
+    if not hexes:
+        return None
+
+    table = harmony_table()
+    base = palette_index(hexes[0])
+    names = [name for _, name in COLOR_PALETTE]
+    others = [index for index in np.argsort(-table.harmony[base], kind="stable") if index != base]
+
+    def listing(indices: list[int]) -> str:
+        return "、".join(f"{names[i]}（对比度{table.contrast[base, i]:.1f}:1）" for i in indices)
+
+    lines = ["【色彩理论参考】"]
+    if table.neutral[base]:
+        lines.append(f"单品主色：{names[base]}，属于中性色，可与大多数颜色协调")
+    else:
+        lines.append(f"单品主色：{names[base]}")
+        for relation in (ColorRelation.COMPLEMENTARY, ColorRelation.ANALOGOUS, ColorRelation.TRIADIC):
+            matches = [i for i in others if _RELATIONS[table.relations[base, i]] == relation]
+            if matches:
+                lines.append(f"{relation.value}：{'、'.join(names[i] for i in matches)}")
+    lines.append(f"推荐搭配色：{listing(others[:PROMPT_PARTNER_COUNT])}")
+    clashes = [i for i in reversed(others) if _RELATIONS[table.relations[base, i]] == ColorRelation.CLASH]
+    if clashes:
+        lines.append(f"慎用撞色：{'、'.join(names[i] for i in clashes[:PROMPT_PARTNER_COUNT])}")
+    for hex_color in hexes[1:]:
+        if palette_index(hex_color) == base:
+            continue
+        pairing = classify(hexes[0], hex_color)
+        lines.append(f"{names[base]}与{palette_name(hex_color)}：{pairing.relation.value}，ΔE {pairing.delta_e:.0f}")
+    return "\n".join(lines)
@@ -0,0 +1,154 @@
+"""Content-addressed storage for server-produced images.
+
+Objects are keyed by the SHA-256 of their bytes (blobs/ab/abcdef....png), so
+identical content is uploaded once no matter how many users or requests
+produce it. A reference row links each blob to every user that produced it;
+ownership checks and garbage collection use those references.
+
+Only bytes hashed on the server go into the shared blob namespace. Client
+uploads that merely *claim* a digest are deduplicated per user instead (see
+user_photo_key), so a forged digest can never affect other users.
+"""
+
+import asyncio
+import hashlib
+import logging
+import uuid
+from dataclasses import dataclass
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.stored_blob import BlobReference, StoredBlob
+from app.services.storage import storage_service
+
+logger = logging.getLogger(__name__)
+
+BLOB_PREFIX = "blobs/"
+
+CONTENT_TYPE_EXTENSIONS: dict[str, str] = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+}
+
+
+def sha256_hex(data: bytes) -> str:
+    """Hex SHA-256 digest of the given bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def blob_key(digest: str, content_type: str) -> str:
+    """Object key for a blob: blobs/{first two hex chars}/{digest}.{ext}."""
+    extension = CONTENT_TYPE_EXTENSIONS.get(content_type, "bin")
+    return f"{BLOB_PREFIX}{digest[:2]}/{digest}.{extension}"
+
+
+def user_photo_key(user_id: uuid.UUID | str, digest: str, content_type: str) -> str:
+    """Per-user deduplicated key for a client-uploaded photo."""
+    extension = CONTENT_TYPE_EXTENSIONS.get(content_type, "jpg")
+    return f"users/{user_id}/photos/{digest}.{extension}"
+
+
+@dataclass
+class StoredContent:
+    """Result of storing content."""
+
+    digest: str
+    object_key: str
+    deduplicated: bool  # True if the bytes were already stored
+
+
+class ContentStore:
+    """Stores blobs once and tracks per-user references."""
+
+    async def put(
+        self,
+        db: AsyncSession,
+        user_id: uuid.UUID,
+        data: bytes,
+        content_type: str,
+        kind: str,
+    ) -> StoredContent | None:
+        """Store content, uploading only if the digest is new.
+
+        Args:
+            db: Database session
+            user_id: Owner to link the blob to
+            data: Raw content
+            content_type: MIME type of the content
+            kind: What produced the blob ("segmented", "generated", ...)
+
+        Returns:
+            StoredContent, or None if a new blob failed to upload
+
+        The writes run in a savepoint: if one fails, only this call is rolled
+        back and the caller's transaction stays usable (e.g. for the next item
+        of a batch).
+        """
+        digest = sha256_hex(data)
+        object_key = blob_key(digest, content_type)
+
+        async with db.begin_nested():
+            existing = await db.get(StoredBlob, digest)
+            deduplicated = existing is not None
+            if existing is None:
+                # oss2 is synchronous; keep it off the event loop
+                if not await asyncio.to_thread(storage_service.upload_file, object_key, data, content_type):
+                    logger.error(f"[ContentStore] Upload failed for blob {digest[:12]}")
+                    return None
+                await db.execute(
+                    insert(StoredBlob)
+                    .values(
+                        digest=digest,
+                        object_key=object_key,
+                        content_type=content_type,
+                        size_bytes=len(data),
+                    )
+                    .on_conflict_do_nothing(index_elements=["digest"])
+                )
+            else:
+                object_key = existing.object_key
+
+            await self.add_reference(db, user_id, digest, kind)
+        logger.info(
+            f"[ContentStore] {'Reused' if deduplicated else 'Stored'} blob {digest[:12]} "
+            f"({len(data)} bytes, kind={kind})"
+        )
+        return StoredContent(digest=digest, object_key=object_key, deduplicated=deduplicated)
+
+    async def add_reference(
+        self,
+        db: AsyncSession,
+        user_id: uuid.UUID,
+        digest: str,
+        kind: str,
+    ) -> None:
+        """Link a blob to a user (idempotent).
+
+        Producing the same blob again refreshes the reference's created_at,
+        which restarts the garbage collector's grace period for it.
+        """
+        stmt = insert(BlobReference).values(id=uuid.uuid4(), user_id=user_id, digest=digest, kind=kind)
+        await db.execute(
+            stmt.on_conflict_do_update(
+                constraint="uq_blob_references_user_digest_kind",
+                set_={"created_at": func.now()},
+            )
+        )
+
+    async def user_can_access(self, db: AsyncSession, user_id: uuid.UUID, object_key: str) -> bool:
+        """Check whether a user references the blob stored at object_key."""
+        stmt = (
+            select(BlobReference.id)
+            .join(StoredBlob, StoredBlob.digest == BlobReference.digest)
+            .where(StoredBlob.object_key == object_key, BlobReference.user_id == user_id)
+            .limit(1)
+        )
+        result = await db.execute(stmt)
+        return result.scalar_one_or_none() is not None
+
+
+# Singleton instance
+content_store = ContentStore()
@@ -0,0 +1,466 @@
+"""Background outfit generation jobs.
+
+Some clients (the share flow, batch features) cannot hold
+/outfits/generate-stream open for a minute. POST /outfits/jobs stores a
+job and returns its id at once; GET /outfits/jobs/{id} reports its status,
+the text so far and the image, and can long-poll for the next change.
+
+Postgres is the queue: every API process runs GENERATION_JOB_WORKERS
+workers that claim the oldest queued job (FOR UPDATE SKIP LOCKED), run the
+same pipeline as the SSE stream and write progress back to the row, so any
+process can answer status reads. Long-polls are woken at once for jobs
+running in the same process and poll the row otherwise.
+
+A job whose worker shuts down is requeued; one whose worker died is failed
+once it has made no progress for GENERATION_JOB_STALE_SECONDS (checked
+every GENERATION_JOB_RECLAIM_SECONDS, not on every idle poll). Finished
+jobs can notify an allowlisted callback URL.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import time
+import uuid
+import weakref
+from collections.abc import Coroutine
+from contextlib import aclosing, suppress
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.deadline import deadline_scope
+from app.core.exceptions import NotFoundError, RateLimitedError, ValidationError
+from app.core.metrics import EXECUTOR_QUEUE_DEPTH, GENERATION_JOB_QUEUE_TIME, GENERATION_JOBS
+from app.core.retry import RetryPolicy, call_with_retry
+from app.models.generation_job import GenerationJob
+from app.services.streaming_generator import SSEEvent, streaming_generator
+
+logger = logging.getLogger(__name__)
+
+PENDING_STATUSES = ("queued", "running")
+FINISHED_STATUSES = ("complete", "error")
+
+CALLBACK_TIMEOUT = 10.0
+
+
+@dataclass
+class JobProgress:
+    """A job's state folded from the generation's SSE events."""
+
+    status: str = "running"
+    text: str = ""
+    image_url: str | None = None
+    image_error: str | None = None
+    outfit_id: str | None = None
+    fallback: str | None = None
+    error_code: str | None = None
+    error_message: str | None = None
+
+    def apply(self, event: SSEEvent) -> bool:
+        """Fold one event in.
+
+        Returns:
+            Whether a client would see a change (progress-only events do not count)
+        """
+        if event.event == "text_chunk":
+            self.text += event.data.get("content", "")
+        elif event.event == "image_ready":
+            self.image_url = event.data.get("url")
+        elif event.event == "image_failed":
+            self.image_error = event.data.get("message")
+        elif event.event == "complete":
+            self.status = "complete"
+            self.outfit_id = event.data.get("outfit_id")
+            self.image_url = event.data.get("generated_image_url") or self.image_url
+            self.fallback = event.data.get("fallback")
+        elif event.event == "error":
+            self.fail(event.data.get("code", "GENERATION_FAILED"), event.data.get("message", "生成失败，请重试"))
+        else:
+            return False
+        return True
+
+    def fail(self, code: str, message: str) -> None:
+        """Mark the job failed."""
+        self.status = "error"
+        self.error_code = code
+        self.error_message = message
+
+    def values(self) -> dict[str, Any]:
+        """Column values to store."""
+        return {
+            "status": self.status,
+            "text": self.text,
+            "image_url": self.image_url,
+            "image_error": self.image_error,
+            "outfit_id": uuid.UUID(self.outfit_id) if self.outfit_id else None,
+            "fallback": self.fallback,
+            "error_code": self.error_code,
+            "error_message": self.error_message,
+        }
+
+
+def job_payload(job: GenerationJob) -> dict[str, Any]:
+    """Public view of a job (status responses and callbacks)."""
+    return {
+        "job_id": str(job.id),
+        "status": job.status,
+        "version": job.version,
+        "occasion": job.occasion,
+        "text": job.text,
+        "image_url": job.image_url,
+        "image_error": job.image_error,
+        "outfit_id": str(job.outfit_id) if job.outfit_id else None,
+        "fallback": job.fallback,
+        "error": {"code": job.error_code, "message": job.error_message} if job.error_code else None,
+        "created_at": job.created_at.isoformat(),
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def callback_allowed(url: str) -> bool:
+    """Whether completion callbacks may be sent to a URL (https, allowlisted host)."""
+    parts = urlsplit(url)
+    return parts.scheme == "https" and parts.hostname in settings.GENERATION_JOB_CALLBACK_HOSTS
+
+
+class GenerationJobService:
+    """Queues generation jobs in Postgres and runs them in a worker pool."""
+
+    def __init__(self) -> None:
+        """Initialize service (workers start with start())."""
+        self._workers: list[asyncio.Task] = []
+        # Set when a job is submitted in this process (workers skip the poll wait)
+        self._wake = asyncio.Event()
+        # Last check for jobs abandoned by a dead worker (shared by this process's workers)
+        self._reclaimed_at = float("-inf")
+        # Long-polls waiting on jobs of this process, by job id
+        self._waiters: weakref.WeakValueDictionary[uuid.UUID, asyncio.Event] = weakref.WeakValueDictionary()
+        # Completion callbacks in flight
+        self._tasks: set[asyncio.Task] = set()
+        self._client: httpx.AsyncClient | None = None
+        self.retry_policy = RetryPolicy.from_settings("generation_job_callback")
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Get or create the HTTP client for callbacks."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=CALLBACK_TIMEOUT)
+        return self._client
+
+    def start(self) -> None:
+        """Start GENERATION_JOB_WORKERS workers."""
+        for _ in range(settings.GENERATION_JOB_WORKERS):
+            self._workers.append(asyncio.create_task(self._work()))
+        logger.info(f"[GenerationJobs] Started {len(self._workers)} workers")
+
+    async def shutdown(self, timeout: float = 5.0) -> None:
+        """Stop the workers (their running jobs are requeued), then wait briefly for callbacks."""
+        for worker in self._workers:
+            worker.cancel()
+        if self._workers:
+            await asyncio.wait(self._workers)
+        self._workers.clear()
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=timeout)
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    async def submit(
+        self,
+        db: AsyncSession,
+        user_id: uuid.UUID,
+        selected_item_url: str,
+        selected_item_description: str,
+        selected_item_category: str,
+        occasion: str,
+        original_image_url: str | None = None,
+        callback_url: str | None = None,
+    ) -> GenerationJob:
+        """Queue a generation.
+
+        Committed before returning, so any worker can claim it right away.
+
+        Raises:
+            ValidationError: If the callback URL is not allowed
+            RateLimitedError: If the user has too many pending jobs
+        """
+        if callback_url is not None and not callback_allowed(callback_url):
+            raise ValidationError(
+                code="GENERATION_JOB_CALLBACK_NOT_ALLOWED",
+                message="不支持的回调地址",
+                details={"callbackUrl": callback_url},
+            )
+
+        pending = await db.scalar(
+            select(func.count())
+            .select_from(GenerationJob)
+            .where(GenerationJob.user_id == user_id, GenerationJob.status.in_(PENDING_STATUSES))
+        )
+        if pending >= settings.GENERATION_JOB_MAX_PENDING_PER_USER:
+            raise RateLimitedError(message="生成任务过多，请等待当前任务完成", retry_after=10)
+
+        job = GenerationJob(
+            user_id=user_id,
+            selected_item_url=selected_item_url,
+            selected_item_description=selected_item_description,
+            selected_item_category=selected_item_category,
+            occasion=occasion,
+            original_image_url=original_image_url,
+            callback_url=callback_url,
+        )
+        db.add(job)
+        await db.commit()
+        self._wake.set()
+        logger.info(f"[GenerationJobs] Queued job={job.id} user={user_id} occasion={occasion}")
+        return job
+
+    async def get(
+        self,
+        job_id: uuid.UUID,
+        user_id: uuid.UUID,
+        after_version: int | None = None,
+        wait: float = 0.0,
+    ) -> GenerationJob:
+        """Read a job, optionally waiting for it to change.
+
+        Each read uses its own short session, so a long-poll does not hold a
+        pooled connection while it waits.
+
+        Args:
+            job_id: Job to read
+            user_id: Owner (other users' jobs are not found)
+            after_version: Return once the job's version is past this one
+            wait: Longest wait in seconds (capped at GENERATION_JOB_MAX_WAIT_SECONDS)
+
+        Raises:
+            NotFoundError: If the user has no such job
+        """
+        from app.db.session import async_session_maker
+
+        give_up_at = time.monotonic() + min(wait, settings.GENERATION_JOB_MAX_WAIT_SECONDS)
+        while True:
+            # Created before the read so a change made meanwhile is not missed
+            changed = self._waiters.setdefault(job_id, asyncio.Event())
+            async with async_session_maker() as db:
+                job = await db.scalar(
+                    select(GenerationJob).where(GenerationJob.id == job_id, GenerationJob.user_id == user_id)
+                )
+            if job is None:
+                raise NotFoundError(code="GENERATION_JOB_NOT_FOUND", message="生成任务不存在")
+
+            left = give_up_at - time.monotonic()
+            if after_version is None or job.version > after_version or job.status in FINISHED_STATUSES or left <= 0:
+                return job
+            # Woken by a worker of this process, or poll for workers elsewhere
+            with suppress(TimeoutError):
+                await asyncio.wait_for(changed.wait(), timeout=min(left, settings.GENERATION_JOB_POLL_SECONDS))
+
+    def _notify(self, job_id: uuid.UUID) -> None:
+        """Wake long-polls of a job in this process."""
+        changed = self._waiters.pop(job_id, None)
+        if changed is not None:
+            changed.set()
+
+    async def _work(self) -> None:
+        """Claim and run queued jobs until cancelled."""
+        while True:
+            self._wake.clear()
+            if time.monotonic() - self._reclaimed_at >= settings.GENERATION_JOB_RECLAIM_SECONDS:
+                # Stamped first, so the other workers skip it meanwhile
+                self._reclaimed_at = time.monotonic()
+                try:
+                    await self._reclaim_lost()
+                except Exception as e:
+                    logger.error(f"[GenerationJobs] Failed to reclaim lost jobs: {e}")
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logger.error(f"[GenerationJobs] Failed to claim a job: {e}")
+                job = None
+            if job is None:
+                with suppress(TimeoutError):
+                    await asyncio.wait_for(self._wake.wait(), timeout=settings.GENERATION_JOB_POLL_SECONDS)
+                continue
+            await self._run(job)
+
+    async def _reclaim_lost(self) -> None:
+        """Fail running jobs that made no progress for GENERATION_JOB_STALE_SECONDS."""
+        from app.db.session import async_session_maker
+
+        now = datetime.now(UTC)
+        async with async_session_maker() as db:
+            lost = await db.execute(
+                update(GenerationJob)
+                .where(
+                    GenerationJob.status == "running",
+                    GenerationJob.updated_at < now - timedelta(seconds=settings.GENERATION_JOB_STALE_SECONDS),
+                )
+                .values(
+                    status="error",
+                    error_code="GENERATION_JOB_LOST",
+                    error_message="生成中断，请重试",
+                    version=GenerationJob.version + 1,
+                    updated_at=now,
+                    finished_at=now,
+                )
+            )
+            if lost.rowcount:
+                GENERATION_JOBS.labels("lost").inc(lost.rowcount)
+                logger.warning(f"[GenerationJobs] Failed {lost.rowcount} jobs abandoned by their worker")
+            await db.commit()
+
+    async def _claim(self) -> GenerationJob | None:
+        """Take the oldest queued job, if any."""
+        from app.db.session import async_session_maker
+
+        now = datetime.now(UTC)
+        async with async_session_maker() as db:
+            oldest_queued = (
+                select(GenerationJob.id)
+                .where(GenerationJob.status == "queued")
+                .order_by(GenerationJob.created_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            job = await db.scalar(
+                update(GenerationJob)
+                .where(GenerationJob.id == oldest_queued)
+                .values(status="running", started_at=now, updated_at=now, version=GenerationJob.version + 1)
+                .returning(GenerationJob)
+            )
+            await db.commit()
+
+        if job is not None:
+            self._notify(job.id)
+            GENERATION_JOB_QUEUE_TIME.observe((job.started_at - job.created_at).total_seconds())
+        return job
+
+    async def _run(self, job: GenerationJob) -> None:
+        """Run one job's generation, writing its progress as it goes."""
+        logger.info(f"[GenerationJobs] Running job={job.id}")
+        EXECUTOR_QUEUE_DEPTH.labels("generation_jobs").inc()
+        progress = JobProgress()
+        flushed_at = time.monotonic()
+        try:
+            # The same budget as the stream: a job is not a way around the deadline
+            with deadline_scope(settings.STREAM_DEADLINE_SECONDS):
+                events = streaming_generator.generate_stream(
+                    selected_item_url=job.selected_item_url,
+                    selected_item_description=job.selected_item_description,
+                    selected_item_category=job.selected_item_category,
+                    occasion=job.occasion,
+                    original_image_url=job.original_image_url,
+                    user_id=str(job.user_id),
+                )
+                async with aclosing(events):
+                    async for event in events:
+                        if not progress.apply(event) or progress.status != "running":
+                            continue
+                        if time.monotonic() - flushed_at >= settings.GENERATION_JOB_FLUSH_SECONDS:
+                            await self._save(job.id, progress)
+                            flushed_at = time.monotonic()
+            if progress.status == "running":
+                progress.fail("GENERATION_FAILED", "生成失败，请重试")  # Ended without a result
+        except asyncio.CancelledError:
+            # Worker shutting down: let another worker start it over
+            await self._requeue(job.id)
+            raise
+        except Exception as e:
+            logger.error(f"[GenerationJobs] Job {job.id} failed: {e}", exc_info=True)
+            progress.fail("GENERATION_FAILED", "生成失败，请重试")
+        finally:
+            EXECUTOR_QUEUE_DEPTH.labels("generation_jobs").dec()
+
+        try:
+            finished = await self._save(job.id, progress, finished=True)
+        except Exception as e:
+            logger.error(f"[GenerationJobs] Failed to store result of job {job.id}: {e}")
+            return
+        if finished is None:
+            return  # Failed as lost meanwhile (no progress for too long)
+        GENERATION_JOBS.labels(progress.status).inc()
+        logger.info(f"[GenerationJobs] Job {job.id} finished: {progress.status}")
+        if finished.callback_url:
+            self._track(self._send_callback(finished))
+
+    async def _save(self, job_id: uuid.UUID, progress: JobProgress, finished: bool = False) -> GenerationJob | None:
+        """Write a job's progress (and wake its long-polls)."""
+        from app.db.session import async_session_maker
+
+        now = datetime.now(UTC)
+        values = progress.values() if finished else {**progress.values(), "status": "running"}
+        async with async_session_maker() as db:
+            job = await db.scalar(
+                update(GenerationJob)
+                .where(GenerationJob.id == job_id, GenerationJob.status == "running")
+                .values(
+                    **values,
+                    version=GenerationJob.version + 1,
+                    updated_at=now,
+                    finished_at=now if finished else None,
+                )
+                .returning(GenerationJob)
+            )
+            await db.commit()
+        self._notify(job_id)
+        return job
+
+    async def _requeue(self, job_id: uuid.UUID) -> None:
+        """Put an interrupted job back in the queue, discarding its partial progress."""
+        from app.db.session import async_session_maker
+
+        try:
+            async with async_session_maker() as db:
+                await db.execute(
+                    update(GenerationJob)
+                    .where(GenerationJob.id == job_id, GenerationJob.status == "running")
+                    .values(**JobProgress(status="queued").values(), version=GenerationJob.version + 1)
+                )
+                await db.commit()
+            GENERATION_JOBS.labels("requeued").inc()
+            logger.info(f"[GenerationJobs] Requeued job={job_id}")
+        except Exception as e:
+            logger.error(f"[GenerationJobs] Failed to requeue job {job_id}: {e}")
+        self._notify(job_id)
+
+    async def _send_callback(self, job: GenerationJob) -> None:
+        """POST the finished job to its callback URL (logs instead of raising).
+
+        Receivers should deduplicate by job_id: a retried delivery may arrive twice.
+        """
+        body = json.dumps(job_payload(job), ensure_ascii=False).encode()
+        headers = {"Content-Type": "application/json"}
+        if settings.GENERATION_JOB_CALLBACK_SECRET:
+            digest = hmac.new(settings.GENERATION_JOB_CALLBACK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+            headers["X-Dali-Signature"] = f"sha256={digest}"
+
+        async def post() -> None:
+            response = await self.client.post(job.callback_url, content=body, headers=headers)
+            response.raise_for_status()
+
+        try:
+            await call_with_retry(self.retry_policy, post)
+            logger.info(f"[GenerationJobs] Delivered callback for job={job.id}")
+        except Exception as e:
+            logger.warning(f"[GenerationJobs] Callback for job {job.id} failed: {e}")
+
+    def _track(self, coro: Coroutine[Any, Any, None]) -> None:
+        """Run a callback delivery as a tracked background task."""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+# Singleton instance
+generation_job_service = GenerationJobService()
@@ -0,0 +1,242 @@
+"""Usage and cost accounting for outfit generations.
+
+StreamingOutfitGenerator fills a GenerationUsage while it streams: DashScope
+token counts, time to first token, the upstream wait between chunks and the
+image provider. When the generation ends, record() updates the llm_* metrics
+and writes one generation_records row in the background, so accounting never
+delays the SSE stream.
+
+Costs are estimates from the LLM_PRICE_* / IMAGE_PRICE_* settings (CNY).
+cost_by_user() and cost_by_occasion() aggregate the table.
+"""
+
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Any
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.metrics import (
+    EXECUTOR_QUEUE_DEPTH,
+    GENERATION_COST,
+    LLM_INTER_CHUNK_GAP,
+    LLM_TIME_TO_FIRST_TOKEN,
+    LLM_TOKENS,
+)
+from app.models.generation_record import GenerationRecord
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_cost(prompt_tokens: int, completion_tokens: int, image_provider: str | None) -> Decimal:
+    """Estimated vendor cost of one generation in CNY."""
+    cost = (
+        prompt_tokens * settings.LLM_PRICE_INPUT_PER_1K_TOKENS
+        + completion_tokens * settings.LLM_PRICE_OUTPUT_PER_1K_TOKENS
+    ) / 1000
+    if image_provider == "siliconflow":
+        cost += settings.IMAGE_PRICE_SILICONFLOW
+    elif image_provider == "dalle":
+        cost += settings.IMAGE_PRICE_DALLE
+    return Decimal(str(round(cost, 6)))
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+@dataclass
+class GenerationUsage:
+    """Usage collected while one generation streams.
+
+    Times are seconds of upstream wait, measured from sending the LLM request
+    with consumer time excluded (see UpstreamStream.consumer_seconds).
+    """
+
+    model: str = "mock"
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    time_to_first_token: float | None = None
+    chunk_gaps: list[float] = field(default_factory=list)
+    stream_time: float | None = None
+    image_provider: str | None = None
+    image_time_ms: int | None = None
+    _last_chunk_at: float = field(default=0.0, init=False, repr=False)
+
+    def observe_chunk(self, upstream_elapsed: float) -> None:
+        """Record the arrival of a content chunk.
+
+        Args:
+            upstream_elapsed: Upstream wait since the request was sent
+        """
+        if self.time_to_first_token is None:
+            self.time_to_first_token = upstream_elapsed
+        else:
+            self.chunk_gaps.append(upstream_elapsed - self._last_chunk_at)
+        self._last_chunk_at = upstream_elapsed
+
+    def observe_usage(self, data: dict[str, Any]) -> None:
+        """Take token counts from a DashScope response chunk.
+
+        With incremental_output the counts are cumulative, so the last chunk
+        carrying a usage block wins.
+        """
+        usage = data.get("usage")
+        if isinstance(usage, dict):
+            self.prompt_tokens = int(usage.get("input_tokens", self.prompt_tokens))
+            self.completion_tokens = int(usage.get("output_tokens", self.completion_tokens))
+
+
+def _ms(seconds: float | None) -> int | None:
+    return None if seconds is None else round(seconds * 1000)
+
+
+class GenerationUsageRecorder:
+    """Writes generation records in the background and aggregates them."""
+
+    def __init__(self) -> None:
+        """Initialize recorder."""
+        self._tasks: set[asyncio.Task] = set()
+
+    def record(
+        self,
+        user_id: uuid.UUID | str,
+        outfit_id: uuid.UUID | str,
+        occasion: str | None,
+        status: str,
+        usage: GenerationUsage,
+        generation_time: float,
+    ) -> GenerationRecord:
+        """Update metrics and store a record without blocking the caller.
+
+        Args:
+            user_id: User who requested the generation
+            outfit_id: StreamingContext.outfit_id
+            occasion: Requested occasion
+            status: "complete", "error" or "cancelled"
+            usage: Usage collected while streaming
+            generation_time: Seconds from request to the last event
+
+        Returns:
+            The record being written
+        """
+        cost = estimate_cost(usage.prompt_tokens, usage.completion_tokens, usage.image_provider)
+        gaps = usage.chunk_gaps
+        record = GenerationRecord(
+            id=uuid.uuid4(),
+            user_id=uuid.UUID(str(user_id)),
+            outfit_id=uuid.UUID(str(outfit_id)),
+            occasion=occasion,
+            status=status,
+            model=usage.model,
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            time_to_first_token_ms=_ms(usage.time_to_first_token),
+            chunk_gap_p50_ms=_ms(_percentile(gaps, 0.5)) if gaps else None,
+            chunk_gap_p95_ms=_ms(_percentile(gaps, 0.95)) if gaps else None,
+            chunk_gap_max_ms=_ms(max(gaps)) if gaps else None,
+            stream_time_ms=_ms(usage.stream_time),
+            image_provider=usage.image_provider,
+            image_time_ms=usage.image_time_ms,
+            generation_time_ms=round(generation_time * 1000),
+            estimated_cost=cost,
+        )
+
+        if usage.time_to_first_token is not None:
+            LLM_TIME_TO_FIRST_TOKEN.labels(usage.model).observe(usage.time_to_first_token)
+        for gap in gaps:
+            LLM_INTER_CHUNK_GAP.labels(usage.model).observe(gap)
+        LLM_TOKENS.labels(usage.model, "prompt").inc(usage.prompt_tokens)
+        LLM_TOKENS.labels(usage.model, "completion").inc(usage.completion_tokens)
+        GENERATION_COST.labels(usage.model).inc(float(cost))
+
+        logger.info(
+            f"[GenerationUsage] outfit={record.outfit_id} status={status} "
+            f"tokens={usage.prompt_tokens}+{usage.completion_tokens} "
+            f"ttft_ms={record.time_to_first_token_ms} image={usage.image_provider} "
+            f"total_ms={record.generation_time_ms} cost={cost}"
+        )
+
+        task = asyncio.create_task(self._write(record))
+        self._tasks.add(task)
+        task.add_done_callback(self._on_done)
+        EXECUTOR_QUEUE_DEPTH.labels("generation_usage").inc()
+        return record
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        """Stop tracking a finished write."""
+        self._tasks.discard(task)
+        EXECUTOR_QUEUE_DEPTH.labels("generation_usage").dec()
+
+    async def _write(self, record: GenerationRecord) -> None:
+        """Insert a record in its own session (logs instead of raising)."""
+        from app.db.session import async_session_maker
+
+        try:
+            async with async_session_maker() as db:
+                db.add(record)
+                await db.commit()
+        except Exception as e:
+            logger.error(f"[GenerationUsage] Failed to store record for outfit {record.outfit_id}: {e}")
+
+    async def cost_by_user(self, db: AsyncSession, since: datetime, limit: int = 50) -> list[dict[str, Any]]:
+        """Generations, tokens and estimated cost per user, most expensive first.
+
+        Args:
+            db: Database session
+            since: Only count generations created after this
+            limit: Maximum number of users returned
+        """
+        stmt = (
+            select(
+                GenerationRecord.user_id,
+                func.count().label("generations"),
+                func.sum(GenerationRecord.prompt_tokens).label("prompt_tokens"),
+                func.sum(GenerationRecord.completion_tokens).label("completion_tokens"),
+                func.sum(GenerationRecord.estimated_cost).label("estimated_cost"),
+            )
+            .where(GenerationRecord.created_at >= since)
+            .group_by(GenerationRecord.user_id)
+            .order_by(func.sum(GenerationRecord.estimated_cost).desc())
+            .limit(limit)
+        )
+        result = await db.execute(stmt)
+        return [dict(row._mapping) for row in result]
+
+    async def cost_by_occasion(self, db: AsyncSession, since: datetime) -> list[dict[str, Any]]:
+        """Generations, average duration and estimated cost per occasion.
+
+        Args:
+            db: Database session
+            since: Only count generations created after this
+        """
+        stmt = (
+            select(
+                GenerationRecord.occasion,
+                func.count().label("generations"),
+                func.avg(GenerationRecord.generation_time_ms).label("avg_generation_time_ms"),
+                func.sum(GenerationRecord.estimated_cost).label("estimated_cost"),
+            )
+            .where(GenerationRecord.created_at >= since)
+            .group_by(GenerationRecord.occasion)
+            .order_by(func.sum(GenerationRecord.estimated_cost).desc())
+        )
+        result = await db.execute(stmt)
+        return [dict(row._mapping) for row in result]
+
+    async def shutdown(self, timeout: float = 5.0) -> None:
+        """Wait briefly for pending writes."""
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=timeout)
+
+
+# Singleton instance
+generation_usage_recorder = GenerationUsageRecorder()
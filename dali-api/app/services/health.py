@@ -0,0 +1,189 @@
+"""Dependency probes for the health endpoint.
+
+GET /api/v1/health checks each dependency with the cheapest call that
+proves it works for us:
+
+- postgres:    SELECT 1 through the application pool
+- oss:         HEAD on HEALTH_OSS_SENTINEL_KEY (a 404 is fine; auth and
+               network errors are not)
+- dashscope:   GET /tasks/{unknown id}, which needs a valid API key but
+               costs no tokens
+- siliconflow: GET /user/info with the API key
+
+Results are cached for HEALTH_CACHE_SECONDS and concurrent callers share
+the probe in flight, so a health-check storm from the load balancer turns
+into at most one upstream call per dependency per TTL. Upstream
+dependencies also report the worst state of their circuit breakers.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, replace
+
+import httpx
+
+from app.config import settings
+from app.core.circuit_breaker import circuit_breakers
+
+logger = logging.getLogger(__name__)
+
+Check = Callable[[], Awaitable[None]]
+
+# Integrations (circuit breaker name prefixes) behind each dependency
+DEPENDENCY_CIRCUITS: dict[str, tuple[str, ...]] = {
+    "dashscope": ("dashscope", "qwen_vl", "qwen_vision"),
+    "siliconflow": ("siliconflow", "openai"),
+}
+
+
+@dataclass
+class DependencyStatus:
+    """Result of one dependency check."""
+
+    status: str  # "ok", "error" or "skipped"
+    latency_ms: float | None = None
+    required: bool = False
+    error: str | None = None
+    circuit: str | None = None
+
+
+async def run_check(name: str, check: Check | None, required: bool, timeout: float) -> DependencyStatus:
+    """Run and time one check; failures and timeouts become an error status."""
+    if check is None:
+        return DependencyStatus(status="skipped", required=required)
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(check(), timeout=timeout)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+        logger.warning(f"[Health] {name} check failed: {error}")
+    return DependencyStatus(
+        status="error" if error else "ok",
+        latency_ms=round((time.perf_counter() - start) * 1000, 1),
+        required=required,
+        error=error,
+    )
+
+
+class UpstreamAuthError(Exception):
+    """Upstream answered, but rejected our credentials."""
+
+
+def raise_for_probe_status(response: httpx.Response) -> None:
+    """Fail a probe on auth errors and server errors; other answers are fine."""
+    if response.status_code in (401, 403):
+        raise UpstreamAuthError(f"HTTP {response.status_code}")
+    if response.status_code >= 500:
+        raise RuntimeError(f"HTTP {response.status_code}")
+
+
+async def check_postgres() -> None:
+    """SELECT 1 through the application pool."""
+    from sqlalchemy import text
+
+    from app.db.session import async_session_maker
+
+    async with async_session_maker() as db:
+        await db.execute(text("SELECT 1"))
+
+
+async def check_oss() -> None:
+    """HEAD the sentinel object."""
+    from app.services.storage import storage_service
+
+    await asyncio.to_thread(storage_service.file_exists, settings.HEALTH_OSS_SENTINEL_KEY)
+
+
+async def check_dashscope() -> None:
+    """Query an unknown task id (validates the key without generating)."""
+    from app.services.streaming_generator import streaming_generator
+
+    response = await streaming_generator.client.get(
+        f"{settings.DASHSCOPE_BASE_URL}/tasks/health-check",
+        headers={"Authorization": f"Bearer {settings.DASHSCOPE_API_KEY}"},
+    )
+    raise_for_probe_status(response)
+
+
+async def check_siliconflow() -> None:
+    """Fetch the account info for the API key."""
+    from app.integrations.siliconflow import siliconflow_client
+
+    response = await siliconflow_client.client.get(
+        f"{settings.SILICONFLOW_BASE_URL}/user/info",
+        headers={"Authorization": f"Bearer {settings.SILICONFLOW_API_KEY}"},
+    )
+    raise_for_probe_status(response)
+
+
+class HealthService:
+    """Cached, single-flight dependency probes."""
+
+    def __init__(self) -> None:
+        """Initialize service with an empty cache."""
+        self._cache: dict[str, tuple[float, DependencyStatus]] = {}
+        self._inflight: dict[str, asyncio.Task[DependencyStatus]] = {}
+
+    def probes(self) -> dict[str, tuple[Check | None, bool]]:
+        """Probes as {name: (check or None to skip, required)}."""
+        from app.services.storage import storage_service
+
+        return {
+            "postgres": (check_postgres, True),
+            "oss": (check_oss if storage_service._use_real_oss else None, False),
+            "dashscope": (check_dashscope if settings.DASHSCOPE_API_KEY else None, False),
+            "siliconflow": (check_siliconflow if settings.SILICONFLOW_API_KEY else None, False),
+        }
+
+    async def check(self, name: str, check: Check | None, required: bool) -> DependencyStatus:
+        """Cached result of one probe, running it if the cache is stale."""
+        cached = self._cache.get(name)
+        if cached is not None and time.monotonic() - cached[0] < settings.HEALTH_CACHE_SECONDS:
+            return cached[1]
+
+        task = self._inflight.get(name)
+        if task is None:
+            task = asyncio.create_task(self._probe(name, check, required))
+            self._inflight[name] = task
+        # A disconnecting caller must not cancel the probe others wait for
+        return await asyncio.shield(task)
+
+    async def _probe(self, name: str, check: Check | None, required: bool) -> DependencyStatus:
+        """Run a probe and cache its result."""
+        try:
+            result = await run_check(name, check, required, settings.HEALTH_PROBE_TIMEOUT)
+            self._cache[name] = (time.monotonic(), result)
+            return result
+        finally:
+            self._inflight.pop(name, None)
+
+    async def check_all(self) -> dict[str, DependencyStatus]:
+        """Check every dependency concurrently."""
+        probes = self.probes()
+        results = await asyncio.gather(
+            *(self.check(name, check, required) for name, (check, required) in probes.items())
+        )
+        return {
+            name: replace(result, circuit=circuit_breakers.state_of(*DEPENDENCY_CIRCUITS[name]).value) if name in DEPENDENCY_CIRCUITS else result
+            for name, result in zip(probes, results, strict=True)
+        }
+
+    def clear(self) -> None:
+        """Forget cached results."""
+        self._cache.clear()
+
+
+def overall_status(dependencies: dict[str, DependencyStatus]) -> str:
+    """Overall status: error if a required dependency is down, degraded if another is."""
+    if any(dep.status == "error" and dep.required for dep in dependencies.values()):
+        return "error"
+    if any(dep.status == "error" for dep in dependencies.values()):
+        return "degraded"
+    return "ok"
+
+
+# Singleton instance
+health_service = HealthService()
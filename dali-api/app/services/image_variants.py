@@ -0,0 +1,178 @@
+"""Derivative image generation (WebP thumbnails and medium sizes).
+
+Originals (user photos, segmented cutouts, generated outfits) are stored at
+full resolution. After an original is written we render smaller WebP copies
+in the background so list views can fetch ~20 KB images instead of 2 MB PNGs.
+
+Derivatives are stored next to the original (see storage.variant_key). Use
+variant_url() to serve them: it returns a URL only once the derivative
+exists and re-schedules generation when it is missing (failed render,
+deduplicated upload whose first render never finished).
+"""
+
+import asyncio
+import io
+import logging
+from collections.abc import Coroutine
+from typing import Any
+
+from PIL import Image
+
+from app.config import settings
+from app.core.metrics import EXECUTOR_QUEUE_DEPTH
+from app.core.tracing import traced
+from app.services.storage import IMAGE_VARIANTS, storage_service, variant_key
+
+logger = logging.getLogger(__name__)
+
+WEBP_QUALITY = 80
+
+
+def render_variants(image_bytes: bytes) -> dict[str, bytes]:
+    """Render all IMAGE_VARIANTS of an image as WebP.
+
+    Transparency is preserved (segmented cutouts stay cut out). Variants that
+    would be larger than the original are rendered at the original size.
+
+    Args:
+        image_bytes: Encoded original image
+
+    Returns:
+        Mapping of variant name to WebP bytes
+    """
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        img.load()
+        has_alpha = img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+        source = img.convert("RGBA" if has_alpha else "RGB")
+
+    variants: dict[str, bytes] = {}
+    # Largest first so each smaller variant downsamples an already reduced image
+    for name, max_edge in sorted(IMAGE_VARIANTS.items(), key=lambda v: v[1], reverse=True):
+        source.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        source.save(buffer, format="WEBP", quality=WEBP_QUALITY, method=4)
+        variants[name] = buffer.getvalue()
+    return variants
+
+
+class ImageVariantService:
+    """Generates and stores derivatives in the background."""
+
+    def __init__(self, concurrency: int | None = None) -> None:
+        """Initialize service with a bound on concurrent renders."""
+        self._semaphore = asyncio.Semaphore(concurrency or settings.IMAGE_VARIANT_CONCURRENCY)
+        self._tasks: set[asyncio.Task] = set()
+        # Originals with a generation in flight (avoids scheduling duplicates)
+        self._pending: dict[str, asyncio.Task] = {}
+
+    @traced("image_variants.generate")
+    async def generate(self, object_key: str, image_bytes: bytes) -> dict[str, str]:
+        """Render and upload all derivatives of an original.
+
+        Args:
+            object_key: Object key of the original
+            image_bytes: Encoded original image
+
+        Returns:
+            Mapping of variant name to stored object key (failed uploads omitted)
+        """
+        async with self._semaphore:
+            variants = await asyncio.to_thread(render_variants, image_bytes)
+
+            stored: dict[str, str] = {}
+            for name, data in variants.items():
+                key = variant_key(object_key, name)
+                # oss2 is synchronous; keep it off the event loop
+                if await asyncio.to_thread(storage_service.upload_file, key, data, "image/webp"):
+                    stored[name] = key
+                else:
+                    logger.error(f"[ImageVariants] Failed to upload {key}")
+
+        logger.info(f"[ImageVariants] Stored {len(stored)} variants for {object_key}")
+        return stored
+
+    def schedule(self, object_key: str, image_bytes: bytes) -> asyncio.Task:
+        """Generate derivatives without blocking the caller.
+
+        Args:
+            object_key: Object key of the original
+            image_bytes: Encoded original image
+
+        Returns:
+            The background task (already tracked; awaiting is optional)
+        """
+        return self._track(object_key, self._generate_logged(object_key, image_bytes))
+
+    async def variant_url(
+        self, object_key: str, variant: str, image_bytes: bytes | None = None
+    ) -> str | None:
+        """Signed URL of a derivative, if it has been stored.
+
+        A missing derivative is (re)generated in the background, from
+        image_bytes if given, otherwise from the stored original.
+
+        Args:
+            object_key: Object key of the original
+            variant: Variant name ("thumb", "medium")
+            image_bytes: Encoded original, if the caller already holds it
+
+        Returns:
+            The derivative's URL, or None (callers fall back to the original)
+        """
+        if await asyncio.to_thread(storage_service.file_exists, variant_key(object_key, variant)):
+            return storage_service.get_file_url(object_key, variant=variant)
+
+        if object_key not in self._pending:
+            if image_bytes is not None:
+                self.schedule(object_key, image_bytes)
+            else:
+                self._track(object_key, self._regenerate(object_key))
+        return None
+
+    def pending(self, object_key: str) -> asyncio.Task | None:
+        """The in-flight generation for an original, if any."""
+        return self._pending.get(object_key)
+
+    def _track(self, object_key: str, coro: Coroutine[Any, Any, dict[str, str]]) -> asyncio.Task:
+        """Run a generation coroutine as a tracked background task."""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        self._pending[object_key] = task
+        task.add_done_callback(lambda done: self._on_done(object_key, done))
+        EXECUTOR_QUEUE_DEPTH.labels("image_variants").inc()
+        return task
+
+    def _on_done(self, object_key: str, task: asyncio.Task) -> None:
+        """Stop tracking a finished task."""
+        self._tasks.discard(task)
+        if self._pending.get(object_key) is task:
+            del self._pending[object_key]
+        EXECUTOR_QUEUE_DEPTH.labels("image_variants").dec()
+
+    async def _generate_logged(self, object_key: str, image_bytes: bytes) -> dict[str, str]:
+        """Run generate() and log instead of raising (background use)."""
+        try:
+            return await self.generate(object_key, image_bytes)
+        except Exception as e:
+            logger.error(f"[ImageVariants] Derivative generation failed for {object_key}: {e}")
+            return {}
+
+    async def _regenerate(self, object_key: str) -> dict[str, str]:
+        """Generate derivatives from the stored original."""
+        image_bytes = await asyncio.to_thread(storage_service.download_file, object_key)
+        if image_bytes is None:
+            logger.warning(f"[ImageVariants] Original {object_key} unavailable, derivatives not generated")
+            return {}
+        return await self._generate_logged(object_key, image_bytes)
+
+    async def shutdown(self, timeout: float = 10.0) -> None:
+        """Wait briefly for pending derivatives, then cancel the rest."""
+        if not self._tasks:
+            return
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+
+
+# Singleton instance
+image_variant_service = ImageVariantService()
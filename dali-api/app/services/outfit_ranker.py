@@ -0,0 +1,213 @@
+"""Vectorized outfit ranking.
+
+Each candidate outfit is encoded once, at startup, as feature arrays:
+- the palette index of every item color (nearest COLOR_PALETTE entry in Lab)
+- the slot every item fills, so the user's garment can stand in for one
+- a one-hot row over the style-tag vocabulary
+- its occasion, scored against the requested one via OCCASION_AFFINITY
+- a modifier per body type from the cuts its items use
+
+A request is then scored against every candidate at once with NumPy
+gathers and matrix products over the precomputed palette harmony matrix;
+there are no per-candidate Python loops on the request path.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.core.color import harmony_matrix, hex_to_lab, nearest_palette_indices
+
+# Weight of each feature in the final score (sums to 1, so scores are in [0, 1])
+SCORE_WEIGHTS: dict[str, float] = {
+    "color": 0.35,
+    "occasion": 0.30,
+    "style": 0.15,
+    "user_style": 0.10,
+    "body_type": 0.10,
+}
+# Score of a feature the request carries no information for (no colors,
+# no body type...), so missing inputs lower confidence instead of raising it
+UNKNOWN_FEATURE_SCORE = 0.5
+
+# How well an outfit for one occasion suits another (symmetric, 1.0 on the diagonal)
+OCCASION_AFFINITY: dict[frozenset[str], float] = {
+    frozenset({"商务会议", "职场通勤"}): 0.7,
+    frozenset({"浪漫约会", "朋友聚会"}): 0.4,
+    frozenset({"日常出行", "居家休闲"}): 0.5,
+    frozenset({"日常出行", "朋友聚会"}): 0.5,
+    frozenset({"日常出行", "职场通勤"}): 0.3,
+}
+DEFAULT_OCCASION = "日常出行"
+
+# Outfit slot taken by each garment type from vision analysis
+GARMENT_SLOTS: dict[str, str] = {
+    "上衣": "上衣",
+    "外套": "上衣",
+    "裤子": "下装",
+    "裙子": "下装",
+    "配饰": "配饰",
+}
+
+# Cuts that flatter (+) or work against (-) each body type, matched on item names
+BODY_TYPE_CUTS: dict[str, tuple[tuple[str, ...], tuple[str, ...]]] = {
+    "梨形": (("A字", "阔腿", "泡泡袖", "开衫"), ("紧身", "铅笔")),
+    "苹果形": (("V领", "开衫", "西装", "A字"), ("紧身", "短款")),
+    "沙漏形": (("西装", "修身", "真丝", "连衣裙"), ("宽松", "oversize")),
+    "直筒形": (("叠搭", "背心", "百褶", "马甲"), ()),
+    "倒三角形": (("阔腿", "百褶", "A字", "V领"), ("泡泡袖", "垫肩")),
+}
+
+
+@dataclass(frozen=True)
+class RankedOutfit:
+    """A candidate outfit with its score and per-feature breakdown."""
+
+    template: dict
+    occasion: str
+    score: float
+    features: dict[str, float]
+
+
+class OutfitRanker:
+    """Scores a garment against a catalog of outfit templates."""
+
+    def __init__(self, catalog: dict[str, list[dict]]) -> None:
+        """Encode every template in the catalog.
+
+        Args:
+            catalog: Outfit templates keyed by occasion (see OUTFIT_TEMPLATES)
+        """
+        self.templates = [template for templates in catalog.values() for template in templates]
+        self.occasions = [getattr(occasion, "value", occasion) for occasion in catalog]
+        self.template_occasions = np.array(
+            [index for index, templates in enumerate(catalog.values()) for _ in templates], dtype=np.intp
+        )
+        n = len(self.templates)
+        width = max(len(template["items"]) for template in self.templates)
+
+        # Item colors and slots, padded to the widest template
+        self.slots = sorted({item["type"] for template in self.templates for item in template["items"]})
+        self.item_mask = np.zeros((n, width), dtype=bool)
+        self.item_slots = np.full((n, width), -1, dtype=np.intp)
+        hexes = []
+        for row, template in enumerate(self.templates):
+            for column, item in enumerate(template["items"]):
+                self.item_mask[row, column] = True
+                self.item_slots[row, column] = self.slots.index(item["type"])
+                hexes.append(item["hex"])
+        self.item_colors = np.zeros((n, width), dtype=np.intp)
+        self.item_colors[self.item_mask] = nearest_palette_indices(hex_to_lab(hexes))[0]
+
+        # Style tags, one-hot with L2-normalized rows for cosine similarity
+        self.vocabulary = {
+            tag: index
+            for index, tag in enumerate(sorted({tag for template in self.templates for tag in template["style_tags"]}))
+        }
+        styles = np.zeros((n, len(self.vocabulary)))
+        for row, template in enumerate(self.templates):
+            styles[row, [self.vocabulary[tag] for tag in template["style_tags"]]] = 1.0
+        self.styles = styles / np.linalg.norm(styles, axis=1, keepdims=True)
+
+        # Occasion affinity between the requested occasion (row) and each template's (column)
+        self.affinity = np.eye(len(self.occasions))
+        for a, first in enumerate(self.occasions):
+            for b, second in enumerate(self.occasions):
+                if a != b:
+                    self.affinity[a, b] = OCCASION_AFFINITY.get(frozenset({first, second}), 0.0)
+
+        # Body type modifiers: 0.5 neutral, up for flattering cuts, down for unflattering ones
+        self.body_types = list(BODY_TYPE_CUTS)
+        self.body_modifiers = np.full((n, len(self.body_types)), 0.5)
+        for row, template in enumerate(self.templates):
+            names = "".join(item["name"] for item in template["items"])
+            for column, (flattering, unflattering) in enumerate(BODY_TYPE_CUTS.values()):
+                self.body_modifiers[row, column] += 0.5 * any(cut in names for cut in flattering)
+                self.body_modifiers[row, column] -= 0.5 * any(cut in names for cut in unflattering)
+
+    def rank(
+        self,
+        garment_type: str,
+        colors: list[dict],
+        style_tags: list[str],
+        occasion: str,
+        body_type: str | None = None,
+        user_styles: list[str] | None = None,
+        top_k: int = 3,
+    ) -> list[RankedOutfit]:
+        """Score every template for a garment and return the best ones.
+
+        Args:
+            garment_type: Type of the user's garment (上衣, 裤子, etc.)
+            colors: Garment colors as dicts with hex and percentage
+            style_tags: Style tags from garment analysis
+            occasion: Requested occasion
+            body_type: User's body type, if known
+            user_styles: User's preferred styles, if known
+            top_k: Number of outfits to return
+
+        Returns:
+            Up to top_k outfits, best first, with score in [0, 1]
+        """
+        features = {
+            "color": self._color_scores(garment_type, colors),
+            "occasion": self._occasion_scores(occasion),
+            "style": self._style_scores(style_tags),
+            "user_style": self._style_scores(user_styles or []),
+            "body_type": self._body_type_scores(body_type),
+        }
+        matrix = np.column_stack(
+            [np.full(len(self.templates), UNKNOWN_FEATURE_SCORE) if values is None else values for values in features.values()]
+        )
+        scores = matrix @ np.array([SCORE_WEIGHTS[name] for name in features])
+
+        best = np.argsort(-scores, kind="stable")[:top_k]
+        return [
+            RankedOutfit(
+                template=self.templates[row],
+                occasion=self.occasions[self.template_occasions[row]],
+                score=float(scores[row]),
+                features={name: float(value) for name, value in zip(features, matrix[row], strict=True)},
+            )
+            for row in best
+        ]
+
+    def _color_scores(self, garment_type: str, colors: list[dict]) -> np.ndarray | None:
+        """Mean harmony between the garment's colors and each outfit's other items."""
+        colors = [color for color in colors if color.get("hex")]
+        if not colors:
+            return None
+
+        indices, _ = nearest_palette_indices(hex_to_lab([color["hex"] for color in colors]))
+        shares = np.array([float(color.get("percentage") or 1.0) for color in colors])
+        garment = np.zeros(len(harmony_matrix()))
+        np.add.at(garment, indices, shares / shares.sum())
+
+        # Harmony of the garment with each palette color, gathered per item
+        item_harmony = (garment @ harmony_matrix())[self.item_colors]
+        # The garment takes its slot's place, so that item is not scored against it
+        slot = GARMENT_SLOTS.get(garment_type, garment_type)
+        mask = self.item_mask
+        if slot in self.slots:
+            mask = mask & (self.item_slots != self.slots.index(slot))
+        return (item_harmony * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1)
+
+    def _occasion_scores(self, occasion: str) -> np.ndarray:
+        """Affinity of each outfit's occasion with the requested one."""
+        if occasion not in self.occasions:
+            occasion = DEFAULT_OCCASION
+        return self.affinity[self.occasions.index(occasion), self.template_occasions]
+
+    def _style_scores(self, tags: list[str]) -> np.ndarray | None:
+        """Cosine similarity between the tags and each outfit's style tags."""
+        if not tags:
+            return None
+        columns = sorted({self.vocabulary[tag] for tag in tags if tag in self.vocabulary})
+        # Tags outside the vocabulary still count towards the query norm
+        return self.styles[:, columns].sum(axis=1) / np.sqrt(len(set(tags)))
+
+    def _body_type_scores(self, body_type: str | None) -> np.ndarray | None:
+        """Body type modifier of each outfit."""
+        if body_type not in self.body_types:
+            return None
+        return self.body_modifiers[:, self.body_types.index(body_type)]
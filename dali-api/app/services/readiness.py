@@ -0,0 +1,162 @@
+"""Startup warm-up and readiness gating.
+
+Right after a deploy the first requests on a worker used to pay for DNS,
+TLS handshakes, SDK imports and new Postgres connections, while /health
+already reported ok. The lifespan now starts a warm-up in the background:
+
+- postgres:     opens the pool to pool_size connections (SELECT 1 on each)
+- dashscope:    primes the shared LLM and Qwen-VL HTTP clients
+- siliconflow:  primes the image-generation HTTP client
+- oss:          HEAD on HEALTH_OSS_SENTINEL_KEY through the OSS session
+- integrations: builds the lazy SDK clients (with INTEGRATION_WARM_UP)
+
+GET /api/v1/ready returns 503 until warm-up has finished and every required
+dependency (Postgres) is up, so the load balancer only routes to warm
+workers. Upstream vendors are reported but do not gate readiness: a
+DashScope outage should degrade generation, not drain the whole fleet.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import AsyncExitStack
+
+from app.config import settings
+from app.services.health import Check, DependencyStatus, run_check
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_database_pool() -> None:
+    """Open pool_size connections at once and run SELECT 1 on each."""
+    from sqlalchemy import text
+
+    from app.db.session import engine
+
+    async with AsyncExitStack() as stack:
+        connections = await asyncio.gather(
+            *(stack.enter_async_context(engine.connect()) for _ in range(engine.pool.size()))
+        )
+        await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in connections))
+
+
+async def prime_http_client(client_owner: object, url: str) -> None:
+    """Open a keep-alive connection to a host through a shared client.
+
+    Any HTTP response means DNS, TCP and TLS are done; the status is not
+    checked (the base URLs answer 404 to an unauthenticated HEAD).
+    """
+    await client_owner.client.head(url)  # type: ignore[attr-defined]
+
+
+async def prime_dashscope() -> None:
+    """Prime the LLM and Qwen-VL clients."""
+    from app.integrations.qwen_vl import qwen_vl_client
+    from app.services.streaming_generator import streaming_generator
+
+    await asyncio.gather(
+        prime_http_client(streaming_generator, settings.DASHSCOPE_BASE_URL),
+        prime_http_client(qwen_vl_client, settings.DASHSCOPE_BASE_URL),
+    )
+
+
+async def prime_siliconflow() -> None:
+    """Prime the image-generation client."""
+    from app.integrations.siliconflow import siliconflow_client
+
+    await prime_http_client(siliconflow_client, settings.SILICONFLOW_BASE_URL)
+
+
+async def prime_oss() -> None:
+    """HEAD the sentinel object (builds the OSS client and its session)."""
+    from app.services.storage import storage_service
+
+    await asyncio.to_thread(storage_service.file_exists, settings.HEALTH_OSS_SENTINEL_KEY)
+
+
+async def build_integrations() -> None:
+    """Build the lazy integration clients (blocking SDK imports)."""
+    from app.core.lazy import warm_up
+
+    failed = {name: error for name, error in (await asyncio.to_thread(warm_up)).items() if error != "ok"}
+    if failed:
+        raise RuntimeError("; ".join(f"{name}: {error}" for name, error in failed.items()))
+
+
+def _oss_configured() -> bool:
+    from app.services.storage import storage_service
+
+    return storage_service._use_real_oss
+
+
+class ReadinessService:
+    """Runs the startup warm-up and tracks whether the worker is ready."""
+
+    def __init__(self) -> None:
+        """Initialize service (not ready until warm-up has run)."""
+        self.ready = False
+        self.warming = False
+        self.dependencies: dict[str, DependencyStatus] = {}
+        self._task: asyncio.Task | None = None
+
+    def checks(self) -> dict[str, tuple[Check | None, bool]]:
+        """Warm-up checks as {name: (check or None to skip, required)}."""
+        return {
+            "postgres": (warm_database_pool, True),
+            "dashscope": (prime_dashscope if settings.DASHSCOPE_API_KEY else None, False),
+            "siliconflow": (prime_siliconflow if settings.SILICONFLOW_API_KEY else None, False),
+            "oss": (prime_oss if _oss_configured() else None, False),
+            "integrations": (build_integrations if settings.INTEGRATION_WARM_UP else None, False),
+        }
+
+    def start(self) -> None:
+        """Start warming up in the background (call from the lifespan)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._warm_up_until_ready())
+
+    async def _warm_up_until_ready(self) -> None:
+        """Warm up, retrying while a required dependency is down."""
+        while not await self.warm_up():
+            await asyncio.sleep(settings.WARM_UP_RETRY_SECONDS)
+
+    async def warm_up(self) -> bool:
+        """Run every check concurrently.
+
+        Returns:
+            Whether all required dependencies are up
+        """
+        self.warming = True
+        start = time.perf_counter()
+        checks = self.checks()
+        try:
+            results = await asyncio.gather(
+                *(
+                    run_check(name, check, required, settings.WARM_UP_PROBE_TIMEOUT)
+                    for name, (check, required) in checks.items()
+                )
+            )
+        finally:
+            self.warming = False
+        self.dependencies = dict(zip(checks, results, strict=True))
+        self.ready = all(dep.status == "ok" for dep in self.dependencies.values() if dep.required)
+
+        summary = ", ".join(f"{name}={dep.status}" for name, dep in self.dependencies.items())
+        log = logger.info if self.ready else logger.warning
+        log(f"[Readiness] Warm-up took {(time.perf_counter() - start) * 1000:.0f}ms "
+            f"(ready={self.ready}): {summary}")
+        return self.ready
+
+    async def shutdown(self) -> None:
+        """Stop a warm-up still in progress."""
+        self.ready = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Singleton instance
+readiness_service = ReadinessService()
@@ -0,0 +1,176 @@
+"""Cache of generated outfit answers.
+
+Many streams ask the same question, e.g. 白色T恤 / 上衣 / 职场通勤. Their LLM
+answers (visible text with the draw prompt, plus the generated image) are
+kept in memory per process and replayed instead of calling the LLM again.
+
+- Key: hash of the normalized user message and the prompt version, so an
+  edited system prompt or model never replays older answers
+- Near matches (optional): requests of the same category, occasion and
+  colors whose descriptions embed within RESPONSE_CACHE_SIMILARITY
+  (cosine of hashed character n-grams) share answers
+- Variety: a key collects RESPONSE_CACHE_VARIANTS answers before any is
+  replayed, then hands them out in turn
+- Expiry: answers last RESPONSE_CACHE_TTL_SECONDS, capped at the storage GC
+  minimum age since cached images are not GC roots; keys are evicted LRU
+  beyond RESPONSE_CACHE_MAX_KEYS
+"""
+
+import hashlib
+import logging
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from app.config import settings
+from app.core.metrics import RESPONSE_CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 256  # Buckets for hashed character unigrams and bigrams
+
+
+def normalize(text: str) -> str:
+    """Fold width and case and collapse whitespace, so trivial edits share a key."""
+    return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+
+def embed_text(text: str) -> np.ndarray:
+    """Unit vector of the text's hashed character unigrams and bigrams."""
+    text = normalize(text)
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for gram in [*text, *(text[i : i + 2] for i in range(len(text) - 1))]:
+        vector[zlib.crc32(gram.encode()) % EMBEDDING_DIM] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+@dataclass(frozen=True)
+class CacheKey:
+    """Where a generation request's answers are cached."""
+
+    exact: str  # Hash of the prompt version and normalized user message
+    scope: str  # Near matches must share it (prompt version, category, occasion, colors)
+    vector: np.ndarray  # Embedding of the item description
+
+    @classmethod
+    def build(
+        cls,
+        version: str,
+        user_message: str,
+        description: str,
+        category: str,
+        occasion: str,
+        colors: list[str],
+    ) -> "CacheKey":
+        """Key of a request for the given prompt version."""
+        exact = hashlib.sha256(f"{version}\n{normalize(user_message)}".encode()).hexdigest()
+        scope = hashlib.sha256("\n".join([version, category, occasion, *colors]).encode()).hexdigest()
+        return cls(exact=exact, scope=scope, vector=embed_text(description))
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """One LLM answer and the image generated for it."""
+
+    text: str  # Raw LLM output, <draw_prompt> tag included
+    base_key: str  # img2img base image (object key or URL) the image was generated from
+    image_key: str | None  # Object key of the generated image
+    created_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class _Entry:
+    """Answers collected for one key."""
+
+    scope: str
+    vector: np.ndarray
+    variants: list[CachedResponse] = field(default_factory=list)
+    turn: int = 0
+
+
+class ResponseCache:
+    """In-memory LRU of generation answers with TTL and rotating variants."""
+
+    def __init__(self) -> None:
+        """Create an empty cache."""
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Number of keys."""
+        return len(self._entries)
+
+    def get(self, key: CacheKey) -> CachedResponse | None:
+        """The next answer to replay for a request, if its key is full."""
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return None
+        result, exact = "hit", key.exact
+        if not self._ready(exact):
+            result, exact = "similar_hit", self._similar(key)
+        if exact is None:
+            RESPONSE_CACHE_LOOKUPS.labels("miss").inc()
+            return None
+
+        RESPONSE_CACHE_LOOKUPS.labels(result).inc()
+        entry = self._entries[exact]
+        self._entries.move_to_end(exact)
+        response = entry.variants[entry.turn % len(entry.variants)]
+        entry.turn += 1
+        return response
+
+    def put(self, key: CacheKey, response: CachedResponse) -> None:
+        """Add an answer to its key, until the key holds RESPONSE_CACHE_VARIANTS."""
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return
+        entry = self._entries.get(key.exact)
+        if entry is None:
+            entry = self._entries[key.exact] = _Entry(scope=key.scope, vector=key.vector)
+        self._expire(entry)
+        if len(entry.variants) < settings.RESPONSE_CACHE_VARIANTS:
+            entry.variants.append(response)
+        self._entries.move_to_end(key.exact)
+        while len(self._entries) > settings.RESPONSE_CACHE_MAX_KEYS:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every answer."""
+        self._entries.clear()
+
+    def _ready(self, exact: str) -> bool:
+        """Whether a key has collected all its variants (dropping expired ones first)."""
+        entry = self._entries.get(exact)
+        if entry is None:
+            return False
+        self._expire(entry)
+        if not entry.variants:
+            del self._entries[exact]
+            return False
+        return len(entry.variants) >= settings.RESPONSE_CACHE_VARIANTS
+
+    def _similar(self, key: CacheKey) -> str | None:
+        """The full key in the same scope whose description is most similar, if close enough."""
+        threshold = settings.RESPONSE_CACHE_SIMILARITY
+        if threshold <= 0:
+            return None
+        candidates = [exact for exact, entry in self._entries.items() if entry.scope == key.scope]
+        candidates = [exact for exact in candidates if exact != key.exact and self._ready(exact)]
+        if not candidates:
+            return None
+        similarities = np.stack([self._entries[exact].vector for exact in candidates]) @ key.vector
+        best = int(np.argmax(similarities))
+        return candidates[best] if similarities[best] >= threshold else None
+
+    @staticmethod
+    def _expire(entry: _Entry) -> None:
+        """Drop answers past their TTL."""
+        ttl = min(settings.RESPONSE_CACHE_TTL_SECONDS, settings.STORAGE_GC_MIN_AGE_HOURS * 3600)
+        now = time.monotonic()
+        entry.variants = [variant for variant in entry.variants if now - variant.created_at < ttl]
+
+
+# Singleton instance
+response_cache = ResponseCache()
@@ -1,20 +1,20 @@
 """SMS service using Alibaba Cloud SMS SDK.
 
-This module provides SMS verification code functionality.
+This module provides SMS verification code functionality. The SMS SDK is
+imported with the first client, so development mode never loads it.
 """
 
 import random
 import string
-
-from alibabacloud_dysmsapi20170525 import models as sms_models
-from alibabacloud_dysmsapi20170525.client import Client
-from alibabacloud_tea_openapi import models as open_api_models
-from alibabacloud_tea_util import models as util_models
+from typing import TYPE_CHECKING
 
 from app.config import settings
 from app.core.exceptions import RateLimitedError, SMSError
 from app.services.verification_store import verification_store
 
+if TYPE_CHECKING:
+    from alibabacloud_dysmsapi20170525.client import Client
+
 
 class SMSService:
     """SMS service for sending verification codes via Alibaba Cloud."""
@@ -23,13 +23,16 @@ class SMSService:
         """Initialize SMS service with Alibaba Cloud credentials."""
         self._client: Client | None = None
 
-    def _get_client(self) -> Client:
+    def _get_client(self) -> "Client":
         """Get or create Alibaba Cloud SMS client.
 
         Returns:
             Configured SMS client
         """
         if self._client is None:
+            from alibabacloud_dysmsapi20170525.client import Client
+            from alibabacloud_tea_openapi import models as open_api_models
+
             config = open_api_models.Config(
                 access_key_id=settings.SMS_ACCESS_KEY_ID,
                 access_key_secret=settings.SMS_ACCESS_KEY_SECRET,
@@ -80,6 +83,9 @@ class SMSService:
 
         # Send SMS via Alibaba Cloud
         try:
+            from alibabacloud_dysmsapi20170525 import models as sms_models
+            from alibabacloud_tea_util import models as util_models
+
             client = self._get_client()
             request = sms_models.SendSmsRequest(
                 phone_numbers=phone,
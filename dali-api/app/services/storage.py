@@ -5,12 +5,44 @@ Use real OSS when credentials are configured, otherwise falls back to mock.
 """
 
 import logging
+import posixpath
+from collections.abc import Iterator
 from datetime import UTC, datetime, timedelta
+from urllib.parse import unquote, urlsplit
 
 from app.config import settings
+from app.core.tracing import traced
 
 logger = logging.getLogger(__name__)
 
+# Derivative image sizes (max edge in px), stored as WebP next to the original
+IMAGE_VARIANTS: dict[str, int] = {
+    "thumb": 256,
+    "medium": 768,
+}
+
+
+def variant_key(object_key: str, variant: str) -> str:
+    """Get the object key of a derivative image.
+
+    Example: users/1/photos/a.jpg + thumb -> users/1/photos/a_thumb.webp
+
+    Args:
+        object_key: Object key of the original image
+        variant: Variant name from IMAGE_VARIANTS
+
+    Returns:
+        Object key of the derivative
+
+    Raises:
+        ValueError: If the variant is unknown
+    """
+    if variant not in IMAGE_VARIANTS:
+        raise ValueError(f"Unknown image variant: {variant}")
+    # Only the file name's extension: directories may contain dots too
+    stem, _ = posixpath.splitext(object_key)
+    return f"{stem}_{variant}.webp"
+
 
 class StorageService:
     """Storage service for managing file uploads.
@@ -25,9 +57,9 @@ class StorageService:
 
         if self._use_real_oss:
             # Import and initialize real OSS client
-            from app.integrations.alibaba_oss import oss_client
+            from app.integrations.alibaba_oss import oss_base_url, oss_client
             self._oss_client = oss_client
-            self.base_url = f"https://{settings.ALIBABA_OSS_BUCKET}.{settings.ALIBABA_OSS_ENDPOINT}"
+            self.base_url = oss_base_url()
         else:
             # Use mock implementation
             self._oss_client = None
@@ -78,17 +110,28 @@ class StorageService:
 
         return upload_url, expires_at
 
-    def get_file_url(self, object_key: str, slash_safe: bool = True) -> str:
+    def get_file_url(
+        self,
+        object_key: str,
+        slash_safe: bool = True,
+        variant: str | None = None,
+    ) -> str:
         """
         Get the public URL for an uploaded file.
 
         Args:
             object_key: The object key (path) in storage
             slash_safe: Whether to preserve slashes in path (default: True for App)
+            variant: Optional derivative size ("thumb", "medium"). Derivatives are
+                generated asynchronously and this does not check that one exists;
+                use image_variant_service.variant_url() to get only stored ones
 
         Returns:
             Public URL to access the file
         """
+        if variant:
+            object_key = variant_key(object_key, variant)
+
         if self._use_real_oss:
             # Use presigned URL for private bucket access
             url = self._oss_client.generate_presigned_download_url(
@@ -108,6 +151,26 @@ class StorageService:
 
 
 
+    def object_key_from_url(self, url: str) -> str | None:
+        """Recover the object key from a URL served by this storage.
+
+        Args:
+            url: A (possibly presigned) URL returned by get_file_url
+
+        Returns:
+            The object key, or None if the URL points elsewhere
+        """
+        parts = urlsplit(url)
+        base = urlsplit(self.base_url)
+        if parts.netloc != base.netloc:
+            return None
+        path = unquote(parts.path)
+        # Path-style endpoints serve objects under /bucket/...
+        if base.path and not path.startswith(f"{base.path}/"):
+            return None
+        return path[len(base.path):].lstrip("/") or None
+
+    @traced("storage.upload_file")
     def upload_file(self, object_key: str, data: bytes, content_type: str = "image/jpeg") -> bool:
         """Upload file content directly to storage.
 
@@ -126,6 +189,37 @@ class StorageService:
             logger.info(f"[StorageService] Mock upload to {object_key} ({len(data)} bytes)")
             return True
 
+    @traced("storage.file_exists")
+    def file_exists(self, object_key: str) -> bool:
+        """
+        Check whether a file exists in storage.
+
+        Args:
+            object_key: The object key (path) to check
+
+        Returns:
+            True if the object exists (always False in mock mode)
+        """
+        if self._use_real_oss:
+            return self._oss_client.object_exists(object_key)
+        return False
+
+    @traced("storage.download_file")
+    def download_file(self, object_key: str) -> bytes | None:
+        """
+        Download a file from storage.
+
+        Args:
+            object_key: The object key (path) to read
+
+        Returns:
+            File content, or None if unavailable (always None in mock mode)
+        """
+        if self._use_real_oss:
+            return self._oss_client.get_object(object_key)
+        return None
+
+    @traced("storage.delete_file")
     def delete_file(self, object_key: str) -> bool:
         """
         Delete a file from storage.
@@ -143,5 +237,37 @@ class StorageService:
             return True
 
 
+    def iter_files(self, prefix: str) -> Iterator[tuple[str, datetime, int]]:
+        """
+        Iterate over all stored files under a prefix.
+
+        Args:
+            prefix: Object key prefix (e.g. "generated/")
+
+        Yields:
+            Tuples of (object_key, last_modified, size_bytes); nothing in mock mode
+        """
+        if self._use_real_oss:
+            yield from self._oss_client.iter_objects(prefix)
+
+    @traced("storage.delete_files")
+    def delete_files(self, object_keys: list[str]) -> list[str]:
+        """
+        Delete files in bulk (OSS batch delete, up to 1000 keys per call).
+
+        Args:
+            object_keys: The object keys to delete
+
+        Returns:
+            Keys that were deleted
+        """
+        if not self._use_real_oss:
+            return list(object_keys)
+        deleted: list[str] = []
+        for start in range(0, len(object_keys), 1000):
+            deleted.extend(self._oss_client.batch_delete(object_keys[start:start + 1000]))
+        return deleted
+
+
 # Singleton instance
 storage_service = StorageService()
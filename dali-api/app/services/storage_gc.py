@@ -0,0 +1,278 @@
+"""Garbage collection for orphaned OSS objects.
+
+Streams upload generated images before the user decides to keep the outfit,
+and segmentation stores every cutout whether or not it is selected. Objects
+nobody references pile up. The reaper:
+
+1. Collects live object keys from the database: everything an outfit points
+   at, plus blobs with a live reference. Segmentation references only mean
+   "this cutout was shown to the user", so they expire after
+   STORAGE_GC_MIN_AGE_HOURS; a cutout the user kept is live via its outfit
+   or its "wardrobe" reference.
+2. Lists each GC prefix page by page and keeps objects that are not live and
+   older than STORAGE_GC_MIN_AGE_HOURS (derivatives follow their original)
+3. Deletes orphans in throttled OSS batch-delete calls, or only reports them
+   in dry-run mode. A blob's row (and its expired references) is dropped
+   before its object.
+
+Under users/ only the legacy per-user cutouts (users/{id}/segmented/) are
+collected; user photos never are. Run on demand with
+`python -m app.services.storage_gc` (dry run) or `... --delete`.
+"""
+
+import asyncio
+import logging
+import posixpath
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import ColumnElement, delete, exists, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.outfit import Outfit
+from app.models.stored_blob import BlobReference, StoredBlob
+from app.services.content_store import BLOB_PREFIX
+from app.services.storage import IMAGE_VARIANTS, storage_service
+
+logger = logging.getLogger(__name__)
+
+# Prefixes holding server-produced objects that may be abandoned
+GC_PREFIXES: tuple[str, ...] = ("generated/", BLOB_PREFIX, "users/")
+
+# Reference kinds that stop keeping a blob alive after the minimum age
+EXPIRING_REFERENCE_KINDS: tuple[str, ...] = ("segmented",)
+
+REPORT_SAMPLE_SIZE = 20  # Orphan keys included in the report for review
+
+
+def original_stem(object_key: str) -> str:
+    """Key of the original without extension, for originals and derivatives alike.
+
+    Example: generated/a_thumb.webp -> generated/a, generated/a.png -> generated/a
+    """
+    # Split like variant_key: directories may contain dots too
+    stem, extension = posixpath.splitext(object_key)
+    if extension == ".webp":
+        for variant in IMAGE_VARIANTS:
+            if stem.endswith(f"_{variant}"):
+                return stem[: -len(variant) - 1]
+    return stem
+
+
+def is_collectable(object_key: str) -> bool:
+    """Whether the reaper may delete an object under one of the GC prefixes.
+
+    Under users/ only legacy cutouts (users/{id}/segmented/...) qualify.
+    """
+    if object_key.startswith("users/"):
+        return object_key.split("/")[2:3] == ["segmented"]
+    return True
+
+
+def live_reference(cutoff: datetime) -> ColumnElement[bool]:
+    """Condition: the StoredBlob has a reference that keeps it alive.
+
+    Args:
+        cutoff: References of an expiring kind created before this are ignored
+    """
+    return exists().where(
+        BlobReference.digest == StoredBlob.digest,
+        or_(
+            BlobReference.kind.not_in(EXPIRING_REFERENCE_KINDS),
+            BlobReference.created_at >= cutoff,
+        ),
+    )
+
+
+def find_orphans(
+    objects: list[tuple[str, datetime, int]],
+    live_stems: set[str],
+    cutoff: datetime,
+) -> list[tuple[str, int]]:
+    """Select unreferenced objects last modified before the cutoff.
+
+    Args:
+        objects: Listed (object_key, last_modified, size_bytes) tuples
+        live_stems: original_stem() of every referenced key
+        cutoff: Objects modified after this are kept (may still be in flight)
+
+    Returns:
+        List of (object_key, size_bytes) to delete
+    """
+    return [
+        (key, size)
+        for key, modified, size in objects
+        if modified < cutoff and is_collectable(key) and original_stem(key) not in live_stems
+    ]
+
+
+@dataclass
+class GCReport:
+    """Outcome of one reaper run."""
+
+    dry_run: bool
+    scanned: int = 0
+    orphaned: int = 0
+    deleted: int = 0
+    reclaimed_bytes: int = 0
+    sample: list[str] = field(default_factory=list)
+
+
+class StorageReaper:
+    """Finds and deletes unreferenced generated and segmented objects."""
+
+    def __init__(
+        self,
+        min_age: timedelta | None = None,
+        batch_size: int | None = None,
+        batch_pause: float | None = None,
+    ) -> None:
+        """Initialize reaper; defaults come from settings."""
+        self.min_age = min_age or timedelta(hours=settings.STORAGE_GC_MIN_AGE_HOURS)
+        self.batch_size = min(batch_size or settings.STORAGE_GC_BATCH_SIZE, 1000)
+        self.batch_pause = settings.STORAGE_GC_BATCH_PAUSE_SECONDS if batch_pause is None else batch_pause
+
+    async def live_stems(self, db: AsyncSession, cutoff: datetime) -> set[str]:
+        """Collect original_stem() of every object the database still references.
+
+        Args:
+            db: Database session
+            cutoff: Expiring references created before this do not count
+        """
+        keys: set[str] = set()
+
+        outfits = await db.stream(
+            select(Outfit.generated_image_key, Outfit.source_image_url, Outfit.generated_image_url)
+        )
+        async for generated_key, source_url, generated_url in outfits:
+            if generated_key:
+                keys.add(generated_key)
+            for url in (source_url, generated_url):
+                if url and (key := storage_service.object_key_from_url(url)):
+                    keys.add(key)
+
+        referenced = await db.stream_scalars(
+            select(StoredBlob.object_key).where(live_reference(cutoff))
+        )
+        async for key in referenced:
+            keys.add(key)
+
+        return {original_stem(key) for key in keys}
+
+    async def run(self, db: AsyncSession, dry_run: bool = True) -> GCReport:
+        """Scan all GC prefixes and delete (or report) orphaned objects.
+
+        Args:
+            db: Database session
+            dry_run: Only report what would be deleted
+
+        Returns:
+            GCReport with counts and a sample of orphan keys
+        """
+        report = GCReport(dry_run=dry_run)
+        cutoff = datetime.now(UTC) - self.min_age
+        live = await self.live_stems(db, cutoff)
+
+        for prefix in GC_PREFIXES:
+            # Listing is synchronous; only the (small) orphan list comes back
+            scanned, orphans = await asyncio.to_thread(self._scan, prefix, live, cutoff)
+            report.scanned += scanned
+            report.orphaned += len(orphans)
+            report.sample.extend(key for key, _ in orphans[: REPORT_SAMPLE_SIZE - len(report.sample)])
+
+            if dry_run:
+                report.reclaimed_bytes += sum(size for _, size in orphans)
+                continue
+
+            sizes = dict(orphans)
+            for start in range(0, len(orphans), self.batch_size):
+                batch = [key for key, _ in orphans[start:start + self.batch_size]]
+                if prefix == BLOB_PREFIX:
+                    batch = await self._release_blobs(db, batch, cutoff)
+                deleted = await asyncio.to_thread(storage_service.delete_files, batch)
+                report.deleted += len(deleted)
+                report.reclaimed_bytes += sum(sizes.get(key, 0) for key in deleted)
+                # Throttle so the reaper never competes with request traffic
+                await asyncio.sleep(self.batch_pause)
+
+        logger.info(
+            f"[StorageGC] {'Dry run' if dry_run else 'Run'}: scanned={report.scanned} "
+            f"orphaned={report.orphaned} deleted={report.deleted} "
+            f"bytes={report.reclaimed_bytes}"
+        )
+        return report
+
+    def _scan(self, prefix: str, live: set[str], cutoff: datetime) -> tuple[int, list[tuple[str, int]]]:
+        """List a prefix page by page, returning (scanned count, orphans)."""
+        scanned = 0
+        orphans: list[tuple[str, int]] = []
+        page: list[tuple[str, datetime, int]] = []
+        for obj in storage_service.iter_files(prefix):
+            scanned += 1
+            page.append(obj)
+            if len(page) >= 1000:
+                orphans.extend(find_orphans(page, live, cutoff))
+                page.clear()
+        orphans.extend(find_orphans(page, live, cutoff))
+        return scanned, orphans
+
+    async def _release_blobs(self, db: AsyncSession, keys: list[str], cutoff: datetime) -> list[str]:
+        """Drop blob rows without a live reference before their objects are deleted.
+
+        Expired references go with the row (ON DELETE CASCADE). A reference
+        may have been added or refreshed since the scan (the same cutout was
+        segmented again); those blobs keep their row and are skipped.
+
+        Returns:
+            Keys that are safe to delete
+        """
+        await db.execute(
+            delete(StoredBlob).where(
+                StoredBlob.object_key.in_(keys),
+                ~live_reference(cutoff),
+            )
+        )
+        await db.commit()
+        still_live = await db.scalars(select(StoredBlob.object_key).where(StoredBlob.object_key.in_(keys)))
+        keep = set(still_live)
+        return [key for key in keys if key not in keep]
+
+
+# Singleton instance
+storage_reaper = StorageReaper()
+
+
+async def start_storage_gc_task() -> None:
+    """Run the reaper periodically.
+
+    Call this with asyncio.create_task() in the app lifespan when
+    STORAGE_GC_ENABLED is set.
+    """
+    from app.db.session import async_session_maker
+
+    while True:
+        await asyncio.sleep(settings.STORAGE_GC_INTERVAL_MINUTES * 60)
+        try:
+            async with async_session_maker() as db:
+                await storage_reaper.run(db, dry_run=settings.STORAGE_GC_DRY_RUN)
+        except Exception as e:
+            logger.error(f"[StorageGC] Run failed: {e}")
+
+
+async def _main(dry_run: bool) -> None:
+    """Run the reaper once and print the report."""
+    from app.db.session import async_session_maker
+
+    async with async_session_maker() as db:
+        report = await storage_reaper.run(db, dry_run=dry_run)
+    print(report)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Delete orphaned OSS objects")
+    parser.add_argument("--delete", action="store_true", help="Delete orphans (default: dry run)")
+    args = parser.parse_args()
+    asyncio.run(_main(dry_run=not args.delete))
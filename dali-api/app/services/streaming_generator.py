@@ -7,24 +7,128 @@ This service coordinates the streaming AI generation pipeline:
 4. Deliver events via SSE to frontend
 
 State machine: STREAMING_TEXT → BUFFERING_PROMPT → TRIGGERING_IMAGE → STREAMING_TEXT
+
+With a stored wardrobe, the user's items that best complete the selected
+garment are scored locally (app.services.wardrobe) and listed in the
+prompt; when they already make a strong outfit, it is answered without
+the LLM. Answers to repeated requests are replayed from the response
+cache (app.services.response_cache).
 """
 
 import asyncio
+import hashlib
 import logging
+import time
 import uuid
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, AsyncIterator, Coroutine
+from contextlib import aclosing, asynccontextmanager
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import Any
 
 import httpx
+from opentelemetry import trace
+from opentelemetry.context import Context
+from opentelemetry.trace import Status, StatusCode
 
 from app.config import settings
+from app.core.circuit_breaker import circuit_allows, circuit_guard
+from app.core.deadline import iter_within_deadline, timeout, within_deadline
+from app.core.exceptions import CircuitOpenError, DeadlineExceededError
+from app.core.metrics import (
+    EXECUTOR_QUEUE_DEPTH,
+    GENERATION_WARDROBE,
+    SSE_CANCELLED_WORK,
+    observe_upstream_stream,
+)
+from app.core.tracing import detached_span, tracer
 from app.integrations.qwen_vl import QwenVLError, VisualAnalysisResult, qwen_vl_client
-from app.integrations.siliconflow import SiliconFlowError, siliconflow_client
+from app.integrations.siliconflow import (
+    SiliconFlowError,
+    image_generation_available,
+    siliconflow_client,
+)
+from app.services.ai_orchestrator import OUTFIT_TEMPLATES, OccasionType
+from app.services.color_theory import color_principle, find_colors, palette_name, prompt_facts
+from app.services.generation_usage import GenerationUsage, generation_usage_recorder
+from app.services.image_variants import image_variant_service
+from app.services.response_cache import CachedResponse, CacheKey, response_cache
+from app.services.storage import IMAGE_VARIANTS, storage_service, variant_key
+from app.services.wardrobe import WardrobeMatch, wardrobe_service
 
 logger = logging.getLogger(__name__)
 
+# Circuit breaker of the LLM stream (see app.core.circuit_breaker)
+LLM_STREAM_CIRCUIT = "dashscope.text_generation_stream"
+
+# Client timeout for the LLM stream; the request deadline lowers it
+STREAM_READ_TIMEOUT = 120.0
+
+# Characters per text_chunk when replaying a cached answer
+CACHE_REPLAY_CHUNK = 20
+
+# Wardrobe outfits take one item per slot; pants and skirts fill the same one
+WARDROBE_OUTFIT_SLOTS: dict[str, str] = {"裤子": "下装", "裙子": "下装"}
+
+# English words for draw prompts of wardrobe outfits
+DRAW_PROMPT_GARMENTS: dict[str, str] = {
+    "上衣": "top",
+    "裤子": "pants",
+    "裙子": "skirt",
+    "外套": "coat",
+    "配饰": "accessory",
+}
+DRAW_PROMPT_COLORS: dict[str, str] = {
+    "白色": "white",
+    "黑色": "black",
+    "米色": "beige",
+    "灰色": "gray",
+    "藏蓝色": "navy",
+    "棕色": "brown",
+    "粉色": "pink",
+    "红色": "red",
+    "浅绿色": "light green",
+    "浅蓝色": "light blue",
+    "金色": "gold",
+    "紫色": "purple",
+    "橙色": "orange",
+    "绿色": "green",
+    "银色": "silver",
+}
+DRAW_PROMPT_SCENES: dict[str, str] = {
+    "浪漫约会": "romantic restaurant background",
+    "商务会议": "modern meeting room background",
+    "职场通勤": "office background",
+    "朋友聚会": "lively cafe background",
+    "日常出行": "city street background",
+    "居家休闲": "cozy home background",
+}
+
+
+class SharedBaseImage:
+    """One download of an img2img base image, shared by several generations."""
+
+    def __init__(self, url: str) -> None:
+        """Initialize with the image's URL (downloaded on first use)."""
+        self.url = url
+        self._download: asyncio.Task[bytes] | None = None
+
+    async def get(self) -> bytes:
+        """The image's bytes; the first caller starts the download, the rest wait for it.
+
+        Raises:
+            httpx.HTTPError: If the download failed
+        """
+        if self._download is None:
+            self._download = asyncio.create_task(siliconflow_client.download_base_image(self.url))
+        # A cancelled caller must not cancel the download for the others
+        return await asyncio.shield(self._download)
+
+    def cancel(self) -> None:
+        """Stop a download nobody waits for any more."""
+        if self._download is not None:
+            self._download.cancel()
+
 
 class StreamState(str, Enum):
     """States for the streaming state machine."""
@@ -64,6 +168,25 @@ class StreamingContext:
 
     # Image generation task (runs async)
     image_task: asyncio.Task | None = None
+    # Base image already downloaded for other generations (batch streams)
+    base_image: SharedBaseImage | None = None
+
+    # Parent for spans started by this stream (never made current across yields)
+    trace_context: Context | None = None
+
+    # Tokens, timings and image provider for cost accounting
+    usage: GenerationUsage = field(default_factory=GenerationUsage)
+
+    # Set when a provider circuit was open: "template" (no LLM) or "text_only" (no image)
+    fallback: str | None = None
+
+    # Wardrobe items the outfit was answered with (fast path, no LLM)
+    wardrobe_item_ids: list[str] = field(default_factory=list)
+
+    # Raw LLM output, draw_prompt tag included (for the response cache)
+    response_text: str = ""
+    # Image of a replayed answer, reused instead of generating one
+    cached_image_key: str | None = None
 
 
 # System prompt with draw_prompt instructions
@@ -95,22 +218,32 @@ OUTFIT_SYSTEM_PROMPT = """你是一位专业的时尚搭配顾问，为用户提
 
 请务必包含 <draw_prompt> 标签，内容用英文描述完整的搭配效果。"""
 
+# Cached answers are only replayed for the system prompt they were generated with
+PROMPT_VERSION = hashlib.sha256(OUTFIT_SYSTEM_PROMPT.encode()).hexdigest()[:12]
+
 
 class StreamingOutfitGenerator:
     """Streaming outfit generation with real-time SSE events."""
 
-    TONGYI_API_URL = "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation"
     MODEL_NAME = "qwen-max"
 
     def __init__(self) -> None:
         """Initialize generator."""
+        self.tongyi_api_url = f"{settings.DASHSCOPE_BASE_URL}/services/aigc/text-generation/generation"
         self._client: httpx.AsyncClient | None = None
+        # Deletions of images generated for streams that ended early
+        self._tasks: set[asyncio.Task] = set()
+        # Concurrent LLM streams per process (DashScope limits concurrency per account)
+        self._llm_slots = asyncio.Semaphore(settings.LLM_MAX_CONCURRENT_STREAMS)
 
     @property
     def client(self) -> httpx.AsyncClient:
         """Get or create HTTP client."""
         if self._client is None:
-            self._client = httpx.AsyncClient(timeout=120.0)
+            self._client = httpx.AsyncClient(
+                timeout=STREAM_READ_TIMEOUT,
+                limits=httpx.Limits(keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY),
+            )
         return self._client
 
     async def close(self) -> None:
@@ -119,6 +252,12 @@ class StreamingOutfitGenerator:
             await self._client.aclose()
             self._client = None
 
+    async def shutdown(self, timeout: float = 5.0) -> None:
+        """Wait briefly for pending cleanups, then close the client."""
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=timeout)
+        await self.close()
+
     async def generate_stream(
         self,
         selected_item_url: str,
@@ -126,6 +265,8 @@ class StreamingOutfitGenerator:
         selected_item_category: str,
         occasion: str,
         original_image_url: str | None = None,
+        user_id: str | None = None,
+        base_image: SharedBaseImage | None = None,
     ) -> AsyncGenerator[SSEEvent, None]:
         """Generate outfit recommendations with streaming SSE events.
 
@@ -135,66 +276,283 @@ class StreamingOutfitGenerator:
             selected_item_category: Category of the selected item (e.g., '上衣', '裤子')
             occasion: Selected occasion (职场通勤, 约会, etc.)
             original_image_url: Optional original uploaded image URL for context
+            user_id: Requesting user; if given, usage and cost are recorded
+            base_image: Base image download shared with other generations
 
         Yields:
             SSEEvent objects for frontend consumption
         """
-        ctx = StreamingContext()
+        started_at = time.perf_counter()
+        ctx = StreamingContext(selected_item_url=selected_item_url, base_image=base_image)
         logger.info(f"[StreamGen] Starting generation for outfit_id={ctx.outfit_id}, selected_item={selected_item_description}")
 
-        try:
-            # Step 1: Skip visual analysis (already done during segmentation)
-            yield SSEEvent(event="thinking", data={"message": "正在生成搭配方案..."})
-
-            # Step 2: Build user message with selected item context
-            user_message = self._build_user_message_with_selected_item(
-                selected_item_description=selected_item_description,
-                selected_item_category=selected_item_category,
-                occasion=occasion,
-            )
+        with detached_span(
+            "streaming.generate_stream",
+            attributes={"outfit.id": ctx.outfit_id, "outfit.occasion": occasion},
+        ) as span:
+            ctx.trace_context = trace.set_span_in_context(span)
+            try:
+                # Step 1: Skip visual analysis (already done during segmentation)
+                yield SSEEvent(event="thinking", data={"message": "正在生成搭配方案..."})
+
+                # Step 2: Build user message with selected item context and wardrobe matches
+                matches = await self._wardrobe_matches(
+                    user_id, selected_item_url, selected_item_description, selected_item_category
+                )
+                user_message = self._build_user_message_with_selected_item(
+                    selected_item_description=selected_item_description,
+                    selected_item_category=selected_item_category,
+                    occasion=occasion,
+                    wardrobe_matches=matches,
+                )
 
-            # Step 3: Stream LLM response
-            async for event in self._stream_llm_response(ctx, user_message):
-                yield event
+                # Answers that draw on the user's wardrobe are personal and never cached
+                cache_key = None
+                if not matches:
+                    cache_key = CacheKey.build(
+                        f"{self.MODEL_NAME}:{PROMPT_VERSION}",
+                        user_message,
+                        selected_item_description,
+                        selected_item_category,
+                        occasion,
+                        find_colors(selected_item_description),
+                    )
+                cached = response_cache.get(cache_key) if cache_key else None
+
+                # Step 3: Answer from the wardrobe or the cache, stream LLM response,
+                # or a template while its circuit is open
+                outfit = self._wardrobe_outfit(matches)
+                if outfit:
+                    async for event in self._wardrobe_response(ctx, selected_item_description, occasion, outfit):
+                        yield event
+                elif cached is not None:
+                    async for event in self._cached_response(ctx, cached):
+                        yield event
+                elif circuit_allows(LLM_STREAM_CIRCUIT):
+                    if matches:
+                        GENERATION_WARDROBE.labels("prompt").inc()
+                    try:
+                        # Closed with the stream, so an early exit also ends the upstream call
+                        async with self._llm_slot(), aclosing(self._stream_llm_response(ctx, user_message)) as events:
+                            async for event in events:
+                                yield event
+                    except CircuitOpenError:
+                        # Lost the half-open trial slot; raised before any text was sent
+                        ctx.fallback = "template"
+                else:
+                    ctx.fallback = "template"
+                if ctx.fallback == "template":
+                    async for event in self._template_response(ctx, selected_item_description, occasion):
+                        yield event
+
+                # Step 4: Wait for image generation if started
+                if ctx.image_task and not ctx.image_task.done():
+                    yield SSEEvent(event="image_generating", data={"message": "正在生成搭配效果图..."})
+                    try:
+                        image_result = await asyncio.wait_for(
+                            ctx.image_task,
+                            timeout=timeout(float(settings.IMG2IMG_TIMEOUT), "streaming.wait_for_image"),
+                        )
+                        ctx.generated_image_url = image_result.image_url
+                        ctx.usage.image_provider = image_result.provider
+                        ctx.usage.image_time_ms = image_result.generation_time_ms
+                        yield SSEEvent(event="image_ready", data={"url": image_result.image_url})
+                    except (TimeoutError, DeadlineExceededError):
+                        ctx.image_task.cancel()
+                        logger.warning("[StreamGen] Image generation timed out")
+                        yield SSEEvent(event="image_failed", data={"message": "图片生成超时"})
+                    except Exception as e:
+                        logger.error(f"[StreamGen] Image generation failed: {e}")
+                        yield SSEEvent(event="image_failed", data={"message": "图片生成失败"})
+
+                if cache_key is not None and cached is None:
+                    self._cache_response(ctx, cache_key)
+
+                # Step 5: Complete
+                ctx.state = StreamState.COMPLETE
+                yield SSEEvent(
+                    event="complete",
+                    data={
+                        "outfit_id": ctx.outfit_id,
+                        "generated_image_url": ctx.generated_image_url,
+                        "fallback": ctx.fallback,
+                        "wardrobe_item_ids": ctx.wardrobe_item_ids,
+                    },
+                )
 
-            # Step 4: Wait for image generation if started
-            if ctx.image_task and not ctx.image_task.done():
-                yield SSEEvent(event="image_generating", data={"message": "正在生成搭配效果图..."})
-                try:
-                    image_result = await asyncio.wait_for(ctx.image_task, timeout=60.0)
-                    ctx.generated_image_url = image_result.image_url
-                    yield SSEEvent(event="image_ready", data={"url": image_result.image_url})
-                except TimeoutError:
-                    logger.warning("[StreamGen] Image generation timed out")
-                    yield SSEEvent(event="image_failed", data={"message": "图片生成超时"})
-                except Exception as e:
-                    logger.error(f"[StreamGen] Image generation failed: {e}")
-                    yield SSEEvent(event="image_failed", data={"message": "图片生成失败"})
-            
-            # Store selected_item_url for img2img base
-            ctx.selected_item_url = selected_item_url
-
-            # Step 5: Complete
-            ctx.state = StreamState.COMPLETE
-            yield SSEEvent(
-                event="complete",
-                data={
-                    "outfit_id": ctx.outfit_id,
-                    "generated_image_url": ctx.generated_image_url,
-                },
+            except DeadlineExceededError as e:
+                ctx.state = StreamState.ERROR
+                ctx.error = str(e)
+                span.set_status(Status(StatusCode.ERROR, str(e)))
+                yield SSEEvent(event="error", data={"message": e.message, "code": e.code})
+            except Exception as e:
+                ctx.state = StreamState.ERROR
+                ctx.error = str(e)
+                logger.error(f"[StreamGen] Generation failed: {e}", exc_info=True)
+                span.record_exception(e)
+                span.set_status(Status(StatusCode.ERROR, str(e)))
+                yield SSEEvent(event="error", data={"message": "生成失败，请重试", "code": "GENERATION_FAILED"})
+            finally:
+                self._release_image(ctx)
+                if user_id:
+                    self._record_usage(ctx, user_id, occasion, time.perf_counter() - started_at)
+            span.set_attribute("outfit.state", ctx.state.value)
+
+    async def generate_batch_stream(
+        self,
+        selected_item_url: str,
+        selected_item_description: str,
+        selected_item_category: str,
+        occasions: list[str],
+        original_image_url: str | None = None,
+        user_id: str | None = None,
+    ) -> AsyncGenerator[SSEEvent, None]:
+        """Generate outfits for one item and several occasions concurrently.
+
+        Each occasion is a generate_stream() of its own (own outfit, usage
+        record and LLM slot); their events are interleaved as they come,
+        each tagged with its "occasion". The img2img base image is
+        downloaded once for all of them. Ends with a batch_complete event
+        holding every occasion's result.
+
+        Yields:
+            SSEEvent objects for frontend consumption
+        """
+        base_image = SharedBaseImage(selected_item_url)
+        queue: asyncio.Queue[tuple[str, SSEEvent] | None] = asyncio.Queue()
+        streams = [
+            asyncio.create_task(
+                self._forward(
+                    occasion,
+                    self.generate_stream(
+                        selected_item_url=selected_item_url,
+                        selected_item_description=selected_item_description,
+                        selected_item_category=selected_item_category,
+                        occasion=occasion,
+                        original_image_url=original_image_url,
+                        user_id=user_id,
+                        base_image=base_image,
+                    ),
+                    queue,
+                )
             )
+            for occasion in occasions
+        ]
+        results: dict[str, dict[str, Any]] = {}
+        try:
+            running = len(streams)
+            while running:
+                item = await queue.get()
+                if item is None:
+                    running -= 1
+                    continue
+                occasion, event = item
+                if event.event == "complete":
+                    results[occasion] = dict(event.data)
+                elif event.event == "error":
+                    results[occasion] = {"error": event.data.get("code")}
+                yield SSEEvent(event=event.event, data={**event.data, "occasion": occasion})
+            yield SSEEvent(event="batch_complete", data={"results": results})
+        finally:
+            # Never awaits (see _release_image); each stream cleans up after itself
+            for stream in streams:
+                stream.cancel()
+            base_image.cancel()
+
+    @staticmethod
+    async def _forward(
+        occasion: str,
+        events: AsyncGenerator[SSEEvent, None],
+        queue: asyncio.Queue[tuple[str, SSEEvent] | None],
+    ) -> None:
+        """Hand one occasion's events to the batch (None when it has ended)."""
+        try:
+            async with aclosing(events):
+                async for event in events:
+                    queue.put_nowait((occasion, event))
+        except Exception as e:
+            logger.error(f"[StreamGen] Batch generation for {occasion} failed: {e}", exc_info=True)
+        finally:
+            queue.put_nowait(None)
+
+    @asynccontextmanager
+    async def _llm_slot(self) -> AsyncIterator[None]:
+        """Hold one of the LLM_MAX_CONCURRENT_STREAMS stream slots."""
+        async with within_deadline("streaming.llm_slot"):
+            await self._llm_slots.acquire()
+        try:
+            yield
+        finally:
+            self._llm_slots.release()
+
+    def _release_image(self, ctx: StreamingContext) -> None:
+        """Stop or undo image generation no client will see.
 
+        Runs in generate_stream's finally, which a disconnect reaches through
+        a cancellation or aclose(), so it only cancels and schedules.
+        """
+        task = ctx.image_task
+        if task is None:
+            return
+        if not task.done():
+            if not task.cancelling():  # Not already given up on (image timeout)
+                task.cancel()
+                SSE_CANCELLED_WORK.labels("image_generation").inc()
+                logger.info(f"[StreamGen] Cancelled image generation for outfit_id={ctx.outfit_id}")
+            return
+        if task.cancelled() or task.exception() is not None or ctx.generated_image_url is not None:
+            return
+        result = task.result()
+        if result.provider == "mock":
+            return
+        # Generated and uploaded, but the stream ended before it was delivered
+        SSE_CANCELLED_WORK.labels("orphaned_image").inc()
+        self._track(self._delete_orphan(result.object_key))
+
+    async def _delete_orphan(self, object_key: str) -> None:
+        """Delete an undelivered generated image and its derivatives (never raises)."""
+        try:
+            # Derivatives still rendering would be written after the delete
+            rendering = image_variant_service.pending(object_key)
+            if rendering is not None:
+                await asyncio.wait([rendering])
+            keys = [object_key, *(variant_key(object_key, variant) for variant in IMAGE_VARIANTS)]
+            # oss2 is synchronous; keep it off the event loop
+            await asyncio.to_thread(storage_service.delete_files, keys)
+            logger.info(f"[StreamGen] Deleted undelivered image {object_key}")
         except Exception as e:
-            ctx.state = StreamState.ERROR
-            ctx.error = str(e)
-            logger.error(f"[StreamGen] Generation failed: {e}", exc_info=True)
-            yield SSEEvent(event="error", data={"message": "生成失败，请重试", "code": "GENERATION_FAILED"})
+            logger.error(f"[StreamGen] Failed to delete undelivered image {object_key}: {e}")
+
+    def _track(self, coro: Coroutine[Any, Any, None]) -> None:
+        """Run a cleanup coroutine as a tracked background task."""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._on_done)
+        EXECUTOR_QUEUE_DEPTH.labels("stream_cleanup").inc()
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        """Stop tracking a finished cleanup."""
+        self._tasks.discard(task)
+        EXECUTOR_QUEUE_DEPTH.labels("stream_cleanup").dec()
+
+    def _record_usage(self, ctx: StreamingContext, user_id: str, occasion: str, elapsed: float) -> None:
+        """Hand the generation's usage to the recorder (never raises)."""
+        if ctx.state == StreamState.COMPLETE:
+            status = "complete"
+        elif ctx.state == StreamState.ERROR:
+            status = "error"
+        else:
+            status = "cancelled"  # Consumer closed the stream early
+        try:
+            generation_usage_recorder.record(user_id, ctx.outfit_id, occasion, status, ctx.usage, elapsed)
+        except Exception as e:
+            logger.error(f"[StreamGen] Failed to record usage: {e}")
 
     async def _analyze_image(self, image_url: str) -> VisualAnalysisResult | None:
         """Perform visual analysis using Qwen-VL-Max."""
         try:
             return await qwen_vl_client.analyze_image_one_shot(image_url)
-        except QwenVLError as e:
+        except (QwenVLError, CircuitOpenError) as e:
             logger.warning(f"[StreamGen] Visual analysis failed: {e}")
             return None
 
@@ -203,19 +561,43 @@ class StreamingOutfitGenerator:
         selected_item_description: str,
         selected_item_category: str,
         occasion: str,
+        wardrobe_matches: list[WardrobeMatch] | None = None,
     ) -> str:
-        """Build user message for LLM with selected item context."""
+        """Build user message for LLM with selected item context.
+
+        Color theory facts for the item's colors are looked up locally and
+        added, so the model explains real color relations. Matching items
+        from the user's wardrobe (best first) are listed for the model to
+        build on instead of inventing every piece.
+        """
+        sections = []
+        requirements = [
+            f"完整保留这件{selected_item_category}的原样（款式、颜色、材质）",
+            "为其他部位推荐搭配单品",
+            f"整体风格适合场合：{occasion}",
+            "提供搭配理论和穿搭建议",
+        ]
+        facts = prompt_facts(selected_item_description)
+        if facts:
+            sections.append(facts)
+            requirements.append("参考【色彩理论参考】选择配色，并在搭配理论中说明配色关系")
+        if wardrobe_matches:
+            lines = [
+                f"- {match.entry.garment_type}：{self._wardrobe_label(match)}（搭配度{match.score:.2f}）"
+                for match in wardrobe_matches
+            ]
+            sections.append("\n".join(["【用户衣橱中的可搭配单品】", *lines]))
+            requirements.append("优先从【用户衣橱中的可搭配单品】中选择搭配单品，不足的部位再推荐新单品")
+        extra = "".join(f"\n{section}\n" for section in sections)
+        numbered = "\n".join(f"{number}. {text}" for number, text in enumerate(requirements, 1))
         return f"""用户选择了一件服装单品，请为其搭配完整的穿搭方案。
 
 【用户选中的单品】
 {selected_item_description}
 类别：{selected_item_category}
-
+{extra}
 【核心要求】
-1. 完整保留这件{selected_item_category}的原样（款式、颜色、材质）
-2. 为其他部位推荐搭配单品
-3. 整体风格适合场合：{occasion}
-4. 提供搭配理论和穿搭建议
+{numbered}
 
 【输出格式】
 请提供：
@@ -259,39 +641,72 @@ class StreamingOutfitGenerator:
             "X-DashScope-SSE": "enable",  # Enable SSE streaming
         }
 
-        try:
-            async with self.client.stream(
-                "POST",
-                self.TONGYI_API_URL,
-                json=payload,
-                headers=headers,
-            ) as response:
-                response.raise_for_status()
-
-                async for line in response.aiter_lines():
-                    if not line or not line.startswith("data:"):
-                        continue
-
-                    data_str = line[5:].strip()
-                    if data_str == "[DONE]":
-                        break
-
-                    try:
-                        import json
-                        data = json.loads(data_str)
-                        chunk = self._extract_chunk(data)
-                        if chunk:
-                            async for event in self._process_chunk(ctx, chunk):
-                                yield event
-                    except json.JSONDecodeError:
-                        continue
-
-        except httpx.HTTPStatusError as e:
-            logger.error(f"[StreamGen] LLM API error: {e.response.status_code}")
-            raise
-        except Exception as e:
-            logger.error(f"[StreamGen] LLM stream error: {e}")
-            raise
+        ctx.usage.model = self.MODEL_NAME
+        # Judged by time to first token: the total depends on the answer length
+        with circuit_guard(LLM_STREAM_CIRCUIT) as call, observe_upstream_stream(
+            "dashscope", "text_generation_stream", parent=ctx.trace_context
+        ) as upstream:
+            # Image generation started by a draw_prompt nests under the stream
+            parent_context, ctx.trace_context = ctx.trace_context, upstream.context
+            sent_at = time.perf_counter()
+            try:
+                async with self.client.stream(
+                    "POST",
+                    self.tongyi_api_url,
+                    json=payload,
+                    headers=headers,
+                    timeout=timeout(STREAM_READ_TIMEOUT, LLM_STREAM_CIRCUIT),
+                ) as response:
+                    response.raise_for_status()
+
+                    # Bounded by the request deadline, not just the client's read timeout
+                    async for line in iter_within_deadline(response.aiter_lines(), LLM_STREAM_CIRCUIT):
+                        if not line or not line.startswith("data:"):
+                            continue
+
+                        data_str = line[5:].strip()
+                        if data_str == "[DONE]":
+                            break
+
+                        try:
+                            import json
+                            data = json.loads(data_str)
+                            ctx.usage.observe_usage(data)
+                            chunk = self._extract_chunk(data)
+                            if chunk:
+                                ctx.usage.observe_chunk(
+                                    time.perf_counter() - sent_at - upstream.consumer_seconds
+                                )
+                                async for event in self._process_chunk(ctx, chunk):
+                                    with upstream.paused():
+                                        yield event
+                        except json.JSONDecodeError:
+                            continue
+
+                    # Text _process_chunk held back after the last chunk
+                    async for event in self._flush_text(ctx):
+                        with upstream.paused():
+                            yield event
+
+            except (asyncio.CancelledError, GeneratorExit):
+                # Client gone: leaving the block closes the upstream response
+                SSE_CANCELLED_WORK.labels("llm_stream").inc()
+                logger.info("[StreamGen] LLM stream cancelled")
+                raise
+            except httpx.HTTPStatusError as e:
+                logger.error(f"[StreamGen] LLM API error: {e.response.status_code}")
+                raise
+            except Exception as e:
+                logger.error(f"[StreamGen] LLM stream error: {e}")
+                raise
+            finally:
+                ctx.trace_context = parent_context
+                ctx.usage.stream_time = time.perf_counter() - sent_at - upstream.consumer_seconds
+                call.duration = (
+                    ctx.usage.time_to_first_token
+                    if ctx.usage.time_to_first_token is not None
+                    else ctx.usage.stream_time
+                )
 
     def _extract_chunk(self, data: dict[str, Any]) -> str:
         """Extract text chunk from DashScope streaming response."""
@@ -311,6 +726,7 @@ class StreamingOutfitGenerator:
         chunk: str,
     ) -> AsyncGenerator[SSEEvent, None]:
         """Process a text chunk, handling draw_prompt tag detection."""
+        ctx.response_text += chunk
         ctx.text_buffer += chunk
 
         # Check for draw_prompt tag start
@@ -348,13 +764,8 @@ class StreamingOutfitGenerator:
                 ctx.text_buffer = after
                 ctx.state = StreamState.TRIGGERING_IMAGE
 
-                # Trigger async image generation
                 logger.info(f"[StreamGen] Detected draw_prompt: {ctx.draw_prompt_buffer[:100]}...")
-                ctx.image_task = asyncio.create_task(
-                    self._generate_image(ctx.draw_prompt_buffer, ctx.selected_item_url)
-                )
-
-                yield SSEEvent(event="image_generating", data={"prompt": ctx.draw_prompt_buffer[:50] + "..."})
+                yield self._trigger_image(ctx)
                 ctx.state = StreamState.STREAMING_TEXT
 
         # Continue streaming remaining text
@@ -364,20 +775,56 @@ class StreamingOutfitGenerator:
                 yield SSEEvent(event="text_chunk", data={"content": ctx.text_buffer})
                 ctx.text_buffer = ""
 
-    async def _generate_image(self, prompt: str, base_image_url: str) -> Any:
-        """Generate image using SiliconFlow Img2Img (runs async)."""
-        try:
-            # Use selected segmented item as base for Img2Img
-            result = await siliconflow_client.generate_img2img(
-                base_image_url=base_image_url,  # Use selected clothing item image
-                prompt=prompt,
-                strength=0.35,  # Lower strength to better preserve the selected item
+    def _trigger_image(self, ctx: StreamingContext) -> SSEEvent:
+        """Start image generation for ctx.draw_prompt_buffer in the background."""
+        if ctx.cached_image_key is not None:
+            # Replayed answer for the same base image: its image still fits
+            ctx.generated_image_url = storage_service.get_file_url(ctx.cached_image_key)
+            return SSEEvent(event="image_ready", data={"url": ctx.generated_image_url})
+        if not image_generation_available():
+            # Every image provider's circuit is open: text only, no waiting
+            logger.warning("[StreamGen] Image providers unavailable, skipping image generation")
+            ctx.fallback = "text_only"
+            return SSEEvent(
+                event="image_failed",
+                data={"message": "图片生成暂时不可用", "code": "AI_SERVICE_UNAVAILABLE"},
             )
-            logger.info(f"[StreamGen] Image generated from base: {result.image_url[:80]}...")
-            return result
-        except SiliconFlowError as e:
-            logger.error(f"[StreamGen] Image generation failed: {e}")
-            raise
+        ctx.image_task = asyncio.create_task(
+            self._generate_image(ctx.draw_prompt_buffer, ctx.selected_item_url, ctx.trace_context, ctx.base_image)
+        )
+        return SSEEvent(event="image_generating", data={"prompt": ctx.draw_prompt_buffer[:50] + "..."})
+
+    async def _generate_image(
+        self,
+        prompt: str,
+        base_image_url: str,
+        trace_context: Context | None = None,
+        shared_base_image: SharedBaseImage | None = None,
+    ) -> Any:
+        """Generate image using SiliconFlow Img2Img (runs async)."""
+        # Runs in its own task, so the span can be current for the whole call
+        with tracer.start_as_current_span("streaming.generate_image", context=trace_context):
+            base_image = None
+            if shared_base_image is not None:
+                base_image_url = shared_base_image.url
+                try:
+                    base_image = await shared_base_image.get()
+                except Exception as e:
+                    # generate_img2img downloads it again, or falls back to text-to-image
+                    logger.warning(f"[StreamGen] Shared base image download failed: {e}")
+            try:
+                # Use selected segmented item as base for Img2Img
+                result = await siliconflow_client.generate_img2img(
+                    base_image_url=base_image_url,  # Use selected clothing item image
+                    prompt=prompt,
+                    strength=0.35,  # Lower strength to better preserve the selected item
+                    base_image=base_image,
+                )
+                logger.info(f"[StreamGen] Image generated from base: {result.image_url[:80]}...")
+                return result
+            except SiliconFlowError as e:
+                logger.error(f"[StreamGen] Image generation failed: {e}")
+                raise
 
     async def _mock_stream_response(
         self,
@@ -407,10 +854,179 @@ class StreamingOutfitGenerator:
                 await asyncio.sleep(0.05)
 
         # Flush remaining buffer
-        if ctx.text_buffer:
+        async for event in self._flush_text(ctx):
+            yield event
+
+    async def _flush_text(self, ctx: StreamingContext) -> AsyncGenerator[SSEEvent, None]:
+        """Send the text _process_chunk held back once the answer has ended."""
+        if ctx.state == StreamState.STREAMING_TEXT and ctx.text_buffer:
             yield SSEEvent(event="text_chunk", data={"content": ctx.text_buffer})
             ctx.text_buffer = ""
 
+    async def _cached_response(
+        self,
+        ctx: StreamingContext,
+        cached: CachedResponse,
+    ) -> AsyncGenerator[SSEEvent, None]:
+        """Replay a cached answer as a stream, reusing its image for the same base image."""
+        logger.info(f"[StreamGen] Replaying cached answer for outfit_id={ctx.outfit_id}")
+        ctx.usage.model = "cache"
+        if cached.image_key is not None and cached.base_key == self._base_key(ctx.selected_item_url):
+            ctx.cached_image_key = cached.image_key
+        for start in range(0, len(cached.text), CACHE_REPLAY_CHUNK):
+            async for event in self._process_chunk(ctx, cached.text[start : start + CACHE_REPLAY_CHUNK]):
+                yield event
+        async for event in self._flush_text(ctx):
+            yield event
+
+    def _cache_response(self, ctx: StreamingContext, cache_key: CacheKey) -> None:
+        """Cache a completed LLM answer and its image for later replays."""
+        if ctx.usage.model != self.MODEL_NAME or "</draw_prompt>" not in ctx.response_text:
+            return  # Mock, template or wardrobe answer, or no image prompt
+        image_key = None
+        task = ctx.image_task
+        if ctx.generated_image_url is not None and task is not None and task.result().provider != "mock":
+            image_key = task.result().object_key
+        response_cache.put(
+            cache_key,
+            CachedResponse(
+                text=ctx.response_text,
+                base_key=self._base_key(ctx.selected_item_url),
+                image_key=image_key,
+            ),
+        )
+
+    @staticmethod
+    def _base_key(selected_item_url: str) -> str:
+        """The img2img base image, independent of URL signatures."""
+        return storage_service.object_key_from_url(selected_item_url) or selected_item_url
+
+    async def _template_response(
+        self,
+        ctx: StreamingContext,
+        selected_item_description: str,
+        occasion: str,
+    ) -> AsyncGenerator[SSEEvent, None]:
+        """Stream a canned outfit for the occasion while the LLM circuit is open."""
+        logger.warning(f"[StreamGen] LLM circuit open, using template for outfit_id={ctx.outfit_id}")
+        ctx.usage.model = "template"
+        templates = OUTFIT_TEMPLATES.get(occasion, OUTFIT_TEMPLATES[OccasionType.DAILY_CASUAL])
+        template = templates[0]
+
+        items = "\n".join(f"- {item['type']}：{item['name']}" for item in template["items"])
+        text = f"""AI搭配师暂时繁忙，先为您的{selected_item_description}推荐一套经典的{occasion}搭配：
+
+**{template["name"]}**
+{items}
+
+**搭配理论**：
+{template["theory"]}"""
+
+        yield SSEEvent(event="thinking", data={"message": "AI搭配师繁忙，为您推荐经典搭配..."})
+        yield SSEEvent(event="text_chunk", data={"content": text})
+
+    async def _wardrobe_matches(
+        self,
+        user_id: str | None,
+        selected_item_url: str,
+        selected_item_description: str,
+        selected_item_category: str,
+    ) -> list[WardrobeMatch]:
+        """The user's stored items that best complete the selected one (never raises)."""
+        if not user_id:
+            return []
+        try:
+            matches = await wardrobe_service.outfit_matches(
+                uuid.UUID(user_id),
+                selected_item_url,
+                selected_item_description,
+                selected_item_category,
+                settings.WARDROBE_PROMPT_ITEMS,
+            )
+        except Exception as e:
+            logger.warning(f"[StreamGen] Wardrobe lookup failed, generating without it: {e}")
+            return []
+        return [match for match in matches if match.score >= settings.WARDROBE_MIN_MATCH_SCORE]
+
+    @staticmethod
+    def _wardrobe_outfit(matches: list[WardrobeMatch]) -> list[WardrobeMatch]:
+        """An outfit made only of wardrobe items, or [] if the matches are not strong enough.
+
+        Takes the best match per slot among those scoring at least
+        WARDROBE_FAST_PATH_MIN_SCORE; at least one must be a core piece
+        (complement 1.0, e.g. bottoms for a top).
+        """
+        if not settings.WARDROBE_FAST_PATH_ENABLED:
+            return []
+        outfit: dict[str, WardrobeMatch] = {}
+        for match in matches:  # Best first
+            slot = WARDROBE_OUTFIT_SLOTS.get(match.entry.garment_type, match.entry.garment_type)
+            if match.score >= settings.WARDROBE_FAST_PATH_MIN_SCORE:
+                outfit.setdefault(slot, match)
+        picked = list(outfit.values())
+        if len(picked) < settings.WARDROBE_FAST_PATH_MIN_ITEMS or not any(m.complement >= 1.0 for m in picked):
+            return []
+        return picked
+
+    @staticmethod
+    def _wardrobe_label(match: WardrobeMatch) -> str:
+        """How a wardrobe item is named to the user and the LLM."""
+        entry = match.entry
+        return entry.description or f"{entry.color or ''}{entry.style or ''}{entry.garment_type}"
+
+    async def _wardrobe_response(
+        self,
+        ctx: StreamingContext,
+        selected_item_description: str,
+        occasion: str,
+        outfit: list[WardrobeMatch],
+    ) -> AsyncGenerator[SSEEvent, None]:
+        """Stream an outfit made of the user's own items, without the LLM."""
+        logger.info(f"[StreamGen] Answering from the wardrobe for outfit_id={ctx.outfit_id} ({len(outfit)} items)")
+        GENERATION_WARDROBE.labels("fast_path").inc()
+        ctx.usage.model = "wardrobe"
+        ctx.wardrobe_item_ids = [str(match.entry.id) for match in outfit]
+
+        items = "\n".join(f"- {m.entry.garment_type}：{self._wardrobe_label(m)}（搭配度{m.score:.2f}）" for m in outfit)
+        selected_colors = find_colors(selected_item_description)
+        item_colors = [m.entry.colors[0]["hex"] for m in outfit if m.entry.colors]
+        if selected_colors and item_colors:
+            principle = f"采用**{color_principle(selected_colors[0], item_colors)}**，"
+        else:
+            principle = ""
+        yield SSEEvent(event="thinking", data={"message": "正在从您的衣橱中挑选单品..."})
+        yield SSEEvent(
+            event="text_chunk",
+            data={
+                "content": f"""根据您的{selected_item_description}，从您的衣橱中挑选了以下{occasion}搭配：
+
+**推荐单品**：
+{items}
+
+"""
+            },
+        )
+
+        pieces = []
+        for match in outfit:
+            colors = match.entry.colors
+            color = DRAW_PROMPT_COLORS.get(palette_name(colors[0]["hex"]), "") if colors else ""
+            pieces.append(f"{color} {DRAW_PROMPT_GARMENTS.get(match.entry.garment_type, 'garment')}".strip())
+        scene = DRAW_PROMPT_SCENES.get(occasion, "city street background")
+        ctx.draw_prompt_buffer = (
+            f"a person wearing the garment from the reference image with {', '.join(pieces)}, "
+            f"{scene}, fashion photography"
+        )
+        yield self._trigger_image(ctx)
+
+        yield SSEEvent(
+            event="text_chunk",
+            data={
+                "content": f"""**搭配理论**：
+{principle}这套单品与您的{selected_item_description}搭配度均在{settings.WARDROBE_FAST_PATH_MIN_SCORE:.1f}以上，色彩协调、部位互补，适合{occasion}场合。"""
+            },
+        )
+
 
 # Singleton instance
 streaming_generator = StreamingOutfitGenerator()
@@ -0,0 +1,531 @@
+"""Wardrobe items and per-user similarity search.
+
+Every saved garment gets a compact float32 embedding made of three blocks,
+each unit-normalized and scaled by the square root of its weight:
+- color: the garment's palette histogram, smoothed by Lab distance so near
+  colors (red, pink) partly match
+- garment type: one-hot over GarmentType
+- style: bag of style, cut and pattern words from the describe-clothing text
+
+The dot product of two embeddings is then the weighted sum of the block
+cosines, in [0, 1]. Search is brute force over a per-user matrix kept in
+memory (a wardrobe holds at most WARDROBE_MAX_ITEMS_PER_USER rows, so one
+matrix-vector product beats any ANN structure). Indexes are loaded from the
+database on first use, updated in place as items are saved or removed by
+this process, and reloaded after WARDROBE_INDEX_TTL_SECONDS to pick up
+writes from other processes.
+
+For outfit generation the same index scores how well each stored item
+completes an outfit around a selected garment: palette-histogram color
+harmony (see app.core.color.harmony_matrix) plus garment-type
+complementarity (COMPLEMENTS). Only the best few reach the LLM prompt.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.color import COLOR_PALETTE, delta_e, harmony_matrix, palette_lab
+from app.core.exceptions import NotFoundError, ValidationError
+from app.integrations.alibaba_vision import ALIBABA_CATEGORY_TO_GARMENT_TYPE, GarmentType, StyleTag
+from app.models.stored_blob import BlobReference, StoredBlob
+from app.models.wardrobe_item import WardrobeItem
+from app.services.color_extraction import color_extractor
+from app.services.color_theory import find_colors, palette_index
+from app.services.content_store import content_store
+from app.services.storage import storage_service
+
+logger = logging.getLogger(__name__)
+
+# Bump when the embedding layout changes; stored vectors are then recomputed
+EMBEDDING_VERSION = 1
+
+GARMENT_TYPES: list[str] = [garment_type.value for garment_type in GarmentType]
+STYLE_FEATURES: list[str] = [
+    *(tag.value for tag in StyleTag),
+    # Cuts and materials
+    "修身", "宽松", "短款", "长款", "圆领", "V领", "高腰", "阔腿", "针织", "牛仔", "西装",
+    # Patterns
+    "纯色", "条纹", "格纹", "碎花", "印花",
+]  # fmt: skip
+EMBEDDING_DIM = len(COLOR_PALETTE) + len(GARMENT_TYPES) + len(STYLE_FEATURES)
+
+# Share of the similarity score contributed by each block (sums to 1)
+EMBEDDING_WEIGHTS: dict[str, float] = {"color": 0.6, "garment_type": 0.25, "style": 0.15}
+COLOR_KERNEL_DELTA_E = 30.0  # ΔE at which two palette colors count as ~37% alike
+
+# How well a candidate garment type completes an outfit around the selected one;
+# pairs left out (two tops, two bottoms) never match
+COMPLEMENTS: dict[str, dict[str, float]] = {
+    "上衣": {"裤子": 1.0, "裙子": 1.0, "外套": 0.8, "配饰": 0.6},
+    "外套": {"上衣": 0.9, "裤子": 1.0, "裙子": 1.0, "配饰": 0.6},
+    "裤子": {"上衣": 1.0, "外套": 0.9, "配饰": 0.6},
+    "裙子": {"上衣": 1.0, "外套": 0.9, "配饰": 0.6},
+    "配饰": {"上衣": 0.8, "外套": 0.8, "裤子": 0.8, "裙子": 0.8, "配饰": 0.3},
+}
+# Share of the match score contributed by each part (sums to 1)
+MATCH_WEIGHTS: dict[str, float] = {"harmony": 0.6, "complement": 0.4}
+UNKNOWN_HARMONY = 0.5  # Harmony assumed when either garment has no colors
+
+# Blob reference kind that keeps a saved cutout out of storage GC
+WARDROBE_REFERENCE_KIND = "wardrobe"
+
+_INITIAL_CAPACITY = 16
+
+
+@lru_cache
+def _color_kernel() -> np.ndarray:
+    """Palette x palette color similarity, computed once."""
+    distances = delta_e(palette_lab(), palette_lab())
+    return np.exp(-((distances / COLOR_KERNEL_DELTA_E) ** 2))
+
+
+@lru_cache
+def _complement_matrix() -> np.ndarray:
+    """COMPLEMENTS as a GARMENT_TYPES x GARMENT_TYPES array, computed once."""
+    matrix = np.array([[COMPLEMENTS[a].get(b, 0.0) for b in GARMENT_TYPES] for a in GARMENT_TYPES])
+    matrix.setflags(write=False)
+    return matrix
+
+
+def color_histogram(colors: list[dict]) -> np.ndarray:
+    """Share of the garment per palette color (all zeros without colors)."""
+    histogram = np.zeros(len(COLOR_PALETTE))
+    for color in colors:
+        histogram[palette_index(color["hex"])] += float(color.get("percentage") or 0.0)
+    total = histogram.sum()
+    return histogram / total if total > 0 else histogram
+
+
+def embed_item(garment_type: str, colors: list[dict], text: str) -> np.ndarray:
+    """Embed a garment for similarity search.
+
+    Args:
+        garment_type: Mapped garment type (上衣, 裤子, ...)
+        colors: Extracted colors as dicts with hex and percentage
+        text: Style, pattern and description words
+
+    Returns:
+        float32 vector of EMBEDDING_DIM
+    """
+    style = np.array([feature in text for feature in STYLE_FEATURES], dtype=np.float64)
+    garment = np.array([garment_type == value for value in GARMENT_TYPES], dtype=np.float64)
+    blocks = {
+        "color": color_histogram(colors) @ _color_kernel(),
+        "garment_type": garment,
+        "style": style,
+    }
+    parts = []
+    for name, block in blocks.items():
+        norm = np.linalg.norm(block)
+        parts.append(block / norm * np.sqrt(EMBEDDING_WEIGHTS[name]) if norm > 0 else block)
+    return np.concatenate(parts).astype(np.float32)
+
+
+def style_text(style: str | None, pattern: str | None, description: str | None) -> str:
+    """The describe-clothing words the style block is built from."""
+    return " ".join(filter(None, (style, pattern, description)))
+
+
+@dataclass(frozen=True)
+class WardrobeEntry:
+    """The parts of a wardrobe item kept in the in-memory index."""
+
+    id: uuid.UUID
+    object_key: str
+    garment_type: str
+    category: str | None
+    color: str | None
+    style: str | None
+    pattern: str | None
+    description: str | None
+    colors: list[dict]
+    created_at: datetime
+
+    @classmethod
+    def from_item(cls, item: WardrobeItem) -> "WardrobeEntry":
+        """Copy the fields of a database row."""
+        return cls(**{name: getattr(item, name) for name in cls.__dataclass_fields__})
+
+
+@dataclass(frozen=True)
+class WardrobeMatch:
+    """A wardrobe item scored against a selected garment."""
+
+    entry: WardrobeEntry
+    score: float  # Weighted by MATCH_WEIGHTS, in [0, 1]
+    harmony: float
+    complement: float
+
+
+class WardrobeIndex:
+    """Brute-force cosine index over one user's wardrobe."""
+
+    def __init__(self) -> None:
+        """Create an empty index."""
+        self._vectors = np.zeros((_INITIAL_CAPACITY, EMBEDDING_DIM), dtype=np.float32)
+        # Palette histogram and GARMENT_TYPES index (-1 if unknown) per row, for outfit matching
+        self._histograms = np.zeros((_INITIAL_CAPACITY, len(COLOR_PALETTE)), dtype=np.float32)
+        self._types = np.full(_INITIAL_CAPACITY, -1, dtype=np.int8)
+        self._entries: list[WardrobeEntry] = []
+        self._rows: dict[uuid.UUID, int] = {}
+        self.loaded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        """Number of items."""
+        return len(self._entries)
+
+    @property
+    def entries(self) -> list[WardrobeEntry]:
+        """Items, in row order."""
+        return self._entries
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Embeddings, one row per entry."""
+        return self._vectors[: len(self._entries)]
+
+    def vector(self, item_id: uuid.UUID) -> np.ndarray | None:
+        """Embedding of an item, if indexed."""
+        row = self._rows.get(item_id)
+        return None if row is None else self._vectors[row]
+
+    def add(self, entry: WardrobeEntry, vector: np.ndarray) -> None:
+        """Insert or replace an item."""
+        row = self._rows.get(entry.id)
+        if row is None:
+            row = len(self._entries)
+            if row == len(self._vectors):
+                self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+                self._histograms = np.concatenate([self._histograms, np.zeros_like(self._histograms)])
+                self._types = np.concatenate([self._types, np.full_like(self._types, -1)])
+            self._entries.append(entry)
+            self._rows[entry.id] = row
+        else:
+            self._entries[row] = entry
+        self._vectors[row] = vector
+        self._histograms[row] = color_histogram(entry.colors)
+        self._types[row] = GARMENT_TYPES.index(entry.garment_type) if entry.garment_type in GARMENT_TYPES else -1
+
+    def remove(self, item_id: uuid.UUID) -> None:
+        """Remove an item by moving the last row into its place."""
+        row = self._rows.pop(item_id, None)
+        if row is None:
+            return
+        last = len(self._entries) - 1
+        if row != last:
+            self._entries[row] = self._entries[last]
+            self._vectors[row] = self._vectors[last]
+            self._histograms[row] = self._histograms[last]
+            self._types[row] = self._types[last]
+            self._rows[self._entries[row].id] = row
+        self._entries.pop()
+
+    def search(
+        self,
+        vector: np.ndarray,
+        limit: int,
+        exclude: uuid.UUID | None = None,
+    ) -> list[tuple[WardrobeEntry, float]]:
+        """Most similar items to a vector, best first.
+
+        Args:
+            vector: Query embedding
+            limit: Maximum number of results
+            exclude: Item to leave out (e.g. the query item itself)
+
+        Returns:
+            (entry, similarity) pairs
+        """
+        scores = self.vectors @ vector
+        if exclude in self._rows:
+            scores[self._rows[exclude]] = -np.inf
+        count = min(limit, len(scores) - (exclude in self._rows))
+        if count <= 0:
+            return []
+        best = np.argpartition(-scores, count - 1)[:count]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(self._entries[row], float(scores[row])) for row in best]
+
+    def outfit_matches(
+        self,
+        histogram: np.ndarray,
+        garment_type: str,
+        limit: int,
+        exclude: uuid.UUID | None = None,
+    ) -> list[WardrobeMatch]:
+        """Items that best complete an outfit around a garment, best first.
+
+        Args:
+            histogram: The garment's palette histogram (see color_histogram)
+            garment_type: The garment's mapped type
+            limit: Maximum number of results
+            exclude: Item to leave out (the garment itself, if stored)
+
+        Returns:
+            Matches of types that complement the garment's
+        """
+        count = len(self._entries)
+        if count == 0 or garment_type not in GARMENT_TYPES:
+            return []
+        types = self._types[:count]
+        complement = np.where(types >= 0, _complement_matrix()[GARMENT_TYPES.index(garment_type)][types], 0.0)
+        histograms = self._histograms[:count]
+        harmony = np.full(count, UNKNOWN_HARMONY)
+        if histogram.any():
+            colored = histograms.any(axis=1)
+            harmony[colored] = histograms[colored] @ (harmony_matrix() @ histogram)
+        scores = MATCH_WEIGHTS["harmony"] * harmony + MATCH_WEIGHTS["complement"] * complement
+        scores[complement == 0] = -np.inf
+        if exclude in self._rows:
+            scores[self._rows[exclude]] = -np.inf
+
+        count = min(limit, int(np.isfinite(scores).sum()))
+        if count <= 0:
+            return []
+        best = np.argpartition(-scores, count - 1)[:count]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [
+            WardrobeMatch(self._entries[row], float(scores[row]), float(harmony[row]), float(complement[row]))
+            for row in best
+        ]
+
+
+class WardrobeService:
+    """Saves wardrobe items and answers similarity queries."""
+
+    def __init__(self) -> None:
+        """Initialize with no indexes loaded."""
+        self._indexes: OrderedDict[uuid.UUID, WardrobeIndex] = OrderedDict()
+        # Writes per user, so a load that raced a write is not cached
+        self._writes: dict[uuid.UUID, int] = {}
+
+    async def add_item(
+        self,
+        db: AsyncSession,
+        user_id: uuid.UUID,
+        digest: str,
+        garment_type: str,
+        category: str | None = None,
+        color: str | None = None,
+        style: str | None = None,
+        pattern: str | None = None,
+        description: str | None = None,
+    ) -> WardrobeItem:
+        """Save a segmented cutout to the user's wardrobe.
+
+        Saving the same cutout again updates its attributes. Commits, then
+        updates the user's index.
+
+        Args:
+            db: Database session
+            user_id: Owner
+            digest: SHA-256 of a cutout the user segmented
+            garment_type: Mapped garment type
+            category: Alibaba category
+            color: Main color from describe-clothing
+            style: Style features from describe-clothing
+            pattern: Pattern from describe-clothing
+            description: Full description from describe-clothing
+
+        Raises:
+            NotFoundError: The user has no cutout with this digest
+            ValidationError: The wardrobe is full
+        """
+        object_key = await db.scalar(
+            select(StoredBlob.object_key)
+            .join(BlobReference, BlobReference.digest == StoredBlob.digest)
+            .where(StoredBlob.digest == digest, BlobReference.user_id == user_id)
+            .limit(1)
+        )
+        if object_key is None:
+            raise NotFoundError(code="WARDROBE_IMAGE_NOT_FOUND", message="服装图片不存在")
+
+        existing = await db.scalar(
+            select(WardrobeItem.id).where(WardrobeItem.user_id == user_id, WardrobeItem.digest == digest)
+        )
+        if existing is None:
+            count = await db.scalar(select(func.count()).where(WardrobeItem.user_id == user_id))
+            if count >= settings.WARDROBE_MAX_ITEMS_PER_USER:
+                raise ValidationError(code="WARDROBE_FULL", message="衣橱已满，请先移除部分单品")
+
+        colors = await self._extract_colors(object_key, color or description or "")
+        vector = embed_item(garment_type, colors, style_text(style, pattern, description))
+        values = {
+            "object_key": object_key,
+            "garment_type": garment_type,
+            "category": category,
+            "color": color,
+            "style": style,
+            "pattern": pattern,
+            "description": description,
+            "colors": colors,
+            "embedding": vector.tobytes(),
+            "embedding_version": EMBEDDING_VERSION,
+        }
+        item = await db.scalar(
+            insert(WardrobeItem)
+            .values(id=uuid.uuid4(), user_id=user_id, digest=digest, **values)
+            .on_conflict_do_update(constraint="uq_wardrobe_items_user_digest", set_=values)
+            .returning(WardrobeItem)
+        )
+        await content_store.add_reference(db, user_id, digest, WARDROBE_REFERENCE_KIND)
+        await db.commit()
+
+        entry = WardrobeEntry.from_item(item)
+        self._apply(user_id, lambda index: index.add(entry, vector))
+        logger.info(f"[Wardrobe] Saved item {item.id} ({garment_type}) for user {user_id}")
+        return item
+
+    async def list_items(self, db: AsyncSession, user_id: uuid.UUID) -> list[WardrobeItem]:
+        """A user's wardrobe, newest first."""
+        result = await db.scalars(
+            select(WardrobeItem).where(WardrobeItem.user_id == user_id).order_by(WardrobeItem.created_at.desc())
+        )
+        return list(result)
+
+    async def delete_item(self, db: AsyncSession, user_id: uuid.UUID, item_id: uuid.UUID) -> None:
+        """Remove an item; its cutout becomes collectable unless used elsewhere.
+
+        Raises:
+            NotFoundError: No such item in the user's wardrobe
+        """
+        digest = await db.scalar(
+            delete(WardrobeItem)
+            .where(WardrobeItem.id == item_id, WardrobeItem.user_id == user_id)
+            .returning(WardrobeItem.digest)
+        )
+        if digest is None:
+            raise NotFoundError(code="WARDROBE_ITEM_NOT_FOUND", message="衣橱单品不存在")
+        await db.execute(
+            delete(BlobReference).where(
+                BlobReference.user_id == user_id,
+                BlobReference.digest == digest,
+                BlobReference.kind == WARDROBE_REFERENCE_KIND,
+            )
+        )
+        await db.commit()
+        self._apply(user_id, lambda index: index.remove(item_id))
+
+    async def similar(
+        self,
+        user_id: uuid.UUID,
+        item_id: uuid.UUID,
+        limit: int = 10,
+    ) -> list[tuple[WardrobeEntry, float]]:
+        """Items in the user's wardrobe most similar to one of them.
+
+        Raises:
+            NotFoundError: No such item in the user's wardrobe
+        """
+        index = await self.index(user_id)
+        vector = index.vector(item_id)
+        if vector is None:
+            raise NotFoundError(code="WARDROBE_ITEM_NOT_FOUND", message="衣橱单品不存在")
+        return index.search(vector, limit, exclude=item_id)
+
+    async def outfit_matches(
+        self,
+        user_id: uuid.UUID,
+        selected_item_url: str,
+        description: str,
+        category: str,
+        limit: int,
+    ) -> list[WardrobeMatch]:
+        """Items in the user's wardrobe that best complete an outfit around a garment.
+
+        The garment's colors and type come from its wardrobe item when the
+        user has saved it (it is then left out of the results), otherwise
+        from the color words in its description and its category.
+
+        Args:
+            user_id: Owner of the wardrobe
+            selected_item_url: URL of the selected cutout
+            description: Description of the selected garment
+            category: Garment type (上衣, ...) or Alibaba category (tops, ...)
+            limit: Maximum number of results
+        """
+        index = await self.index(user_id)
+        if not len(index):
+            return []
+        object_key = storage_service.object_key_from_url(selected_item_url) if selected_item_url else None
+        stored = next((entry for entry in index.entries if entry.object_key == object_key), None)
+        if stored is not None:
+            return index.outfit_matches(color_histogram(stored.colors), stored.garment_type, limit, exclude=stored.id)
+
+        garment_type = ALIBABA_CATEGORY_TO_GARMENT_TYPE.get(category, category)
+        colors = [{"hex": hex_color, "percentage": 1.0} for hex_color in find_colors(description)]
+        return index.outfit_matches(color_histogram(colors), garment_type, limit)
+
+    async def index(self, user_id: uuid.UUID) -> WardrobeIndex:
+        """The user's similarity index, loading it if absent or stale."""
+        index = self._indexes.get(user_id)
+        if index is not None and time.monotonic() - index.loaded_at < settings.WARDROBE_INDEX_TTL_SECONDS:
+            self._indexes.move_to_end(user_id)
+            return index
+
+        writes = self._writes.get(user_id, 0)
+        index = await self._load(user_id)
+        if self._writes.get(user_id, 0) == writes:
+            self._indexes[user_id] = index
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > settings.WARDROBE_INDEX_MAX_USERS:
+                self._indexes.popitem(last=False)
+        return index
+
+    def _apply(self, user_id: uuid.UUID, change: Callable[[WardrobeIndex], None]) -> None:
+        """Apply a committed write to the user's index, if loaded."""
+        self._writes[user_id] = self._writes.get(user_id, 0) + 1
+        index = self._indexes.get(user_id)
+        if index is not None:
+            change(index)
+
+    async def _load(self, user_id: uuid.UUID) -> WardrobeIndex:
+        """Build a user's index from the database."""
+        from app.db.session import async_session_maker
+
+        async with async_session_maker() as db:
+            items = await db.scalars(
+                select(WardrobeItem).where(WardrobeItem.user_id == user_id).order_by(WardrobeItem.created_at)
+            )
+            index = WardrobeIndex()
+            for item in items:
+                if item.embedding_version == EMBEDDING_VERSION:
+                    vector = np.frombuffer(item.embedding, dtype=np.float32)
+                else:
+                    text = style_text(item.style, item.pattern, item.description)
+                    vector = embed_item(item.garment_type, item.colors, text)
+                index.add(WardrobeEntry.from_item(item), vector)
+        logger.info(f"[Wardrobe] Loaded index for user {user_id} ({len(index)} items)")
+        return index
+
+    async def _extract_colors(self, object_key: str, color_text: str) -> list[dict]:
+        """Colors of a stored cutout; from the color name if it cannot be read."""
+        # oss2 is synchronous; keep it off the event loop
+        data = await asyncio.to_thread(storage_service.download_file, object_key)
+        if data:
+            extracted = await color_extractor.extract(data)
+            return [{"hex": c.hex, "name": c.name, "percentage": c.percentage} for c in extracted]
+
+        logger.warning(f"[Wardrobe] Could not read {object_key}, using the described color")
+        hexes = find_colors(color_text)
+        if not hexes:
+            return []
+        hex_color, name = COLOR_PALETTE[palette_index(hexes[0])]
+        return [{"hex": hex_color, "name": name, "percentage": 1.0}]
+
+
+# Singleton instance
+wardrobe_service = WardrobeService()
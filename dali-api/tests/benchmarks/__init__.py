@@ -0,0 +1 @@
+"""Load tests and benchmarks (run as scripts, not collected by pytest)."""
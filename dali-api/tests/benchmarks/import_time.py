@@ -0,0 +1,126 @@
+"""Import-time benchmark and CI budget for app.main.
+
+Runs `python -X importtime -c "import app.main"` in fresh interpreters and
+reports the median total plus the slowest top-level packages. Exits non-zero
+when the median exceeds the budget or a vendor SDK that must load lazily
+(see app.core.lazy) was imported:
+
+    python -m tests.benchmarks.import_time --runs 5 --budget-ms 1500
+
+Run from dali-api/ so `app` is importable. Use --json to keep the numbers.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+# Must not be imported by app.main (loaded with their client on first use)
+LAZY_MODULES: tuple[str, ...] = (
+    "oss2",
+    "dashscope",
+    "alibabacloud_imageseg20191230",
+    "alibabacloud_objectdet20191230",
+    "alibabacloud_dysmsapi20170525",
+    "alibabacloud_tea_openapi",
+)
+
+DEFAULT_BUDGET_MS = 1500.0
+
+
+def parse_importtime(stderr: str) -> tuple[float, dict[str, float]]:
+    """Parse -X importtime output.
+
+    Returns:
+        Tuple of (total ms, ms per top-level package). Package times sum the
+        modules' self time, so a dependency is charged to itself, not to the
+        package that happened to import it first.
+    """
+    total = 0.0
+    packages: dict[str, float] = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        ms = int(self_us) / 1000
+        total += ms
+        packages[name.strip().split(".")[0]] += ms
+    return total, dict(packages)
+
+
+def measure(module: str = "app.main") -> tuple[float, dict[str, float], list[str]]:
+    """Import a module in a fresh interpreter.
+
+    Returns:
+        Tuple of (total ms, ms per top-level package, lazy modules loaded)
+    """
+    check = f"import sys; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}; {check}"],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        check=True,
+    )
+    total, packages = parse_importtime(result.stderr)
+    loaded = [name for name in result.stdout.strip().split(",") if name]
+    return total, packages, loaded
+
+
+def main() -> int:
+    """Run the benchmark and apply the budget."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=10, help="Slowest packages to list")
+    parser.add_argument("--json", dest="json_path", help="Write the results to this file")
+    args = parser.parse_args()
+
+    # The first run warms the bytecode cache; it is not counted
+    measure(args.module)
+    totals: list[float] = []
+    per_package: dict[str, list[float]] = defaultdict(list)
+    loaded: set[str] = set()
+    for _ in range(args.runs):
+        total, packages, lazy_loaded = measure(args.module)
+        totals.append(total)
+        loaded.update(lazy_loaded)
+        for name, ms in packages.items():
+            per_package[name].append(ms)
+
+    median = statistics.median(totals)
+    slowest = sorted(
+        ((name, statistics.median(values)) for name, values in per_package.items()),
+        key=lambda item: item[1],
+        reverse=True,
+    )[: args.top]
+
+    print(f"import {args.module}: median {median:.0f}ms over {args.runs} runs (budget {args.budget_ms:.0f}ms)")
+    for name, ms in slowest:
+        print(f"  {ms:8.1f}ms  {name}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(
+                {"module": args.module, "median_ms": median, "runs_ms": totals,
+                 "packages_ms": dict(slowest), "lazy_modules_loaded": sorted(loaded)},
+                f,
+                indent=2,
+            )
+
+    failed = False
+    if loaded:
+        print(f"FAIL: imported eagerly: {', '.join(sorted(loaded))}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"FAIL: median import time {median:.0f}ms exceeds {args.budget_ms:.0f}ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,335 @@
+"""End-to-end load test for the generation pipeline.
+
+Each virtual user repeatedly runs the app flow:
+
+    upload (signed URL + PUT) -> segment-clothing -> describe-clothing -> generate-stream
+
+and the harness records per-step latency, time-to-first-event for every SSE
+event type (thinking, text_chunk, image_generating, image_ready, ...), and
+CPU/RSS of the API worker processes. Stages run at increasing concurrency;
+the highest stage that stays within the SLO (p99 time to first text chunk
+and error rate) gives the max concurrent streams per worker.
+
+Fully local run (fake upstreams, API spawned with uvicorn). Needs Postgres
+at DATABASE_URL with migrations applied; benchmark users are created there
+and their tokens minted locally:
+
+    python -m tests.benchmarks.pipeline --start-fakes --start-api --workers 2 \\
+        --stages 5,10,20 --iterations 3 --output bench.json --baseline main.json
+
+The JSON report is comparable across runs; with --baseline the harness
+exits non-zero on regressions (see report.compare_reports).
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from datetime import UTC, datetime
+
+import httpx
+from PIL import Image
+
+from tests.benchmarks.report import LatencyRecorder, compare_reports
+from tests.benchmarks.resources import ProcessSampler
+
+API_PREFIX = "/api/v1"
+OCCASION = "职场通勤"
+
+
+def _photo_bytes() -> bytes:
+    """A small JPEG standing in for a user photo."""
+    img = Image.new("RGB", (768, 1024), (200, 190, 170))
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def start_fakes(port: int) -> str:
+    """Run the fake upstream server in a background thread."""
+    import uvicorn
+
+    from tests.fakes.upstreams import create_app
+
+    server = uvicorn.Server(uvicorn.Config(create_app(), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("Fake upstreams did not start")
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def start_api(port: int, workers: int, fake_base_url: str | None) -> subprocess.Popen:
+    """Spawn the API with uvicorn, pointed at the fake upstreams if given."""
+    env = dict(os.environ)
+    if fake_base_url:
+        from tests.fakes.upstreams import upstream_env
+
+        env.update(upstream_env(fake_base_url))
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning",
+        ],
+        env=env,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 30.0) -> None:
+    """Poll the health endpoint until the API answers."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(f"{API_PREFIX}/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("API did not become healthy")
+
+
+async def seed_users(count: int) -> list[str]:
+    """Create benchmark users (idempotent) and mint access tokens for them."""
+    from sqlalchemy import select
+
+    from app.core.security import create_access_token
+    from app.db.session import async_session_maker
+    from app.models.user import User
+
+    tokens: list[str] = []
+    async with async_session_maker() as db:
+        for i in range(count):
+            phone = f"199{i:08d}"
+            user = (await db.execute(select(User).where(User.phone == phone))).scalar_one_or_none()
+            if user is None:
+                user = User(phone=phone, nickname=f"bench-{i}")
+                db.add(user)
+                await db.flush()
+            tokens.append(create_access_token({"sub": str(user.id)}))
+        await db.commit()
+    return tokens
+
+
+class PipelineUser:
+    """One virtual user driving the full flow."""
+
+    def __init__(self, client: httpx.AsyncClient, token: str, recorder: LatencyRecorder, photo: bytes) -> None:
+        """Initialize user with a shared client and recorder."""
+        self.client = client
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.recorder = recorder
+        self.photo = photo
+
+    async def _timed(self, step: str, request) -> httpx.Response:
+        """Run a request, recording latency and raising on failure."""
+        start = time.perf_counter()
+        try:
+            response = await request
+            response.raise_for_status()
+        except Exception:
+            self.recorder.error(step)
+            raise
+        self.recorder.record(f"step.{step}", (time.perf_counter() - start) * 1000)
+        return response
+
+    async def run_once(self) -> bool:
+        """Run the flow once; returns False if any step failed."""
+        try:
+            signed = (await self._timed("signed_url", self.client.post(
+                f"{API_PREFIX}/upload/signed-url",
+                json={"content_type": "image/jpeg"},
+                headers=self.headers,
+            ))).json()
+            await self._timed("upload", self.client.put(
+                signed["uploadUrl"], content=self.photo, headers={"Content-Type": "image/jpeg"},
+            ))
+
+            segmented = (await self._timed("segment", self.client.post(
+                f"{API_PREFIX}/segmentation/segment-clothing",
+                json={"image_url": signed["photoUrl"]},
+                headers=self.headers,
+            ))).json()
+            if not segmented["items"]:
+                self.recorder.error("segment")
+                return False
+            item = segmented["items"][0]
+
+            described = (await self._timed("describe", self.client.post(
+                f"{API_PREFIX}/segmentation/describe-clothing",
+                json={"image_url": item["image_url"], "category_hint": item["category"]},
+                headers=self.headers,
+            ))).json()
+
+            return await self._stream(item, described)
+        except Exception:
+            return False
+
+    async def _stream(self, item: dict, described: dict) -> bool:
+        """Consume generate-stream, recording time to first occurrence of each event."""
+        payload = {
+            "selected_item_url": item["image_url"],
+            "selected_item_description": described["description"],
+            "selected_item_category": item["garment_type"],
+            "occasion": OCCASION,
+        }
+        start = time.perf_counter()
+        seen: set[str] = set()
+        try:
+            async with self.client.stream(
+                "POST", f"{API_PREFIX}/outfits/generate-stream", json=payload, headers=self.headers,
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("event:"):
+                        continue
+                    event = line[6:].strip()
+                    if event not in seen:
+                        seen.add(event)
+                        self.recorder.record(f"sse.{event}", (time.perf_counter() - start) * 1000)
+        except Exception:
+            self.recorder.error("generate_stream")
+            return False
+
+        self.recorder.record("step.generate_stream", (time.perf_counter() - start) * 1000)
+        if "error" in seen or "complete" not in seen:
+            self.recorder.error("generate_stream")
+            return False
+        return True
+
+
+async def run_stage(
+    client: httpx.AsyncClient,
+    tokens: list[str],
+    concurrency: int,
+    iterations: int,
+    api_pid: int | None,
+) -> dict:
+    """Run one stage: `concurrency` users, each running the flow `iterations` times."""
+    recorder = LatencyRecorder()
+    photo = _photo_bytes()
+    sampler = ProcessSampler(api_pid) if api_pid else None
+    if sampler:
+        sampler.start()
+
+    users = [PipelineUser(client, tokens[i % len(tokens)], recorder, photo) for i in range(concurrency)]
+
+    async def loop(user: PipelineUser) -> list[bool]:
+        return [await user.run_once() for _ in range(iterations)]
+
+    start = time.perf_counter()
+    results = [ok for user_results in await asyncio.gather(*(loop(u) for u in users)) for ok in user_results]
+    elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "iterations": len(results),
+        "duration_s": round(elapsed, 2),
+        "throughput_per_s": round(len(results) / elapsed, 2),
+        "error_rate": round(1 - sum(results) / len(results), 4) if results else 0.0,
+        "errors": dict(recorder.errors),
+        "steps": recorder.summary("step."),
+        "sse_events": recorder.summary("sse."),
+        "resources": await sampler.stop() if sampler else {},
+    }
+
+
+def max_streams_per_worker(stages: list[dict], workers: int, slo_ms: float, max_error_rate: float) -> float:
+    """Highest passing concurrency divided by worker count."""
+    passing = [
+        stage["concurrency"]
+        for stage in stages
+        if stage["error_rate"] <= max_error_rate
+        and stage["sse_events"].get("text_chunk", {}).get("p99", float("inf")) <= slo_ms
+    ]
+    return round(max(passing, default=0) / workers, 1)
+
+
+def _git_commit() -> str:
+    """Current commit hash, if available."""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+async def main(args: argparse.Namespace) -> int:
+    """Run all stages and write the report."""
+    fake_base_url = start_fakes(args.fake_port) if args.start_fakes else None
+    api_process = start_api(args.api_port, args.workers, fake_base_url) if args.start_api else None
+    api_url = f"http://127.0.0.1:{args.api_port}" if args.start_api else args.api_url
+    api_pid = api_process.pid if api_process else args.api_pid
+    stages = [int(c) for c in args.stages.split(",")]
+
+    limits = httpx.Limits(max_connections=max(stages) * 2, max_keepalive_connections=max(stages))
+    try:
+        async with httpx.AsyncClient(base_url=api_url, timeout=args.timeout, limits=limits) as client:
+            await wait_ready(client)
+            tokens = await seed_users(max(stages))
+
+            results = []
+            for concurrency in stages:
+                stage = await run_stage(client, tokens, concurrency, args.iterations, api_pid)
+                print(
+                    f"c={concurrency}: {stage['iterations']} runs, error_rate={stage['error_rate']:.2%}, "
+                    f"first text p99={stage['sse_events'].get('text_chunk', {}).get('p99')}ms, "
+                    f"image_ready p99={stage['sse_events'].get('image_ready', {}).get('p99')}ms"
+                )
+                results.append(stage)
+    finally:
+        if api_process:
+            api_process.terminate()
+            api_process.wait(timeout=10)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(UTC).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "workers": args.workers,
+            "iterations_per_user": args.iterations,
+            "fake_upstreams": bool(fake_base_url),
+            "slo_first_text_p99_ms": args.slo_ms,
+        },
+        "stages": results,
+        "max_streams_per_worker": max_streams_per_worker(results, args.workers, args.slo_ms, args.max_error_rate),
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Report written to {args.output} (max streams/worker: {report['max_streams_per_worker']})")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_reports(report, json.load(f), tolerance=args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the generation pipeline")
+    parser.add_argument("--api-url", default="http://127.0.0.1:8000", help="Existing API to test")
+    parser.add_argument("--api-pid", type=int, help="PID of an existing API (for CPU/memory sampling)")
+    parser.add_argument("--start-api", action="store_true", help="Spawn the API with uvicorn")
+    parser.add_argument("--api-port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--start-fakes", action="store_true", help="Run fake upstreams in-process")
+    parser.add_argument("--fake-port", type=int, default=9100)
+    parser.add_argument("--stages", default="1,5,10,20", help="Comma-separated concurrency levels")
+    parser.add_argument("--iterations", type=int, default=3, help="Flow runs per user per stage")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--slo-ms", type=float, default=3000.0, help="p99 time to first text chunk")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--output", default="benchmark-report.json")
+    parser.add_argument("--baseline", help="Previous report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative slowdown")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,126 @@
+"""Latency statistics and comparable JSON benchmark reports.
+
+A report is a plain dict (written as JSON) so runs from different commits
+can be diffed with compare_reports():
+
+    {
+      "meta": {...},
+      "stages": [
+        {"concurrency": 10, "iterations": 30, "error_rate": 0.0,
+         "steps": {"upload": {"count": 30, "p50": ..., "p99": ..., "histogram": {...}}, ...},
+         "sse_events": {"text_chunk": {...}, "image_ready": {...}, ...},
+         "resources": {"1234": {"cpu_percent_mean": ..., "rss_mb_max": ...}}}
+      ],
+      "max_streams_per_worker": 5
+    }
+"""
+
+from collections import Counter, defaultdict
+
+import numpy as np
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is +Inf
+HISTOGRAM_BUCKETS_MS: tuple[float, ...] = (
+    10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000,
+)
+
+# Differences below this are treated as noise when comparing reports
+NOISE_FLOOR_MS = 5.0
+
+
+def summarize(samples: list[float]) -> dict:
+    """Summarize latency samples (ms) with percentiles and a histogram."""
+    if not samples:
+        return {"count": 0}
+    values = np.asarray(samples, dtype=float)
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    # Bucket i counts samples <= HISTOGRAM_BUCKETS_MS[i] (and above the previous bound)
+    counts = np.bincount(
+        np.searchsorted(HISTOGRAM_BUCKETS_MS, values, side="left"),
+        minlength=len(HISTOGRAM_BUCKETS_MS) + 1,
+    )
+    labels = [f"le_{int(b)}" for b in HISTOGRAM_BUCKETS_MS] + ["inf"]
+    return {
+        "count": int(values.size),
+        "mean": round(float(values.mean()), 1),
+        "p50": round(float(p50), 1),
+        "p90": round(float(p90), 1),
+        "p99": round(float(p99), 1),
+        "max": round(float(values.max()), 1),
+        "histogram": dict(zip(labels, counts.tolist(), strict=True)),
+    }
+
+
+class LatencyRecorder:
+    """Collects latency samples and error counts by name."""
+
+    def __init__(self) -> None:
+        """Initialize empty recorder."""
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.errors: Counter[str] = Counter()
+
+    def record(self, name: str, latency_ms: float) -> None:
+        """Add one latency sample."""
+        self.samples[name].append(latency_ms)
+
+    def error(self, name: str) -> None:
+        """Count one failure."""
+        self.errors[name] += 1
+
+    def summary(self, prefix: str = "") -> dict[str, dict]:
+        """Summaries of all samples whose name starts with prefix (prefix stripped)."""
+        return {
+            name[len(prefix):]: summarize(values)
+            for name, values in sorted(self.samples.items())
+            if name.startswith(prefix)
+        }
+
+
+def compare_reports(
+    current: dict,
+    baseline: dict,
+    tolerance: float = 0.10,
+    metrics: tuple[str, ...] = ("p50", "p99"),
+) -> list[str]:
+    """Find regressions of current against baseline.
+
+    Stages are matched by concurrency. A latency metric regresses when it
+    grows by more than tolerance (and more than NOISE_FLOOR_MS); the error
+    rate regresses when it grows by more than one percentage point.
+
+    Returns:
+        Human-readable regression descriptions (empty if none)
+    """
+    regressions: list[str] = []
+    baseline_stages = {stage["concurrency"]: stage for stage in baseline.get("stages", [])}
+
+    for stage in current.get("stages", []):
+        concurrency = stage["concurrency"]
+        base = baseline_stages.get(concurrency)
+        if base is None:
+            continue
+
+        if stage["error_rate"] > base["error_rate"] + 0.01:
+            regressions.append(
+                f"c={concurrency} error_rate {base['error_rate']:.3f} -> {stage['error_rate']:.3f}"
+            )
+
+        for section in ("steps", "sse_events"):
+            for name, stats in stage.get(section, {}).items():
+                base_stats = base.get(section, {}).get(name)
+                if not base_stats or not stats.get("count") or not base_stats.get("count"):
+                    continue
+                for metric in metrics:
+                    old, new = base_stats[metric], stats[metric]
+                    if new > old * (1 + tolerance) and new - old > NOISE_FLOOR_MS:
+                        regressions.append(
+                            f"c={concurrency} {section}.{name}.{metric} {old:.1f}ms -> {new:.1f}ms "
+                            f"(+{(new / old - 1) * 100 if old else float('inf'):.0f}%)"
+                        )
+
+    old_max = baseline.get("max_streams_per_worker")
+    new_max = current.get("max_streams_per_worker")
+    if old_max is not None and new_max is not None and new_max < old_max:
+        regressions.append(f"max_streams_per_worker {old_max} -> {new_max}")
+
+    return regressions
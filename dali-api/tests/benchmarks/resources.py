@@ -0,0 +1,101 @@
+"""CPU and memory sampling of API worker processes (Linux /proc)."""
+
+import asyncio
+import os
+import time
+from collections import defaultdict
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def process_tree(pid: int) -> list[int]:
+    """A process and all its descendants (uvicorn workers, process pools)."""
+    pids = [pid]
+    for current in pids:
+        try:
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return pids
+
+
+def _cpu_seconds(pid: int) -> float | None:
+    """User + system CPU time of a process."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # comm may contain spaces; fields after the closing paren are fixed
+            fields = f.read().rpartition(")")[2].split()
+        return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _rss_mb(pid: int) -> float | None:
+    """Resident set size of a process."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE / 1024 / 1024
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _cmdline(pid: int) -> str:
+    """Short command line for labelling."""
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return f.read().replace(b"\0", b" ").decode(errors="replace").strip()[:80]
+    except OSError:
+        return ""
+
+
+class ProcessSampler:
+    """Periodically samples CPU% and RSS of a process tree."""
+
+    def __init__(self, root_pid: int, interval: float = 0.5) -> None:
+        """Initialize sampler for root_pid and its descendants."""
+        self.root_pid = root_pid
+        self.interval = interval
+        self.cpu: dict[int, list[float]] = defaultdict(list)
+        self.rss: dict[int, list[float]] = defaultdict(list)
+        self._task: asyncio.Task | None = None
+
+    async def _run(self) -> None:
+        """Sample until cancelled."""
+        last: dict[int, tuple[float, float]] = {}
+        while True:
+            now = time.monotonic()
+            for pid in process_tree(self.root_pid):
+                cpu, rss = _cpu_seconds(pid), _rss_mb(pid)
+                if cpu is None or rss is None:
+                    continue
+                if pid in last:
+                    prev_time, prev_cpu = last[pid]
+                    self.cpu[pid].append((cpu - prev_cpu) / (now - prev_time) * 100)
+                last[pid] = (now, cpu)
+                self.rss[pid].append(rss)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start sampling in the background."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> dict[str, dict]:
+        """Stop sampling and summarize per process."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        return {
+            str(pid): {
+                "cmd": _cmdline(pid),
+                "cpu_percent_mean": round(sum(self.cpu[pid]) / len(self.cpu[pid]), 1) if self.cpu[pid] else 0.0,
+                "cpu_percent_max": round(max(self.cpu[pid], default=0.0), 1),
+                "rss_mb_max": round(max(self.rss[pid]), 1),
+            }
+            for pid in self.rss
+        }
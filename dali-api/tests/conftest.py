@@ -23,3 +23,35 @@ async def client() -> AsyncGenerator[AsyncClient, None]:
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
         yield ac
+
+
+@pytest.fixture
+def healthy_dependencies(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Make /api/v1/health answer 200 without Postgres or upstreams."""
+    from app.services.health import health_service
+
+    async def ok() -> None:
+        return None
+
+    monkeypatch.setattr(health_service, "_cache", {})
+    monkeypatch.setattr(health_service, "probes", lambda: {"postgres": (ok, True)})
+
+
+@pytest.fixture(autouse=True)
+def reset_circuit_breakers() -> Generator[None, None, None]:
+    """Start every test with closed circuits (failures in one test must not open them for the next)."""
+    from app.core.circuit_breaker import circuit_breakers
+
+    circuit_breakers.reset()
+    yield
+    circuit_breakers.reset()
+
+
+@pytest.fixture(autouse=True)
+def clear_response_cache() -> Generator[None, None, None]:
+    """Start every test with an empty response cache (answers from one test must not replay in the next)."""
+    from app.services.response_cache import response_cache
+
+    response_cache.clear()
+    yield
+    response_cache.clear()
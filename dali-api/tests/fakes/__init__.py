@@ -0,0 +1 @@
+"""Fake external services for local testing and benchmarks."""
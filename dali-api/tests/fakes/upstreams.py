@@ -0,0 +1,490 @@
+"""Local fake upstream server for offline load tests.
+
+One ASGI app that speaks just enough of each upstream protocol for the real
+integration clients (no mock branches) to run against it:
+
+- DashScope text generation, streamed as SSE (X-DashScope-SSE: enable)
+- DashScope multimodal generation (Qwen-VL), plain JSON
+- DashScope task status and SiliconFlow /user/info (health probes)
+- SiliconFlow /images/edits and /images/generations
+- OpenAI /images/generations (DALL-E fallback)
+- Alibaba imageseg SegmentCloth and objectdet DetectMainBody (RPC at "/")
+- OSS path-style bucket: PUT/GET/HEAD/DELETE objects, ListObjects and
+  batch delete. Signatures are passed through (required, not verified)
+
+Point the API at it through Settings (see upstream_env), e.g. for a server
+on 127.0.0.1:9100:
+
+    DASHSCOPE_API_KEY=fake DASHSCOPE_BASE_URL=http://127.0.0.1:9100/dashscope/api/v1
+    SILICONFLOW_API_KEY=fake SILICONFLOW_BASE_URL=http://127.0.0.1:9100/siliconflow/v1
+    OPENAI_API_KEY=fake OPENAI_BASE_URL=http://127.0.0.1:9100/openai/v1
+    ALIBABA_ACCESS_KEY_ID=fake ALIBABA_ACCESS_KEY_SECRET=fake ALIBABA_ALLOW_HTTP=true
+    ALIBABA_OSS_BUCKET=dali-fake ALIBABA_OSS_ENDPOINT=http://127.0.0.1:9100
+    ALIBABA_IMAGESEG_ENDPOINT=http://127.0.0.1:9100
+    ALIBABA_OBJECTDET_ENDPOINT=http://127.0.0.1:9100
+
+Run with `python -m tests.fakes.upstreams --port 9100 --latency-ms 200`.
+Knobs can be changed at runtime with POST /__fake__/config (JSON body).
+"""
+
+import asyncio
+import io
+import json
+import random
+import time
+import uuid
+from collections.abc import AsyncGenerator
+from dataclasses import asdict, dataclass, fields
+from datetime import UTC, datetime
+from email.utils import format_datetime
+from functools import lru_cache
+from xml.etree import ElementTree
+
+from PIL import Image, ImageDraw
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+OUTFIT_RESPONSE = """根据您选择的单品，我为您推荐以下搭配：
+
+**推荐单品**：
+- 内搭：白色真丝衬衫，优雅大方
+- 下装：黑色阔腿西裤，显瘦修长
+- 鞋子：裸色尖头高跟鞋
+
+<draw_prompt>a woman wearing beige trench coat, white silk blouse, black wide-leg pants, nude heels, office background, fashion photography</draw_prompt>
+
+**搭配理论**：
+采用**高对比度配色法则**，米色与黑色形成视觉冲击，白色内搭提亮肤色。阔腿裤拉长腿部线条，整体造型干练优雅。"""
+
+ONE_SHOT_RESPONSE = {
+    "items": [
+        {"category": "外套", "center": [0.5, 0.3], "description": "beige trench coat with belt"},
+        {"category": "裤子", "center": [0.5, 0.7], "description": "black wide-leg pants"},
+    ],
+    "overall_style": "简约通勤风",
+    "colors": ["米色", "黑色"],
+}
+
+DETECTION_RESPONSE = [
+    {"category": "外套", "description": "beige trench coat", "center_x": 0.5, "center_y": 0.3},
+    {"category": "裤子", "description": "black wide-leg pants", "center_x": 0.5, "center_y": 0.7},
+]
+
+DESCRIPTION_RESPONSE = {
+    "color": "米色",
+    "style": "双排扣长款",
+    "pattern": "纯色",
+    "description": "米色双排扣长款风衣",
+}
+
+# Cutout colors per SegmentCloth category
+CUTOUT_COLORS: dict[str, tuple[int, int, int]] = {
+    "tops": (245, 245, 220),
+    "coat": (193, 154, 107),
+    "pants": (20, 20, 20),
+    "skirt": (255, 182, 193),
+}
+
+
+@dataclass
+class FakeUpstreamConfig:
+    """Behavior knobs, applied to every upstream call."""
+
+    latency_ms: float = 50.0  # Base latency before the first byte
+    jitter_ms: float = 20.0  # Uniform +/- jitter added to every latency
+    error_rate: float = 0.0  # Probability of answering with error_status
+    error_status: int = 500
+    tokens_per_second: float = 60.0  # LLM streaming speed
+    tokens_per_chunk: int = 4  # Characters per SSE chunk (~1 token per CJK char)
+    image_latency_ms: float = 2000.0  # Image generation time (SiliconFlow/OpenAI)
+    image_size: int = 512
+    seed: int | None = None
+
+
+class FakeUpstreams:
+    """State of the fake server: config, RNG and the in-memory OSS bucket."""
+
+    def __init__(self, config: FakeUpstreamConfig | None = None) -> None:
+        """Initialize with an optional config."""
+        self.config = config or FakeUpstreamConfig()
+        self.rng = random.Random(self.config.seed)
+        self.objects: dict[tuple[str, str], tuple[bytes, str, datetime]] = {}
+        self.calls: dict[str, int] = {}
+
+    def count(self, name: str) -> None:
+        """Record a call for later inspection."""
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    async def delay(self, base_ms: float | None = None) -> None:
+        """Sleep for the configured latency plus jitter."""
+        base = self.config.latency_ms if base_ms is None else base_ms
+        jitter = self.rng.uniform(-self.config.jitter_ms, self.config.jitter_ms)
+        await asyncio.sleep(max(0.0, base + jitter) / 1000)
+
+    def should_fail(self) -> bool:
+        """Roll the dice for error injection."""
+        return self.rng.random() < self.config.error_rate
+
+
+@lru_cache(maxsize=16)
+def render_png(size: int, color: tuple[int, int, int], transparent_background: bool) -> bytes:
+    """Render a simple garment-like PNG (cached; deterministic)."""
+    mode = "RGBA" if transparent_background else "RGB"
+    background = (0, 0, 0, 0) if transparent_background else (230, 230, 230)
+    img = Image.new(mode, (size, size), background)
+    draw = ImageDraw.Draw(img)
+    margin = size // 5
+    draw.rectangle((margin, margin, size - margin, size - margin), fill=color)
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _base_url(request: Request) -> str:
+    """Scheme and host the client used to reach us."""
+    return f"{request.url.scheme}://{request.url.netloc}"
+
+
+def _bearer_token(request: Request) -> str:
+    """API key from an "Authorization: Bearer" header ("" if missing)."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    return token.strip() if scheme == "Bearer" else ""
+
+
+def _dashscope_error(state: FakeUpstreams) -> JSONResponse:
+    """DashScope-style error body."""
+    return JSONResponse(
+        {"code": "InternalError", "message": "Injected failure", "request_id": str(uuid.uuid4())},
+        status_code=state.config.error_status,
+    )
+
+
+async def dashscope_text(request: Request) -> Response:
+    """DashScope text generation; SSE when X-DashScope-SSE is enabled."""
+    state: FakeUpstreams = request.app.state.fake
+    state.count("dashscope_text")
+    await request.json()
+    await state.delay()
+    if state.should_fail():
+        return _dashscope_error(state)
+
+    request_id = str(uuid.uuid4())
+    if request.headers.get("x-dashscope-sse", "").lower() != "enable":
+        return JSONResponse({
+            "output": {"choices": [{
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": OUTFIT_RESPONSE},
+            }]},
+            "usage": {"input_tokens": 600, "output_tokens": len(OUTFIT_RESPONSE)},
+            "request_id": request_id,
+        })
+
+    config = state.config
+    step = max(1, config.tokens_per_chunk)
+    interval = step / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+
+    async def events() -> AsyncGenerator[bytes, None]:
+        chunks = [OUTFIT_RESPONSE[i:i + step] for i in range(0, len(OUTFIT_RESPONSE), step)]
+        for index, chunk in enumerate(chunks, start=1):
+            last = index == len(chunks)
+            data = {
+                "output": {"choices": [{
+                    "finish_reason": "stop" if last else "null",
+                    "message": {"role": "assistant", "content": chunk},
+                }]},
+                "usage": {"input_tokens": 600, "output_tokens": index * step},
+                "request_id": request_id,
+            }
+            payload = json.dumps(data, ensure_ascii=False)
+            yield f"id:{index}\nevent:result\n:HTTP_STATUS/200\ndata:{payload}\n\n".encode()
+            if not last:
+                await asyncio.sleep(interval)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+async def dashscope_multimodal(request: Request) -> Response:
+    """DashScope multimodal generation (Qwen-VL), non-streaming."""
+    state: FakeUpstreams = request.app.state.fake
+    state.count("dashscope_multimodal")
+    body = await request.json()
+    await state.delay()
+    if state.should_fail():
+        return _dashscope_error(state)
+
+    prompt = "".join(
+        part.get("text", "")
+        for message in body.get("input", {}).get("messages", [])
+        for part in message.get("content", [])
+        if isinstance(part, dict)
+    )
+    # Answer in the shape each prompt asks for
+    if '"items"' in prompt:
+        answer = ONE_SHOT_RESPONSE
+    elif '"pattern"' in prompt:
+        answer = DESCRIPTION_RESPONSE
+    else:
+        answer = DETECTION_RESPONSE
+    return JSONResponse({
+        "output": {"choices": [{
+            "finish_reason": "stop",
+            "message": {
+                "role": "assistant",
+                "content": [{"text": f"```json\n{json.dumps(answer, ensure_ascii=False)}\n```"}],
+            },
+        }]},
+        "usage": {"input_tokens": 1200, "output_tokens": 120, "image_tokens": 1000},
+        "request_id": str(uuid.uuid4()),
+    })
+
+
+async def dashscope_task(request: Request) -> Response:
+    """DashScope task status; every task id is unknown here."""
+    state: FakeUpstreams = request.app.state.fake
+    state.count("dashscope_task")
+    if not _bearer_token(request):
+        return JSONResponse({"code": "InvalidApiKey", "message": "Invalid API-key provided."}, status_code=401)
+    await state.delay()
+    return JSONResponse({
+        "request_id": str(uuid.uuid4()),
+        "output": {"task_id": request.path_params["task_id"], "task_status": "UNKNOWN"},
+    })
+
+
+async def siliconflow_user_info(request: Request) -> Response:
+    """SiliconFlow account info for the API key."""
+    state: FakeUpstreams = request.app.state.fake
+    state.count("siliconflow_user_info")
+    if not _bearer_token(request):
+        return JSONResponse({"code": 20012, "message": "Invalid token"}, status_code=401)
+    await state.delay()
+    return JSONResponse({"code": 20000, "status": True, "data": {"id": "fake", "balance": "10.00"}})
+
+
+async def image_generation(request: Request) -> Response:
+    """SiliconFlow /images/edits, /images/generations and OpenAI images."""
+    state: FakeUpstreams = request.app.state.fake
+    state.count(f"images_{request.path_params['provider']}")
+    if not request.headers.get("authorization", "").startswith("Bearer "):
+        return JSONResponse({"error": {"message": "Missing API key"}}, status_code=401)
+    await request.json()
+    await state.delay(state.config.image_latency_ms)
+    if state.should_fail():
+        return JSONResponse({"error": {"message": "Injected failure"}}, status_code=state.config.error_status)
+
+    url = f"{_base_url(request)}/files/generated/{uuid.uuid4()}.png"
+    return JSONResponse({"created": int(time.time()), "data": [{"url": url}]})
+
+
+async def files(request: Request) -> Response:
+    """Temporary result files (generated images and cutouts)."""
+    state: FakeUpstreams = request.app.state.fake
+    await state.delay()
+    kind, name = request.path_params["kind"], request.path_params["name"]
+    size = state.config.image_size
+    if kind == "cutouts":
+        category = name.removesuffix(".png")
+        color = CUTOUT_COLORS.get(category, (128, 128, 128))
+        return Response(render_png(size, color, True), media_type="image/png")
+    return Response(render_png(size, (90, 120, 160), False), media_type="image/png")
+
+
+async def rpc(request: Request) -> Response:
+    """Alibaba Cloud RPC-style APIs (imageseg, objectdet)."""
+    state: FakeUpstreams = request.app.state.fake
+    action = request.headers.get("x-acs-action") or request.query_params.get("Action", "")
+    state.count(f"rpc_{action}")
+    await state.delay()
+    request_id = str(uuid.uuid4()).upper()
+    if state.should_fail():
+        return JSONResponse(
+            {"RequestId": request_id, "Code": "InternalError", "Message": "Injected failure"},
+            status_code=state.config.error_status,
+        )
+
+    base = _base_url(request)
+    if action == "SegmentCloth":
+        class_url = {category: f"{base}/files/cutouts/{category}.png" for category in ("coat", "pants")}
+        return JSONResponse({
+            "RequestId": request_id,
+            "Data": {"Elements": [
+                {"ImageURL": f"{base}/files/cutouts/mask.png"},
+                {"ClassUrl": class_url},
+            ]},
+        })
+    if action == "DetectMainBody":
+        return JSONResponse({
+            "RequestId": request_id,
+            "Data": {"Location": {"X": 64, "Y": 32, "Width": 384, "Height": 448}},
+        })
+    return JSONResponse(
+        {"RequestId": request_id, "Code": "InvalidAction.NotFound", "Message": action},
+        status_code=404,
+    )
+
+
+def _oss_signed(request: Request) -> bool:
+    """Accept any signature, but require one (header or presigned query)."""
+    return "authorization" in request.headers or "Signature" in request.query_params
+
+
+def _oss_error(code: str, status_code: int) -> Response:
+    """OSS XML error body."""
+    body = f'<?xml version="1.0" encoding="UTF-8"?><Error><Code>{code}</Code></Error>'
+    return Response(body, status_code=status_code, media_type="application/xml")
+
+
+async def oss_bucket(request: Request) -> Response:
+    """Bucket-level OSS operations: ListObjects and batch delete."""
+    state: FakeUpstreams = request.app.state.fake
+    bucket = request.path_params["bucket"]
+    if not _oss_signed(request):
+        return _oss_error("AccessDenied", 403)
+    await state.delay()
+
+    if request.method == "POST" and "delete" in request.query_params:
+        state.count("oss_batch_delete")
+        root = ElementTree.fromstring(await request.body())
+        result = ElementTree.Element("DeleteResult")
+        for key_node in root.iter("Key"):
+            state.objects.pop((bucket, key_node.text or ""), None)
+            deleted = ElementTree.SubElement(result, "Deleted")
+            ElementTree.SubElement(deleted, "Key").text = key_node.text
+        return Response(ElementTree.tostring(result), media_type="application/xml")
+
+    state.count("oss_list")
+    prefix = request.query_params.get("prefix", "")
+    marker = request.query_params.get("marker", "")
+    max_keys = int(request.query_params.get("max-keys", "100"))
+    keys = sorted(k for b, k in state.objects if b == bucket and k.startswith(prefix) and k > marker)
+    page, truncated = keys[:max_keys], len(keys) > max_keys
+
+    result = ElementTree.Element("ListBucketResult")
+    for tag, value in (
+        ("Name", bucket), ("Prefix", prefix), ("Marker", marker), ("MaxKeys", str(max_keys)),
+        ("Delimiter", ""), ("IsTruncated", str(truncated).lower()),
+        ("NextMarker", page[-1] if truncated else ""),
+    ):
+        ElementTree.SubElement(result, tag).text = value
+    for key in page:
+        data, _, modified = state.objects[(bucket, key)]
+        contents = ElementTree.SubElement(result, "Contents")
+        ElementTree.SubElement(contents, "Key").text = key
+        ElementTree.SubElement(contents, "LastModified").text = modified.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        ElementTree.SubElement(contents, "ETag").text = '"fake"'
+        ElementTree.SubElement(contents, "Type").text = "Normal"
+        ElementTree.SubElement(contents, "Size").text = str(len(data))
+        ElementTree.SubElement(contents, "StorageClass").text = "Standard"
+    return Response(ElementTree.tostring(result), media_type="application/xml")
+
+
+async def oss_object(request: Request) -> Response:
+    """Object-level OSS operations: PUT, GET, HEAD, DELETE."""
+    state: FakeUpstreams = request.app.state.fake
+    bucket, key = request.path_params["bucket"], request.path_params["key"]
+    if not _oss_signed(request):
+        return _oss_error("AccessDenied", 403)
+    state.count(f"oss_{request.method.lower()}")
+    await state.delay()
+    if state.should_fail():
+        return _oss_error("InternalError", state.config.error_status)
+
+    headers = {"x-oss-request-id": uuid.uuid4().hex}
+    if request.method == "PUT":
+        content_type = request.headers.get("content-type", "application/octet-stream")
+        state.objects[(bucket, key)] = (await request.body(), content_type, datetime.now(UTC))
+        return Response(status_code=200, headers={**headers, "ETag": '"fake"'})
+    if request.method == "DELETE":
+        state.objects.pop((bucket, key), None)
+        return Response(status_code=204, headers=headers)
+
+    stored = state.objects.get((bucket, key))
+    if stored is None:
+        return _oss_error("NoSuchKey", 404) if request.method == "GET" else Response(status_code=404)
+    data, content_type, modified = stored
+    headers.update({
+        "Content-Type": content_type,
+        "Content-Length": str(len(data)),
+        "Last-Modified": format_datetime(modified, usegmt=True),
+        "ETag": '"fake"',
+    })
+    if request.method == "HEAD":
+        return Response(status_code=200, headers=headers)
+    return Response(data, headers=headers)
+
+
+async def fake_config(request: Request) -> Response:
+    """Read (GET) or update (POST) the behavior knobs and call counters."""
+    state: FakeUpstreams = request.app.state.fake
+    if request.method == "POST":
+        updates = await request.json()
+        known = {f.name for f in fields(FakeUpstreamConfig)}
+        for name, value in updates.items():
+            if name in known:
+                setattr(state.config, name, value)
+        if "seed" in updates:
+            state.rng.seed(state.config.seed)
+    return JSONResponse({"config": asdict(state.config), "calls": state.calls})
+
+
+def upstream_env(base_url: str, bucket: str = "dali-fake") -> dict[str, str]:
+    """Settings overrides that point every integration at a fake server."""
+    return {
+        "DASHSCOPE_API_KEY": "fake",
+        "DASHSCOPE_BASE_URL": f"{base_url}/dashscope/api/v1",
+        "SILICONFLOW_API_KEY": "fake",
+        "SILICONFLOW_BASE_URL": f"{base_url}/siliconflow/v1",
+        "OPENAI_API_KEY": "fake",
+        "OPENAI_BASE_URL": f"{base_url}/openai/v1",
+        "ALIBABA_ACCESS_KEY_ID": "fake",
+        "ALIBABA_ACCESS_KEY_SECRET": "fake",
+        "ALIBABA_ALLOW_HTTP": "true",
+        "ALIBABA_OSS_BUCKET": bucket,
+        "ALIBABA_OSS_ENDPOINT": base_url,
+        "ALIBABA_IMAGESEG_ENDPOINT": base_url,
+        "ALIBABA_OBJECTDET_ENDPOINT": base_url,
+    }
+
+
+def create_app(config: FakeUpstreamConfig | None = None) -> Starlette:
+    """Create the fake upstream ASGI app."""
+    app = Starlette(routes=[
+        Route("/__fake__/config", fake_config, methods=["GET", "POST"]),
+        Route("/dashscope/api/v1/services/aigc/text-generation/generation", dashscope_text, methods=["POST"]),
+        Route(
+            "/dashscope/api/v1/services/aigc/multimodal-generation/generation",
+            dashscope_multimodal,
+            methods=["POST"],
+        ),
+        Route("/dashscope/api/v1/tasks/{task_id:str}", dashscope_task, methods=["GET"]),
+        Route("/siliconflow/v1/user/info", siliconflow_user_info, methods=["GET"]),
+        Route("/{provider:str}/v1/images/{operation:str}", image_generation, methods=["POST"]),
+        Route("/files/{kind:str}/{name:str}", files, methods=["GET"]),
+        Route("/", rpc, methods=["GET", "POST"]),
+        Route("/{bucket:str}/", oss_bucket, methods=["GET", "POST"]),
+        Route("/{bucket:str}/{key:path}", oss_object, methods=["GET", "HEAD", "PUT", "DELETE"]),
+    ])
+    app.state.fake = FakeUpstreams(config)
+    return app
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run fake upstream services")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    for f in fields(FakeUpstreamConfig):
+        parser.add_argument(f"--{f.name.replace('_', '-')}", type=int if f.default is None else type(f.default))
+    args = parser.parse_args()
+
+    overrides = {
+        f.name: getattr(args, f.name)
+        for f in fields(FakeUpstreamConfig)
+        if getattr(args, f.name) is not None
+    }
+    uvicorn.run(create_app(FakeUpstreamConfig(**overrides)), host=args.host, port=args.port, log_level="warning")
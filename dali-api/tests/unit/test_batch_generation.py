@@ -0,0 +1,80 @@
+"""Unit tests for multi-occasion batch generation."""
+
+import asyncio
+
+import httpx
+import pytest
+from pydantic import ValidationError
+
+from app.api.v1.endpoints.sse import GenerateBatchStreamRequest
+from app.config import settings
+from app.integrations.siliconflow import siliconflow_client
+from app.services.streaming_generator import SharedBaseImage, StreamingOutfitGenerator
+from tests.fakes.upstreams import FakeUpstreamConfig, create_app
+
+OCCASIONS = ["职场通勤", "约会", "日常出行"]
+
+
+@pytest.fixture
+def downloads(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Count base image downloads instead of fetching them."""
+    urls: list[str] = []
+
+    async def download_base_image(url: str) -> bytes:
+        urls.append(url)
+        await asyncio.sleep(0.01)
+        return b"png"
+
+    monkeypatch.setattr(siliconflow_client, "download_base_image", download_base_image)
+    return urls
+
+
+async def test_batch_multiplexes_occasions(monkeypatch: pytest.MonkeyPatch, downloads: list[str]) -> None:
+    """Test every occasion streams concurrently, tagged, and the base image is fetched once."""
+    monkeypatch.setattr(settings, "DASHSCOPE_API_KEY", "fake")
+    fake = create_app(FakeUpstreamConfig(latency_ms=0, jitter_ms=0, tokens_per_second=0, seed=1))
+    generator = StreamingOutfitGenerator()
+    generator.tongyi_api_url = "http://fake/dashscope/api/v1/services/aigc/text-generation/generation"
+    generator._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake))
+
+    events = [
+        event
+        async for event in generator.generate_batch_stream(
+            "https://oss/segmented/coat.png", "米色风衣", "外套", OCCASIONS
+        )
+    ]
+    await generator.close()
+
+    assert fake.state.fake.calls["dashscope_text"] == 3
+    assert downloads == ["https://oss/segmented/coat.png"]
+    assert all(event.data["occasion"] in OCCASIONS for event in events[:-1])
+    assert {e.data["occasion"] for e in events if e.event == "text_chunk"} == set(OCCASIONS)
+    assert events[-1].event == "batch_complete"
+    results = events[-1].data["results"]
+    assert sorted(results) == sorted(OCCASIONS)
+    assert len({result["outfit_id"] for result in results.values()}) == 3
+
+
+async def test_shared_base_image_survives_a_cancelled_waiter(downloads: list[str]) -> None:
+    """Test one generation giving up does not cancel the download for the others."""
+    shared = SharedBaseImage("https://oss/segmented/coat.png")
+    first = asyncio.create_task(shared.get())
+    second = asyncio.create_task(shared.get())
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == b"png"
+    assert first.cancelled()
+    assert len(downloads) == 1
+
+
+def test_batch_request_needs_distinct_occasions() -> None:
+    """Test repeated occasions are dropped and a single occasion is rejected."""
+    base = {"selected_item_url": "u", "selected_item_description": "d", "selected_item_category": "c"}
+
+    request = GenerateBatchStreamRequest(**base, occasions=["约会", "职场通勤", "约会"])
+    assert request.occasions == ["约会", "职场通勤"]
+    with pytest.raises(ValidationError):
+        GenerateBatchStreamRequest(**base, occasions=["约会", "约会"])
+    with pytest.raises(ValidationError):
+        GenerateBatchStreamRequest(**base, occasions=OCCASIONS * 2)
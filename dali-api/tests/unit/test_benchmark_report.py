@@ -0,0 +1,71 @@
+"""Unit tests for benchmark report statistics and comparison."""
+
+from tests.benchmarks.pipeline import max_streams_per_worker
+from tests.benchmarks.report import LatencyRecorder, compare_reports, summarize
+
+
+def _stage(concurrency: int, text_p99: float, error_rate: float = 0.0) -> dict:
+    """Minimal stage dict."""
+    stats = {"count": 10, "p50": text_p99 / 2, "p99": text_p99}
+    return {
+        "concurrency": concurrency,
+        "error_rate": error_rate,
+        "steps": {},
+        "sse_events": {"text_chunk": stats},
+    }
+
+
+class TestSummarize:
+    """Tests for latency summaries."""
+
+    def test_percentiles_and_histogram(self) -> None:
+        """Test percentiles and bucket counts."""
+        summary = summarize([float(v) for v in range(1, 101)])
+        assert summary["count"] == 100
+        assert summary["p50"] == 50.5
+        assert summary["max"] == 100.0
+        assert summary["histogram"]["le_10"] == 10
+        assert sum(summary["histogram"].values()) == 100
+
+    def test_empty(self) -> None:
+        """Test empty sample lists."""
+        assert summarize([]) == {"count": 0}
+
+    def test_recorder_prefix(self) -> None:
+        """Test summaries are grouped by prefix."""
+        recorder = LatencyRecorder()
+        recorder.record("sse.text_chunk", 10.0)
+        recorder.record("step.upload", 5.0)
+        assert list(recorder.summary("sse.")) == ["text_chunk"]
+
+
+class TestCompareReports:
+    """Tests for regression detection."""
+
+    def test_slowdown_beyond_tolerance_is_reported(self) -> None:
+        """Test a 50% p99 regression is flagged."""
+        baseline = {"stages": [_stage(10, 1000.0)]}
+        current = {"stages": [_stage(10, 1500.0)]}
+        regressions = compare_reports(current, baseline)
+        assert any("sse_events.text_chunk.p99" in r for r in regressions)
+
+    def test_noise_is_ignored(self) -> None:
+        """Test small and within-tolerance changes pass."""
+        baseline = {"stages": [_stage(10, 20.0), _stage(20, 1000.0)]}
+        current = {"stages": [_stage(10, 24.0), _stage(20, 1050.0)]}
+        assert compare_reports(current, baseline) == []
+
+    def test_error_rate_regression(self) -> None:
+        """Test error rate increases are flagged."""
+        baseline = {"stages": [_stage(10, 100.0)]}
+        current = {"stages": [_stage(10, 100.0, error_rate=0.05)]}
+        assert compare_reports(current, baseline)
+
+
+class TestMaxStreams:
+    """Tests for the per-worker capacity estimate."""
+
+    def test_highest_passing_stage(self) -> None:
+        """Test failing stages do not count."""
+        stages = [_stage(5, 800.0), _stage(10, 2000.0), _stage(20, 5000.0)]
+        assert max_streams_per_worker(stages, workers=2, slo_ms=3000.0, max_error_rate=0.01) == 5.0
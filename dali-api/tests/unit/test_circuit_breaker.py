@@ -0,0 +1,185 @@
+"""Unit tests for upstream circuit breakers."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.core.circuit_breaker import (
+    CircuitBreaker,
+    CircuitState,
+    circuit_breakers,
+    is_upstream_failure,
+)
+from app.core.exceptions import CircuitOpenError, ValidationError
+from app.core.metrics import track_upstream
+from app.services.streaming_generator import LLM_STREAM_CIRCUIT, StreamingOutfitGenerator
+from tests.fakes.upstreams import FakeUpstreamConfig, create_app
+
+
+def _breaker(**overrides: float) -> CircuitBreaker:
+    options = {"window_size": 4, "min_calls": 4, "failure_rate": 0.5, "open_seconds": 60, "slow_call_seconds": 1.0}
+    return CircuitBreaker("test.call", **{**options, **overrides})
+
+
+def _fail(breaker: CircuitBreaker, error: Exception | None = None) -> None:
+    with pytest.raises(type(error) if error else RuntimeError), breaker.guard():
+        raise error or RuntimeError("upstream down")
+
+
+def _succeed(breaker: CircuitBreaker, duration: float = 0.0) -> None:
+    with breaker.guard() as call:
+        call.duration = duration
+
+
+def _status_error(status_code: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://upstream/")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status_code, request=request))
+
+
+class TestCircuitBreaker:
+    """Tests for the breaker state machine."""
+
+    def test_opens_on_failure_rate(self) -> None:
+        """Test the breaker opens once failures reach the rate over enough calls."""
+        breaker = _breaker()
+        _succeed(breaker)
+        _fail(breaker)
+        _succeed(breaker)
+        assert breaker.state == CircuitState.CLOSED  # Too few calls to judge
+        _fail(breaker)
+        assert breaker.state == CircuitState.OPEN
+
+        with pytest.raises(CircuitOpenError) as exc_info, breaker.guard():
+            pytest.fail("an open breaker must not run the call")
+        assert exc_info.value.code == "AI_SERVICE_UNAVAILABLE"
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.details == {"circuit": "test.call", "retryAfter": 60}
+
+    def test_opens_on_slow_calls_as_timeout(self) -> None:
+        """Test slow successes open the breaker and rejections read as timeouts."""
+        breaker = _breaker(slow_call_rate=0.75)
+        for duration in (2.0, 0.1, 2.0, 2.0):
+            _succeed(breaker, duration)
+
+        assert breaker.state == CircuitState.OPEN
+        with pytest.raises(CircuitOpenError) as exc_info, breaker.guard():
+            pass
+        assert exc_info.value.code == "AI_SERVICE_TIMEOUT"
+
+    def test_client_errors_do_not_count(self) -> None:
+        """Test bad requests are not held against the upstream."""
+        breaker = _breaker()
+        for _ in range(4):
+            _fail(breaker, _status_error(400))
+        assert breaker.state == CircuitState.CLOSED
+
+        assert not is_upstream_failure(ValidationError())
+        assert is_upstream_failure(_status_error(429))
+        wrapped = RuntimeError("wrapped")
+        wrapped.__cause__ = _status_error(502)
+        assert is_upstream_failure(wrapped)
+
+    def test_half_open_trial_closes_or_reopens(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test one trial call is let through after the open period."""
+        breaker = _breaker(open_seconds=0.01)
+        for _ in range(4):
+            _fail(breaker)
+        assert not breaker.allows_request()
+        monkeypatch.setattr(breaker, "_opened_at", 0.0)  # Open period over
+        assert breaker.allows_request()
+
+        _fail(breaker)  # Failed trial reopens
+        assert breaker.state == CircuitState.OPEN
+
+        monkeypatch.setattr(breaker, "_opened_at", 0.0)
+        with breaker.guard():
+            assert breaker.state == CircuitState.HALF_OPEN
+            # Only one trial at a time
+            with pytest.raises(CircuitOpenError), breaker.guard():
+                pass
+        assert breaker.state == CircuitState.CLOSED
+
+    def test_cancelled_trial_frees_its_slot(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test a trial cancelled mid-call neither closes nor reopens the breaker."""
+        breaker = _breaker()
+        for _ in range(4):
+            _fail(breaker)
+        monkeypatch.setattr(breaker, "_opened_at", 0.0)
+
+        with pytest.raises(asyncio.CancelledError), breaker.guard():
+            raise asyncio.CancelledError
+        assert breaker.state == CircuitState.HALF_OPEN
+        assert breaker.allows_request()
+
+
+@pytest.mark.asyncio
+async def test_track_upstream_fails_fast(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test decorated integration methods stop calling a failing upstream."""
+    monkeypatch.setattr(settings, "CIRCUIT_MIN_CALLS", 3)
+    calls = 0
+
+    @track_upstream("flaky", "fetch")
+    async def fetch() -> None:
+        nonlocal calls
+        calls += 1
+        raise httpx.ConnectError("refused")
+
+    for _ in range(3):
+        with pytest.raises(httpx.ConnectError):
+            await fetch()
+    with pytest.raises(CircuitOpenError):
+        await fetch()
+
+    assert calls == 3
+    assert circuit_breakers.state_of("flaky") == CircuitState.OPEN
+
+
+def _generator(monkeypatch: pytest.MonkeyPatch) -> tuple[StreamingOutfitGenerator, dict[str, int]]:
+    """Generator streaming from the fake DashScope; returns it and the fake's call counts."""
+    monkeypatch.setattr(settings, "DASHSCOPE_API_KEY", "fake")
+    fake = create_app(FakeUpstreamConfig(latency_ms=0, jitter_ms=0, tokens_per_second=0, seed=1))
+    generator = StreamingOutfitGenerator()
+    generator.tongyi_api_url = "http://fake/dashscope/api/v1/services/aigc/text-generation/generation"
+    generator._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake))
+    return generator, fake.state.fake.calls
+
+
+def _open(name: str) -> None:
+    breaker = circuit_breakers.get(name)
+    for _ in range(breaker.min_calls):
+        with pytest.raises(RuntimeError), breaker.guard():
+            raise RuntimeError("upstream down")
+
+
+@pytest.mark.asyncio
+async def test_open_llm_circuit_streams_template(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test generation skips DashScope and serves a template while its circuit is open."""
+    generator, calls = _generator(monkeypatch)
+    _open(LLM_STREAM_CIRCUIT)
+
+    events = [event async for event in generator.generate_stream("", "米色风衣", "外套", "职场通勤")]
+    await generator.close()
+
+    assert "dashscope_text" not in calls
+    text = "".join(e.data["content"] for e in events if e.event == "text_chunk")
+    assert "米色风衣" in text and "搭配理论" in text
+    assert events[-1].event == "complete"
+    assert events[-1].data["fallback"] == "template"
+
+
+@pytest.mark.asyncio
+async def test_open_image_circuits_stream_text_only(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the image step is skipped when every image provider's circuit is open."""
+    generator, calls = _generator(monkeypatch)
+    _open("siliconflow.images_edits")
+    _open("openai.images_generations")
+
+    events = [event async for event in generator.generate_stream("", "米色风衣", "外套", "职场通勤")]
+    await generator.close()
+
+    assert calls["dashscope_text"] == 1
+    assert [e.data["code"] for e in events if e.event == "image_failed"] == ["AI_SERVICE_UNAVAILABLE"]
+    assert not any(e.event == "image_generating" for e in events)
+    assert events[-1].data["fallback"] == "text_only"
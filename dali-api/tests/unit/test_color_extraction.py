@@ -0,0 +1,151 @@
+"""Unit tests for garment color extraction.
+
+Tests:
+- Transparent background pixels are ignored
+- Clusters are mapped onto named palette colors
+- Extraction stays fast enough for per-request use
+"""
+
+import io
+import time
+
+import httpx
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.core.color import COLOR_PALETTE, hex_to_lab, nearest_palette_indices
+from app.integrations.alibaba_vision import VisionAPIError, vision_client
+from app.services.color_extraction import ColorExtractor, extract_dominant_colors
+
+
+def _make_cutout(size: int = 512) -> bytes:
+    """Build a PNG cutout: transparent border, red top half, white bottom half."""
+    pixels = np.zeros((size, size, 4), dtype=np.uint8)
+    inner = slice(size // 8, size - size // 8)
+    pixels[inner, inner] = (250, 250, 250, 255)
+    pixels[size // 8 : size // 2, inner] = (220, 20, 30, 255)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels, mode="RGBA").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class TestPaletteMapping:
+    """Tests for Lab palette lookup."""
+
+    def test_palette_colors_map_to_themselves(self) -> None:
+        """Every palette entry is its own nearest neighbour."""
+        lab = hex_to_lab([hex_color for hex_color, _ in COLOR_PALETTE])
+        indices, distances = nearest_palette_indices(lab)
+        assert list(indices) == list(range(len(COLOR_PALETTE)))
+        assert np.allclose(distances, 0)
+
+
+class TestExtractDominantColors:
+    """Tests for extract_dominant_colors."""
+
+    def test_ignores_transparent_background(self) -> None:
+        """Only garment pixels contribute; the black transparent border does not."""
+        colors = extract_dominant_colors(_make_cutout())
+        names = [color.name for color in colors]
+        assert "黑色" not in names
+        assert set(names[:2]) == {"红色", "白色"}
+
+    def test_percentages_reflect_pixel_share(self) -> None:
+        """Red and white each cover half of the opaque garment area."""
+        colors = {color.name: color.percentage for color in extract_dominant_colors(_make_cutout())}
+        assert colors["白色"] == pytest.approx(0.5, abs=0.05)
+        assert colors["红色"] == pytest.approx(0.5, abs=0.05)
+
+    def test_fully_transparent_image_returns_empty(self) -> None:
+        """An empty cutout yields no colors."""
+        buffer = io.BytesIO()
+        Image.new("RGBA", (32, 32), (0, 0, 0, 0)).save(buffer, format="PNG")
+        assert extract_dominant_colors(buffer.getvalue()) == []
+
+    def test_opaque_jpeg_uses_all_pixels(self) -> None:
+        """Images without alpha are analyzed in full."""
+        buffer = io.BytesIO()
+        Image.new("RGB", (200, 100), (0, 0, 120)).save(buffer, format="JPEG")
+        colors = extract_dominant_colors(buffer.getvalue())
+        assert colors[0].name == "藏蓝色"
+        assert colors[0].percentage == 1.0
+
+    def test_extraction_is_fast(self) -> None:
+        """A large cutout is processed well under 50 ms."""
+        image_bytes = _make_cutout(1024)
+        extract_dominant_colors(image_bytes)  # warm up imports and caches
+        start = time.perf_counter()
+        extract_dominant_colors(image_bytes)
+        assert time.perf_counter() - start < 0.05
+
+
+class TestColorExtractor:
+    """Tests for the process pool wrapper."""
+
+    @pytest.mark.asyncio
+    async def test_extract_runs_in_pool(self) -> None:
+        """Async extraction returns the same result as the sync function."""
+        extractor = ColorExtractor(max_workers=1)
+        try:
+            image_bytes = _make_cutout(128)
+            assert await extractor.extract(image_bytes) == extract_dominant_colors(image_bytes)
+        finally:
+            extractor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_identical_content_is_cached(self) -> None:
+        """A second extraction of the same bytes does not touch the pool."""
+        extractor = ColorExtractor(max_workers=1)
+        try:
+            image_bytes = _make_cutout(64)
+            first = await extractor.extract(image_bytes)
+            extractor.shutdown()  # any pool use after this would create a new pool
+            assert await extractor.extract(image_bytes) == first
+            assert extractor._executor is None
+        finally:
+            extractor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_callers_cannot_change_cached_result(self) -> None:
+        """Changing a returned list does not affect later lookups of the same image."""
+        extractor = ColorExtractor(max_workers=1)
+        try:
+            image_bytes = _make_cutout(64)
+            first = await extractor.extract(image_bytes)
+            expected = list(first)
+            first.reverse()
+            first.append(first[0])
+            assert await extractor.extract(image_bytes) == expected
+        finally:
+            extractor.shutdown()
+
+
+class TestVisionColorSources:
+    """Tests for the cutout -> original photo fallback in garment analysis."""
+
+    @pytest.fixture
+    def photo_server(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Serve the original photo; the cutout URL fails."""
+        real_client = httpx.AsyncClient
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/photo.png":
+                return httpx.Response(200, content=_make_cutout(64))
+            return httpx.Response(404)
+
+        monkeypatch.setattr(
+            httpx, "AsyncClient", lambda **kwargs: real_client(transport=httpx.MockTransport(handler))
+        )
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_original_photo(self, photo_server: None) -> None:
+        """A missing cutout does not fail the analysis."""
+        colors = await vision_client._extract_colors("http://oss/cutout.png", "http://oss/photo.png")
+        assert {color.name for color in colors[:2]} == {"红色", "白色"}
+
+    @pytest.mark.asyncio
+    async def test_raises_when_all_sources_fail(self, photo_server: None) -> None:
+        """Only when every source fails is the error surfaced."""
+        with pytest.raises(VisionAPIError):
+            await vision_client._extract_colors("http://oss/cutout.png", "http://oss/other.png")
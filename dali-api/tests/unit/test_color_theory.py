@@ -0,0 +1,72 @@
+"""Unit tests for the color theory lookup tables.
+
+Tests:
+- Palette pairs are classified into harmony relations
+- Outfit color principles are named from the garment's colors
+- Garment descriptions yield prompt facts about their colors
+"""
+
+import numpy as np
+
+from app.services.color_theory import (
+    ColorRelation,
+    classify,
+    color_principle,
+    find_colors,
+    harmony_table,
+    prompt_facts,
+)
+from app.services.streaming_generator import StreamingOutfitGenerator
+
+WHITE, BLACK, RED, ORANGE, LIGHT_BLUE, PINK, GREEN = (
+    "#FFFFFF",
+    "#000000",
+    "#FF0000",
+    "#FFA500",
+    "#ADD8E6",
+    "#FFC0CB",
+    "#008000",
+)
+
+
+def test_table_is_symmetric() -> None:
+    """Test every relation and score is the same both ways round."""
+    table = harmony_table()
+
+    for array in (table.relations, table.harmony, table.contrast, table.delta_e):
+        np.testing.assert_allclose(array, array.T)
+
+
+def test_classify_pairs() -> None:
+    """Test relations, contrast and ΔE for well-known pairs."""
+    assert classify(RED, ORANGE).relation == ColorRelation.ANALOGOUS
+    assert classify(RED, LIGHT_BLUE).relation == ColorRelation.COMPLEMENTARY
+    assert classify(PINK, GREEN).relation == ColorRelation.TRIADIC
+    assert classify(RED, "#FF1010").relation == ColorRelation.MONOCHROME
+    assert classify(RED, WHITE).relation == ColorRelation.NEUTRAL
+
+    black_white = classify(BLACK, WHITE)
+    assert round(black_white.contrast) == 21
+    assert round(black_white.delta_e) == 100
+    assert classify(WHITE, WHITE).contrast == 1.0
+
+
+def test_color_principle() -> None:
+    """Test the outfit's principle follows its dominant chromatic relation."""
+    assert color_principle(PINK, [GREEN, WHITE]) == "三角色搭配（粉色×绿色）"
+    assert color_principle(RED, [RED, WHITE]) == "同色系搭配（红色）"
+    assert color_principle(BLACK, [WHITE, BLACK]) == "中性色搭配·高对比"
+
+
+def test_prompt_facts_from_description() -> None:
+    """Test color words are found, longest first, and turned into prompt facts."""
+    assert find_colors("深蓝色牛仔外套配白色T恤") == ["#000080", "#FFFFFF"]
+    assert prompt_facts("纯棉T恤") is None
+
+    facts = prompt_facts("红色针织开衫")
+    assert facts.startswith("【色彩理论参考】")
+    assert "互补色：浅蓝色" in facts
+    assert "慎用撞色" in facts
+
+    message = StreamingOutfitGenerator()._build_user_message_with_selected_item("红色针织开衫", "上衣", "约会")
+    assert facts in message
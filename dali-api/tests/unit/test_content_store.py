@@ -0,0 +1,31 @@
+"""Unit tests for content-addressed storage keys."""
+
+import hashlib
+import uuid
+
+from app.services.content_store import blob_key, sha256_hex, user_photo_key
+
+
+class TestContentKeys:
+    """Tests for digest-derived object keys."""
+
+    def test_sha256_hex(self) -> None:
+        """Test digest matches hashlib."""
+        assert sha256_hex(b"dali") == hashlib.sha256(b"dali").hexdigest()
+
+    def test_blob_key_is_sharded_by_digest_prefix(self) -> None:
+        """Test blob keys fan out by the first two hex characters."""
+        digest = sha256_hex(b"cutout")
+        assert blob_key(digest, "image/png") == f"blobs/{digest[:2]}/{digest}.png"
+
+    def test_identical_content_maps_to_same_key(self) -> None:
+        """Test the same bytes always produce the same key."""
+        assert blob_key(sha256_hex(b"a"), "image/png") == blob_key(sha256_hex(b"a"), "image/png")
+        assert blob_key(sha256_hex(b"a"), "image/png") != blob_key(sha256_hex(b"b"), "image/png")
+
+    def test_user_photo_key_stays_in_user_prefix(self) -> None:
+        """Test client-claimed digests are deduplicated per user only."""
+        user_id = uuid.uuid4()
+        digest = sha256_hex(b"photo")
+        key = user_photo_key(user_id, digest, "image/jpeg")
+        assert key == f"users/{user_id}/photos/{digest}.jpg"
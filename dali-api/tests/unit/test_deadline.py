@@ -0,0 +1,151 @@
+"""Unit tests for per-request deadlines."""
+
+import asyncio
+from collections.abc import AsyncIterator
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+
+from app.api.deps import request_deadline
+from app.config import settings
+from app.core import deadline
+from app.core.circuit_breaker import CircuitState, circuit_breakers
+from app.core.deadline import deadline_scope, iter_within_deadline, remaining, within_deadline
+from app.core.exceptions import DeadlineExceededError
+from app.core.metrics import track_upstream
+from app.core.retry import RetryPolicy, call_with_retry
+from app.services.streaming_generator import LLM_STREAM_CIRCUIT, StreamingOutfitGenerator
+from tests.fakes.upstreams import FakeUpstreamConfig, create_app
+
+
+class TestDeadline:
+    """Tests for the deadline helpers."""
+
+    async def test_no_deadline_is_unbounded(self) -> None:
+        """Test calls outside a request keep their own timeouts."""
+        assert remaining() is None
+        assert deadline.timeout(30.0, "test") == 30.0
+        async with within_deadline("test"):
+            await asyncio.sleep(0)
+
+    async def test_scope_only_tightens(self) -> None:
+        """Test a nested scope cannot extend the request's deadline."""
+        with deadline_scope(1.0):
+            with deadline_scope(60.0):
+                assert remaining() <= 1.0
+            with deadline_scope(0.5):
+                assert remaining() <= 0.5
+                assert deadline.timeout(30.0, "test") <= 0.5
+        assert remaining() is None
+
+    async def test_cancels_work_when_deadline_passes(self) -> None:
+        """Test the block is cancelled and the error names the operation."""
+        cancelled = False
+
+        async def slow() -> None:
+            nonlocal cancelled
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+
+        with deadline_scope(0.05), pytest.raises(DeadlineExceededError) as exc_info:
+            async with within_deadline("test.slow"):
+                await slow()
+        assert cancelled
+        assert exc_info.value.status_code == 504
+        assert exc_info.value.details == {"operation": "test.slow"}
+
+    async def test_own_timeouts_pass_through(self) -> None:
+        """Test a TimeoutError raised by the operation itself is not relabelled."""
+        with deadline_scope(10.0), pytest.raises(TimeoutError):
+            async with within_deadline("test"):
+                await asyncio.wait_for(asyncio.sleep(10), timeout=0.01)
+
+    async def test_iterator_reads_are_bounded(self) -> None:
+        """Test a stalled stream is cut off between items."""
+
+        async def stream() -> AsyncIterator[str]:
+            yield "first"
+            await asyncio.sleep(10)
+            yield "never"
+
+        items = []
+        with deadline_scope(0.05), pytest.raises(DeadlineExceededError):
+            async for item in iter_within_deadline(stream(), "test.stream"):
+                items.append(item)
+        assert items == ["first"]
+
+
+async def test_expired_deadline_skips_upstream_without_tripping_breaker() -> None:
+    """Test integration calls fail fast past the deadline and the breaker stays clean."""
+    calls = 0
+
+    @track_upstream("slow", "fetch")
+    async def fetch() -> None:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(10)
+
+    with deadline_scope(0.02):
+        with pytest.raises(DeadlineExceededError):
+            await fetch()  # Cancelled mid-call
+        with pytest.raises(DeadlineExceededError):
+            await fetch()  # Not attempted
+
+    assert calls == 1
+    assert circuit_breakers.state_of("slow") == CircuitState.CLOSED
+    assert not circuit_breakers.get("slow.fetch")._outcomes
+
+
+async def test_retries_stop_at_deadline() -> None:
+    """Test no retry starts when its backoff would outlast the deadline."""
+    calls = 0
+
+    async def flaky() -> None:
+        nonlocal calls
+        calls += 1
+        raise httpx.ConnectError("refused")
+
+    policy = RetryPolicy("test", max_attempts=5, base_delay=1.0, max_delay=1.0)
+    with deadline_scope(0.001), pytest.raises(httpx.ConnectError):
+        await call_with_retry(policy, flaky)
+    assert calls == 1
+
+
+async def test_route_dependency_sets_deadline(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test request_deadline gives the route the configured budget."""
+    monkeypatch.setattr(settings, "REQUEST_DEADLINE_SECONDS", 5.0)
+    app = FastAPI()
+
+    @app.get("/budget", dependencies=[Depends(request_deadline)])
+    async def budget() -> dict[str, float | None]:
+        return {"remaining": remaining()}
+
+    async def read_budget() -> float:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return (await client.get("/budget")).json()["remaining"]
+
+    # In its own task, like a server request, so the deadline does not leak into the test
+    assert 4.0 < await asyncio.create_task(read_budget()) <= 5.0
+
+
+async def test_stream_reports_deadline(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a generation past its deadline ends with a deadline error, not a generic failure."""
+    monkeypatch.setattr(settings, "DASHSCOPE_API_KEY", "fake")
+    # ASGITransport buffers the response, so the deadline passes before the first read
+    fake = create_app(FakeUpstreamConfig(latency_ms=300, jitter_ms=0, tokens_per_second=0, seed=1))
+    generator = StreamingOutfitGenerator()
+    generator.tongyi_api_url = "http://fake/dashscope/api/v1/services/aigc/text-generation/generation"
+    generator._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake))
+
+    with deadline_scope(0.1):
+        events = [event async for event in generator.generate_stream("", "米色风衣", "外套", "职场通勤")]
+    await generator.close()
+
+    assert events[-1].event == "error"
+    assert events[-1].data["code"] == "REQUEST_DEADLINE_EXCEEDED"
+    assert not any(e.event == "complete" for e in events)
+    assert circuit_breakers.state_of(LLM_STREAM_CIRCUIT.split(".")[0]) == CircuitState.CLOSED
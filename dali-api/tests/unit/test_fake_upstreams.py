@@ -0,0 +1,103 @@
+"""Unit tests for the fake upstream server.
+
+The real integration clients are pointed at the fake through an in-process
+ASGI transport, so these tests exercise their HTTP code paths offline.
+"""
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.integrations.qwen_vl import QwenVLClient, QwenVLError
+from app.services.streaming_generator import StreamingOutfitGenerator
+from tests.fakes.upstreams import OUTFIT_RESPONSE, FakeUpstreamConfig, create_app
+
+BASE_URL = "http://fake"
+
+
+def _fake_client(config: FakeUpstreamConfig) -> httpx.AsyncClient:
+    """HTTP client routed to an in-process fake upstream app."""
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(config)), base_url=BASE_URL)
+
+
+FAST = FakeUpstreamConfig(latency_ms=0, jitter_ms=0, tokens_per_second=0, image_latency_ms=0, seed=1)
+
+
+class TestFakeDashScope:
+    """Tests for the DashScope endpoints."""
+
+    @pytest.mark.asyncio
+    async def test_streaming_generator_parses_sse(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test the generator streams text and detects the draw prompt."""
+        monkeypatch.setattr(settings, "DASHSCOPE_API_KEY", "fake")
+        generator = StreamingOutfitGenerator()
+        generator.tongyi_api_url = f"{BASE_URL}/dashscope/api/v1/services/aigc/text-generation/generation"
+        generator._client = _fake_client(FAST)
+
+        events = [event async for event in generator.generate_stream("", "米色风衣", "外套", "职场通勤")]
+        await generator.close()
+
+        names = [event.event for event in events]
+        text = "".join(event.data["content"] for event in events if event.event == "text_chunk")
+        assert "image_generating" in names
+        assert names[-1] == "complete"
+        assert "搭配理论" in text
+        assert "<draw_prompt>" not in text
+
+    @pytest.mark.asyncio
+    async def test_streaming_generator_sends_the_whole_answer(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test the text held back for tag detection is sent once the stream ends."""
+        monkeypatch.setattr(settings, "DASHSCOPE_API_KEY", "fake")
+        generator = StreamingOutfitGenerator()
+        generator.tongyi_api_url = f"{BASE_URL}/dashscope/api/v1/services/aigc/text-generation/generation"
+        generator._client = _fake_client(FAST)
+
+        events = [event async for event in generator.generate_stream("", "米色风衣", "外套", "职场通勤")]
+        await generator.close()
+
+        text = "".join(event.data["content"] for event in events if event.event == "text_chunk")
+        assert text.endswith(OUTFIT_RESPONSE.rpartition("</draw_prompt>")[2].rstrip())
+
+    @pytest.mark.asyncio
+    async def test_multimodal_one_shot(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test Qwen-VL one-shot analysis parses the fake response."""
+        monkeypatch.setattr(settings, "DASHSCOPE_API_KEY", "fake")
+        client = QwenVLClient()
+        client.api_url = f"{BASE_URL}/dashscope/api/v1/services/aigc/multimodal-generation/generation"
+        client._client = _fake_client(FAST)
+
+        result = await client.analyze_image_one_shot("http://example.com/photo.jpg")
+        await client.close()
+
+        assert [point.category for point in result.anchor_points] == ["外套", "裤子"]
+
+    @pytest.mark.asyncio
+    async def test_error_injection(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test error_rate=1 makes every call fail."""
+        monkeypatch.setattr(settings, "DASHSCOPE_API_KEY", "fake")
+        client = QwenVLClient()
+        client.api_url = f"{BASE_URL}/dashscope/api/v1/services/aigc/multimodal-generation/generation"
+        client._client = _fake_client(FakeUpstreamConfig(latency_ms=0, jitter_ms=0, error_rate=1.0))
+
+        with pytest.raises(QwenVLError):
+            await client.analyze_image_one_shot("http://example.com/photo.jpg")
+        await client.close()
+
+
+class TestFakeOSS:
+    """Tests for the path-style OSS bucket."""
+
+    @pytest.mark.asyncio
+    async def test_put_get_list_requires_signature(self) -> None:
+        """Test object round trip and signature pass-through."""
+        async with _fake_client(FAST) as client:
+            signed = {"Authorization": "OSS fake:signature"}
+            put = await client.put("/bucket/generated/a.png", content=b"png", headers=signed)
+            assert put.status_code == 200
+
+            assert (await client.get("/bucket/generated/a.png")).status_code == 403
+            get = await client.get("/bucket/generated/a.png", params={"Signature": "x"})
+            assert get.content == b"png"
+
+            listing = await client.get("/bucket/", params={"prefix": "generated/"}, headers=signed)
+            assert "<Key>generated/a.png</Key>" in listing.text
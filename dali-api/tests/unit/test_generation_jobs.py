@@ -0,0 +1,261 @@
+"""Unit tests for background generation jobs."""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+import uuid
+from collections.abc import AsyncGenerator
+from datetime import UTC, datetime
+from pathlib import Path
+
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api import deps
+from app.config import settings
+from app.core.security import create_access_token
+from app.main import app
+from app.models.generation_job import GenerationJob
+from app.models.user import User
+from app.services import generation_jobs
+from app.services.generation_jobs import (
+    GenerationJobService,
+    JobProgress,
+    callback_allowed,
+    generation_job_service,
+)
+from app.services.streaming_generator import SSEEvent
+
+OUTFIT_ID = str(uuid.uuid4())
+
+EVENTS = [
+    SSEEvent(event="thinking", data={"message": "正在生成搭配方案..."}),
+    SSEEvent(event="text_chunk", data={"content": "推荐单品："}),
+    SSEEvent(event="image_generating", data={"prompt": "a woman..."}),
+    SSEEvent(event="text_chunk", data={"content": "白色衬衫"}),
+    SSEEvent(event="image_ready", data={"url": "https://oss/generated/a.png"}),
+    SSEEvent(
+        event="complete",
+        data={"outfit_id": OUTFIT_ID, "generated_image_url": "https://oss/generated/a.png", "fallback": None},
+    ),
+]
+
+
+def _job(callback_url: str | None = None) -> GenerationJob:
+    return GenerationJob(
+        id=uuid.uuid4(),
+        user_id=uuid.uuid4(),
+        status="running",
+        selected_item_url="https://oss/segmented/a.png",
+        selected_item_description="米色风衣",
+        selected_item_category="外套",
+        occasion="职场通勤",
+        callback_url=callback_url,
+        text="",
+        version=1,
+        created_at=datetime.now(UTC),
+    )
+
+
+class _FakeGenerator:
+    """Replays events, optionally hanging before the last one."""
+
+    def __init__(self, events: list[SSEEvent], hang: bool = False) -> None:
+        self.events = events
+        self.hang = hang
+
+    async def generate_stream(self, **kwargs: object) -> AsyncGenerator[SSEEvent, None]:
+        for event in self.events:
+            yield event
+        if self.hang:
+            await asyncio.sleep(60)
+
+
+@pytest.fixture
+def service(monkeypatch: pytest.MonkeyPatch) -> tuple[GenerationJobService, list[JobProgress], list[uuid.UUID]]:
+    """A service whose job writes are recorded instead of stored."""
+    service = GenerationJobService()
+    saved: list[JobProgress] = []
+    requeued: list[uuid.UUID] = []
+    jobs: dict[uuid.UUID, GenerationJob] = {}
+
+    async def save(job_id: uuid.UUID, progress: JobProgress, finished: bool = False) -> GenerationJob:
+        saved.append(JobProgress(**{**vars(progress), "status": progress.status if finished else "running"}))
+        job = jobs[job_id]
+        for name, value in progress.values().items():
+            setattr(job, name, value)
+        job.finished_at = datetime.now(UTC) if finished else None
+        return job
+
+    async def requeue(job_id: uuid.UUID) -> None:
+        requeued.append(job_id)
+
+    original_run = service._run
+
+    async def run(job: GenerationJob) -> None:
+        jobs[job.id] = job
+        await original_run(job)
+
+    monkeypatch.setattr(service, "_save", save)
+    monkeypatch.setattr(service, "_requeue", requeue)
+    monkeypatch.setattr(service, "_run", run)
+    monkeypatch.setattr(settings, "GENERATION_JOB_FLUSH_SECONDS", 0.0)
+    return service, saved, requeued
+
+
+def test_progress_folds_events() -> None:
+    """Test text accumulates and the result comes from the complete event."""
+    progress = JobProgress()
+    changed = [progress.apply(event) for event in EVENTS]
+
+    assert changed == [False, True, False, True, True, True]
+    assert progress.status == "complete"
+    assert progress.text == "推荐单品：白色衬衫"
+    assert progress.image_url == "https://oss/generated/a.png"
+    assert progress.values()["outfit_id"] == uuid.UUID(OUTFIT_ID)
+
+    failed = JobProgress()
+    failed.apply(SSEEvent(event="error", data={"message": "请求处理超时，请稍后重试", "code": "REQUEST_DEADLINE_EXCEEDED"}))
+    assert (failed.status, failed.error_code) == ("error", "REQUEST_DEADLINE_EXCEEDED")
+
+
+def test_callbacks_only_to_allowlisted_https_hosts(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test callbacks cannot be pointed at arbitrary (internal) hosts."""
+    monkeypatch.setattr(settings, "GENERATION_JOB_CALLBACK_HOSTS", ["hooks.example.com"])
+
+    assert callback_allowed("https://hooks.example.com/dali")
+    assert not callback_allowed("http://hooks.example.com/dali")
+    assert not callback_allowed("https://169.254.169.254/latest")
+    assert not callback_allowed("https://hooks.example.com.evil.io/dali")
+
+
+async def test_run_writes_progress_and_result(service, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a job's text is written as it streams and the result at the end."""
+    service, saved, _ = service
+    monkeypatch.setattr(generation_jobs, "streaming_generator", _FakeGenerator(EVENTS))
+
+    await service._run(_job())
+
+    assert [p.status for p in saved] == ["running", "running", "running", "complete"]
+    assert saved[0].text == "推荐单品："
+    assert saved[-1].text == "推荐单品：白色衬衫"
+    assert saved[-1].outfit_id == OUTFIT_ID
+
+
+async def test_run_without_result_fails_the_job(service, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a generation that ends without complete or error is reported as failed."""
+    service, saved, _ = service
+    monkeypatch.setattr(generation_jobs, "streaming_generator", _FakeGenerator(EVENTS[:2]))
+
+    await service._run(_job())
+
+    assert saved[-1].status == "error"
+    assert saved[-1].error_code == "GENERATION_FAILED"
+
+
+async def test_cancelled_job_is_requeued(service, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a job interrupted by shutdown goes back to the queue."""
+    service, saved, requeued = service
+    monkeypatch.setattr(generation_jobs, "streaming_generator", _FakeGenerator(EVENTS[:2], hang=True))
+    job = _job()
+
+    task = asyncio.create_task(service._run(job))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert requeued == [job.id]
+    assert all(p.status == "running" for p in saved)
+
+
+async def test_finished_job_calls_back_signed(service, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the callback carries the result and an HMAC signature of the body."""
+    service, _, _ = service
+    monkeypatch.setattr(generation_jobs, "streaming_generator", _FakeGenerator(EVENTS))
+    monkeypatch.setattr(settings, "GENERATION_JOB_CALLBACK_SECRET", "s3cret")
+    received: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        received.append(request)
+        return httpx.Response(204)
+
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    job = _job(callback_url="https://hooks.example.com/dali")
+
+    await service._run(job)
+    await service.shutdown()
+
+    assert len(received) == 1
+    body = received[0].content
+    expected = hmac.new(b"s3cret", body, hashlib.sha256).hexdigest()
+    assert received[0].headers["X-Dali-Signature"] == f"sha256={expected}"
+    payload = json.loads(body)
+    assert payload["job_id"] == str(job.id)
+    assert payload["status"] == "complete"
+    assert payload["image_url"] == "https://oss/generated/a.png"
+
+
+async def test_long_poll_holds_no_pooled_connection(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Test authentication returns its connection to the pool before the long-poll waits."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'auth.db'}")
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(User.__table__.create)
+    user = User(id=uuid.uuid4(), nickname="poller", is_active=True, is_deleted=False)
+    async with session_maker() as db:
+        db.add(user)
+        await db.commit()
+    monkeypatch.setattr(deps, "async_session_maker", session_maker)
+    checked_out: list[int] = []
+
+    async def get(job_id: uuid.UUID, user_id: uuid.UUID, after_version: int | None = None, wait: float = 0.0):
+        for _ in range(3):
+            checked_out.append(engine.pool.checkedout())
+            await asyncio.sleep(0.01)
+        job = _job()
+        job.id, job.user_id = job_id, user_id
+        return job
+
+    monkeypatch.setattr(generation_job_service, "get", get)
+    token = create_access_token({"sub": str(user.id)})
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get(
+            f"/api/v1/outfits/jobs/{uuid.uuid4()}",
+            params={"version": 1, "wait": 1},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+    await engine.dispose()
+
+    assert response.status_code == 200
+    assert checked_out == [0, 0, 0]
+
+
+async def test_lost_jobs_are_reclaimed_on_their_own_cadence(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test idle polls only claim; the stale-job update runs once per GENERATION_JOB_RECLAIM_SECONDS."""
+    service = GenerationJobService()
+    reclaims: list[float] = []
+    claims: list[float] = []
+
+    async def reclaim_lost() -> None:
+        reclaims.append(time.monotonic())
+
+    async def claim() -> None:
+        claims.append(time.monotonic())
+
+    monkeypatch.setattr(service, "_reclaim_lost", reclaim_lost)
+    monkeypatch.setattr(service, "_claim", claim)
+    monkeypatch.setattr(settings, "GENERATION_JOB_POLL_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "GENERATION_JOB_RECLAIM_SECONDS", 60.0)
+
+    workers = [asyncio.create_task(service._work()) for _ in range(2)]
+    await asyncio.sleep(0.1)
+    for worker in workers:
+        worker.cancel()
+    await asyncio.wait(workers)
+
+    assert len(claims) > 4
+    assert len(reclaims) == 1
@@ -0,0 +1,80 @@
+"""Unit tests for generation usage and cost accounting."""
+
+import uuid
+from decimal import Decimal
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.models.generation_record import GenerationRecord
+from app.services.generation_usage import (
+    GenerationUsage,
+    GenerationUsageRecorder,
+    estimate_cost,
+    generation_usage_recorder,
+)
+from app.services.streaming_generator import StreamingOutfitGenerator
+from tests.fakes.upstreams import FakeUpstreamConfig, create_app
+
+
+class TestGenerationUsage:
+    """Tests for collecting usage while streaming."""
+
+    def test_first_chunk_sets_ttft_then_gaps(self) -> None:
+        """Test the first chunk is the time to first token, later ones are gaps."""
+        usage = GenerationUsage()
+        for elapsed in (0.5, 0.6, 0.9):
+            usage.observe_chunk(elapsed)
+
+        assert usage.time_to_first_token == 0.5
+        assert usage.chunk_gaps == pytest.approx([0.1, 0.3])
+
+    def test_last_usage_block_wins(self) -> None:
+        """Test cumulative DashScope usage blocks overwrite earlier ones."""
+        usage = GenerationUsage()
+        usage.observe_usage({"usage": {"input_tokens": 600, "output_tokens": 4}})
+        usage.observe_usage({"output": {}})
+        usage.observe_usage({"usage": {"input_tokens": 600, "output_tokens": 12}})
+
+        assert (usage.prompt_tokens, usage.completion_tokens) == (600, 12)
+
+
+def test_estimate_cost(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test token prices are per 1K tokens and images add a flat price."""
+    monkeypatch.setattr(settings, "LLM_PRICE_INPUT_PER_1K_TOKENS", 0.002)
+    monkeypatch.setattr(settings, "LLM_PRICE_OUTPUT_PER_1K_TOKENS", 0.008)
+    monkeypatch.setattr(settings, "IMAGE_PRICE_DALLE", 0.3)
+
+    assert estimate_cost(1000, 500, None) == Decimal("0.006")
+    assert estimate_cost(1000, 500, "dalle") == Decimal("0.306")
+
+
+@pytest.mark.asyncio
+async def test_stream_records_usage(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A generation against the fake DashScope stores tokens and timings."""
+    written: list[GenerationRecord] = []
+
+    async def capture(self: GenerationUsageRecorder, record: GenerationRecord) -> None:
+        written.append(record)
+
+    monkeypatch.setattr(GenerationUsageRecorder, "_write", capture)
+    monkeypatch.setattr(settings, "DASHSCOPE_API_KEY", "fake")
+    config = FakeUpstreamConfig(latency_ms=0, jitter_ms=0, tokens_per_second=0, image_latency_ms=0, seed=1)
+    generator = StreamingOutfitGenerator()
+    generator.tongyi_api_url = "http://fake/dashscope/api/v1/services/aigc/text-generation/generation"
+    generator._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(config)))
+
+    user_id = str(uuid.uuid4())
+    [event async for event in generator.generate_stream("", "米色风衣", "外套", "职场通勤", user_id=user_id)]
+    await generator.close()
+    await generation_usage_recorder.shutdown()
+
+    [record] = written
+    assert record.user_id == uuid.UUID(user_id)
+    assert record.status == "complete"
+    assert record.model == StreamingOutfitGenerator.MODEL_NAME
+    assert record.prompt_tokens == 600
+    assert record.completion_tokens > 0
+    assert record.time_to_first_token_ms is not None
+    assert record.estimated_cost > 0
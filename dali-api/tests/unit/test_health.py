@@ -4,14 +4,109 @@ import pytest
 from httpx import AsyncClient
 
 
+def _checks(**checks):
+    async def ok() -> None:
+        return None
+
+    async def fail() -> None:
+        raise ConnectionError("refused")
+
+    probes = {"ok": ok, "fail": fail, "skip": None}
+    return lambda: {name: (probes[result], name == "postgres") for name, result in checks.items()}
+
+
+@pytest.fixture
+def health(monkeypatch: pytest.MonkeyPatch):
+    """Health service singleton with an empty cache."""
+    from app.services.health import health_service
+
+    monkeypatch.setattr(health_service, "_cache", {})
+    return health_service
+
+
 @pytest.mark.asyncio
-async def test_health_check(client: AsyncClient) -> None:
+async def test_health_check(client: AsyncClient, health, monkeypatch: pytest.MonkeyPatch) -> None:
     """Test health check endpoint returns OK status."""
+    monkeypatch.setattr(health, "probes", _checks(postgres="ok", oss="skip"))
+
     response = await client.get("/api/v1/health")
     assert response.status_code == 200
     data = response.json()
     assert data["status"] == "ok"
     assert data["version"] == "0.1.0"
+    assert data["dependencies"]["postgres"]["status"] == "ok"
+    assert data["dependencies"]["oss"]["status"] == "skipped"
+
+
+@pytest.mark.asyncio
+async def test_health_degraded_and_error(client: AsyncClient, health, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test an upstream failure degrades health and a Postgres failure fails it."""
+    monkeypatch.setattr(health, "probes", _checks(postgres="ok", dashscope="fail"))
+    response = await client.get("/api/v1/health")
+    assert response.status_code == 200
+    assert response.json()["status"] == "degraded"
+
+    health.clear()
+    monkeypatch.setattr(health, "probes", _checks(postgres="fail", dashscope="ok"))
+    response = await client.get("/api/v1/health")
+    assert response.status_code == 503
+    assert response.json()["status"] == "error"
+    assert response.json()["dependencies"]["postgres"]["error"] == "ConnectionError: refused"
+
+
+@pytest.mark.asyncio
+async def test_health_probes_are_cached_and_shared(health, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a burst of health checks runs each probe once per TTL."""
+    import asyncio
+
+    from app.config import settings
+
+    calls = 0
+
+    async def probe() -> None:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+
+    monkeypatch.setattr(health, "probes", lambda: {"postgres": (probe, True)})
+    monkeypatch.setattr(settings, "HEALTH_CACHE_SECONDS", 60.0)
+
+    results = await asyncio.gather(*(health.check_all() for _ in range(20)))
+    assert calls == 1
+    assert all(result["postgres"].status == "ok" for result in results)
+    await health.check_all()
+    assert calls == 1
+
+    monkeypatch.setattr(settings, "HEALTH_CACHE_SECONDS", 0.0)
+    await health.check_all()
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_upstream_auth_probes(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the DashScope and SiliconFlow probes against the fake upstreams."""
+    import httpx
+
+    from app.config import settings
+    from app.integrations.siliconflow import siliconflow_client
+    from app.services.health import check_dashscope, check_siliconflow, run_check
+    from app.services.streaming_generator import streaming_generator
+    from tests.fakes.upstreams import FakeUpstreamConfig, create_app
+
+    fake = create_app(FakeUpstreamConfig(latency_ms=0, jitter_ms=0, seed=1))
+    monkeypatch.setattr(settings, "DASHSCOPE_BASE_URL", "http://fake/dashscope/api/v1")
+    monkeypatch.setattr(settings, "SILICONFLOW_BASE_URL", "http://fake/siliconflow/v1")
+    monkeypatch.setattr(settings, "DASHSCOPE_API_KEY", "fake")
+    monkeypatch.setattr(settings, "SILICONFLOW_API_KEY", "")
+    for owner in (streaming_generator, siliconflow_client):
+        monkeypatch.setattr(owner, "_client", httpx.AsyncClient(transport=httpx.ASGITransport(app=fake)))
+
+    dashscope = await run_check("dashscope", check_dashscope, False, 2.0)
+    siliconflow = await run_check("siliconflow", check_siliconflow, False, 2.0)
+    assert dashscope.status == "ok"
+    assert siliconflow.status == "error"
+    assert siliconflow.error == "UpstreamAuthError: HTTP 401"
+    assert fake.state.fake.calls == {"dashscope_task": 1, "siliconflow_user_info": 1}
 
 
 @pytest.mark.asyncio
@@ -23,3 +118,100 @@ async def test_root_endpoint(client: AsyncClient) -> None:
     assert data["name"] == "搭理app API"
     assert data["version"] == "0.1.0"
     assert data["docs"] == "/docs"
+
+
+@pytest.fixture
+def readiness(monkeypatch: pytest.MonkeyPatch):
+    """Fresh readiness state for the singleton the endpoint reads."""
+    from app.services.readiness import readiness_service
+
+    monkeypatch.setattr(readiness_service, "ready", False)
+    monkeypatch.setattr(readiness_service, "warming", False)
+    monkeypatch.setattr(readiness_service, "dependencies", {})
+    return readiness_service
+
+
+@pytest.mark.asyncio
+async def test_ready_is_503_before_warm_up(client: AsyncClient, readiness) -> None:
+    """Test /ready refuses traffic until the warm-up has run."""
+    response = await client.get("/api/v1/ready")
+    assert response.status_code == 503
+    assert response.json() == {"status": "warming", "dependencies": {}}
+
+
+@pytest.mark.asyncio
+async def test_ready_after_warm_up(client: AsyncClient, readiness, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test /ready reports each dependency once Postgres is warm."""
+    monkeypatch.setattr(readiness, "checks", _checks(postgres="ok", dashscope="ok", oss="skip"))
+
+    assert await readiness.warm_up() is True
+    response = await client.get("/api/v1/ready")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "ready"
+    assert data["dependencies"]["postgres"]["status"] == "ok"
+    assert data["dependencies"]["postgres"]["required"] is True
+    assert data["dependencies"]["postgres"]["latencyMs"] >= 0
+    assert data["dependencies"]["oss"] == {
+        "status": "skipped", "latencyMs": None, "required": False, "error": None, "circuit": None,
+    }
+
+
+@pytest.mark.asyncio
+async def test_upstream_failure_does_not_gate_readiness(
+    client: AsyncClient, readiness, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test a vendor outage is reported without draining the worker."""
+    monkeypatch.setattr(readiness, "checks", _checks(postgres="ok", dashscope="fail"))
+
+    assert await readiness.warm_up() is True
+    data = (await client.get("/api/v1/ready")).json()
+    assert data["dependencies"]["dashscope"]["status"] == "error"
+    assert data["dependencies"]["dashscope"]["error"] == "ConnectionError: refused"
+
+
+@pytest.mark.asyncio
+async def test_postgres_failure_keeps_worker_unready(
+    client: AsyncClient, readiness, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test the worker stays out of rotation while Postgres is down."""
+    monkeypatch.setattr(readiness, "checks", _checks(postgres="fail", dashscope="ok"))
+
+    assert await readiness.warm_up() is False
+    response = await client.get("/api/v1/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "not_ready"
+
+
+@pytest.mark.asyncio
+async def test_warm_up_check_timeout(readiness, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a hanging check fails after WARM_UP_PROBE_TIMEOUT."""
+    import asyncio
+
+    from app.config import settings
+
+    async def hang() -> None:
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(settings, "WARM_UP_PROBE_TIMEOUT", 0.01)
+    monkeypatch.setattr(readiness, "checks", lambda: {"postgres": (hang, True)})
+
+    assert await readiness.warm_up() is False
+    assert readiness.dependencies["postgres"].error == "TimeoutError"
+
+
+@pytest.mark.asyncio
+async def test_health_reports_circuit_state(client: AsyncClient, health, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test upstream dependencies report the worst state of their circuit breakers."""
+    from app.core.circuit_breaker import circuit_breakers
+
+    breaker = circuit_breakers.get("qwen_vl.analyze_image_one_shot")
+    for _ in range(breaker.min_calls):
+        with pytest.raises(RuntimeError), breaker.guard():
+            raise RuntimeError("upstream down")
+    monkeypatch.setattr(health, "probes", _checks(postgres="ok", dashscope="ok", siliconflow="ok"))
+
+    data = (await client.get("/api/v1/health")).json()
+    assert data["dependencies"]["dashscope"]["circuit"] == "open"
+    assert data["dependencies"]["siliconflow"]["circuit"] == "closed"
+    assert data["dependencies"]["postgres"]["circuit"] is None
@@ -0,0 +1,101 @@
+"""Unit tests for derivative image generation.
+
+Tests:
+- WebP rendering at each variant size
+- Transparency preservation
+- Background generation uploads every variant
+"""
+
+import asyncio
+import io
+
+import pytest
+from PIL import Image
+
+from app.services import image_variants
+from app.services.image_variants import ImageVariantService, render_variants
+from app.services.storage import IMAGE_VARIANTS
+
+
+def _png(size: tuple[int, int], mode: str = "RGBA") -> bytes:
+    """Build a PNG of the given size."""
+    buffer = io.BytesIO()
+    Image.new(mode, size, (200, 30, 30, 128) if mode == "RGBA" else (200, 30, 30)).save(
+        buffer, format="PNG"
+    )
+    return buffer.getvalue()
+
+
+class TestRenderVariants:
+    """Tests for render_variants."""
+
+    def test_renders_every_variant_as_webp(self) -> None:
+        """Each variant is a WebP bounded by its max edge."""
+        variants = render_variants(_png((2000, 1000)))
+        assert set(variants) == set(IMAGE_VARIANTS)
+        for name, data in variants.items():
+            with Image.open(io.BytesIO(data)) as img:
+                assert img.format == "WEBP"
+                assert max(img.size) == IMAGE_VARIANTS[name]
+
+    def test_preserves_transparency(self) -> None:
+        """Cutouts keep their alpha channel."""
+        with Image.open(io.BytesIO(render_variants(_png((400, 400)))["thumb"])) as img:
+            assert img.mode == "RGBA"
+
+    def test_small_images_are_not_upscaled(self) -> None:
+        """Originals smaller than a variant keep their size."""
+        with Image.open(io.BytesIO(render_variants(_png((100, 50), "RGB"))["medium"])) as img:
+            assert img.size == (100, 50)
+
+
+class TestImageVariantService:
+    """Tests for ImageVariantService."""
+
+    @pytest.mark.asyncio
+    async def test_generate_uploads_all_variants(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """All variants are uploaded next to the original."""
+        uploads: dict[str, str] = {}
+
+        def fake_upload(object_key: str, data: bytes, content_type: str = "image/jpeg") -> bool:
+            uploads[object_key] = content_type
+            return True
+
+        monkeypatch.setattr(image_variants.storage_service, "upload_file", fake_upload)
+        service = ImageVariantService(concurrency=1)
+        stored = await service.schedule("generated/abc.png", _png((1200, 1200)))
+
+        assert stored == {
+            "thumb": "generated/abc_thumb.webp",
+            "medium": "generated/abc_medium.webp",
+        }
+        assert set(uploads.values()) == {"image/webp"}
+
+    @pytest.mark.asyncio
+    async def test_failures_do_not_raise(self) -> None:
+        """Undecodable input is logged, not raised, in the background path."""
+        service = ImageVariantService(concurrency=1)
+        assert await service.schedule("generated/bad.png", b"not an image") == {}
+
+    @pytest.mark.asyncio
+    async def test_variant_url_only_for_stored_variants(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """A missing derivative yields no URL and is regenerated from the original."""
+        stored: dict[str, bytes] = {"users/u/photos/a.jpg": _png((800, 800), "RGB")}
+
+        def fake_upload(object_key: str, data: bytes, content_type: str = "image/jpeg") -> bool:
+            stored[object_key] = data
+            return True
+
+        monkeypatch.setattr(image_variants.storage_service, "upload_file", fake_upload)
+        monkeypatch.setattr(image_variants.storage_service, "file_exists", lambda key: key in stored)
+        monkeypatch.setattr(image_variants.storage_service, "download_file", stored.get)
+        service = ImageVariantService(concurrency=1)
+
+        assert await service.variant_url("users/u/photos/a.jpg", "thumb") is None
+        # A second request while regenerating does not schedule a duplicate
+        assert await service.variant_url("users/u/photos/a.jpg", "thumb") is None
+        assert len(service._tasks) == 1
+        await asyncio.gather(*service._tasks)
+
+        assert "users/u/photos/a_thumb.webp" in stored
+        assert await service.variant_url("users/u/photos/a.jpg", "thumb") is not None
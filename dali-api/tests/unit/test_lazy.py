@@ -0,0 +1,70 @@
+"""Unit tests for lazily constructed singletons."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.core.lazy import LazySingleton, lazy_singleton, warm_up
+from tests.benchmarks.import_time import LAZY_MODULES
+
+
+class Client:
+    """Stand-in integration client."""
+
+    instances = 0
+
+    def __init__(self) -> None:
+        Client.instances += 1
+        self.endpoint = "https://example.com"
+
+    def call(self) -> str:
+        return "called"
+
+
+class TestLazySingleton:
+    """Tests for the lazy proxy."""
+
+    def test_built_once_on_first_use(self) -> None:
+        """Test nothing is built until an attribute is used, then only once."""
+        Client.instances = 0
+        client = lazy_singleton("test_client", Client)
+
+        assert Client.instances == 0
+        assert client.call() == "called"
+        assert client.endpoint == "https://example.com"
+        assert Client.instances == 1
+
+    def test_monkeypatch_reaches_target(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test attribute writes go to the built instance and can be undone."""
+        proxy = LazySingleton("test_patched", Client)
+
+        monkeypatch.setattr(proxy, "call", lambda: "patched")
+        assert proxy.get().call() == "patched"
+        monkeypatch.undo()
+        assert proxy.call() == "called"
+
+    def test_warm_up_reports_failures(self) -> None:
+        """Test a failing constructor is reported instead of raised."""
+
+        def broken() -> Client:
+            raise ValueError("no endpoint")
+
+        lazy_singleton("test_broken", broken)
+        lazy_singleton("test_warm", Client)
+
+        results = warm_up(["test_broken", "test_warm"])
+
+        assert results == {"test_broken": "ValueError: no endpoint", "test_warm": "ok"}
+
+
+def test_app_import_is_lazy() -> None:
+    """Importing the app neither loads vendor SDKs nor needs OSS settings."""
+    check = f"import sys, app.main; print([m for m in {LAZY_MODULES!r} if m in sys.modules])"
+    env = {**os.environ, "ALIBABA_OSS_ENDPOINT": "", "ALIBABA_OSS_BUCKET": ""}
+
+    result = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True, env=env)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
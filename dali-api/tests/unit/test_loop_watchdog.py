@@ -0,0 +1,73 @@
+"""Unit tests for the event-loop blocking detector."""
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncGenerator
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.core.loop_watchdog import LoopWatchdog, loop_watchdog, request_scope
+from app.core.metrics import track_upstream
+
+
+@pytest.fixture
+async def watchdog(monkeypatch: pytest.MonkeyPatch) -> AsyncGenerator[LoopWatchdog, None]:
+    """The watchdog reporting callbacks over 50ms, removed after the test."""
+    monkeypatch.setattr(loop_watchdog, "threshold", 0.05)
+    monkeypatch.setattr(loop_watchdog, "probe_interval", 0.01)
+    loop_watchdog.start()
+    yield loop_watchdog
+    await loop_watchdog.stop()
+
+
+def _blocking_seconds(route: str, integration: str) -> float:
+    labels = {"route": route, "integration": integration}
+    return REGISTRY.get_sample_value("event_loop_blocking_seconds_count", labels) or 0.0
+
+
+@pytest.mark.asyncio
+async def test_blocking_attributed_to_upstream_method(
+    watchdog: LoopWatchdog, caplog: pytest.LogCaptureFixture
+) -> None:
+    """A synchronous SDK call inside a tracked method is attributed to it."""
+
+    @track_upstream("test_sdk")
+    async def segment() -> None:
+        time.sleep(0.1)  # Synchronous SDK call
+
+    before = _blocking_seconds("background", "test_sdk.segment")
+    with caplog.at_level(logging.WARNING, logger="app.core.loop_watchdog"):
+        await asyncio.create_task(segment())
+
+    assert _blocking_seconds("background", "test_sdk.segment") == before + 1
+    assert "integration=test_sdk.segment" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_blocking_attributed_to_route(watchdog: LoopWatchdog) -> None:
+    """Blocking while handling a request is labelled with its route template."""
+
+    class Route:
+        path = "/api/v1/test/{id}"
+
+    async def handler() -> None:
+        request_scope.set({"type": "http", "route": Route()})
+        time.sleep(0.1)
+
+    before = _blocking_seconds("/api/v1/test/{id}", "none")
+    await asyncio.create_task(handler())
+
+    assert _blocking_seconds("/api/v1/test/{id}", "none") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_stop_restores_callback_runner() -> None:
+    """Stopping the watchdog unhooks asyncio."""
+    original = asyncio.Handle._run
+    watchdog = LoopWatchdog(threshold=0.05, probe_interval=0.01)
+    watchdog.start()
+    assert asyncio.Handle._run is not original
+    await watchdog.stop()
+    assert asyncio.Handle._run is original
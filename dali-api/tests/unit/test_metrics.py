@@ -0,0 +1,80 @@
+"""Unit tests for Prometheus metrics."""
+
+import time
+
+import pytest
+from httpx import AsyncClient
+from prometheus_client import REGISTRY
+
+from app.core.metrics import observe_upstream, observe_upstream_stream, track_upstream
+
+
+def _sample(name: str, labels: dict[str, str]) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("healthy_dependencies")
+async def test_metrics_endpoint_records_route_template(client: AsyncClient) -> None:
+    """Requests are labelled by route template and exposed at /metrics."""
+    labels = {"method": "GET", "route": "/api/v1/health", "status": "200"}
+    before = _sample("http_request_duration_seconds_count", labels)
+
+    await client.get("/api/v1/health")
+    response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "http_request_duration_seconds" in response.text
+    assert _sample("http_request_duration_seconds_count", labels) == before + 1
+
+
+@pytest.mark.asyncio
+async def test_unmatched_paths_share_one_label(client: AsyncClient) -> None:
+    """Unknown paths do not create a label value each."""
+    labels = {"method": "GET", "route": "unmatched", "status": "404"}
+    before = _sample("http_request_duration_seconds_count", labels)
+
+    await client.get("/no/such/path/1")
+    await client.get("/no/such/path/2")
+
+    assert _sample("http_request_duration_seconds_count", labels) == before + 2
+
+
+def test_observe_upstream_counts_errors() -> None:
+    """Failures are counted by exception type and still timed."""
+    labels = {"integration": "test", "method": "fails"}
+    before = _sample("upstream_request_duration_seconds_count", labels)
+
+    with pytest.raises(ValueError), observe_upstream("test", "fails"):
+        raise ValueError("boom")
+
+    assert _sample("upstream_request_duration_seconds_count", labels) == before + 1
+    assert _sample("upstream_errors_total", {**labels, "error": "ValueError"}) == 1
+
+
+@pytest.mark.asyncio
+async def test_track_upstream_uses_function_name() -> None:
+    """The decorator labels calls with the wrapped method's name."""
+
+    @track_upstream("test")
+    async def segment() -> str:
+        return "ok"
+
+    labels = {"integration": "test", "method": "segment"}
+    before = _sample("upstream_request_duration_seconds_count", labels)
+
+    assert await segment() == "ok"
+    assert _sample("upstream_request_duration_seconds_count", labels) == before + 1
+
+
+def test_upstream_stream_excludes_consumer_time() -> None:
+    """Time spent handing items to the consumer is not upstream latency."""
+    labels = {"integration": "test", "method": "stream"}
+    before = _sample("upstream_request_duration_seconds_sum", labels)
+
+    with observe_upstream_stream("test", "stream") as stream, stream.paused():
+        time.sleep(0.2)
+
+    assert _sample("upstream_request_duration_seconds_sum", labels) - before < 0.1
+    assert stream.consumer_seconds >= 0.2
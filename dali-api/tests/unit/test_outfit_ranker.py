@@ -0,0 +1,93 @@
+"""Unit tests for vectorized outfit ranking.
+
+Tests:
+- Palette harmony favours neutrals and related hues over clashes
+- Ranking follows garment colors, style and occasion
+- Confidences are deterministic scores, not random
+- Ranking a large catalog stays within the per-request budget
+"""
+
+import random
+import time
+
+import numpy as np
+
+from app.core.color import COLOR_PALETTE, harmony_matrix
+from app.services.ai_orchestrator import OUTFIT_TEMPLATES, ai_orchestrator
+from app.services.outfit_ranker import OutfitRanker
+
+PINK = [{"hex": "#FFC0CB", "name": "粉色", "percentage": 90.0}]
+
+
+def _palette_index(name: str) -> int:
+    return [color_name for _, color_name in COLOR_PALETTE].index(name)
+
+
+def test_harmony_matrix_is_symmetric_and_bounded() -> None:
+    """Test neutrals go with anything and analogous hues beat clashing ones."""
+    matrix = harmony_matrix()
+    black, red, orange, green = (_palette_index(name) for name in ("黑色", "红色", "橙色", "绿色"))
+
+    np.testing.assert_allclose(matrix, matrix.T)
+    assert matrix.min() >= 0.0 and matrix.max() <= 1.0
+    assert matrix[black].min() >= 0.8
+    assert matrix[red, orange] > matrix[red, green]
+
+
+def test_ranking_prefers_matching_colors_and_style() -> None:
+    """Test a pink sweet top ranks the sweet date outfit first."""
+    ranker = OutfitRanker(OUTFIT_TEMPLATES)
+
+    ranked = ranker.rank("上衣", PINK, ["甜美"], "浪漫约会", body_type="梨形")
+
+    assert ranked[0].template["name"] == "甜美约会风"
+    assert all(outfit.occasion == "浪漫约会" for outfit in ranked)
+    assert [outfit.score for outfit in ranked] == sorted((outfit.score for outfit in ranked), reverse=True)
+
+
+def test_unknown_inputs_lower_confidence() -> None:
+    """Test an uninformative request gets a middling score and the default occasion."""
+    ranker = OutfitRanker(OUTFIT_TEMPLATES)
+
+    ranked = ranker.rank("上衣", [], [], "不存在的场合")
+
+    assert {outfit.occasion for outfit in ranked} == {"日常出行"}
+    assert all(0.5 < outfit.score < 0.7 for outfit in ranked)
+
+
+async def test_recommendation_confidence_is_deterministic() -> None:
+    """Test the orchestrator's confidences come from the ranker."""
+    kwargs = {"garment_type": "上衣", "colors": PINK, "style_tags": ["甜美"], "occasion": "浪漫约会"}
+
+    first = await ai_orchestrator.generate_outfit_recommendations(**kwargs)
+    second = await ai_orchestrator.generate_outfit_recommendations(**kwargs)
+
+    assert len(first) == 3
+    assert [r.confidence for r in first] == [r.confidence for r in second]
+    assert [r.name for r in first] == [r.name for r in second]
+    assert all(0.0 <= r.confidence <= 1.0 for r in first)
+
+
+def test_large_catalog_ranks_within_budget() -> None:
+    """Test thousands of candidate outfits are scored in well under 10 ms."""
+    rng = random.Random(0)
+    templates = [template for group in OUTFIT_TEMPLATES.values() for template in group]
+    catalog = {
+        occasion: [
+            {**template, "items": rng.sample(template["items"], len(template["items"]))}
+            for template in rng.choices(templates, k=500)
+        ]
+        for occasion in OUTFIT_TEMPLATES
+    }
+    ranker = OutfitRanker(catalog)
+    colors = [{"hex": "#000080", "percentage": 70.0}, {"hex": "#FFFFFF", "percentage": 30.0}]
+
+    ranker.rank("裤子", colors, ["通勤"], "职场通勤", body_type="梨形", user_styles=["简约"])
+    started = time.perf_counter()
+    for _ in range(10):
+        ranked = ranker.rank("裤子", colors, ["通勤"], "职场通勤", body_type="梨形", user_styles=["简约"])
+    elapsed = (time.perf_counter() - started) / 10
+
+    assert len(ranker.templates) == 3000
+    assert len(ranked) == 3
+    assert elapsed < 0.01
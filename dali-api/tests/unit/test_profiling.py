@@ -0,0 +1,71 @@
+"""Unit tests for on-demand profiling."""
+
+import asyncio
+import logging
+import threading
+import time
+
+import pytest
+from httpx import AsyncClient
+
+from app.config import settings
+from app.core.profiling import LoopStallMonitor, sample_stacks
+
+
+def _busy_worker(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sample_stacks_is_collapsed_format() -> None:
+    """Samples name the thread and end with the function it is running."""
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_worker, args=(stop,), name="busy")
+    worker.start()
+    try:
+        collapsed = sample_stacks(0.1, interval=0.005)
+    finally:
+        stop.set()
+        worker.join()
+
+    busy = [line for line in collapsed.splitlines() if line.startswith("busy;")]
+    assert busy
+    stack, count = busy[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert "_busy_worker (" in stack
+
+
+@pytest.mark.asyncio
+async def test_stall_monitor_names_blocking_call(caplog: pytest.LogCaptureFixture) -> None:
+    """A synchronous call blocking the loop is logged with its stack."""
+    monitor = LoopStallMonitor(threshold=0.05, interval=0.01)
+    monitor.start()
+    await asyncio.sleep(0.05)
+
+    with caplog.at_level(logging.WARNING, logger="app.core.profiling"):
+        time.sleep(0.3)  # Blocks the event loop
+        await asyncio.sleep(0.05)
+    await monitor.stop()
+
+    assert "Event loop blocked" in caplog.text
+    assert "test_stall_monitor_names_blocking_call" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_profile_endpoint_requires_admin_token(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """The endpoint is hidden without ADMIN_TOKEN and forbidden with a wrong one."""
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "")
+    assert (await client.get("/api/v1/debug/profile")).status_code == 404
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    response = await client.get("/api/v1/debug/profile", headers={"X-Admin-Token": "wrong"})
+    assert response.status_code == 403
+
+    response = await client.get(
+        "/api/v1/debug/profile", params={"seconds": 0.05}, headers={"X-Admin-Token": "secret"}
+    )
+    assert response.status_code == 200
+    assert response.headers["x-worker-pid"]
+    assert "MainThread;" in response.text
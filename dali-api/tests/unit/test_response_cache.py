@@ -0,0 +1,119 @@
+"""Unit tests for the generation response cache.
+
+Tests:
+- Answers are collected per key, then replayed in turn until they expire
+- Near-identical descriptions share answers only when enabled
+- A repeated stream is replayed without the LLM, reusing its image
+"""
+
+import re
+import time
+from dataclasses import dataclass
+
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+
+from app.config import settings
+from app.services.response_cache import CachedResponse, CacheKey, ResponseCache
+from app.services.storage import storage_service
+from app.services.streaming_generator import StreamingOutfitGenerator
+from tests.fakes.upstreams import OUTFIT_RESPONSE, FakeUpstreamConfig, create_app
+
+FAST = FakeUpstreamConfig(latency_ms=0, jitter_ms=0, tokens_per_second=0, image_latency_ms=0, seed=1)
+
+
+def _lookups(result: str) -> float:
+    return REGISTRY.get_sample_value("response_cache_lookups_total", {"result": result}) or 0.0
+
+
+def _key(description: str, occasion: str = "职场通勤") -> CacheKey:
+    return CacheKey.build("v1", f"{description} {occasion}", description, "上衣", occasion, ["#FFFFFF"])
+
+
+def _response(text: str, created_at: float | None = None) -> CachedResponse:
+    created_at = created_at or time.monotonic()
+    return CachedResponse(text=text, base_key="blobs/ab/cutout.png", image_key=None, created_at=created_at)
+
+
+def test_variants_rotate_until_expired(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a key replays only once full, then hands out its variants in turn."""
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_VARIANTS", 2)
+    cache, key = ResponseCache(), _key("白色T恤")
+    misses, hits = _lookups("miss"), _lookups("hit")
+
+    assert cache.get(key) is None
+    cache.put(key, _response("a"))
+    assert cache.get(key) is None
+    cache.put(key, _response("b"))
+    assert [cache.get(key).text for _ in range(3)] == ["a", "b", "a"]
+    assert (_lookups("miss") - misses, _lookups("hit") - hits) == (2, 3)
+
+    # Normalized: width, case and whitespace do not matter
+    assert cache.get(_key("白色Ｔ恤 ")) is not None
+
+    expired = time.monotonic() - settings.RESPONSE_CACHE_TTL_SECONDS - 1
+    cache.put(_key("黑色T恤"), _response("old", created_at=expired))
+    assert cache.get(_key("黑色T恤")) is None
+    assert len(cache) == 1
+
+
+def test_similar_descriptions_share_answers(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test near matches need the same scope and are off by default."""
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_VARIANTS", 1)
+    cache = ResponseCache()
+    cache.put(_key("白色短袖T恤"), _response("a"))
+
+    assert cache.get(_key("白色T恤")) is None
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_SIMILARITY", 0.6)
+    assert cache.get(_key("白色T恤")).text == "a"
+    assert cache.get(_key("白色T恤", occasion="约会")) is None
+    assert cache.get(_key("白色衬衫")) is None
+
+
+@dataclass
+class _Image:
+    image_url: str
+    object_key: str = "generated/outfit.png"
+    provider: str = "siliconflow"
+    generation_time_ms: int = 0
+
+
+async def test_repeated_stream_is_replayed(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the second identical stream makes no LLM call and reuses the image for the same base."""
+    monkeypatch.setattr(settings, "DASHSCOPE_API_KEY", "fake")
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_VARIANTS", 1)
+    monkeypatch.setattr("app.services.streaming_generator.image_generation_available", lambda: True)
+    bases: list[str] = []
+
+    async def generate_image(self: StreamingOutfitGenerator, prompt: str, base_image_url: str, *args) -> _Image:
+        bases.append(base_image_url)
+        return _Image(image_url=storage_service.get_file_url("generated/outfit.png"))
+
+    monkeypatch.setattr(StreamingOutfitGenerator, "_generate_image", generate_image)
+    fake = create_app(FAST)
+    generator = StreamingOutfitGenerator()
+    generator.tongyi_api_url = "http://fake/dashscope/api/v1/services/aigc/text-generation/generation"
+    generator._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake))
+    url = storage_service.get_file_url("blobs/ab/cutout.png")
+    other_url = storage_service.get_file_url("blobs/cd/cutout.png")
+
+    streams = [
+        [e async for e in generator.generate_stream(base, "米色风衣", "外套", "职场通勤")]
+        for base in (url, url, other_url)
+    ]
+    await generator.close()
+
+    # Chunked differently, so blank lines between segments may differ
+    texts = [
+        "".join("".join(e.data["content"] for e in events if e.event == "text_chunk").split())
+        for events in streams
+    ]
+    answer = "".join(re.sub(r"<draw_prompt>.*</draw_prompt>", "", OUTFIT_RESPONSE).split())
+    assert fake.state.fake.calls["dashscope_text"] == 1
+    assert texts[1] == texts[2] == answer
+    assert [events[-1].data["generated_image_url"] for events in streams] == [
+        storage_service.get_file_url("generated/outfit.png")
+    ] * 3
+    # The image is only generated again for a different base image
+    assert bases == [url, other_url]
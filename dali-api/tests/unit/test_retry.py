@@ -0,0 +1,174 @@
+"""Unit tests for retries of idempotent upstream calls."""
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.core import retry
+from app.core.exceptions import CircuitOpenError
+from app.core.retry import (
+    RetryBudget,
+    RetryPolicy,
+    call_with_retry,
+    get_with_retry,
+    is_retryable,
+    retryable,
+)
+from app.integrations.qwen_vision import QwenVisionError
+
+POLICY = RetryPolicy("test", max_attempts=3, base_delay=0.01, max_delay=0.05)
+
+
+def _status_error(status_code: int, headers: dict[str, str] | None = None) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "http://upstream/")
+    response = httpx.Response(status_code, headers=headers, request=request)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+
+@pytest.fixture(autouse=True)
+def sleeps(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    """Record backoff delays instead of sleeping, with a fresh budget."""
+    delays: list[float] = []
+
+    async def sleep(delay: float) -> None:
+        delays.append(delay)
+
+    monkeypatch.setattr(retry.asyncio, "sleep", sleep)
+    monkeypatch.setattr(retry, "retry_budget", RetryBudget(ratio=0.1, min_per_second=1.0, window=10.0))
+    return delays
+
+
+def _flaky(*errors: Exception) -> tuple[list[int], object]:
+    """A call failing with each error in turn, then returning "ok"."""
+    calls: list[int] = []
+
+    async def call() -> str:
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return "ok"
+
+    return calls, call
+
+
+class TestIsRetryable:
+    """Tests for classifying failures."""
+
+    @pytest.mark.parametrize("status_code", [408, 429, 500, 502, 503, 504])
+    def test_transient_statuses(self, status_code: int) -> None:
+        """Test transient statuses are retried, also when wrapped."""
+        error = _status_error(status_code)
+        assert is_retryable(error, POLICY)
+        try:
+            raise QwenVisionError("wrapped") from error
+        except QwenVisionError as wrapped:
+            assert is_retryable(wrapped, POLICY)
+
+    @pytest.mark.parametrize("status_code", [400, 401, 404, 422, 501])
+    def test_other_statuses(self, status_code: int) -> None:
+        """Test bad requests and auth errors are not retried."""
+        assert not is_retryable(_status_error(status_code), POLICY)
+
+    def test_transport_and_sdk_errors(self) -> None:
+        """Test network errors and SDK-reported statuses."""
+        assert is_retryable(httpx.ConnectTimeout("timed out"), POLICY)
+        assert is_retryable(ConnectionResetError(), POLICY)
+        assert is_retryable(QwenVisionError("throttled", upstream_status=429), POLICY)
+        assert not is_retryable(QwenVisionError("bad image", upstream_status=400), POLICY)
+        assert not is_retryable(QwenVisionError("unparseable response"), POLICY)
+        assert not is_retryable(ValueError("bug"), POLICY)
+
+    def test_open_circuit_is_not_retried(self) -> None:
+        """Test a rejection by an open breaker is final."""
+        assert not is_retryable(CircuitOpenError("qwen_vl.analyze_image_one_shot", 30), POLICY)
+
+
+class TestCallWithRetry:
+    """Tests for the retry loop."""
+
+    async def test_retries_until_success(self, sleeps: list[float]) -> None:
+        """Test transient failures are retried with jittered, capped backoff."""
+        calls, call = _flaky(_status_error(503), httpx.ReadTimeout("slow"))
+        assert await call_with_retry(POLICY, call) == "ok"
+        assert len(calls) == 3
+        assert len(sleeps) == 2
+        assert 0 <= sleeps[0] <= 0.01 and 0 <= sleeps[1] <= 0.02
+
+    async def test_gives_up_after_max_attempts(self) -> None:
+        """Test the last error is raised once attempts run out."""
+        calls, call = _flaky(*[_status_error(502)] * 5)
+        with pytest.raises(httpx.HTTPStatusError):
+            await call_with_retry(POLICY, call)
+        assert len(calls) == 3
+
+    async def test_permanent_errors_are_not_retried(self) -> None:
+        """Test a 400 fails on the first attempt."""
+        calls, call = _flaky(_status_error(400))
+        with pytest.raises(httpx.HTTPStatusError):
+            await call_with_retry(POLICY, call)
+        assert len(calls) == 1
+
+    async def test_honors_retry_after(self, sleeps: list[float]) -> None:
+        """Test Retry-After replaces the backoff, and a long one ends the retries."""
+        calls, call = _flaky(_status_error(429, {"Retry-After": "3"}))
+        assert await call_with_retry(POLICY, call) == "ok"
+        assert sleeps == [3.0]
+
+        calls, call = _flaky(_status_error(429, {"Retry-After": "120"}))
+        with pytest.raises(httpx.HTTPStatusError):
+            await call_with_retry(POLICY, call)
+        assert len(calls) == 1
+
+    async def test_budget_caps_retries(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test retries stop once the budget for the window is spent."""
+        monkeypatch.setattr(retry, "retry_budget", RetryBudget(ratio=0.5, min_per_second=0.0, window=10.0))
+        outcomes = []
+        for _ in range(4):
+            calls, call = _flaky(_status_error(503))
+            try:
+                await call_with_retry(POLICY, call)
+                outcomes.append("retried")
+            except httpx.HTTPStatusError:
+                outcomes.append("failed")
+        # Half a retry per call: the 1st and 3rd calls may retry, the 2nd and 4th find it spent
+        assert outcomes == ["retried", "failed", "retried", "failed"]
+
+    def test_policy_overrides_from_settings(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test RETRY_POLICIES tunes one client without touching the others."""
+        monkeypatch.setattr(settings, "RETRY_POLICIES", {"qwen_vl": {"max_attempts": 1}})
+        assert RetryPolicy.from_settings("qwen_vl").max_attempts == 1
+        assert RetryPolicy.from_settings("qwen_vision").max_attempts == settings.RETRY_MAX_ATTEMPTS
+
+    async def test_retryable_uses_the_client_policy(self) -> None:
+        """Test the method decorator retries with self.retry_policy."""
+
+        class Client:
+            retry_policy = POLICY
+
+            def __init__(self) -> None:
+                self.calls = 0
+
+            @retryable
+            async def fetch(self, value: str) -> str:
+                self.calls += 1
+                if self.calls == 1:
+                    raise httpx.ConnectError("refused")
+                return value
+
+        client = Client()
+        assert await client.fetch("ok") == "ok"
+        assert client.calls == 2
+
+
+async def test_get_with_retry() -> None:
+    """Test downloads retry transient statuses and return other responses."""
+    statuses = iter([503, 200, 404])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(next(statuses), content=b"image")
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        response = await get_with_retry(client, "http://oss/signed", POLICY)
+        assert response.status_code == 200
+        response = await get_with_retry(client, "http://oss/signed", POLICY)
+        assert response.status_code == 404  # Left to the caller
@@ -4,11 +4,14 @@ Tests:
 - Signed URL generation
 - File URL generation
 - File deletion
+- Derivative variant keys
 """
 
 from datetime import UTC, datetime, timedelta
 
-from app.services.storage import StorageService, storage_service
+import pytest
+
+from app.services.storage import StorageService, storage_service, variant_key
 
 
 class TestStorageService:
@@ -115,3 +118,53 @@ class TestStorageServiceUrls:
         """Test that file URL starts with base_url."""
         url = storage_service.get_file_url("test.jpg")
         assert url.startswith(storage_service.base_url)
+
+
+class TestStorageVariants:
+    """Tests for derivative image keys and URLs."""
+
+    def test_variant_key_replaces_extension(self) -> None:
+        """Test variant key is stored next to the original as WebP."""
+        assert variant_key("users/1/photos/a.jpg", "thumb") == "users/1/photos/a_thumb.webp"
+        assert variant_key("generated/x.png", "medium") == "generated/x_medium.webp"
+
+    def test_variant_key_without_extension(self) -> None:
+        """Test keys without an extension get the suffix appended."""
+        assert variant_key("users/1/photos/a", "thumb") == "users/1/photos/a_thumb.webp"
+
+    def test_variant_key_dotted_directory(self) -> None:
+        """Test a dot in a directory name is not taken for the extension."""
+        assert variant_key("users/a.b/photos/x", "thumb") == "users/a.b/photos/x_thumb.webp"
+        assert variant_key("users/a.b/photos/x.jpg", "thumb") == "users/a.b/photos/x_thumb.webp"
+
+    def test_variant_key_unknown_variant(self) -> None:
+        """Test unknown variants are rejected."""
+        with pytest.raises(ValueError):
+            variant_key("a.jpg", "huge")
+
+    def test_get_file_url_with_variant(self) -> None:
+        """Test get_file_url points at the derivative object."""
+        url = storage_service.get_file_url("users/abc/segmented/item.png", variant="thumb")
+        assert url.endswith("users/abc/segmented/item_thumb.webp")
+
+    def test_object_key_from_url_roundtrip(self) -> None:
+        """Test object keys can be recovered from storage URLs."""
+        url = storage_service.get_file_url("users/abc/photos/image.jpg")
+        assert storage_service.object_key_from_url(url) == "users/abc/photos/image.jpg"
+
+    def test_object_key_from_foreign_url(self) -> None:
+        """Test URLs from other hosts are not treated as ours."""
+        assert storage_service.object_key_from_url("https://example.com/a.jpg") is None
+
+
+class TestStorageBulk:
+    """Tests for bulk listing and deletion (mock mode)."""
+
+    def test_iter_files_empty_in_mock_mode(self) -> None:
+        """Test mock storage lists nothing."""
+        assert list(storage_service.iter_files("generated/")) == []
+
+    def test_delete_files_returns_keys(self) -> None:
+        """Test mock bulk delete reports every key as deleted."""
+        keys = [f"generated/{i}.png" for i in range(3)]
+        assert storage_service.delete_files(keys) == keys
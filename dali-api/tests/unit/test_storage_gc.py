@@ -0,0 +1,71 @@
+"""Unit tests for orphaned object garbage collection."""
+
+from datetime import UTC, datetime, timedelta
+
+from app.services.storage_gc import find_orphans, live_reference, original_stem
+
+
+class TestOriginalStem:
+    """Tests for mapping objects back to their original."""
+
+    def test_original(self) -> None:
+        """Test originals drop their extension."""
+        assert original_stem("generated/abc.png") == "generated/abc"
+
+    def test_derivatives_map_to_original(self) -> None:
+        """Test WebP derivatives share the original's stem."""
+        assert original_stem("generated/abc_thumb.webp") == "generated/abc"
+        assert original_stem("blobs/ab/abcd_medium.webp") == "blobs/ab/abcd"
+
+    def test_dotted_directory(self) -> None:
+        """Test a dot in a directory name is not taken for the extension."""
+        assert original_stem("users/a.b/segmented/x") == "users/a.b/segmented/x"
+        assert original_stem("users/a.b/segmented/x_thumb.webp") == "users/a.b/segmented/x"
+
+    def test_unknown_suffix_is_not_stripped(self) -> None:
+        """Test only known variant suffixes are treated as derivatives."""
+        assert original_stem("generated/abc_large.webp") == "generated/abc_large"
+
+
+class TestFindOrphans:
+    """Tests for orphan selection."""
+
+    def test_selects_old_unreferenced_objects(self) -> None:
+        """Test live objects, their derivatives and young objects are kept."""
+        now = datetime.now(UTC)
+        old = now - timedelta(days=3)
+        objects = [
+            ("generated/live.png", old, 100),
+            ("generated/live_thumb.webp", old, 10),
+            ("generated/dead.png", old, 200),
+            ("generated/dead_thumb.webp", old, 20),
+            ("generated/new.png", now, 300),
+        ]
+
+        orphans = find_orphans(objects, {"generated/live"}, now - timedelta(hours=24))
+
+        assert orphans == [("generated/dead.png", 200), ("generated/dead_thumb.webp", 20)]
+
+    def test_only_legacy_cutouts_under_users(self) -> None:
+        """Test legacy per-user cutouts are collected but user photos are not."""
+        old = datetime.now(UTC) - timedelta(days=3)
+        objects = [
+            ("users/u1/segmented/item.png", old, 100),
+            ("users/u1/photos/abcd.jpg", old, 200),
+        ]
+
+        orphans = find_orphans(objects, set(), old + timedelta(days=1))
+
+        assert orphans == [("users/u1/segmented/item.png", 100)]
+
+
+class TestLiveReference:
+    """Tests for the blob liveness condition."""
+
+    def test_segmented_references_expire(self) -> None:
+        """Test segmentation references stop counting after the cutoff."""
+        cutoff = datetime.now(UTC)
+        sql = str(live_reference(cutoff).compile(compile_kwargs={"literal_binds": True}))
+
+        assert "blob_references.kind NOT IN ('segmented')" in sql
+        assert "blob_references.created_at >=" in sql
@@ -0,0 +1,107 @@
+"""Unit tests for cancelling generation work when an SSE client goes away."""
+
+import asyncio
+from collections.abc import AsyncGenerator
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.api.v1.endpoints import sse
+from app.config import settings
+from app.integrations.siliconflow import ImageGenerationResult
+from app.services import streaming_generator as streaming_module
+from app.services.streaming_generator import SSEEvent, StreamingContext, StreamingOutfitGenerator
+
+
+def _cancelled_work(work: str) -> float:
+    return REGISTRY.get_sample_value("sse_cancelled_work_total", {"work": work}) or 0.0
+
+
+class _HangingGenerator:
+    """Yields one event, then waits forever (a slow LLM or image)."""
+
+    def __init__(self) -> None:
+        self.cancelled = asyncio.Event()
+
+    async def generate_stream(self, **kwargs: object) -> AsyncGenerator[SSEEvent, None]:
+        yield SSEEvent(event="thinking", data={"message": "..."})
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            self.cancelled.set()
+            raise
+        yield SSEEvent(event="complete", data={})
+
+
+@pytest.fixture
+def hanging(monkeypatch: pytest.MonkeyPatch) -> _HangingGenerator:
+    """Serve the SSE endpoint from a generation that never finishes."""
+    generator = _HangingGenerator()
+    monkeypatch.setattr(sse, "streaming_generator", generator)
+    monkeypatch.setattr(settings, "SSE_DISCONNECT_POLL_SECONDS", 0.01)
+    return generator
+
+
+def _events(is_disconnected: object = None) -> AsyncGenerator[str, None]:
+    return sse.event_generator("", "米色风衣", "外套", "职场通勤", None, "user-1", is_disconnected=is_disconnected)
+
+
+async def test_disconnect_cancels_generation(hanging: _HangingGenerator) -> None:
+    """Test a gone client stops the generation and ends the response quietly."""
+    polls = 0
+
+    async def is_disconnected() -> bool:
+        nonlocal polls
+        polls += 1
+        return polls >= 2
+
+    events = [event async for event in _events(is_disconnected)]
+
+    assert hanging.cancelled.is_set()
+    assert len(events) == 1 and events[0].startswith("event: thinking")
+
+
+async def test_closing_the_response_cancels_generation(hanging: _HangingGenerator) -> None:
+    """Test the server closing the response (failed send) stops the generation."""
+    events = _events()
+    assert (await anext(events)).startswith("event: thinking")
+    await events.aclose()
+    await asyncio.wait_for(hanging.cancelled.wait(), timeout=1.0)
+
+
+class TestReleaseImage:
+    """Tests for image work left behind by a stream that ended early."""
+
+    async def test_running_image_is_cancelled(self) -> None:
+        """Test an image still generating is cancelled."""
+        generator = StreamingOutfitGenerator()
+        ctx = StreamingContext(image_task=asyncio.create_task(asyncio.sleep(60)))
+        before = _cancelled_work("image_generation")
+
+        generator._release_image(ctx)
+        await asyncio.sleep(0)
+
+        assert ctx.image_task.cancelled()
+        assert _cancelled_work("image_generation") == before + 1
+
+    async def test_undelivered_image_is_deleted(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test a generated image the client never received is deleted with its derivatives."""
+        deleted: list[str] = []
+        monkeypatch.setattr(streaming_module.storage_service, "delete_files", lambda keys: deleted.extend(keys) or keys)
+        generator = StreamingOutfitGenerator()
+
+        async def generate() -> ImageGenerationResult:
+            return ImageGenerationResult("https://oss/generated/a.png", "generated/a.png", "siliconflow", 1200)
+
+        delivered = StreamingContext(image_task=asyncio.create_task(generate()))
+        undelivered = StreamingContext(image_task=asyncio.create_task(generate()))
+        await asyncio.wait([delivered.image_task, undelivered.image_task])
+        delivered.generated_image_url = "https://oss/generated/a.png"
+        before = _cancelled_work("orphaned_image")
+
+        generator._release_image(delivered)
+        generator._release_image(undelivered)
+        await generator.shutdown()
+
+        assert sorted(deleted) == ["generated/a.png", "generated/a_medium.webp", "generated/a_thumb.webp"]
+        assert _cancelled_work("orphaned_image") == before + 1
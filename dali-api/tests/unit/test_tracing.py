@@ -0,0 +1,169 @@
+"""Unit tests for OpenTelemetry tracing."""
+
+import asyncio
+import logging
+from collections.abc import Generator
+
+import httpx
+import pytest
+from httpx import AsyncClient
+from opentelemetry import trace
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import SpanKind
+from sqlalchemy import create_engine, text
+
+from app.config import settings
+from app.core.tracing import (
+    TraceContextFilter,
+    add_span_exporter,
+    instrument_engine,
+    traced,
+    tracer,
+)
+from app.services.streaming_generator import StreamingOutfitGenerator
+from tests.fakes.upstreams import FakeUpstreamConfig, create_app
+
+_exporter = InMemorySpanExporter()
+add_span_exporter(_exporter)
+
+
+@pytest.fixture
+def spans() -> Generator[InMemorySpanExporter, None, None]:
+    """Span exporter emptied before each test."""
+    _exporter.clear()
+    yield _exporter
+    _exporter.clear()
+
+
+def _by_name(exporter: InMemorySpanExporter) -> dict:
+    return {span.name: span for span in exporter.get_finished_spans()}
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("healthy_dependencies")
+async def test_server_span_named_by_route(client: AsyncClient, spans: InMemorySpanExporter) -> None:
+    """Requests get a server span named after the route template."""
+    await client.get("/api/v1/health")
+
+    span = _by_name(spans)["GET /api/v1/health"]
+    assert span.kind == SpanKind.SERVER
+    assert span.attributes["http.route"] == "/api/v1/health"
+    assert span.attributes["http.response.status_code"] == 200
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("healthy_dependencies")
+async def test_incoming_traceparent_is_continued(client: AsyncClient, spans: InMemorySpanExporter) -> None:
+    """A W3C traceparent header makes the request part of the caller's trace."""
+    trace_id = "0af7651916cd43dd8448eb211c80319c"
+    await client.get("/api/v1/health", headers={"traceparent": f"00-{trace_id}-b7ad6b7169203331-01"})
+
+    span = _by_name(spans)["GET /api/v1/health"]
+    assert format(span.context.trace_id, "032x") == trace_id
+    assert format(span.parent.span_id, "016x") == "b7ad6b7169203331"
+
+
+@pytest.mark.asyncio
+async def test_background_task_keeps_parent(spans: InMemorySpanExporter) -> None:
+    """Tasks created inside a span report to that span even after it ended."""
+
+    @traced("background")
+    async def background() -> None:
+        await asyncio.sleep(0)
+
+    with tracer.start_as_current_span("parent"):
+        task = asyncio.create_task(background())
+    await task
+
+    found = _by_name(spans)
+    assert found["background"].parent.span_id == found["parent"].context.span_id
+
+
+def test_traced_records_exceptions(spans: InMemorySpanExporter) -> None:
+    """Exceptions mark the span as failed and propagate."""
+
+    @traced("failing")
+    def failing() -> None:
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        failing()
+
+    span = _by_name(spans)["failing"]
+    assert not span.status.is_ok
+    assert span.events[0].name == "exception"
+
+
+def test_log_records_carry_span_ids(spans: InMemorySpanExporter) -> None:
+    """The filter stamps trace and span ids on records ("-" outside spans)."""
+    log_filter = TraceContextFilter()
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "message", None, None)
+
+    log_filter.filter(record)
+    assert (record.trace_id, record.span_id) == ("-", "-")
+
+    with tracer.start_as_current_span("logged") as span:
+        log_filter.filter(record)
+    assert record.trace_id == format(span.get_span_context().trace_id, "032x")
+    assert record.span_id == format(span.get_span_context().span_id, "016x")
+
+
+def test_db_statements_are_traced(spans: InMemorySpanExporter) -> None:
+    """Engine statements become client spans under the current span."""
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+
+    with tracer.start_as_current_span("handler"), engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    found = _by_name(spans)
+    assert found["db.select"].attributes["db.statement"] == "SELECT 1"
+    assert found["db.select"].parent.span_id == found["handler"].context.span_id
+
+
+@pytest.mark.asyncio
+async def test_generation_pipeline_span_tree(
+    monkeypatch: pytest.MonkeyPatch, spans: InMemorySpanExporter
+) -> None:
+    """The LLM stream and the background image task nest under the generation span."""
+    monkeypatch.setattr(settings, "DASHSCOPE_API_KEY", "fake")
+    config = FakeUpstreamConfig(latency_ms=0, jitter_ms=0, tokens_per_second=0, image_latency_ms=0, seed=1)
+    generator = StreamingOutfitGenerator()
+    generator.tongyi_api_url = "http://fake/dashscope/api/v1/services/aigc/text-generation/generation"
+    generator._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(config)))
+
+    [event async for event in generator.generate_stream("", "米色风衣", "外套", "职场通勤")]
+    await generator.close()
+
+    found = _by_name(spans)
+    root = found["streaming.generate_stream"]
+    llm = found["dashscope.text_generation_stream"]
+    image = found["streaming.generate_image"]
+    assert llm.parent.span_id == root.context.span_id
+    # Image generation is started by a draw_prompt inside the LLM stream
+    assert image.parent.span_id == llm.context.span_id
+    assert found["siliconflow.generate_img2img"].parent.span_id == image.context.span_id
+
+
+@pytest.mark.asyncio
+async def test_closing_stream_early_restores_context(
+    monkeypatch: pytest.MonkeyPatch, spans: InMemorySpanExporter, caplog: pytest.LogCaptureFixture
+) -> None:
+    """A disconnecting consumer neither sees the stream's spans nor breaks detach."""
+    monkeypatch.setattr(settings, "DASHSCOPE_API_KEY", "fake")
+    config = FakeUpstreamConfig(latency_ms=0, jitter_ms=0, tokens_per_second=0, image_latency_ms=0, seed=1)
+    generator = StreamingOutfitGenerator()
+    generator.tongyi_api_url = "http://fake/dashscope/api/v1/services/aigc/text-generation/generation"
+    generator._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(config)))
+
+    stream = generator.generate_stream("", "米色风衣", "外套", "职场通勤")
+    async for event in stream:
+        # Between yields the consumer's context is untouched
+        assert not trace.get_current_span().get_span_context().is_valid
+        if event.event == "text_chunk":
+            break
+    await stream.aclose()
+    await generator.close()
+
+    assert "Failed to detach context" not in caplog.text
+    assert "streaming.generate_stream" in _by_name(spans)
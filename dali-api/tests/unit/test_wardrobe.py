@@ -0,0 +1,113 @@
+"""Unit tests for wardrobe embeddings and the similarity index."""
+
+import uuid
+from datetime import UTC, datetime
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.services.wardrobe import (
+    EMBEDDING_DIM,
+    WardrobeEntry,
+    WardrobeIndex,
+    WardrobeService,
+    embed_item,
+)
+
+RED = [{"hex": "#FF0000", "percentage": 0.9}, {"hex": "#FFFFFF", "percentage": 0.1}]
+PINK = [{"hex": "#FFC0CB", "percentage": 1.0}]
+NAVY = [{"hex": "#000080", "percentage": 1.0}]
+
+
+def _entry(garment_type: str = "上衣", colors: list[dict] | None = None) -> WardrobeEntry:
+    return WardrobeEntry(
+        id=uuid.uuid4(),
+        object_key=f"blobs/ab/{uuid.uuid4().hex}.png",
+        garment_type=garment_type,
+        category=None,
+        color=None,
+        style=None,
+        pattern=None,
+        description=None,
+        colors=colors or [],
+        created_at=datetime.now(UTC),
+    )
+
+
+def test_embedding_similarity() -> None:
+    """Test the dot product ranks near colors and the same type above unrelated items."""
+    red_top = embed_item("上衣", RED, "修身针织")
+    pink_top = embed_item("上衣", PINK, "针织")
+    navy_pants = embed_item("裤子", NAVY, "阔腿")
+
+    assert red_top.dtype == np.float32 and red_top.shape == (EMBEDDING_DIM,)
+    assert np.dot(red_top, red_top) == pytest.approx(1.0, abs=1e-6)
+    assert np.dot(red_top, pink_top) > np.dot(red_top, navy_pants)
+    assert 0.0 <= np.dot(red_top, navy_pants) < 0.2
+
+
+def test_index_updates_incrementally() -> None:
+    """Test adds, replacements and removals keep search consistent with brute force."""
+    rng = np.random.default_rng(0)
+    index = WardrobeIndex()
+    vectors: dict[uuid.UUID, np.ndarray] = {}
+    for _ in range(40):
+        entry = _entry()
+        vector = rng.random(EMBEDDING_DIM, dtype=np.float32)
+        index.add(entry, vector)
+        vectors[entry.id] = vector
+    for item_id in list(vectors)[::3]:
+        index.remove(item_id)
+        del vectors[item_id]
+    replaced = next(iter(vectors))
+    vectors[replaced] = rng.random(EMBEDDING_DIM, dtype=np.float32)
+    index.add(next(e for e in index.entries if e.id == replaced), vectors[replaced])
+
+    query = rng.random(EMBEDDING_DIM, dtype=np.float32)
+    ranked = sorted(vectors, key=lambda item_id: -float(vectors[item_id] @ query))
+
+    assert len(index) == len(vectors) == 26
+    assert [entry.id for entry, _ in index.search(query, 5)] == ranked[:5]
+    assert [entry.id for entry, _ in index.search(query, 5, exclude=ranked[0])] == ranked[1:6]
+
+
+async def test_similar_uses_cached_index(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the index is loaded once per user and kept up to date by writes."""
+    service = WardrobeService()
+    red, pink, navy = _entry("上衣", RED), _entry("上衣", PINK), _entry("裤子", NAVY)
+    loads: list[uuid.UUID] = []
+
+    async def load(user_id: uuid.UUID) -> WardrobeIndex:
+        loads.append(user_id)
+        index = WardrobeIndex()
+        for entry in (red, navy):
+            index.add(entry, embed_item(entry.garment_type, entry.colors, ""))
+        return index
+
+    monkeypatch.setattr(service, "_load", load)
+    user_id = uuid.uuid4()
+
+    assert [entry.id for entry, _ in await service.similar(user_id, red.id)] == [navy.id]
+    service._apply(user_id, lambda index: index.add(pink, embed_item("上衣", PINK, "")))
+    assert [entry.id for entry, _ in await service.similar(user_id, red.id)] == [pink.id, navy.id]
+    assert loads == [user_id]
+
+
+async def test_index_evicts_least_recently_used(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test only WARDROBE_INDEX_MAX_USERS indexes stay in memory."""
+    service = WardrobeService()
+
+    async def load(user_id: uuid.UUID) -> WardrobeIndex:
+        return WardrobeIndex()
+
+    monkeypatch.setattr(service, "_load", load)
+    monkeypatch.setattr(settings, "WARDROBE_INDEX_MAX_USERS", 2)
+    first, second, third = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+
+    await service.index(first)
+    await service.index(second)
+    await service.index(first)
+    await service.index(third)
+
+    assert list(service._indexes) == [first, third]
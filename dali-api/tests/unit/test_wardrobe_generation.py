@@ -0,0 +1,143 @@
+"""Unit tests for wardrobe-aware outfit generation.
+
+Tests:
+- Stored items are scored by color harmony and garment-type complementarity
+- The best matches are listed in the LLM prompt
+- A strong wardrobe outfit is answered without the LLM
+- Image generation uses the selected item as the img2img base
+"""
+
+import uuid
+from dataclasses import dataclass
+from datetime import UTC, datetime
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.services.storage import storage_service
+from app.services.streaming_generator import StreamingOutfitGenerator
+from app.services.wardrobe import (
+    WardrobeEntry,
+    WardrobeIndex,
+    WardrobeMatch,
+    color_histogram,
+    embed_item,
+    wardrobe_service,
+)
+from tests.fakes.upstreams import FakeUpstreamConfig, create_app
+
+FAST = FakeUpstreamConfig(latency_ms=0, jitter_ms=0, tokens_per_second=0, image_latency_ms=0, seed=1)
+
+
+def _entry(garment_type: str, hex_color: str | None, description: str) -> WardrobeEntry:
+    return WardrobeEntry(
+        id=uuid.uuid4(),
+        object_key=f"blobs/ab/{uuid.uuid4().hex}.png",
+        garment_type=garment_type,
+        category=None,
+        color=None,
+        style=None,
+        pattern=None,
+        description=description,
+        colors=[{"hex": hex_color, "percentage": 1.0}] if hex_color else [],
+        created_at=datetime.now(UTC),
+    )
+
+
+def _index(*entries: WardrobeEntry) -> WardrobeIndex:
+    index = WardrobeIndex()
+    for entry in entries:
+        index.add(entry, embed_item(entry.garment_type, entry.colors, entry.description or ""))
+    return index
+
+
+@dataclass
+class _Image:
+    image_url: str = "https://example.com/outfit.png"
+    provider: str = "mock"
+    generation_time_ms: int = 0
+    object_key: str = "generated/outfit.png"
+
+
+def _generator(monkeypatch: pytest.MonkeyPatch, index: WardrobeIndex) -> tuple[StreamingOutfitGenerator, list, dict]:
+    """Generator against the fake DashScope, the given wardrobe and a recording image stub."""
+    monkeypatch.setattr(settings, "DASHSCOPE_API_KEY", "fake")
+    monkeypatch.setattr("app.services.streaming_generator.image_generation_available", lambda: True)
+
+    async def load(user_id: uuid.UUID) -> WardrobeIndex:
+        return index
+
+    monkeypatch.setattr(wardrobe_service, "_load", load)
+    images: list[tuple[str, str]] = []
+
+    async def generate_image(self: StreamingOutfitGenerator, prompt: str, base_image_url: str, *args) -> _Image:
+        images.append((prompt, base_image_url))
+        return _Image()
+
+    monkeypatch.setattr(StreamingOutfitGenerator, "_generate_image", generate_image)
+    fake = create_app(FAST)
+    generator = StreamingOutfitGenerator()
+    generator.tongyi_api_url = "http://fake/dashscope/api/v1/services/aigc/text-generation/generation"
+    generator._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake))
+    return generator, images, fake.state.fake.calls
+
+
+def test_outfit_matches_prefer_complementary_harmonious_items() -> None:
+    """Test tops never match a top, and harmonious colors rank first."""
+    white_pants = _entry("裤子", "#FFFFFF", "白色阔腿裤")
+    green_skirt = _entry("裙子", "#008000", "绿色半身裙")
+    white_top = _entry("上衣", "#FFFFFF", "白色T恤")
+    plain_bag = _entry("配饰", None, "托特包")
+    index = _index(white_pants, green_skirt, white_top, plain_bag)
+
+    matches = index.outfit_matches(color_histogram([{"hex": "#FF0000", "percentage": 1.0}]), "上衣", 10)
+
+    assert [m.entry.id for m in matches] == [white_pants.id, green_skirt.id, plain_bag.id]
+    assert matches[0].complement == 1.0 and matches[0].harmony > matches[1].harmony
+    assert matches[2].harmony == 0.5
+    assert index.outfit_matches(color_histogram([]), "鞋子", 10) == []
+
+
+def test_matches_listed_in_prompt() -> None:
+    """Test matches are listed best first and the requirements stay numbered."""
+    pants = WardrobeMatch(_entry("裤子", "#FFFFFF", "白色阔腿裤"), 0.94, 0.9, 1.0)
+    message = StreamingOutfitGenerator()._build_user_message_with_selected_item(
+        "红色针织开衫", "上衣", "约会", wardrobe_matches=[pants]
+    )
+
+    assert "【用户衣橱中的可搭配单品】\n- 裤子：白色阔腿裤（搭配度0.94）" in message
+    assert "5. 参考【色彩理论参考】" in message
+    assert "6. 优先从【用户衣橱中的可搭配单品】" in message
+
+
+async def test_strong_wardrobe_outfit_skips_llm(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a strong wardrobe outfit streams without calling the LLM."""
+    selected = _entry("上衣", "#FF0000", "红色针织开衫")
+    pants, coat = _entry("裤子", "#FFFFFF", "白色阔腿裤"), _entry("外套", "#000000", "黑色西装外套")
+    generator, images, calls = _generator(monkeypatch, _index(selected, pants, coat))
+    url = storage_service.get_file_url(selected.object_key)
+
+    events = [e async for e in generator.generate_stream(url, "红色针织开衫", "上衣", "职场通勤", user_id=str(uuid.uuid4()))]
+    await generator.close()
+
+    text = "".join(e.data["content"] for e in events if e.event == "text_chunk")
+    assert calls.get("dashscope_text", 0) == 0
+    assert "白色阔腿裤" in text and "黑色西装外套" in text
+    assert events[-1].data["wardrobe_item_ids"] == [str(pants.id), str(coat.id)]
+    assert events[-1].data["generated_image_url"] == _Image.image_url
+    [(prompt, base_image_url)] = images
+    assert "white pants" in prompt and base_image_url == url
+
+
+async def test_llm_image_uses_selected_item(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the draw prompt's image is generated from the selected item."""
+    generator, images, calls = _generator(monkeypatch, _index())
+    url = "https://example.com/cutout.png"
+
+    events = [e async for e in generator.generate_stream(url, "米色风衣", "外套", "职场通勤", user_id=str(uuid.uuid4()))]
+    await generator.close()
+
+    assert calls["dashscope_text"] == 1
+    assert events[-1].data["wardrobe_item_ids"] == []
+    assert [base_image_url for _, base_image_url in images] == [url]